@@ -0,0 +1,658 @@
+"""Unified action execution engine for Agentic OS.
+
+The chat endpoint, background email commands and the document workflows
+all execute the same file/email actions. This module holds a single
+registry of action executors with typed (pydantic) inputs and a uniform
+:class:`ActionResult` output. Blocking filesystem work runs on a bounded
+thread pool, independent actions can be executed concurrently, and every
+execution is timed.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import re
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple, Type
+
+from pydantic import BaseModel, ValidationError
+
+from document_cache import DocumentCache
+from file_index import INDEX_DIR_NAME
+from file_reader import read_range
+from search_backends import search_stream
+
+
+logger = logging.getLogger(__name__)
+
+
+ACTION_MAX_WORKERS = int(os.getenv("ACTION_MAX_WORKERS", "8"))
+FIND_RESULT_LIMIT = 15
+LIST_RESULT_LIMIT = 20
+# Cosine similarity below which semantic matches are not reported by find_file
+SEMANTIC_MIN_SCORE = float(os.getenv("SEMANTIC_MIN_SCORE", "0.2"))
+PLAN_MAX_STEPS = int(os.getenv("ACTION_PLAN_MAX_STEPS", "10"))
+
+# Plan step references: "$step.key" (whole value) or "{{step.key}}" (inside a string)
+STEP_REF_RE = re.compile(r"^\$(\w+)\.(\w+)$")
+STEP_TEMPLATE_RE = re.compile(r"\{\{\s*(\w+)\.(\w+)\s*\}\}")
+
+
+# ----------------------------------------------------------------------
+# Typed inputs
+# ----------------------------------------------------------------------
+class CreateFileInput(BaseModel):
+    path: str = ""
+    content: str = ""
+
+
+class FindFileInput(BaseModel):
+    pattern: str = ""
+    search_content: bool = True
+
+
+class ReadFilesInput(BaseModel):
+    paths: List[str] = []
+    # Optional line range applied to every file (0-based first line, line count)
+    offset: int = 0
+    limit: Optional[int] = None
+
+
+class DeleteFileInput(BaseModel):
+    path: str = ""
+
+
+class ListFilesInput(BaseModel):
+    path: str = ""
+
+
+class ComposeEmailInput(BaseModel):
+    instructions: str = ""
+
+
+class PlanStep(BaseModel):
+    id: str
+    action: str
+    data: Dict[str, Any] = {}
+    depends_on: List[str] = []
+
+
+class PlanInput(BaseModel):
+    steps: List[PlanStep] = []
+
+
+class ActionResult(BaseModel):
+    """Outcome of a single action execution"""
+    action: str
+    success: bool = True
+    response: str = ""
+    data: Optional[Dict[str, Any]] = None  # None leaves the LLM-provided data untouched
+    elapsed_ms: float = 0.0
+
+    def apply_to(self, llm_response: Dict[str, Any]) -> Dict[str, Any]:
+        """Merge the result into a chat response dict (response/action/data)."""
+
+        llm_response["response"] = self.response
+        if self.data is not None:
+            llm_response["data"] = self.data
+        if not self.success:
+            llm_response["action"] = None
+        return llm_response
+
+
+# Sends composed email instructions, returns (inbox entry, raw API response)
+EmailSender = Callable[[str], Awaitable[Tuple[Dict[str, Any], Dict[str, Any]]]]
+
+
+def _error(message: str) -> Tuple[bool, str, Optional[Dict[str, Any]]]:
+    return False, message, None
+
+
+@dataclass
+class ActionSpec:
+    name: str
+    input_model: Type[BaseModel]
+    handler: Callable[..., Any]
+    blocking: bool
+    error_prefix: str
+
+
+class ActionEngine:
+    """
+    Registry and executor for chat actions.
+
+    Handlers return ``(success, response_text, data)``. Blocking handlers
+    run on a bounded ``ThreadPoolExecutor``; async handlers run on the
+    event loop.
+    """
+
+    def __init__(
+        self,
+        data_dir: Path,
+        file_index: Any,
+        send_email: Optional[EmailSender] = None,
+        max_workers: int = ACTION_MAX_WORKERS,
+        searcher: Any = None,
+        document_cache: Optional[DocumentCache] = None,
+        semantic_index: Any = None,
+    ):
+        self.data_dir = Path(data_dir)
+        self.file_index = file_index
+        # find_file backend: the file index by default, or a scan backend (search_backends.py)
+        self.searcher = searcher or file_index
+        # Whole-file reads go through the shared document cache when one is configured
+        self.document_cache = document_cache
+        # Optional embedding index (semantic_index.py): find_file adds semantically related files
+        self.semantic_index = semantic_index
+        self.send_email = send_email
+        self.actions: Dict[str, ActionSpec] = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="action")
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+        self.register("create_file", CreateFileInput, True, "Error creating file")(self._create_file)
+        self.register("find_file", FindFileInput, True, "Error finding files")(self._find_file)
+        self.register("read_files", ReadFilesInput, True, "Error reading files")(self._read_files)
+        self.register("delete_file", DeleteFileInput, True, "Error deleting file")(self._delete_file)
+        self.register("list_files", ListFilesInput, True, "Error listing files")(self._list_files)
+        self.register("compose_email", ComposeEmailInput, False, "Error sending email")(self._compose_email)
+        self.register("plan", PlanInput, False, "Error executing plan")(self._plan)
+
+    def register(
+        self,
+        name: str,
+        input_model: Type[BaseModel],
+        blocking: bool = False,
+        error_prefix: Optional[str] = None,
+    ):
+        """Decorator registering an action handler."""
+
+        def decorator(handler: Callable[..., Any]):
+            self.actions[name] = ActionSpec(
+                name, input_model, handler, blocking, error_prefix or f"Error executing {name}"
+            )
+            return handler
+
+        return decorator
+
+    def __contains__(self, name: Optional[str]) -> bool:
+        return name in self.actions
+
+    # ------------------------------------------------------------------
+    # Execution
+    # ------------------------------------------------------------------
+    async def execute(self, name: str, data: Optional[Dict[str, Any]]) -> ActionResult:
+        """Validate the input, run the handler and time it."""
+
+        spec = self.actions.get(name)
+        if spec is None:
+            return ActionResult(action=name, success=False, response=f"Error: Unknown action '{name}'.")
+
+        started = time.perf_counter()
+        try:
+            params = spec.input_model.model_validate(data or {})
+        except ValidationError as exc:
+            success, response, result_data = _error(f"Error: Invalid input for {name}: {exc.errors()[0].get('msg', exc)}")
+        else:
+            try:
+                if spec.blocking:
+                    loop = asyncio.get_running_loop()
+                    success, response, result_data = await loop.run_in_executor(
+                        self._executor, spec.handler, params
+                    )
+                else:
+                    success, response, result_data = await spec.handler(params)
+            except Exception as exc:
+                logger.error(f"Action {name} failed: {str(exc)}", exc_info=True)
+                success, response, result_data = _error(f"{spec.error_prefix}: {str(exc)}")
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self._record(name, elapsed_ms, success)
+        logger.info(f"⚙️ Action {name} finished in {elapsed_ms:.1f} ms (success={success})")
+        return ActionResult(
+            action=name,
+            success=success,
+            response=response,
+            data=result_data,
+            elapsed_ms=round(elapsed_ms, 2),
+        )
+
+    async def execute_many(self, calls: List[Tuple[str, Dict[str, Any]]]) -> List[ActionResult]:
+        """Run independent actions concurrently, preserving input order."""
+
+        return list(await asyncio.gather(*(self.execute(name, data) for name, data in calls)))
+
+    async def stream_find_file(
+        self,
+        pattern: str,
+        search_content: bool = True,
+        limit: int = FIND_RESULT_LIMIT,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield ranked find_file hits as the search backend produces them.
+
+        Stops after ``limit`` results (or when the consumer stops
+        iterating). Timings are recorded as ``find_file_stream``.
+        """
+
+        started = time.perf_counter()
+        first_ms: Optional[float] = None
+        count = 0
+        success = True
+        try:
+            async for result in search_stream(self.searcher, pattern, search_content, limit, self._executor):
+                if first_ms is None:
+                    first_ms = (time.perf_counter() - started) * 1000
+                count += 1
+                yield result
+        except Exception:
+            success = False
+            raise
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self._record("find_file_stream", elapsed_ms, success)
+            first_info = f", first after {first_ms:.1f} ms" if first_ms is not None else ""
+            logger.info(f"⚙️ Streamed {count} find_file result(s) in {elapsed_ms:.1f} ms{first_info}")
+
+    def _record(self, name: str, elapsed_ms: float, success: bool) -> None:
+        stats = self._stats.setdefault(name, {"count": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0})
+        stats["count"] += 1
+        stats["total_ms"] += elapsed_ms
+        stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+        if not success:
+            stats["errors"] += 1
+
+    def get_stats(self) -> Dict[str, Dict[str, float]]:
+        """Return per-action counts and timings."""
+
+        return {
+            name: {**stats, "avg_ms": stats["total_ms"] / stats["count"] if stats["count"] else 0.0}
+            for name, stats in self._stats.items()
+        }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+    @staticmethod
+    def safe_relative_path(path: str) -> Optional[Path]:
+        """Return the path if it is relative and has no parent traversal."""
+
+        safe_path = Path(path)
+        if ".." in str(safe_path) or safe_path.is_absolute():
+            return None
+        return safe_path
+
+    def _record_change(self, rel_path: Path, kind: str) -> None:
+        try:
+            self.file_index.record_change(str(rel_path), kind)
+            if self.semantic_index is not None:
+                self.semantic_index.mark_stale()
+        except Exception as exc:
+            logger.warning(f"Failed to record file change for {rel_path}: {str(exc)}")
+
+    # ------------------------------------------------------------------
+    # Plans
+    # ------------------------------------------------------------------
+    @classmethod
+    def _step_refs(cls, value: Any) -> Set[str]:
+        """Step ids referenced by ``$step.key`` / ``{{step.key}}`` anywhere in ``value``."""
+
+        if isinstance(value, dict):
+            return set().union(*(cls._step_refs(v) for v in value.values()))
+        if isinstance(value, list):
+            return set().union(*(cls._step_refs(v) for v in value))
+        if not isinstance(value, str):
+            return set()
+        refs = {m.group(1) for m in STEP_TEMPLATE_RE.finditer(value)}
+        match = STEP_REF_RE.match(value)
+        if match:
+            refs.add(match.group(1))
+        return refs
+
+    def validate_plan(self, steps: List[PlanStep]) -> Optional[str]:
+        """
+        Return an error message if the plan is not a runnable DAG.
+
+        Steps referenced from a step's data are added to its ``depends_on``,
+        so a reference always waits for the step it reads from.
+        """
+
+        if not steps:
+            return "Error: Plan has no steps."
+        if len(steps) > PLAN_MAX_STEPS:
+            return f"Error: Plan has {len(steps)} steps (maximum is {PLAN_MAX_STEPS})."
+
+        ids = [step.id for step in steps]
+        if len(set(ids)) != len(ids):
+            return "Error: Plan step ids must be unique."
+        for step in steps:
+            if step.action == "plan" or step.action not in self.actions:
+                return f"Error: Action '{step.action}' cannot be used in a plan."
+            for ref in sorted(self._step_refs(step.data)):
+                if ref in ids and ref not in step.depends_on:
+                    step.depends_on.append(ref)
+            missing = [dep for dep in step.depends_on if dep not in ids]
+            if missing:
+                return f"Error: Step '{step.id}' depends on unknown step(s): {', '.join(missing)}."
+
+        # Kahn's algorithm to reject cycles
+        remaining = {step.id: set(step.depends_on) for step in steps}
+        while remaining:
+            ready = [step_id for step_id, deps in remaining.items() if not deps]
+            if not ready:
+                return f"Error: Plan has a dependency cycle between: {', '.join(sorted(remaining))}."
+            for step_id in ready:
+                del remaining[step_id]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+        return None
+
+    @staticmethod
+    def _step_value(result: ActionResult, key: str) -> Any:
+        if key == "response":
+            return result.response
+        return (result.data or {}).get(key)
+
+    def _resolve_refs(self, value: Any, results: Dict[str, ActionResult]) -> Any:
+        """Substitute outputs of earlier steps into a step's input data."""
+
+        if isinstance(value, dict):
+            return {k: self._resolve_refs(v, results) for k, v in value.items()}
+        if isinstance(value, list):
+            return [self._resolve_refs(v, results) for v in value]
+        if not isinstance(value, str):
+            return value
+
+        match = STEP_REF_RE.match(value)
+        if match and match.group(1) in results:
+            return self._step_value(results[match.group(1)], match.group(2))
+
+        def substitute(m: re.Match) -> str:
+            if m.group(1) not in results:
+                return m.group(0)
+            resolved = self._step_value(results[m.group(1)], m.group(2))
+            if isinstance(resolved, list):
+                return "\n".join(str(item) for item in resolved)
+            return "" if resolved is None else str(resolved)
+
+        return STEP_TEMPLATE_RE.sub(substitute, value)
+
+    async def execute_plan(self, steps: List[PlanStep]) -> Dict[str, ActionResult]:
+        """
+        Run a validated plan. Each step starts as soon as the steps it depends
+        on have finished, so independent steps run concurrently.
+        """
+
+        results: Dict[str, ActionResult] = {}
+        tasks: Dict[str, asyncio.Task] = {}
+        by_id = {step.id: step for step in steps}
+
+        async def run_step(step: PlanStep) -> ActionResult:
+            if step.depends_on:
+                await asyncio.gather(*(tasks[dep] for dep in step.depends_on))
+            failed = [dep for dep in step.depends_on if not results[dep].success]
+            if failed:
+                result = ActionResult(
+                    action=step.action,
+                    success=False,
+                    response=f"Skipped because step(s) {', '.join(failed)} failed.",
+                )
+            else:
+                result = await self.execute(step.action, self._resolve_refs(step.data, results))
+            results[step.id] = result
+            return result
+
+        # Create tasks in dependency order so every dependency task exists first
+        created: List[str] = []
+        while len(created) < len(steps):
+            for step_id, step in by_id.items():
+                if step_id not in tasks and all(dep in tasks for dep in step.depends_on):
+                    tasks[step_id] = asyncio.create_task(run_step(step))
+                    created.append(step_id)
+
+        await asyncio.gather(*tasks.values())
+        return {step.id: results[step.id] for step in steps}
+
+    # ------------------------------------------------------------------
+    # Handlers
+    # ------------------------------------------------------------------
+    def _create_file(self, params: CreateFileInput):
+        if not params.path:
+            return _error("Error: No file path specified for file creation.")
+
+        safe_path = self.safe_relative_path(params.path)
+        if safe_path is None:
+            return _error("Error: Invalid file path.")
+
+        # If path doesn't start with Desktop/, create in Desktop folder
+        if not str(safe_path).startswith("Desktop/"):
+            safe_path = Path("Desktop") / safe_path
+
+        target_file = self.data_dir / safe_path
+        if target_file.exists():
+            return _error(f"Error: File '{safe_path}' already exists.")
+
+        target_file.parent.mkdir(parents=True, exist_ok=True)
+        target_file.write_text(params.content, encoding='utf-8')
+        self._record_change(safe_path, "created")
+        return True, f"Successfully created file '{safe_path}'.", None
+
+    def _find_file(self, params: FindFileInput):
+        if not params.pattern:
+            return _error("Error: No search pattern specified.")
+
+        found_files = self.searcher.search(params.pattern, params.search_content)
+        if self.semantic_index is not None and len(found_files) < FIND_RESULT_LIMIT:
+            seen = {f["path"] for f in found_files}
+            related = self.semantic_index.search(params.pattern, FIND_RESULT_LIMIT)
+            found_files += [
+                f for f in related if f["path"] not in seen and f["score"] >= SEMANTIC_MIN_SCORE
+            ][:FIND_RESULT_LIMIT - len(found_files)]
+        if not found_files:
+            return True, f"No files found matching '{params.pattern}' in filename or content.", {
+                "files": [], "details": [], "total": 0
+            }
+
+        results_text = []
+        for f in found_files[:FIND_RESULT_LIMIT]:
+            if f["match_type"] == "filename":
+                results_text.append(f"- {f['path']} (filename match)")
+            elif f["match_type"] == "semantic":
+                results_text.append(f"- {f['path']} (semantically related, lines {f['lines'][0]}-{f['lines'][1]})")
+            else:
+                sample_lines = f.get('sample_lines', [])
+                line_info = f" (found in content at lines {', '.join(map(str, sample_lines))}" + \
+                          (f", and {f.get('line_count', 0) - len(sample_lines)} more"
+                           if f.get('line_count', 0) > len(sample_lines) else "") + ")"
+                results_text.append(f"- {f['path']}{line_info}")
+
+        files_list = "\n".join(results_text)
+        return True, f"Found {len(found_files)} file(s) matching '{params.pattern}':\n{files_list}", {
+            "files": [f["path"] for f in found_files[:FIND_RESULT_LIMIT]],
+            "details": found_files[:FIND_RESULT_LIMIT],
+            "total": len(found_files),
+        }
+
+    def _read_files(self, params: ReadFilesInput):
+        if not params.paths:
+            return _error("Error: No file paths specified or paths must be an array.")
+
+        file_contents = []
+        errors = []
+        for file_path in params.paths:
+            try:
+                safe_path = self.safe_relative_path(file_path)
+                if safe_path is None:
+                    errors.append(f"Invalid path: {file_path}")
+                    continue
+
+                target_file = self.data_dir / safe_path
+                if not target_file.exists() or not target_file.is_file():
+                    errors.append(f"File not found: {file_path}")
+                    continue
+
+                if self.document_cache is not None and not (params.offset or params.limit is not None):
+                    document = self.document_cache.get(target_file)
+                    file_contents.append({
+                        "path": file_path,
+                        "content": document.text,
+                        "size": len(document.text),
+                        "lines": document.line_count,
+                        "tokens": document.token_count
+                    })
+                    continue
+
+                read = read_range(target_file, params.offset, params.limit, errors='ignore')
+                entry = {
+                    "path": file_path,
+                    "content": read["content"],
+                    "size": read["size"],
+                    "lines": read["lines"]
+                }
+                if params.offset or params.limit is not None:
+                    entry["offset"] = params.offset
+                    entry["has_more"] = read["has_more"]
+                file_contents.append(entry)
+            except Exception as e:
+                errors.append(f"Error reading {file_path}: {str(e)}")
+
+        if not file_contents:
+            return True, f"No files could be read. Errors: {', '.join(errors) if errors else 'All files were invalid or not found.'}", {
+                "files": [], "errors": errors
+            }
+
+        response_parts = [f"Successfully read {len(file_contents)} file(s):"]
+        for fc in file_contents:
+            range_info = f", showing from line {fc['offset'] + 1}" if "offset" in fc else ""
+            response_parts.append(f"\n--- {fc['path']} ({fc['lines']} lines, {fc['size']} chars{range_info}) ---")
+            # Include full content in response for LLM to process
+            response_parts.append(fc['content'])
+        if errors:
+            response_parts.append(f"\n\nErrors: {', '.join(errors)}")
+
+        return True, "\n".join(response_parts), {"files": file_contents, "errors": errors}
+
+    def _delete_file(self, params: DeleteFileInput):
+        if not params.path:
+            return _error("Error: No file path specified for deletion.")
+
+        safe_path = self.safe_relative_path(params.path)
+        if safe_path is None:
+            return _error("Error: Invalid file path.")
+
+        target_file = self.data_dir / safe_path
+        if not target_file.exists():
+            return _error(f"Error: File '{safe_path}' not found.")
+
+        if target_file.is_file():
+            target_file.unlink()
+        else:
+            shutil.rmtree(target_file)
+        self._record_change(safe_path, "deleted")
+        return True, f"Successfully deleted '{safe_path}'.", None
+
+    def _list_files(self, params: ListFilesInput):
+        list_path = params.path
+        if list_path:
+            target_dir = self.data_dir / Path(list_path).name
+        else:
+            target_dir = self.data_dir
+
+        if not target_dir.exists() or not target_dir.is_dir():
+            return _error(f"Error: Directory '{list_path}' not found.")
+
+        items = []
+        for item in sorted(target_dir.iterdir()):
+            if item.name == INDEX_DIR_NAME:
+                continue
+            items.append({
+                "name": item.name,
+                "path": str(item.relative_to(self.data_dir)),
+                "type": "folder" if item.is_dir() else "file"
+            })
+
+        if not items:
+            return True, f"Directory '{list_path or 'root'}' is empty.", {"items": []}
+
+        items_list = "\n".join([f"- {item['name']} ({item['type']})" for item in items[:LIST_RESULT_LIMIT]])
+        return True, f"Files in '{list_path or 'root'}':\n{items_list}", {"items": items[:LIST_RESULT_LIMIT]}
+
+    async def _plan(self, params: PlanInput):
+        error = self.validate_plan(params.steps)
+        if error:
+            return _error(error)
+
+        results = await self.execute_plan(params.steps)
+        response_parts = [f"Executed plan with {len(results)} step(s):"]
+        for step_id, result in results.items():
+            status = "✅" if result.success else "❌"
+            response_parts.append(f"\n{status} [{step_id}] {result.action}: {result.response}")
+
+        return True, "\n".join(response_parts), {
+            "steps": [
+                {"id": step_id, **result.model_dump()}
+                for step_id, result in results.items()
+            ]
+        }
+
+    async def _compose_email(self, params: ComposeEmailInput):
+        if not params.instructions:
+            return _error("Error: No email instructions provided.")
+        if self.send_email is None:
+            return _error("Error: Email sending is not configured.")
+
+        email_entry, _ = await self.send_email(params.instructions)
+
+        recipient = email_entry.get("to", "recipient")
+        subject = email_entry.get("subject", "email")
+
+        # Format recipient(s) nicely for response
+        recipients_str = recipient
+        if isinstance(recipient, str) and ',' in recipient:
+            recipients = [r.strip() for r in recipient.split(',')]
+            if len(recipients) == 2:
+                recipients_str = f"{recipients[0]} and {recipients[1]}"
+            else:
+                recipients_str = ", ".join(recipients[:-1]) + f", and {recipients[-1]}"
+
+        return True, (
+            f"Email sent successfully to {recipients_str}!\nSubject: {subject}\n"
+            "The email has been added to your inbox."
+        ), {"email": email_entry}
+
+
+# Global action engine instance (will be initialized in main.py)
+action_engine: Optional[ActionEngine] = None
+
+
+def get_action_engine() -> ActionEngine:
+    """Get the global action engine instance"""
+    global action_engine
+    if action_engine is None:
+        raise RuntimeError("Action engine not initialized. Call initialize_action_engine() first.")
+    return action_engine
+
+
+def initialize_action_engine(
+    data_dir: Path,
+    file_index: Any,
+    send_email: Optional[EmailSender] = None,
+    searcher: Any = None,
+    document_cache: Optional[DocumentCache] = None,
+    semantic_index: Any = None,
+) -> ActionEngine:
+    """Initialize the global action engine instance"""
+    global action_engine
+    action_engine = ActionEngine(
+        data_dir, file_index, send_email,
+        searcher=searcher, document_cache=document_cache, semantic_index=semantic_index,
+    )
+    return action_engine
@@ -0,0 +1,110 @@
+"""Multi-step action plans for autonomous browser agents.
+
+An agent step used to make one model call per click, type or scroll.
+The model may now return ``"plan": [...]``, a short list of actions it
+can predict without seeing the page in between, for example click the
+search box, type the query and press Enter. :func:`run_plan` executes
+the steps back to back. It stops early and hands control back to the
+model at a checkpoint:
+
+- the plan ends, or a ``done`` step is reached
+- the page navigated (the URL changed), so later coordinates or element
+  ids refer to a page that is gone
+- a step's element cannot be found, or a step fails
+
+A plain single-action answer is treated as a one-step plan.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+AGENT_MAX_PLAN_STEPS = int(os.getenv("AGENT_MAX_PLAN_STEPS", "5"))
+
+PLAN_PROMPT = f"""You may return several actions at once as "plan": [action, ...] (at most {AGENT_MAX_PLAN_STEPS}) when you can predict them without seeing the page in between, e.g. click the search box, type the query, press Enter. Plans may also use press: {{"action": "press", "key": "Enter"}}.
+End the plan where you need to look at the page again (after a navigation, or when results load). If the page changes unexpectedly, the rest of the plan is dropped and you will be asked again.
+Put "description", "goal_progress" and "next_steps" at the top level of the JSON object, next to "plan"."""
+
+# (step, following step or None) -> None
+ActionExecutor = Callable[[Dict[str, Any], Optional[Dict[str, Any]]], Awaitable[None]]
+# step -> False if its target no longer exists
+StepResolver = Callable[[Dict[str, Any]], Awaitable[bool]]
+
+
+@dataclass
+class PlanResult:
+    """How far a plan got and why it stopped."""
+
+    executed: int
+    done: bool = False
+    stopped: Optional[str] = None  # checkpoint reason when steps were skipped
+    skipped: int = 0
+
+
+def plan_steps(decision: Dict[str, Any], max_steps: int = AGENT_MAX_PLAN_STEPS) -> List[Dict[str, Any]]:
+    """The decision's steps: its ``plan`` (capped, cut after ``done``) or the decision itself."""
+
+    plan = decision.get("plan")
+    if not isinstance(plan, list) or not plan:
+        return [decision]
+    steps: List[Dict[str, Any]] = []
+    for step in plan[:max(max_steps, 1)]:
+        if not isinstance(step, dict):
+            continue
+        steps.append(step)
+        if step.get("action") == "done":
+            break
+    return steps or [decision]
+
+
+async def run_plan(
+    page: Any,
+    steps: List[Dict[str, Any]],
+    execute: ActionExecutor,
+    resolve: Optional[StepResolver] = None,
+    settle: Optional[Callable[[], Awaitable[Any]]] = None,
+) -> PlanResult:
+    """
+    Execute ``steps`` in order until a checkpoint.
+
+    ``resolve`` prepares a step just before it runs (e.g. maps an element id
+    to coordinates); ``settle`` runs between steps. A failure in the first
+    step propagates; later failures end the plan at a checkpoint.
+    """
+
+    result = PlanResult(executed=0)
+    for index, step in enumerate(steps):
+        if step.get("action") == "done":
+            result.done = True
+            break
+        following = steps[index + 1] if index + 1 < len(steps) else None
+        url_before = page.url
+        try:
+            if resolve is not None and not await resolve(step):
+                result.stopped = "element not found"
+                break
+            await execute(step, following)
+        except Exception as e:
+            if index == 0:
+                raise
+            result.stopped = f"step failed: {e}"
+            break
+        result.executed += 1
+        if following is None:
+            break
+        if settle is not None:
+            await settle()
+        if page.url != url_before:
+            result.stopped = "page navigated"
+            break
+    if result.stopped:
+        result.skipped = len(steps) - result.executed
+        logger.info(f"⏸️  Plan checkpoint after {result.executed}/{len(steps)} steps: {result.stopped}")
+    return result
@@ -0,0 +1,160 @@
+"""Event-driven scheduler for autonomous browser agents.
+
+Each browser agent used to own a ``while True`` task that woke every
+second to check for a goal, even when idle, and never exited. Agents now
+have no task of their own. :class:`AgentScheduler` keeps one FIFO queue
+of sessions with work, and a small pool of worker tasks takes one
+*step* at a time from it:
+
+- ``wake(session_id)`` queues a session (a new goal or task arrived)
+- a worker runs ``step(session_id)``; if it returns True the session
+  goes to the back of the queue, so sessions take turns (round-robin)
+- at most ``AGENT_MAX_CONCURRENT`` steps run at once, and a session never
+  runs two steps concurrently
+- workers start on demand and exit after ``AGENT_WORKER_IDLE_SECONDS``
+  without work, so idle agents cost nothing
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+
+logger = logging.getLogger(__name__)
+
+
+AGENT_MAX_CONCURRENT = int(os.getenv("AGENT_MAX_CONCURRENT", "4"))
+AGENT_WORKER_IDLE_SECONDS = float(os.getenv("AGENT_WORKER_IDLE_SECONDS", "30"))
+
+# session_id -> True if the agent still has work after this step
+AgentStep = Callable[[str], Awaitable[bool]]
+
+
+class AgentScheduler:
+    """Round-robin agent steps over a bounded, self-retiring worker pool."""
+
+    def __init__(
+        self,
+        step: AgentStep,
+        max_concurrent: int = AGENT_MAX_CONCURRENT,
+        idle_seconds: float = AGENT_WORKER_IDLE_SECONDS,
+    ):
+        self._step = step
+        self.max_concurrent = max(max_concurrent, 1)
+        self.idle_seconds = idle_seconds
+        self._ready: "asyncio.Queue[str]" = asyncio.Queue()
+        # Sessions waiting in _ready; cancelled ones are removed here and skipped on dequeue
+        self._queued: Set[str] = set()
+        # Sessions woken while their step was running
+        self._rewake: Set[str] = set()
+        self._running: Dict[str, asyncio.Task] = {}
+        self._workers: Set[asyncio.Task] = set()
+        self._idle_workers = 0
+        self._closed = False
+        self._stats = {"steps": 0, "errors": 0, "workers_started": 0, "workers_retired": 0}
+
+    def wake(self, session_id: str) -> None:
+        """Schedule a step for ``session_id`` (no-op if one is already pending)."""
+
+        if self._closed:
+            return
+        if session_id in self._running:
+            self._rewake.add(session_id)
+            return
+        if session_id in self._queued:
+            return
+        self._queued.add(session_id)
+        self._ready.put_nowait(session_id)
+        if self._idle_workers == 0 and len(self._workers) < self.max_concurrent:
+            task = asyncio.create_task(self._worker())
+            self._workers.add(task)
+            task.add_done_callback(self._workers.discard)
+            self._stats["workers_started"] += 1
+
+    def cancel(self, session_id: str) -> None:
+        """Drop pending work for a session and cancel its running step."""
+
+        self._queued.discard(session_id)
+        self._rewake.discard(session_id)
+        task = self._running.get(session_id)
+        if task is not None:
+            task.cancel()
+
+    async def stop(self, session_id: str) -> None:
+        """Cancel a session's work and wait until its running step has unwound."""
+
+        task = self._running.get(session_id)
+        self.cancel(session_id)
+        if task is not None:
+            await asyncio.wait({task})
+
+    async def _next_session(self) -> Optional[str]:
+        while True:
+            self._idle_workers += 1
+            try:
+                session_id = await asyncio.wait_for(self._ready.get(), self.idle_seconds)
+            except asyncio.TimeoutError:
+                if self._ready.empty():
+                    return None
+                continue
+            finally:
+                self._idle_workers -= 1
+            if session_id in self._queued:
+                self._queued.discard(session_id)
+                return session_id
+
+    async def _worker(self) -> None:
+        while True:
+            session_id = await self._next_session()
+            if session_id is None:
+                self._workers.discard(asyncio.current_task())
+                self._stats["workers_retired"] += 1
+                return
+            step = asyncio.create_task(self._step(session_id))
+            self._running[session_id] = step
+            try:
+                # wait() does not raise when only the step was cancelled
+                await asyncio.wait({step})
+            except asyncio.CancelledError:
+                step.cancel()
+                raise
+            finally:
+                self._running.pop(session_id, None)
+            self._stats["steps"] += 1
+            more = False
+            if step.cancelled():
+                self._rewake.discard(session_id)
+            elif step.exception() is not None:
+                self._stats["errors"] += 1
+                logger.error(f"Agent step for {session_id} failed: {step.exception()}")
+            else:
+                more = bool(step.result())
+            if more or session_id in self._rewake:
+                self._rewake.discard(session_id)
+                # Back of the queue: other sessions with work go first
+                self.wake(session_id)
+
+    def is_scheduled(self, session_id: str) -> bool:
+        return session_id in self._queued or session_id in self._running
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "workers": len(self._workers),
+            "idle_workers": self._idle_workers,
+            "running": sorted(self._running),
+            "queued": sorted(self._queued),
+            "max_concurrent": self.max_concurrent,
+        }
+
+    async def close(self) -> None:
+        """Cancel running steps and stop every worker."""
+
+        self._closed = True
+        workers = list(self._workers)
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
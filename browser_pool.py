@@ -0,0 +1,163 @@
+"""Pool of pre-warmed Playwright browser contexts.
+
+Creating a ``BrowserContext`` and its first page costs a noticeable part
+of every new browser session's first navigation. :class:`BrowserContextPool`
+keeps ``BROWSER_POOL_MIN`` idle contexts, each with a blank page already
+open, and hands them out to new sessions. When a session closes, its
+context is reset and returned to the pool: the pool closes extra pages,
+clears cookies, permissions and the storage of every origin the session
+touched, and leaves a blank page. At most ``BROWSER_POOL_MAX`` contexts
+stay idle; the rest are closed. A context that fails to reset is closed
+rather than reused, so one user's state never reaches the next.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from typing import Any, Dict, List, Optional, Set
+from urllib.parse import urlparse
+
+from playwright.async_api import Browser, BrowserContext
+
+
+logger = logging.getLogger(__name__)
+
+
+BROWSER_POOL_MIN = int(os.getenv("BROWSER_POOL_MIN", "2"))
+BROWSER_POOL_MAX = int(os.getenv("BROWSER_POOL_MAX", "8"))
+
+CONTEXT_OPTIONS: Dict[str, Any] = {
+    "viewport": {"width": 1280, "height": 720},
+    "user_agent": (
+        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+    ),
+}
+
+
+def _origin(url: str) -> Optional[str]:
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https") or not parsed.netloc:
+        return None
+    return f"{parsed.scheme}://{parsed.netloc}"
+
+
+class BrowserContextPool:
+    """Hands out ready contexts (one blank page each) and recycles released ones."""
+
+    def __init__(
+        self,
+        browser: Browser,
+        min_size: int = BROWSER_POOL_MIN,
+        max_size: int = BROWSER_POOL_MAX,
+        context_options: Optional[Dict[str, Any]] = None,
+    ):
+        self.browser = browser
+        self.min_size = min_size
+        self.max_size = max(max_size, min_size)
+        self.context_options = context_options or CONTEXT_OPTIONS
+        self._idle: List[BrowserContext] = []
+        # id(context) -> origins its pages requested (storage to clear on reset)
+        self._origins: Dict[int, Set[str]] = {}
+        self._in_use = 0
+        self._refill_task: Optional[asyncio.Task] = None
+        self._stats = {"created": 0, "pooled_hits": 0, "cold_starts": 0, "recycled": 0, "discarded": 0}
+
+    async def _create(self) -> BrowserContext:
+        context = await self.browser.new_context(**self.context_options)
+        origins: Set[str] = set()
+        self._origins[id(context)] = origins
+
+        def track(request) -> None:
+            origin = _origin(request.url)
+            if origin:
+                origins.add(origin)
+
+        context.on("request", track)
+        await context.new_page()
+        self._stats["created"] += 1
+        return context
+
+    async def warm(self) -> None:
+        """Create idle contexts until ``min_size`` are ready."""
+
+        while len(self._idle) < self.min_size:
+            try:
+                self._idle.append(await self._create())
+            except Exception as e:
+                logger.warning(f"Could not pre-warm a browser context: {e}")
+                return
+
+    def _schedule_refill(self) -> None:
+        if self._refill_task is None or self._refill_task.done():
+            self._refill_task = asyncio.create_task(self.warm())
+
+    async def acquire(self) -> BrowserContext:
+        """Take a ready context, creating one if the pool is empty."""
+
+        if self._idle:
+            context = self._idle.pop()
+            self._stats["pooled_hits"] += 1
+        else:
+            context = await self._create()
+            self._stats["cold_starts"] += 1
+        self._in_use += 1
+        self._schedule_refill()
+        return context
+
+    async def _reset(self, context: BrowserContext) -> None:
+        pages = context.pages
+        for page in pages[1:]:
+            await page.close()
+        page = pages[0] if pages else await context.new_page()
+        await page.goto("about:blank")
+        await context.clear_cookies()
+        await context.clear_permissions()
+        origins = self._origins.get(id(context), set())
+        if origins:
+            cdp = await context.new_cdp_session(page)
+            try:
+                for origin in origins:
+                    await cdp.send("Storage.clearDataForOrigin", {"origin": origin, "storageTypes": "all"})
+            finally:
+                await cdp.detach()
+            origins.clear()
+
+    async def _discard(self, context: BrowserContext) -> None:
+        self._origins.pop(id(context), None)
+        self._stats["discarded"] += 1
+        try:
+            await context.close()
+        except Exception as e:
+            logger.debug(f"Closing browser context failed: {e}")
+
+    async def release(self, context: BrowserContext) -> None:
+        """Return a session's context: reset and keep it idle, or close it."""
+
+        self._in_use = max(self._in_use - 1, 0)
+        if len(self._idle) >= self.max_size:
+            await self._discard(context)
+            return
+        try:
+            await self._reset(context)
+        except Exception as e:
+            logger.warning(f"Browser context reset failed, closing it: {e}")
+            await self._discard(context)
+            return
+        self._idle.append(context)
+        self._stats["recycled"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self._stats, "idle": len(self._idle), "in_use": self._in_use,
+                "min_size": self.min_size, "max_size": self.max_size}
+
+    async def close(self) -> None:
+        """Close the idle contexts (in-use ones close with the browser)."""
+
+        if self._refill_task is not None:
+            self._refill_task.cancel()
+        idle, self._idle = self._idle, []
+        for context in idle:
+            await self._discard(context)
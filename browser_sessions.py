@@ -0,0 +1,200 @@
+"""Lifecycle of per-session browser contexts.
+
+Every browser session used to keep its Playwright context forever in a
+plain dict, which also held ``<id>_base_url`` / ``<id>_current_url``
+string keys. :class:`BrowserSessionManager` replaces that dict. It keeps
+one :class:`BrowserSession` record per session in LRU order and bounds
+Chromium's footprint in three ways:
+
+- sessions idle longer than ``BROWSER_IDLE_TIMEOUT_SECONDS`` are closed
+- opening a session beyond ``BROWSER_MAX_CONTEXTS`` closes the least
+  recently used one
+- when the summed JS heap of all pages exceeds ``BROWSER_MAX_HEAP_MB``,
+  the least recently used sessions are closed until it fits
+
+Playwright does not expose per-context process RSS (renderers can be
+shared between contexts), so memory is measured as the JS heap of each
+page via CDP ``Runtime.getHeapUsage``. Heap is sampled by the periodic
+sweep and reported by ``get_stats``.
+
+Closing a session goes through the ``close_session`` callback supplied
+by the app. That callback stops the agent and returns the context to the
+pool.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+BROWSER_MAX_CONTEXTS = int(os.getenv("BROWSER_MAX_CONTEXTS", "20"))
+BROWSER_IDLE_TIMEOUT_SECONDS = float(os.getenv("BROWSER_IDLE_TIMEOUT_SECONDS", "900"))
+BROWSER_MAX_HEAP_MB = float(os.getenv("BROWSER_MAX_HEAP_MB", "1024"))
+BROWSER_SWEEP_SECONDS = float(os.getenv("BROWSER_SWEEP_SECONDS", "60"))
+
+
+@dataclass
+class BrowserSession:
+    """A live browser context and what the proxy needs to know about it."""
+
+    context: Any
+    created_at: float
+    last_access: float
+    base_url: Optional[str] = None
+    current_url: Optional[str] = None
+    heap_bytes: int = 0
+
+
+async def measure_heap(context: Any) -> int:
+    """Sum of used JS heap over the context's pages (0 if it cannot be measured)."""
+
+    total = 0
+    for page in context.pages:
+        try:
+            cdp = await context.new_cdp_session(page)
+            try:
+                usage = await cdp.send("Runtime.getHeapUsage")
+            finally:
+                await cdp.detach()
+            total += int(usage.get("usedSize", 0))
+        except Exception as e:
+            logger.debug(f"Heap measurement failed: {e}")
+    return total
+
+
+class BrowserSessionManager:
+    """LRU registry of browser sessions with idle, count and memory limits."""
+
+    def __init__(
+        self,
+        close_session: Callable[[str, BrowserSession], Awaitable[None]],
+        max_contexts: int = BROWSER_MAX_CONTEXTS,
+        idle_timeout: float = BROWSER_IDLE_TIMEOUT_SECONDS,
+        max_heap_bytes: float = BROWSER_MAX_HEAP_MB * 1024 * 1024,
+        measure: Callable[[Any], Awaitable[int]] = measure_heap,
+    ):
+        self._close_session = close_session
+        self.max_contexts = max_contexts
+        self.idle_timeout = idle_timeout
+        self.max_heap_bytes = max_heap_bytes
+        self._measure = measure
+        self._sessions: "OrderedDict[str, BrowserSession]" = OrderedDict()
+        self._stats = {"opened": 0, "closed": 0, "evicted_idle": 0, "evicted_lru": 0, "evicted_memory": 0}
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def session_ids(self) -> List[str]:
+        return list(self._sessions)
+
+    def get(self, session_id: str, touch: bool = True) -> Optional[BrowserSession]:
+        session = self._sessions.get(session_id)
+        if session is not None and touch:
+            session.last_access = time.time()
+            self._sessions.move_to_end(session_id)
+        return session
+
+    def most_recent(self) -> Optional[str]:
+        """The most recently used session id."""
+
+        return next(reversed(self._sessions), None)
+
+    async def add(self, session_id: str, context: Any) -> BrowserSession:
+        """Register a new session, closing the least recently used ones over the cap."""
+
+        now = time.time()
+        session = BrowserSession(context=context, created_at=now, last_access=now)
+        self._sessions[session_id] = session
+        self._stats["opened"] += 1
+        while len(self._sessions) > self.max_contexts:
+            victim = next(iter(self._sessions))
+            logger.info(f"🧹 Closing least recently used browser session {victim} (limit {self.max_contexts})")
+            await self.close(victim, "evicted_lru")
+        return session
+
+    def pop(self, session_id: str) -> Optional[BrowserSession]:
+        session = self._sessions.pop(session_id, None)
+        if session is not None:
+            self._stats["closed"] += 1
+        return session
+
+    async def close(self, session_id: str, reason: Optional[str] = None) -> bool:
+        """Close a session through the app's callback."""
+
+        session = self.pop(session_id)
+        if session is None:
+            return False
+        if reason:
+            self._stats[reason] += 1
+        try:
+            await self._close_session(session_id, session)
+        except Exception as e:
+            logger.warning(f"Closing browser session {session_id} failed: {e}")
+        return True
+
+    async def sweep(self) -> Dict[str, int]:
+        """Close idle sessions, then the least recently used ones while over the heap cap."""
+
+        cutoff = time.time() - self.idle_timeout
+        idle = [sid for sid, session in self._sessions.items() if session.last_access < cutoff]
+        for session_id in idle:
+            logger.info(f"🧹 Closing idle browser session {session_id}")
+            await self.close(session_id, "evicted_idle")
+
+        for session in list(self._sessions.values()):
+            session.heap_bytes = await self._measure(session.context)
+        over_memory = 0
+        while len(self._sessions) > 1 and self.heap_bytes() > self.max_heap_bytes:
+            victim = next(iter(self._sessions))
+            logger.info(f"🧹 Closing browser session {victim}: JS heap over {self.max_heap_bytes / 1048576:.0f} MB")
+            await self.close(victim, "evicted_memory")
+            over_memory += 1
+        return {"idle": len(idle), "memory": over_memory}
+
+    async def run(self, interval: float = BROWSER_SWEEP_SECONDS) -> None:
+        """Sweep periodically (run as a background task)."""
+
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.warning(f"Browser session sweep failed: {e}")
+
+    def heap_bytes(self) -> int:
+        return sum(session.heap_bytes for session in self._sessions.values())
+
+    def get_stats(self) -> Dict[str, Any]:
+        now = time.time()
+        return {
+            **self._stats,
+            "open": len(self._sessions),
+            "max_contexts": self.max_contexts,
+            "heap_bytes": self.heap_bytes(),
+            "max_heap_bytes": int(self.max_heap_bytes),
+            "sessions": {
+                session_id: {
+                    "idle_seconds": round(now - session.last_access, 1),
+                    "age_seconds": round(now - session.created_at, 1),
+                    "heap_bytes": session.heap_bytes,
+                    "url": session.current_url,
+                }
+                for session_id, session in self._sessions.items()
+            },
+        }
+
+    async def close_all(self) -> None:
+        for session_id in list(self._sessions):
+            await self.close(session_id)
@@ -0,0 +1,189 @@
+"""In-process document cache for workflow reads.
+
+Report and slideshow workflows, email commands and the ``read_files``
+action read the same documents over and over. Decoded documents are kept
+in an LRU keyed on path and validated against the file's ``(mtime, size)``
+on every lookup, so an edited file is re-read automatically. Each entry
+carries derived data computed once at load time (line offsets, the
+lowercased text, word and token counts). Eviction is by a total byte
+budget rather than an entry count.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import sys
+import threading
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from pydantic import BaseModel
+
+from file_index import tokenize
+from file_reader import read_range
+
+
+logger = logging.getLogger(__name__)
+
+# Rough chars-per-token ratio of the OpenAI tokenizers on English text
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate LLM token count of ``text``."""
+
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+class DocumentCacheConfig(BaseModel):
+    """Configuration for the document cache"""
+    max_bytes: int = int(os.getenv("DOC_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+    # Larger documents are returned but never cached
+    max_document_bytes: int = int(os.getenv("DOC_CACHE_MAX_DOCUMENT_BYTES", str(32 * 1024 * 1024)))
+
+
+@dataclass
+class CachedDocument:
+    """A decoded document plus derived data"""
+    path: str
+    mtime_ns: int
+    size: int
+    text: str
+    lower: str
+    line_offsets: array
+    word_count: int
+    token_count: int
+    nbytes: int
+
+    @classmethod
+    def load(cls, path: Path) -> "CachedDocument":
+        stat = path.stat()
+        text = read_range(path, errors="ignore")["content"]
+        lower = text.lower()
+        offsets = array("Q", [0])
+        pos = text.find("\n")
+        while pos >= 0:
+            offsets.append(pos + 1)
+            pos = text.find("\n", pos + 1)
+        nbytes = sys.getsizeof(text) + sys.getsizeof(lower) + offsets.itemsize * len(offsets)
+        return cls(
+            path=str(path),
+            mtime_ns=stat.st_mtime_ns,
+            size=stat.st_size,
+            text=text,
+            lower=lower,
+            line_offsets=offsets,
+            word_count=len(tokenize(lower)),
+            token_count=estimate_tokens(text),
+            nbytes=nbytes,
+        )
+
+    @property
+    def line_count(self) -> int:
+        """Same value as ``len(text.split('\\n'))``."""
+
+        return len(self.line_offsets)
+
+    def line_of(self, char_index: int) -> int:
+        """1-based line number containing ``char_index``."""
+
+        return bisect_right(self.line_offsets, char_index)
+
+
+class DocumentCache:
+    """
+    Byte-budgeted LRU of :class:`CachedDocument` entries.
+
+    Lookups stat the file and reload it when its mtime or size changed.
+    Safe to use from the action engine's worker threads.
+    """
+
+    def __init__(self, config: Optional[DocumentCacheConfig] = None):
+        self.config = config or DocumentCacheConfig()
+        self._entries: "OrderedDict[str, CachedDocument]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0, "evictions": 0, "bypassed": 0}
+
+    def get(self, path: Path) -> CachedDocument:
+        """Return the decoded document at ``path``, from the cache when still valid."""
+
+        key = str(path)
+        stat = path.stat()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return entry
+                self._remove(key)
+                self._stats["invalidations"] += 1
+            self._stats["misses"] += 1
+
+        # Decode outside the lock so slow reads do not block other lookups
+        document = CachedDocument.load(path)
+        with self._lock:
+            if document.size > self.config.max_document_bytes or document.nbytes > self.config.max_bytes:
+                self._stats["bypassed"] += 1
+                return document
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = document
+            self._bytes += document.nbytes
+            while self._bytes > self.config.max_bytes:
+                evicted_key = next(iter(self._entries))
+                self._remove(evicted_key)
+                self._stats["evictions"] += 1
+        return document
+
+    def _remove(self, key: str) -> None:
+        self._bytes -= self._entries.pop(key).nbytes
+
+    def invalidate(self, path: Path) -> None:
+        with self._lock:
+            if str(path) in self._entries:
+                self._remove(str(path))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the current footprint."""
+
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.config.max_bytes,
+                "hit_rate": self._stats["hits"] / lookups if lookups else 0.0,
+            }
+
+
+# Global document cache instance (will be initialized in main.py)
+document_cache: Optional[DocumentCache] = None
+
+
+def get_document_cache() -> DocumentCache:
+    """Get the global document cache instance"""
+    global document_cache
+    if document_cache is None:
+        raise RuntimeError("Document cache not initialized. Call initialize_document_cache() first.")
+    return document_cache
+
+
+def initialize_document_cache(config: Optional[DocumentCacheConfig] = None) -> DocumentCache:
+    """Initialize the global document cache instance"""
+    global document_cache
+    document_cache = DocumentCache(config)
+    logger.info(f"📚 Document cache initialized ({document_cache.config.max_bytes // (1024 * 1024)} MiB budget)")
+    return document_cache
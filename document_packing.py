@@ -0,0 +1,185 @@
+"""Token-budgeted document packing for report and slideshow prompts.
+
+The compilation workflows used to concatenate every matched document
+into one prompt, so a few large files were enough to hit the model's
+token limit. :func:`pack_documents` fits the documents into a token
+budget instead:
+
+1. If everything fits, every document is included whole.
+2. Otherwise the smallest documents are included whole, up to
+   ``PACK_WHOLE_FRACTION`` of the budget.
+3. The remaining documents are split into chunks of about
+   ``PACK_CHUNK_TOKENS`` tokens. Chunks are scored against the request
+   with BM25, where rare terms count more than words common to every
+   chunk. The best chunks fill what is left of the budget.
+
+Packed output keeps the ``=== path ===`` layout the prompts already use.
+Documents keep their search-ranking order. Gaps between chosen excerpts
+are marked as trimmed.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import os
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Tuple
+
+from document_cache import CHARS_PER_TOKEN, estimate_tokens
+from file_index import bm25_term_score, tokenize
+
+
+logger = logging.getLogger(__name__)
+
+
+PACK_TOKEN_BUDGET = int(os.getenv("PACK_TOKEN_BUDGET", "30000"))
+PACK_CHUNK_TOKENS = int(os.getenv("PACK_CHUNK_TOKENS", "600"))
+PACK_WHOLE_FRACTION = float(os.getenv("PACK_WHOLE_FRACTION", "0.6"))
+TRIM_MARKER = "[... trimmed ...]"
+
+
+@dataclass
+class PackedDocuments:
+    """Result of packing: the prompt text plus what was kept from each document"""
+    text: str
+    tokens: int
+    budget: int
+    documents: List[Dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def trimmed(self) -> int:
+        return sum(1 for doc in self.documents if doc["mode"] != "whole")
+
+    def summary(self) -> str:
+        whole = sum(1 for doc in self.documents if doc["mode"] == "whole")
+        excerpts = sum(1 for doc in self.documents if doc["mode"] == "excerpts")
+        omitted = sum(1 for doc in self.documents if doc["mode"] == "omitted")
+        parts = [f"{whole} whole"]
+        if excerpts:
+            parts.append(f"{excerpts} excerpted")
+        if omitted:
+            parts.append(f"{omitted} omitted")
+        return f"{', '.join(parts)} (~{self.tokens} of {self.budget} tokens)"
+
+
+def chunk_text(text: str, chunk_tokens: int = PACK_CHUNK_TOKENS) -> List[str]:
+    """Split text into chunks of about ``chunk_tokens`` tokens on line boundaries."""
+
+    max_chars = max(chunk_tokens, 1) * CHARS_PER_TOKEN
+    chunks: List[str] = []
+    current: List[str] = []
+    current_chars = 0
+    for line in text.splitlines(keepends=True):
+        # Hard-wrap single lines that are longer than a chunk
+        pieces = [line[i:i + max_chars] for i in range(0, len(line), max_chars)] or [line]
+        for piece in pieces:
+            if current and current_chars + len(piece) > max_chars:
+                chunks.append("".join(current))
+                current, current_chars = [], 0
+            current.append(piece)
+            current_chars += len(piece)
+    if current:
+        chunks.append("".join(current))
+    return chunks
+
+
+def _score_chunks(chunks: List[Tuple[int, int, str]], query: str) -> Dict[Tuple[int, int], float]:
+    """BM25 score of each (doc, chunk) against the query, with chunks as the corpus."""
+
+    query_terms = set(tokenize(query))
+    if not query_terms or not chunks:
+        return {}
+    counts = [Counter(term for term in tokenize(text) if term in query_terms) for _, _, text in chunks]
+    lengths = [max(estimate_tokens(text), 1) for _, _, text in chunks]
+    avg_length = sum(lengths) / len(lengths)
+    df = Counter(term for count in counts for term in count)
+    total = len(chunks)
+    idf = {term: math.log(1 + (total - n + 0.5) / (n + 0.5)) for term, n in df.items()}
+    return {
+        (doc_idx, chunk_idx): sum(
+            bm25_term_score(tf, length, avg_length, idf[term]) for term, tf in count.items()
+        )
+        for (doc_idx, chunk_idx, _), count, length in zip(chunks, counts, lengths)
+    }
+
+
+def pack_documents(
+    documents: List[Dict[str, Any]],
+    query: str,
+    budget_tokens: int = PACK_TOKEN_BUDGET,
+    chunk_tokens: int = PACK_CHUNK_TOKENS,
+) -> PackedDocuments:
+    """
+    Fit ``documents`` (``read_files`` entries: ``path``, ``content`` and
+    optionally ``tokens``) into ``budget_tokens``, most relevant first.
+    """
+
+    sizes = [doc.get("tokens") or estimate_tokens(doc["content"]) for doc in documents]
+    modes = ["omitted"] * len(documents)
+    selected: Dict[int, List[int]] = {}
+    doc_chunks: Dict[int, List[str]] = {}
+    used = 0
+
+    if sum(sizes) <= budget_tokens:
+        modes = ["whole"] * len(documents)
+        used = sum(sizes)
+    else:
+        # Whole documents, smallest first, up to a share of the budget
+        whole_budget = int(budget_tokens * PACK_WHOLE_FRACTION)
+        for idx in sorted(range(len(documents)), key=lambda i: sizes[i]):
+            if used + sizes[idx] > whole_budget:
+                break
+            modes[idx] = "whole"
+            used += sizes[idx]
+
+        # Best-scoring chunks of the remaining documents fill the rest
+        candidates = []
+        for idx, doc in enumerate(documents):
+            if modes[idx] == "whole":
+                continue
+            doc_chunks[idx] = chunk_text(doc["content"], chunk_tokens)
+            candidates.extend((idx, chunk_idx, text) for chunk_idx, text in enumerate(doc_chunks[idx]))
+        scores = _score_chunks(candidates, query)
+        # Ties (e.g. no query terms) go to higher-ranked documents and earlier chunks
+        for idx, chunk_idx, text in sorted(
+            candidates, key=lambda c: (-scores.get((c[0], c[1]), 0.0), c[0], c[1])
+        ):
+            cost = estimate_tokens(text)
+            if used + cost > budget_tokens:
+                continue
+            selected.setdefault(idx, []).append(chunk_idx)
+            used += cost
+
+    sections = []
+    report = []
+    for idx, doc in enumerate(documents):
+        if modes[idx] == "whole":
+            sections.append(f"=== {doc['path']} ===\n{doc['content']}")
+            report.append({"path": doc["path"], "mode": "whole", "tokens": sizes[idx]})
+            continue
+        chunk_ids = sorted(selected.get(idx, []))
+        if not chunk_ids:
+            report.append({"path": doc["path"], "mode": "omitted", "tokens": 0})
+            continue
+        parts = []
+        previous = -1
+        for chunk_idx in chunk_ids:
+            if chunk_idx != previous + 1:
+                parts.append(TRIM_MARKER + "\n")
+            parts.append(doc_chunks[idx][chunk_idx])
+            previous = chunk_idx
+        if previous != len(doc_chunks[idx]) - 1:
+            parts.append("\n" + TRIM_MARKER)
+        sections.append(f"=== {doc['path']} (excerpts) ===\n{''.join(parts)}")
+        report.append({
+            "path": doc["path"],
+            "mode": "excerpts",
+            "tokens": sum(estimate_tokens(doc_chunks[idx][c]) for c in chunk_ids),
+            "chunks": f"{len(chunk_ids)}/{len(doc_chunks[idx])}",
+        })
+
+    packed = PackedDocuments(text="\n\n".join(sections), tokens=used, budget=budget_tokens, documents=report)
+    logger.info(f"📦 Packed {len(documents)} document(s): {packed.summary()}")
+    return packed
@@ -0,0 +1,579 @@
+"""Persistent inverted index over the Agentic OS data directory.
+
+``find_file`` used to walk the whole data directory and re-read every file
+on each query. This module keeps an on-disk inverted index (term ->
+postings with line numbers) in a SQLite database under the data directory
+so searches only touch the postings for the query terms.
+
+The index and the flat file listing are maintained incrementally: write
+paths call :meth:`FileIndex.record_change`, which applies the change and
+appends it to a change journal, and :meth:`FileIndex.watch` picks up
+out-of-band edits through ``watchfiles`` (inotify on Linux). Full syncs run
+from the startup task and the watcher's periodic rescan, never inside a
+query.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+
+INDEX_DIR_NAME = ".index"
+INDEX_DB_NAME = "file_index.sqlite3"
+# Files larger than this are still matched by filename but not indexed by content
+INDEX_MAX_FILE_BYTES = int(os.getenv("FILE_INDEX_MAX_FILE_BYTES", str(32 * 1024 * 1024)))
+# Safety-net rescan interval (stat only, unchanged files are not re-read)
+INDEX_RESCAN_SECONDS = float(os.getenv("FILE_INDEX_RESCAN_SECONDS", "300"))
+# Polling interval used when watchfiles is not installed
+INDEX_POLL_SECONDS = float(os.getenv("FILE_INDEX_POLL_SECONDS", "30"))
+JOURNAL_MAX_ENTRIES = int(os.getenv("FILE_INDEX_JOURNAL_MAX_ENTRIES", "10000"))
+# SQLite page cache for the index connection, in KiB
+INDEX_CACHE_KIB = int(os.getenv("FILE_INDEX_CACHE_KIB", str(64 * 1024)))
+
+TOKEN_RE = re.compile(r"\w+")
+
+# Ranking: BM25 over content matches, filename matches boosted above them
+BM25_K1 = 1.2
+BM25_B = 0.75
+FILENAME_BOOST = 100.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    indexed INTEGER NOT NULL DEFAULT 1,
+    length INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS terms (
+    id INTEGER PRIMARY KEY,
+    term TEXT UNIQUE NOT NULL
+);
+CREATE TABLE IF NOT EXISTS postings (
+    term_id INTEGER NOT NULL,
+    doc_id INTEGER NOT NULL,
+    lines TEXT NOT NULL,
+    PRIMARY KEY (term_id, doc_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc_id);
+CREATE TABLE IF NOT EXISTS journal (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    path TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    source TEXT NOT NULL,
+    ts REAL NOT NULL
+);
+"""
+
+
+def tokenize(text: str) -> List[str]:
+    """Split lowercased text into index terms."""
+
+    return TOKEN_RE.findall(text.lower())
+
+
+def bm25_term_score(tf: int, length: int, avg_length: float, idf: float = 1.0) -> float:
+    """BM25 contribution of one query term with term frequency ``tf``."""
+
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * length / (avg_length or 1.0))
+    return idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+
+def filename_score(path: str, pattern_lower: str) -> float:
+    """Filename matches outrank content; the whole pattern in the path ranks highest."""
+
+    return FILENAME_BOOST * (2 if pattern_lower in path.lower() else 1)
+
+
+def matches_filename(path: str, pattern_lower: str, pattern_words: List[str]) -> bool:
+    """Filename rule used by find_file: whole pattern or every word in the path."""
+
+    path_lower = path.lower()
+    return pattern_lower in path_lower or (
+        len(pattern_words) > 1 and all(word in path_lower for word in pattern_words)
+    )
+
+
+def iter_data_files(data_dir: Path) -> Iterable[Tuple[str, os.stat_result]]:
+    """Walk the data directory (skipping the index dir), yielding ``(relative_path, stat)``."""
+
+    data_dir = Path(data_dir)
+    for root, dirs, filenames in os.walk(data_dir):
+        if Path(root) == data_dir and INDEX_DIR_NAME in dirs:
+            dirs.remove(INDEX_DIR_NAME)
+        for filename in filenames:
+            full_path = os.path.join(root, filename)
+            try:
+                stat = os.stat(full_path)
+            except OSError:
+                continue
+            rel_path = os.path.relpath(full_path, data_dir).replace(os.sep, "/")
+            yield rel_path, stat
+
+
+class FileIndex:
+    """
+    SQLite-backed inverted index for the files under ``data_dir``.
+
+    Content matching is token based: a file matches when every query token
+    is contained in some term of the file, and a line matches when every
+    query token appears on that line.
+    """
+
+    def __init__(self, data_dir: Path):
+        self.data_dir = Path(data_dir)
+        self.index_dir = self.data_dir / INDEX_DIR_NAME
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.index_dir / INDEX_DB_NAME
+
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        # Postings inserts hit random B-tree pages; a larger page cache keeps bulk syncs fast
+        self._conn.execute(f"PRAGMA cache_size=-{INDEX_CACHE_KIB}")
+        self._conn.executescript(SCHEMA)
+        self._migrate()
+        self._lock = threading.RLock()
+        # term -> id (terms are never deleted, so this never goes stale)
+        self._term_cache: Dict[str, int] = {}
+        self._listing: Optional[List[Dict[str, str]]] = None
+
+    def _migrate(self) -> None:
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(docs)")}
+        if "length" not in columns:
+            # Document lengths feed BM25; force a re-index so every doc gets one
+            self._conn.execute("ALTER TABLE docs ADD COLUMN length INTEGER NOT NULL DEFAULT 0")
+            self._conn.execute("UPDATE docs SET mtime = -1")
+            self._conn.commit()
+
+    # ------------------------------------------------------------------
+    # Building
+    # ------------------------------------------------------------------
+    def iter_files(self) -> Iterable[Tuple[str, os.stat_result]]:
+        """Yield ``(relative_path, stat)`` for every file in the data directory."""
+
+        return iter_data_files(self.data_dir)
+
+    def sync(self) -> Dict[str, int]:
+        """Bring the index up to date with the data directory (stat based)."""
+
+        started = time.perf_counter()
+        added = updated = removed = 0
+        with self._lock:
+            known = {
+                path: (mtime, size)
+                for path, mtime, size in self._conn.execute("SELECT path, mtime, size FROM docs")
+            }
+            seen: Set[str] = set()
+            for rel_path, stat in self.iter_files():
+                seen.add(rel_path)
+                previous = known.get(rel_path)
+                if previous == (stat.st_mtime, stat.st_size):
+                    continue
+                self._index_file(rel_path, stat)
+                if previous is None:
+                    added += 1
+                else:
+                    updated += 1
+
+            for rel_path in set(known) - seen:
+                self._remove(rel_path)
+                removed += 1
+
+            self._conn.commit()
+            if added or removed:
+                self._listing = None
+
+        if added or updated or removed:
+            logger.info(
+                "File index synced in %.1f ms (%d added, %d updated, %d removed)",
+                (time.perf_counter() - started) * 1000, added, updated, removed,
+            )
+        return {"added": added, "updated": updated, "removed": removed}
+
+    def _index_file(self, rel_path: str, stat: os.stat_result) -> None:
+        full_path = self.data_dir / rel_path
+        postings: Dict[str, List[int]] = defaultdict(list)
+        length = 0
+        indexed = stat.st_size <= INDEX_MAX_FILE_BYTES
+        if indexed:
+            try:
+                with open(full_path, "r", encoding="utf-8", errors="ignore") as f:
+                    for line_no, line in enumerate(f, 1):
+                        terms = tokenize(line)
+                        length += len(terms)
+                        for term in set(terms):
+                            postings[term].append(line_no)
+            except OSError as exc:
+                logger.warning("Could not index %s: %s", rel_path, exc)
+                return
+
+        self._remove(rel_path)
+        cursor = self._conn.execute(
+            "INSERT INTO docs (path, mtime, size, indexed, length) VALUES (?, ?, ?, ?, ?)",
+            (rel_path, stat.st_mtime, stat.st_size, int(indexed), length),
+        )
+        doc_id = cursor.lastrowid
+        if not postings:
+            return
+
+        term_ids = self._term_ids(list(postings))
+        self._conn.executemany(
+            "INSERT INTO postings (term_id, doc_id, lines) VALUES (?, ?, ?)",
+            (
+                (term_ids[term], doc_id, ",".join(map(str, lines)))
+                for term, lines in postings.items()
+            ),
+        )
+
+    def _term_ids(self, terms: List[str]) -> Dict[str, int]:
+        """Return ids for ``terms``, creating the ones not seen before."""
+
+        cache = self._term_cache
+        missing = [term for term in terms if term not in cache]
+        if missing:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO terms (term) VALUES (?)",
+                ((term,) for term in missing),
+            )
+            # Stay below SQLite's bound-parameter limit
+            for start in range(0, len(missing), 500):
+                chunk = missing[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                for term_id, term in self._conn.execute(
+                    f"SELECT id, term FROM terms WHERE term IN ({placeholders})", chunk
+                ):
+                    cache[term] = term_id
+        return {term: cache[term] for term in terms}
+
+    def _remove(self, rel_path: str) -> None:
+        row = self._conn.execute("SELECT id FROM docs WHERE path = ?", (rel_path,)).fetchone()
+        if row is None:
+            return
+        self._conn.execute("DELETE FROM postings WHERE doc_id = ?", (row[0],))
+        self._conn.execute("DELETE FROM docs WHERE id = ?", (row[0],))
+
+    # ------------------------------------------------------------------
+    # Incremental maintenance
+    # ------------------------------------------------------------------
+    @staticmethod
+    def normalize_path(rel_path: str) -> str:
+        """Normalise a data-relative path to the forward-slash form stored in the index."""
+
+        normalized = str(rel_path).replace(os.sep, "/").strip("/")
+        while normalized.startswith("./"):
+            normalized = normalized[2:]
+        return normalized
+
+    def record_change(self, rel_path: str, kind: str, source: str = "api") -> bool:
+        """
+        Apply a change to the index and append it to the change journal.
+
+        Args:
+            rel_path: Path relative to the data directory (file or folder)
+            kind: "created", "modified" or "deleted"
+            source: Who reported the change ("api", "agent", "watcher", ...)
+
+        Returns:
+            True if the index content changed
+        """
+        rel_path = self.normalize_path(rel_path)
+        if not rel_path or rel_path.split("/")[0] == INDEX_DIR_NAME:
+            return False
+
+        with self._lock:
+            changed = self._apply(rel_path)
+            if changed or source != "watcher":
+                self._conn.execute(
+                    "INSERT INTO journal (path, kind, source, ts) VALUES (?, ?, ?, ?)",
+                    (rel_path, kind, source, time.time()),
+                )
+                self._conn.execute(
+                    "DELETE FROM journal WHERE seq <= (SELECT MAX(seq) FROM journal) - ?",
+                    (JOURNAL_MAX_ENTRIES,),
+                )
+            self._conn.commit()
+        return changed
+
+    def _apply(self, rel_path: str) -> bool:
+        full_path = self.data_dir / rel_path
+        changed = False
+
+        if full_path.is_file():
+            stat = full_path.stat()
+            row = self._conn.execute(
+                "SELECT mtime, size FROM docs WHERE path = ?", (rel_path,)
+            ).fetchone()
+            if row != (stat.st_mtime, stat.st_size):
+                self._index_file(rel_path, stat)
+                changed = True
+                if row is None:
+                    self._listing = None
+        elif full_path.is_dir():
+            for root, _, filenames in os.walk(full_path):
+                for filename in filenames:
+                    child = os.path.relpath(os.path.join(root, filename), self.data_dir)
+                    changed = self._apply(self.normalize_path(child)) or changed
+        else:
+            # Deleted file or folder: drop the path and everything below it
+            rows = self._conn.execute(
+                "SELECT path FROM docs WHERE path = ? OR substr(path, 1, ?) = ?",
+                (rel_path, len(rel_path) + 1, rel_path + "/"),
+            ).fetchall()
+            for (path,) in rows:
+                self._remove(path)
+            if rows:
+                changed = True
+                self._listing = None
+
+        return changed
+
+    def recent_changes(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Return the most recent journal entries (newest first)."""
+
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, path, kind, source, ts FROM journal ORDER BY seq DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [
+            {"seq": seq, "path": path, "kind": kind, "source": source, "timestamp": ts}
+            for seq, path, kind, source, ts in rows
+        ]
+
+    async def watch(self) -> None:
+        """
+        Watch the data directory for out-of-band edits and apply them.
+
+        Uses ``watchfiles`` (inotify/FSEvents) when available, with a
+        stat-only safety-net sync every ``INDEX_RESCAN_SECONDS``; otherwise
+        falls back to a stat-only sync every ``INDEX_POLL_SECONDS``.
+        """
+        try:
+            from watchfiles import awatch
+        except ImportError:
+            logger.info("watchfiles not installed; polling data directory every %ss", INDEX_POLL_SECONDS)
+            await self._sync_every(INDEX_POLL_SECONDS)
+
+        index_prefix = str(self.index_dir)
+
+        def watch_filter(_change, path: str) -> bool:
+            return not path.startswith(index_prefix)
+
+        logger.info("Watching %s for file changes", self.data_dir)
+        rescan = asyncio.create_task(self._sync_every(INDEX_RESCAN_SECONDS))
+        try:
+            async for changes in awatch(self.data_dir, watch_filter=watch_filter):
+                for change, path in changes:
+                    rel_path = os.path.relpath(path, self.data_dir)
+                    kind = "created" if change.name == "added" else change.name
+                    await asyncio.to_thread(self.record_change, rel_path, kind, "watcher")
+        finally:
+            rescan.cancel()
+
+    async def _sync_every(self, seconds: float) -> None:
+        while True:
+            await asyncio.sleep(seconds)
+            try:
+                await asyncio.to_thread(self.sync)
+            except Exception as exc:
+                logger.warning("Periodic file index sync failed: %s", exc)
+
+    # ------------------------------------------------------------------
+    # Querying
+    # ------------------------------------------------------------------
+    def list_files(self) -> List[Dict[str, str]]:
+        """
+        Return ``{"name", "path"}`` for every file, served from the maintained listing.
+
+        Never syncs: the listing is kept current by ``record_change``, the
+        watcher and the background sync. Rebuilding a dropped listing is one
+        SELECT, but it may wait for a running sync's lock, so async callers
+        should run this in a thread.
+        """
+
+        if self._listing is None:
+            with self._lock:
+                if self._listing is None:
+                    self._listing = [
+                        {"name": path.rsplit("/", 1)[-1], "path": path}
+                        for (path,) in self._conn.execute("SELECT path FROM docs ORDER BY path")
+                    ]
+        return self._listing
+
+    def all_paths(self) -> List[str]:
+        """Return every indexed relative path."""
+
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT path FROM docs ORDER BY path")]
+
+    def search(
+        self,
+        pattern: str,
+        search_content: bool = True,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Search filenames and contents for ``pattern``.
+
+        Returns filename matches first, then content matches ranked by BM25,
+        using the same ``match_type``/``line_count``/``sample_lines`` shape
+        find_file uses.
+        """
+        results = [
+            {k: v for k, v in result.items() if k != "score"}
+            for result in self.iter_search(pattern, search_content, limit)
+        ]
+        return results
+
+    def iter_search(
+        self,
+        pattern: str,
+        search_content: bool = True,
+        limit: Optional[int] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Yield ranked results (with a ``score``), best first, stopping at ``limit``.
+
+        Filename matches get ``FILENAME_BOOST`` (doubled when the whole
+        pattern appears in the path) so they rank above content matches;
+        they are yielded before any content is scored. Content matches need
+        corpus-wide BM25 statistics, so they follow as one ranked batch.
+        Queries never sync the index.
+        """
+        pattern_lower = pattern.lower()
+        pattern_words = pattern_lower.split()
+
+        with self._lock:
+            docs = list(self._conn.execute("SELECT id, path, length FROM docs ORDER BY path"))
+
+        filename_hits: List[Dict[str, Any]] = []
+        name_matched: Set[int] = set()
+        for doc_id, path, _ in docs:
+            if matches_filename(path, pattern_lower, pattern_words):
+                filename_hits.append({
+                    "path": path, "match_type": "filename", "score": filename_score(path, pattern_lower)
+                })
+                name_matched.add(doc_id)
+        filename_hits.sort(key=lambda r: -r["score"])
+
+        remaining = limit
+        for hit in filename_hits:
+            if remaining is not None and remaining <= 0:
+                return
+            yield hit
+            if remaining is not None:
+                remaining -= 1
+        if not search_content or (remaining is not None and remaining <= 0):
+            return
+
+        with self._lock:
+            content_hits = self._search_content(pattern_lower, docs, name_matched)
+        content_hits.sort(key=lambda r: -r["score"])
+        yield from (content_hits[:remaining] if remaining is not None else content_hits)
+
+    def _search_content(
+        self,
+        pattern_lower: str,
+        docs: List[Tuple[int, str, int]],
+        exclude: Set[int],
+    ) -> List[Dict[str, Any]]:
+        query_tokens = list(dict.fromkeys(tokenize(pattern_lower)))
+        if not query_tokens:
+            return []
+
+        # Per token: doc_id -> line numbers where a matching term occurs
+        per_token: List[Dict[int, Set[int]]] = []
+        for token in query_tokens:
+            doc_lines: Dict[int, Set[int]] = defaultdict(set)
+            # Resolve matching terms first so postings are read by primary key
+            # (a join lets SQLite drive the query from the postings table)
+            term_ids = [
+                row[0] for row in self._conn.execute(
+                    "SELECT id FROM terms WHERE instr(term, ?) > 0", (token,)
+                )
+            ]
+            for start in range(0, len(term_ids), 500):
+                chunk = term_ids[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT doc_id, lines FROM postings WHERE term_id IN ({placeholders})", chunk
+                )
+                for doc_id, lines in rows:
+                    doc_lines[doc_id].update(int(n) for n in lines.split(","))
+            if not doc_lines:
+                return []
+            per_token.append(doc_lines)
+
+        candidates = set(per_token[0])
+        for doc_lines in per_token[1:]:
+            candidates &= doc_lines.keys()
+        candidates -= exclude
+
+        paths = {doc_id: path for doc_id, path, _ in docs}
+        lengths = {doc_id: length for doc_id, _, length in docs}
+        total_docs = len(docs) or 1
+        avg_length = (sum(lengths.values()) / total_docs) or 1.0
+        # Document frequency includes filename-matched docs: it describes the corpus
+        idf = [
+            math.log(1 + (total_docs - len(doc_lines) + 0.5) / (len(doc_lines) + 0.5))
+            for doc_lines in per_token
+        ]
+
+        results = []
+        for doc_id in sorted(candidates, key=lambda d: paths.get(d, "")):
+            if doc_id not in paths:
+                continue
+            score = 0.0
+            lines = set(per_token[0][doc_id])
+            for token_idf, doc_lines in zip(idf, per_token):
+                # Term frequency at line granularity: lines containing the token
+                tf = len(doc_lines[doc_id])
+                score += bm25_term_score(tf, lengths[doc_id], avg_length, token_idf)
+                lines &= doc_lines[doc_id]
+            matching_lines = sorted(lines)
+            results.append({
+                "path": paths[doc_id],
+                "match_type": "content",
+                "line_count": len(matching_lines),
+                "sample_lines": matching_lines[:3],
+                "score": round(score, 4),
+            })
+        return results
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+# Global file index instance (will be initialized in main.py)
+file_index: Optional[FileIndex] = None
+
+
+def get_file_index() -> FileIndex:
+    """Get the global file index instance"""
+    global file_index
+    if file_index is None:
+        raise RuntimeError("File index not initialized. Call initialize_file_index() first.")
+    return file_index
+
+
+def initialize_file_index(data_dir: Path) -> FileIndex:
+    """Initialize the global file index instance"""
+    global file_index
+    file_index = FileIndex(data_dir)
+    return file_index
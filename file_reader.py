@@ -0,0 +1,195 @@
+"""Chunked file reads for Agentic OS.
+
+``read_files`` and ``/api/files/read`` used to load whole documents with
+``Path.read_text`` and split them just to count lines. This module reads
+through a plain file handle in ``READ_CHUNK_BYTES`` pieces instead:
+
+- line counts scan the file in chunks (no split, no full copy) and are
+  cached by ``(mtime, size)``, so paging through a large log does not
+  rescan it for every page
+- byte or line ranges (``offset``/``limit``) decode only the requested slice;
+  byte ranges are moved forward to UTF-8 character boundaries, and newlines
+  are normalized to ``\\n`` as ``read_text`` did
+- :func:`iter_range` yields a range in chunks for ``StreamingResponse``, so
+  serving a multi-hundred-MB log keeps peak memory at one chunk
+
+Files are not memory-mapped: another request may truncate a file while it
+is being read (``/api/files/write`` rewrites in place), and touching a
+mapping past the new end kills the process with SIGBUS. ``read`` on a file
+handle just returns fewer bytes.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+
+READ_CHUNK_BYTES = int(os.getenv("FILE_READ_CHUNK_BYTES", str(1024 * 1024)))
+# Files above this size are streamed by /api/files/read unless a range is requested
+STREAM_THRESHOLD_BYTES = int(os.getenv("FILE_READ_STREAM_BYTES", str(8 * 1024 * 1024)))
+LINE_COUNT_CACHE_ENTRIES = 256
+RANGE_UNITS = ("lines", "bytes")
+
+# path -> (mtime_ns, size, newline count)
+_line_counts: "OrderedDict[str, Tuple[int, int, int]]" = OrderedDict()
+_line_counts_lock = threading.Lock()
+
+
+def count_newlines(f: BinaryIO, start: int = 0, end: Optional[int] = None) -> int:
+    """Count ``\\n`` bytes between ``start`` and ``end`` one chunk at a time."""
+
+    f.seek(start)
+    count = 0
+    remaining = end - start if end is not None else None
+    while remaining is None or remaining > 0:
+        chunk = f.read(READ_CHUNK_BYTES if remaining is None else min(READ_CHUNK_BYTES, remaining))
+        if not chunk:
+            break
+        count += chunk.count(b"\n")
+        if remaining is not None:
+            remaining -= len(chunk)
+    return count
+
+
+def cached_newlines(path: Path, f: BinaryIO) -> int:
+    """Newline count of the whole file, reused while its mtime and size are unchanged."""
+
+    stat = os.fstat(f.fileno())
+    key = str(path)
+    with _line_counts_lock:
+        entry = _line_counts.get(key)
+        if entry is not None and entry[:2] == (stat.st_mtime_ns, stat.st_size):
+            _line_counts.move_to_end(key)
+            return entry[2]
+    count = count_newlines(f)
+    with _line_counts_lock:
+        _line_counts[key] = (stat.st_mtime_ns, stat.st_size, count)
+        _line_counts.move_to_end(key)
+        while len(_line_counts) > LINE_COUNT_CACHE_ENTRIES:
+            _line_counts.popitem(last=False)
+    return count
+
+
+def line_start(f: BinaryIO, line: int, start: int = 0) -> int:
+    """Byte offset where ``line`` (0-based, counted from ``start``) begins, or the file size."""
+
+    f.seek(start)
+    pos = start
+    while line > 0:
+        chunk = f.read(READ_CHUNK_BYTES)
+        if not chunk:
+            return pos
+        index = -1
+        while line > 0:
+            index = chunk.find(b"\n", index + 1)
+            if index < 0:
+                break
+            line -= 1
+        if line == 0:
+            return pos + index + 1
+        pos += len(chunk)
+    return pos
+
+
+def char_boundary(f: BinaryIO, pos: int) -> int:
+    """Move ``pos`` forward past UTF-8 continuation bytes (at most three) to a character start."""
+
+    f.seek(pos)
+    for byte in f.read(3):
+        if byte & 0xC0 != 0x80:
+            break
+        pos += 1
+    return pos
+
+
+def resolve_range(
+    f: BinaryIO,
+    offset: int = 0,
+    limit: Optional[int] = None,
+    unit: str = "lines",
+) -> Tuple[int, int]:
+    """Translate a line or byte range into ``(start_byte, end_byte)``."""
+
+    if unit not in RANGE_UNITS:
+        raise ValueError(f"Unknown range unit '{unit}', expected one of {RANGE_UNITS}")
+    offset = max(offset, 0)
+    total = os.fstat(f.fileno()).st_size
+    if unit == "bytes":
+        start = char_boundary(f, min(offset, total))
+        end = total if limit is None else char_boundary(f, min(start + max(limit, 0), total))
+    else:
+        start = line_start(f, offset)
+        end = total if limit is None else line_start(f, max(limit, 0), start)
+    return start, end
+
+
+def read_range(
+    path: Path,
+    offset: int = 0,
+    limit: Optional[int] = None,
+    unit: str = "lines",
+    errors: str = "strict",
+) -> Dict[str, Any]:
+    """
+    Read a line or byte range of a text file.
+
+    ``lines`` is the line count of the whole file (same value as
+    ``len(content.split('\\n'))`` on a full read); ``has_more`` tells the
+    caller whether content remains after the returned range.
+    """
+
+    with open(path, "rb") as f:
+        start, end = resolve_range(f, offset, limit, unit)
+        f.seek(start)
+        data = f.read(end - start)
+        # The file may have shrunk since its size was taken
+        end = start + len(data)
+        total = max(os.fstat(f.fileno()).st_size, end)
+        newlines = data.count(b"\n") if (start, end) == (0, total) else cached_newlines(path, f)
+    content = data.decode("utf-8", errors=errors).replace("\r\n", "\n").replace("\r", "\n")
+    return {
+        "content": content,
+        "size": len(content),
+        "lines": newlines + 1,
+        "total_bytes": total,
+        "start_byte": start,
+        "end_byte": end,
+        "has_more": end < total,
+    }
+
+
+def iter_range(path: Path, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+    """Yield ``path[start:end]`` in ``READ_CHUNK_BYTES`` pieces (for streaming responses)."""
+
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = None if end is None else end - start
+        while remaining is None or remaining > 0:
+            chunk = f.read(READ_CHUNK_BYTES if remaining is None else min(READ_CHUNK_BYTES, remaining))
+            if not chunk:
+                # Truncated while streaming: end the response early
+                return
+            yield chunk
+            if remaining is not None:
+                remaining -= len(chunk)
+
+
+def file_range_bounds(
+    path: Path,
+    offset: int = 0,
+    limit: Optional[int] = None,
+    unit: str = "lines",
+) -> Tuple[int, int, int]:
+    """Return ``(start_byte, end_byte, total_bytes)`` for a range without decoding it."""
+
+    with open(path, "rb") as f:
+        start, end = resolve_range(f, offset, limit, unit)
+        return start, end, os.fstat(f.fileno()).st_size
@@ -0,0 +1,163 @@
+"""Shared pooled HTTP clients for outbound (non-LLM) requests.
+
+The email API, Hyperspell and the browser resource proxy used to open a
+fresh ``httpx.AsyncClient`` per call, paying a TCP (and TLS) handshake
+every time. :class:`HTTPClientRegistry` keeps one long-lived client per
+upstream name, so calls to the same host reuse keep-alive connections.
+HTTP/2 is enabled when the optional ``h2`` package is installed.
+
+Clients are shared by every session, so they never persist cookies:
+callers that need cookies send them as a header on the request. httpx
+drops an explicit ``Cookie`` header when it follows a redirect, so
+:func:`get_with_cookies` follows redirects itself and looks up the
+cookies for each hop's URL.
+
+Connection reuse is measured with httpcore's ``trace`` extension: every
+request counts, and every TCP connect counts as a new connection.
+"""
+
+from __future__ import annotations
+
+import importlib.util
+import logging
+import os
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import httpx
+from pydantic import BaseModel
+
+
+logger = logging.getLogger(__name__)
+
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+MAX_REDIRECTS = 20
+
+
+class HTTPClientConfig(BaseModel):
+    """Configuration for the pooled outbound HTTP clients"""
+    max_connections: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+    max_keepalive_connections: int = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    keepalive_expiry: float = float(os.getenv("HTTP_KEEPALIVE_EXPIRY_SECONDS", "30"))
+    timeout: float = float(os.getenv("HTTP_TIMEOUT_SECONDS", "30"))
+    http2: bool = os.getenv("HTTP2", "1").lower() in ("1", "true", "yes")
+
+
+def _no_cookie_jar() -> CookieJar:
+    # allowed_domains=[] rejects every Set-Cookie and never sends stored cookies
+    return CookieJar(policy=DefaultCookiePolicy(allowed_domains=[]))
+
+
+class HTTPClientRegistry:
+    """
+    One pooled ``httpx.AsyncClient`` per upstream.
+
+    ``client(name, **options)`` creates the named client on first use;
+    ``options`` (e.g. ``timeout``, ``follow_redirects``) only apply then.
+    """
+
+    def __init__(self, config: Optional[HTTPClientConfig] = None):
+        self.config = config or HTTPClientConfig()
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._stats: Dict[str, Dict[str, Any]] = {}
+
+    def client(self, name: str, **options: Any) -> httpx.AsyncClient:
+        existing = self._clients.get(name)
+        if existing is not None and not existing.is_closed:
+            return existing
+
+        stats = self._stats.setdefault(name, {"requests": 0, "new_connections": 0, "http_versions": {}})
+
+        async def trace(event: str, info: Dict[str, Any]) -> None:
+            if event == "connection.connect_tcp.complete":
+                stats["new_connections"] += 1
+
+        async def on_request(request: httpx.Request) -> None:
+            request.extensions["trace"] = trace
+
+        async def on_response(response: httpx.Response) -> None:
+            stats["requests"] += 1
+            versions = stats["http_versions"]
+            versions[response.http_version] = versions.get(response.http_version, 0) + 1
+
+        options.setdefault("timeout", self.config.timeout)
+        self._clients[name] = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=self.config.max_connections,
+                max_keepalive_connections=self.config.max_keepalive_connections,
+                keepalive_expiry=self.config.keepalive_expiry,
+            ),
+            http2=self.config.http2 and HTTP2_AVAILABLE,
+            cookies=_no_cookie_jar(),
+            event_hooks={"request": [on_request], "response": [on_response]},
+            **options,
+        )
+        return self._clients[name]
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-upstream request counts and the share served on reused connections."""
+
+        return {
+            name: {
+                **stats,
+                "reused_connections": max(stats["requests"] - stats["new_connections"], 0),
+                "reuse_rate": (
+                    max(stats["requests"] - stats["new_connections"], 0) / stats["requests"]
+                    if stats["requests"] else 0.0
+                ),
+                "http2": self.config.http2 and HTTP2_AVAILABLE,
+            }
+            for name, stats in self._stats.items()
+        }
+
+    async def close(self) -> None:
+        """Close every pooled client."""
+
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
+
+
+async def get_with_cookies(
+    client: httpx.AsyncClient,
+    url: str,
+    cookie_header: Callable[[str], Awaitable[Optional[str]]],
+    max_redirects: int = MAX_REDIRECTS,
+) -> httpx.Response:
+    """
+    GET ``url`` with ``cookie_header(url)`` as its ``Cookie``, following redirects by hand.
+
+    ``client`` must not follow redirects itself. Every hop asks
+    ``cookie_header`` again, so a redirect to another host gets that
+    host's cookies rather than none (or the first host's).
+    """
+
+    for _ in range(max_redirects + 1):
+        cookie = await cookie_header(url)
+        response = await client.get(url, headers={"Cookie": cookie} if cookie else None, follow_redirects=False)
+        if response.next_request is None:
+            return response
+        url = str(response.next_request.url)
+    raise httpx.TooManyRedirects(f"Exceeded {max_redirects} redirects", request=response.request)
+
+
+# Global HTTP client registry (will be initialized in main.py)
+http_clients: Optional[HTTPClientRegistry] = None
+
+
+def get_http_clients() -> HTTPClientRegistry:
+    """Get the global HTTP client registry, creating a default one if needed"""
+    global http_clients
+    if http_clients is None:
+        http_clients = HTTPClientRegistry()
+    return http_clients
+
+
+def initialize_http_clients(config: Optional[HTTPClientConfig] = None) -> HTTPClientRegistry:
+    """Initialize the global HTTP client registry"""
+    global http_clients
+    http_clients = HTTPClientRegistry(config)
+    logger.info(
+        f"🔌 HTTP client registry initialized (http2={'on' if http_clients.config.http2 and HTTP2_AVAILABLE else 'off'})"
+    )
+    return http_clients
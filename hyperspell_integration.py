@@ -11,6 +11,8 @@ import httpx
 from dotenv import load_dotenv
 from pydantic import BaseModel
 
+from http_clients import get_http_clients
+
 
 logger = logging.getLogger(__name__)
 
@@ -127,14 +129,14 @@ class HyperspellClient:
             payload["max_results"] = limit
 
         try:
-            async with httpx.AsyncClient(timeout=HYPERSPELL_TIMEOUT) as client:
-                response = await client.post(
-                    f"{self.base_url}{self.query_path}",
-                    json=payload,
-                    headers=self._headers(),
-                )
-                response.raise_for_status()
-                data = response.json()
+            client = get_http_clients().client("hyperspell", timeout=HYPERSPELL_TIMEOUT)
+            response = await client.post(
+                f"{self.base_url}{self.query_path}",
+                json=payload,
+                headers=self._headers(),
+            )
+            response.raise_for_status()
+            data = response.json()
         except httpx.HTTPStatusError as exc:
             logger.warning(
                 "Hyperspell context request failed (%s): %s",
@@ -176,13 +178,13 @@ class HyperspellClient:
             payload["metadata"] = metadata
 
         try:
-            async with httpx.AsyncClient(timeout=HYPERSPELL_TIMEOUT) as client:
-                response = await client.post(
-                    f"{self.base_url}{self.record_path}",
-                    json=payload,
-                    headers=self._headers(),
-                )
-                response.raise_for_status()
+            client = get_http_clients().client("hyperspell", timeout=HYPERSPELL_TIMEOUT)
+            response = await client.post(
+                f"{self.base_url}{self.record_path}",
+                json=payload,
+                headers=self._headers(),
+            )
+            response.raise_for_status()
         except httpx.HTTPStatusError as exc:
             logger.warning(
                 "Hyperspell ingest request failed (%s): %s",
@@ -0,0 +1,228 @@
+"""Precompiled intent router for Agentic OS.
+
+Chat messages, background email commands and the browser handlers all
+classify the user's message with keyword lists (compilation requests,
+slideshow requests, browser search/task intents). The patterns are
+compiled once at import time: every keyword literal goes into a single
+combined regex so one pass over the message finds all of them, and the
+slideshow/browser-task regexes are each merged into one alternation.
+Chat and email commands keep their own slideshow pattern lists.
+
+Run ``python intent_router.py`` for a routing microbenchmark.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List
+
+
+# Explicit compilation phrases (chat, background chat and email commands)
+COMPILATION_KEYWORDS = [
+    "compile", "create a report", "generate a report", "make a report", "make report",
+    "analyze and create", "summarize", "create a summary", "generate a summary",
+    "report of", "report from", "report on", "compile from", "compile all",
+    "gather and compile", "collect and summarize", "report of it", "compile it",
+    "make a report of", "create a report of", "summarize it", "compile them"
+]
+
+# Narrower list accepted by execute_iterative_workflow itself
+WORKFLOW_COMPILATION_KEYWORDS = [
+    "compile", "create a report", "generate a report", "analyze and create", "summarize", "create a summary"
+]
+
+REPORT_KEYWORDS = ["report", "compile", "summarize", "summary"]
+DOCUMENT_TRIGGERS = ["documents", "files", "it", "them", "those", "all"]
+
+# Substrings combined by the "make a report of it" style heuristics
+REPORT_PATTERN_TERMS = ["report", "of", "from", "on", "make", "compile", "it", "them", "all", "summarize"]
+
+# Chat and background chat; applied as re.search(p.replace("*", ".*")), so
+# "create.*slideshow" needs at least one character between the two words
+SLIDESHOW_PATTERNS = [
+    "create.*slideshow", "make.*presentation", "generate.*slideshow",
+    "create.*presentation", "build.*presentation"
+]
+
+# Email commands also accept "prepare ... presentation"
+EMAIL_SLIDESHOW_PATTERNS = SLIDESHOW_PATTERNS + ["prepare.*presentation"]
+
+# Browser: "find out about X, Y" opens agents that search for each term
+BROWSER_SEARCH_PATTERNS = [
+    "find out about", "search for", "look up", "find information about", "get information on", "learn about"
+]
+
+# Browser: single-URL requests that need an autonomous agent
+BROWSER_TASK_PATTERNS = [
+    r'extract.*(?:info|information|data|text|content)',
+    r'create.*(?:doc|document|file|word|txt)',
+    r'save.*(?:info|information|data|text|content)',
+    r'get.*(?:info|information|data).*(?:and|then).*(?:create|save|make|write)',
+    r'summarize.*(?:and|then).*(?:save|create|write)',
+    r'read.*(?:and|then).*(?:extract|save|create)'
+]
+
+
+def _trie_regex(literals: List[str]) -> str:
+    """Build a regex that matches the longest of ``literals`` via a prefix trie."""
+
+    trie: Dict[str, dict] = {}
+    for literal in literals:
+        node = trie
+        for char in literal:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def render(node: Dict[str, dict]) -> str:
+        terminal = "" in node
+        branches = [re.escape(char) + render(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if terminal:
+            # Greedy optional group: the longest literal wins, shorter ones remain matchable
+            return "(?:" + body + ")?"
+        return body
+
+    return render(trie)
+
+
+def _build_literal_automaton(literals: List[str]):
+    """
+    Compile all literals into one zero-width lookahead over a prefix trie.
+
+    Matching at every position with the longest literal first reports one
+    literal per start position; shorter literals starting at the same
+    position are exactly the prefixes of that match, so they are expanded
+    from a precomputed table. The result is the full set of literals that
+    occur anywhere in the text, from a single scan.
+    """
+    unique = sorted(set(literals), key=len, reverse=True)
+    pattern = re.compile("(?=(" + _trie_regex(unique) + "))")
+    prefixes: Dict[str, FrozenSet[str]] = {
+        literal: frozenset(other for other in unique if literal.startswith(other))
+        for literal in unique
+    }
+    return pattern, prefixes
+
+
+_LITERAL_RE, _LITERAL_PREFIXES = _build_literal_automaton(
+    COMPILATION_KEYWORDS + WORKFLOW_COMPILATION_KEYWORDS + REPORT_KEYWORDS
+    + DOCUMENT_TRIGGERS + REPORT_PATTERN_TERMS + BROWSER_SEARCH_PATTERNS
+)
+_SLIDESHOW_RE = re.compile("|".join(f"(?:{p.replace('*', '.*')})" for p in SLIDESHOW_PATTERNS))
+_EMAIL_SLIDESHOW_RE = re.compile("|".join(f"(?:{p.replace('*', '.*')})" for p in EMAIL_SLIDESHOW_PATTERNS))
+_BROWSER_TASK_RE = re.compile("|".join(f"(?:{p})" for p in BROWSER_TASK_PATTERNS))
+
+_COMPILATION_SET = frozenset(COMPILATION_KEYWORDS)
+_WORKFLOW_COMPILATION_SET = frozenset(WORKFLOW_COMPILATION_KEYWORDS)
+_REPORT_SET = frozenset(REPORT_KEYWORDS)
+_DOCUMENT_SET = frozenset(DOCUMENT_TRIGGERS)
+_BROWSER_SEARCH_SET = frozenset(BROWSER_SEARCH_PATTERNS)
+
+
+def find_literals(text_lower: str) -> FrozenSet[str]:
+    """Return every known keyword literal that occurs in the (lowercased) text."""
+
+    found = set()
+    for match in _LITERAL_RE.finditer(text_lower):
+        found.update(_LITERAL_PREFIXES[match.group(1)])
+    return frozenset(found)
+
+
+@dataclass
+class Intents:
+    """All intents detected in one message"""
+    literals: FrozenSet[str]
+    compilation_keyword: bool
+    workflow_compilation: bool
+    report_pattern: bool
+    report_keyword: bool
+    document_trigger: bool
+    slideshow: bool
+    email_slideshow: bool
+    browser_search: bool
+    browser_task: bool
+
+    def is_compilation(self, has_recent_find: bool = False) -> bool:
+        """Chat heuristic for report compilation (may use recent find_file activity)."""
+
+        return self.compilation_keyword or self.report_pattern or (
+            self.report_keyword and (self.document_trigger or has_recent_find)
+        )
+
+
+def classify(message: str) -> Intents:
+    """Classify a message in one pass over the keyword automaton plus the pattern regexes."""
+
+    text = message.lower().strip()
+    literals = find_literals(text)
+    has = literals.__contains__
+
+    report_pattern = (
+        (has("report") and (has("of") or has("from") or has("on"))) or
+        (has("make") and has("report")) or
+        (has("compile") and (has("it") or has("them") or has("all"))) or
+        (has("summarize") and (has("it") or has("them")))
+    )
+    return Intents(
+        literals=literals,
+        compilation_keyword=not literals.isdisjoint(_COMPILATION_SET),
+        workflow_compilation=not literals.isdisjoint(_WORKFLOW_COMPILATION_SET),
+        report_pattern=report_pattern,
+        report_keyword=not literals.isdisjoint(_REPORT_SET),
+        document_trigger=not literals.isdisjoint(_DOCUMENT_SET),
+        slideshow=_SLIDESHOW_RE.search(text) is not None,
+        email_slideshow=_EMAIL_SLIDESHOW_RE.search(text) is not None,
+        browser_search=not literals.isdisjoint(_BROWSER_SEARCH_SET),
+        browser_task=_BROWSER_TASK_RE.search(text) is not None,
+    )
+
+
+def _legacy_classify(message: str) -> Dict[str, bool]:
+    """Per-request keyword scans as previously done inline (benchmark baseline)."""
+
+    user_lower = message.lower().strip()
+    has_explicit_keyword = any(keyword in user_lower for keyword in COMPILATION_KEYWORDS)
+    has_report_pattern = (
+        ("report" in user_lower and ("of" in user_lower or "from" in user_lower or "on" in user_lower)) or
+        ("make" in user_lower and "report" in user_lower) or
+        ("compile" in user_lower and ("it" in user_lower or "them" in user_lower or "all" in user_lower)) or
+        ("summarize" in user_lower and ("it" in user_lower or "them" in user_lower))
+    )
+    has_report_keyword = any(kw in user_lower for kw in REPORT_KEYWORDS)
+    has_document_trigger = any(trig in user_lower for trig in DOCUMENT_TRIGGERS)
+    return {
+        "compilation": has_explicit_keyword or has_report_pattern or (has_report_keyword and has_document_trigger),
+        "workflow_compilation": any(keyword in user_lower for keyword in WORKFLOW_COMPILATION_KEYWORDS),
+        "slideshow": any(re.search(keyword.replace("*", ".*"), user_lower) for keyword in SLIDESHOW_PATTERNS),
+        "email_slideshow": any(re.search(keyword.replace("*", ".*"), user_lower) for keyword in EMAIL_SLIDESHOW_PATTERNS),
+        "browser_search": any(pattern in user_lower for pattern in BROWSER_SEARCH_PATTERNS),
+        "browser_task": any(re.search(pattern, user_lower) for pattern in BROWSER_TASK_PATTERNS),
+    }
+
+
+if __name__ == "__main__":
+    import timeit
+
+    samples = [
+        "Hello! How are you today?",
+        "Compile a Q4 financial report from all the relevant documents",
+        "make a report of it",
+        "Create a slideshow about our product launch with charts",
+        "Open google.com and find out about Tim Cook, Sundar Pichai and Satya Nadella",
+        "Go to example.com, extract the pricing information and create a document with it",
+        "Send an email to john@example.com about the meeting tomorrow at 10am " * 4,
+    ]
+    for sample in samples:
+        intents = classify(sample)
+        legacy = _legacy_classify(sample)
+        assert intents.is_compilation() == legacy["compilation"], sample
+        assert intents.slideshow == legacy["slideshow"], sample
+        assert intents.browser_task == legacy["browser_task"], sample
+
+    runs = 20000
+    for name, func in (("legacy scans", _legacy_classify), ("intent router", classify)):
+        seconds = timeit.timeit(lambda: [func(sample) for sample in samples], number=runs)
+        print(f"{name:>14}: {seconds / (runs * len(samples)) * 1e6:.2f} µs/message")
@@ -0,0 +1,163 @@
+"""Content-addressed cache for deterministic LLM sub-calls.
+
+Small prompts such as search-term extraction and the slideshow YES/NO
+search decision repeat heavily across users and email commands. Their
+replies are cached by a hash of model + messages + parameters in an
+in-memory LRU with a TTL, optionally backed by a SQLite file so entries
+survive restarts.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+
+logger = logging.getLogger(__name__)
+
+# Call options that do not change the reply and are left out of the key
+NON_KEY_PARAMS = {"timeout"}
+
+
+class LLMCacheConfig(BaseModel):
+    """Configuration for the LLM response cache"""
+    max_entries: int = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024"))
+    ttl_seconds: float = float(os.getenv("LLM_CACHE_TTL_SECONDS", "3600"))
+    sqlite_path: Optional[str] = os.getenv("LLM_CACHE_SQLITE_PATH") or None
+
+
+class LLMResponseCache:
+    """
+    TTL + LRU cache of LLM reply text.
+
+    The in-memory ``OrderedDict`` holds the hot entries; when a SQLite path
+    is configured every entry is also written through to disk and memory
+    misses fall back to it.
+    """
+
+    def __init__(self, config: Optional[LLMCacheConfig] = None):
+        self.config = config or LLMCacheConfig()
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "disk_hits": 0, "evictions": 0, "expired": 0}
+        self._conn: Optional[sqlite3.Connection] = None
+
+        if self.config.sqlite_path:
+            Path(self.config.sqlite_path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.config.sqlite_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._conn.execute("DELETE FROM llm_cache WHERE expires_at < ?", (time.time(),))
+            self._conn.commit()
+
+    @staticmethod
+    def make_key(model: str, messages: List[Dict[str, Any]], params: Dict[str, Any]) -> str:
+        """Hash model, messages and reply-affecting params into a cache key."""
+
+        payload = {
+            "model": model,
+            "messages": messages,
+            "params": {k: v for k, v in params.items() if k not in NON_KEY_PARAMS},
+        }
+        raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at >= now:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return value
+                del self._entries[key]
+                self._stats["expired"] += 1
+
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row and row[1] >= now:
+                    self._store_memory(key, row[0], row[1])
+                    self._stats["hits"] += 1
+                    self._stats["disk_hits"] += 1
+                    return row[0]
+
+            self._stats["misses"] += 1
+            return None
+
+    def set(self, key: str, value: str, ttl_seconds: Optional[float] = None) -> None:
+        expires_at = time.time() + (ttl_seconds if ttl_seconds is not None else self.config.ttl_seconds)
+        with self._lock:
+            self._store_memory(key, value, expires_at)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, value, expires_at),
+                )
+                self._conn.commit()
+
+    def _store_memory(self, key: str, value: str, expires_at: float) -> None:
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.config.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM llm_cache")
+                self._conn.commit()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the current size."""
+
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "entries": len(self._entries),
+                "hit_rate": self._stats["hits"] / lookups if lookups else 0.0,
+                "persistent": self._conn is not None,
+            }
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+# Global cache instance (will be initialized in main.py)
+llm_cache: Optional[LLMResponseCache] = None
+
+
+def get_llm_cache() -> LLMResponseCache:
+    """Get the global LLM response cache instance"""
+    global llm_cache
+    if llm_cache is None:
+        raise RuntimeError("LLM cache not initialized. Call initialize_llm_cache() first.")
+    return llm_cache
+
+
+def initialize_llm_cache(config: Optional[LLMCacheConfig] = None) -> LLMResponseCache:
+    """Initialize the global LLM response cache instance"""
+    global llm_cache
+    llm_cache = LLMResponseCache(config)
+    return llm_cache
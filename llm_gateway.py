@@ -0,0 +1,367 @@
+"""Shared async LLM gateway for Agentic OS.
+
+Every chat completion issued by the server goes through a single
+``AsyncOpenAI`` client so that slow calls never block the event loop.
+The gateway owns the HTTP connection pool, enforces a concurrency limit
+per model and applies per-call timeouts.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import re
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+from openai import APITimeoutError, AsyncOpenAI
+from pydantic import BaseModel
+
+from llm_cache import LLMResponseCache
+
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_model_limits(raw: str) -> Dict[str, int]:
+    """Parse ``model=limit`` pairs separated by commas."""
+
+    limits: Dict[str, int] = {}
+    for item in raw.split(","):
+        if "=" not in item:
+            continue
+        model, _, value = item.partition("=")
+        try:
+            limits[model.strip()] = max(1, int(value))
+        except ValueError:
+            logger.warning("Ignoring invalid LLM concurrency entry: %s", item)
+    return limits
+
+
+class LLMGatewayConfig(BaseModel):
+    """Configuration for the LLM gateway"""
+    max_connections: int = int(os.getenv("LLM_MAX_CONNECTIONS", "50"))
+    max_keepalive_connections: int = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    default_timeout: float = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+    default_concurrency: int = int(os.getenv("LLM_DEFAULT_CONCURRENCY", "16"))
+    model_concurrency: Dict[str, int] = _parse_model_limits(
+        os.getenv("LLM_MODEL_CONCURRENCY", "gpt-5-2025-08-07=4")
+    )
+    max_retries: int = int(os.getenv("LLM_MAX_RETRIES", "2"))
+
+
+class LLMGateway:
+    """
+    Async wrapper around the OpenAI chat completions API.
+
+    - One pooled ``httpx.AsyncClient`` shared by every call site
+    - A semaphore per model so one slow model cannot starve the others
+    - Per-call timeouts (falls back to the configured default)
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        config: Optional[LLMGatewayConfig] = None,
+        cache: Optional[LLMResponseCache] = None,
+    ):
+        self.config = config or LLMGatewayConfig()
+        self.cache = cache
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=self.config.max_connections,
+                max_keepalive_connections=self.config.max_keepalive_connections,
+            ),
+            timeout=self.config.default_timeout,
+        )
+        self.client = AsyncOpenAI(
+            api_key=api_key,
+            http_client=self._http_client,
+            max_retries=self.config.max_retries,
+        )
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+        logger.info("LLM gateway initialized with config: %s", self.config.model_dump())
+
+    def _semaphore(self, model: str) -> asyncio.Semaphore:
+        if model not in self._semaphores:
+            limit = self.config.model_concurrency.get(model, self.config.default_concurrency)
+            self._semaphores[model] = asyncio.Semaphore(limit)
+        return self._semaphores[model]
+
+    def _record(self, model: str, key: str, value: float = 1) -> None:
+        stats = self._stats.setdefault(
+            model,
+            {
+                "calls": 0, "errors": 0, "timeouts": 0, "in_flight": 0, "total_seconds": 0.0,
+                "streams": 0, "first_token_seconds": 0.0,
+                "prompt_tokens": 0, "cached_prompt_tokens": 0, "completion_tokens": 0,
+            },
+        )
+        stats[key] += value
+
+    def _record_usage(self, model: str, usage: Any) -> None:
+        """Record input/output token counts, including prompt-cache hits."""
+
+        if usage is None:
+            return
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached_tokens = (getattr(details, "cached_tokens", 0) or 0) if details else 0
+        self._record(model, "prompt_tokens", prompt_tokens)
+        self._record(model, "cached_prompt_tokens", cached_tokens)
+        self._record(model, "completion_tokens", getattr(usage, "completion_tokens", 0) or 0)
+        logger.info(
+            "LLM usage model=%s prompt_tokens=%d cached=%d uncached=%d",
+            model, prompt_tokens, cached_tokens, prompt_tokens - cached_tokens,
+        )
+
+    async def chat(
+        self,
+        *,
+        model: str,
+        messages: List[Dict[str, Any]],
+        timeout: Optional[float] = None,
+        **params: Any,
+    ):
+        """
+        Create a chat completion without blocking the event loop.
+
+        Args:
+            model: Model name
+            messages: Chat messages
+            timeout: Per-call timeout in seconds (defaults to config)
+            **params: Extra arguments forwarded to ``chat.completions.create``
+
+        Returns:
+            The ``ChatCompletion`` object returned by the OpenAI SDK
+        """
+        call_timeout = timeout or self.config.default_timeout
+        async with self._semaphore(model):
+            self._record(model, "in_flight")
+            started = time.perf_counter()
+            try:
+                completion = await self.client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    timeout=call_timeout,
+                    **params,
+                )
+                self._record_usage(model, getattr(completion, "usage", None))
+                return completion
+            except Exception as exc:
+                if isinstance(exc, APITimeoutError):
+                    self._record(model, "timeouts")
+                self._record(model, "errors")
+                raise
+            finally:
+                self._record(model, "in_flight", -1)
+                self._record(model, "calls")
+                self._record(model, "total_seconds", time.perf_counter() - started)
+
+    async def chat_stream(
+        self,
+        *,
+        model: str,
+        messages: List[Dict[str, Any]],
+        timeout: Optional[float] = None,
+        **params: Any,
+    ) -> AsyncIterator[str]:
+        """
+        Stream a chat completion, yielding content deltas as they arrive.
+
+        Shares the per-model concurrency limit and counters with ``chat``;
+        ``first_token_seconds`` accumulates time-to-first-token.
+        """
+        call_timeout = timeout or self.config.default_timeout
+        async with self._semaphore(model):
+            self._record(model, "in_flight")
+            self._record(model, "streams")
+            started = time.perf_counter()
+            first_token = True
+            try:
+                params.setdefault("stream_options", {"include_usage": True})
+                stream = await self.client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    timeout=call_timeout,
+                    stream=True,
+                    **params,
+                )
+                async for chunk in stream:
+                    # The final chunk carries usage (and no choices) when include_usage is set
+                    self._record_usage(model, getattr(chunk, "usage", None))
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if not delta:
+                        continue
+                    if first_token:
+                        first_token = False
+                        self._record(model, "first_token_seconds", time.perf_counter() - started)
+                    yield delta
+            except Exception as exc:
+                if isinstance(exc, APITimeoutError):
+                    self._record(model, "timeouts")
+                self._record(model, "errors")
+                raise
+            finally:
+                self._record(model, "in_flight", -1)
+                self._record(model, "calls")
+                self._record(model, "total_seconds", time.perf_counter() - started)
+
+    async def chat_text(self, *, use_cache: bool = False, **kwargs: Any) -> str:
+        """
+        Convenience helper returning only the first choice's message content.
+
+        With ``use_cache=True`` the reply is served from the response cache
+        when an identical call (model, messages, params) was made before;
+        concurrent identical misses share one upstream request.
+        """
+        if not use_cache or self.cache is None:
+            completion = await self.chat(**kwargs)
+            return completion.choices[0].message.content or ""
+
+        params = {k: v for k, v in kwargs.items() if k not in ("model", "messages")}
+        key = self.cache.make_key(kwargs["model"], kwargs["messages"], params)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+                # The owning call was cancelled (e.g. its client disconnected); make our own
+                return await self.chat_text(use_cache=use_cache, **kwargs)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            completion = await self.chat(**kwargs)
+            text = completion.choices[0].message.content or ""
+            self.cache.set(key, text)
+            future.set_result(text)
+            return text
+        except Exception as exc:
+            future.set_exception(exc)
+            # Waiters re-raise it; mark it retrieved for the owner
+            future.exception()
+            raise
+        finally:
+            # Cancelled owner: release the waiters instead of leaving them blocked
+            if not future.done():
+                future.cancel()
+            if self._inflight.get(key) is future:
+                self._inflight.pop(key, None)
+
+    def get_stats(self) -> Dict[str, Dict[str, float]]:
+        """Return per-model call counters and the share of input tokens served from the prompt cache."""
+
+        return {
+            model: {
+                **stats,
+                "uncached_prompt_tokens": stats["prompt_tokens"] - stats["cached_prompt_tokens"],
+                "prompt_cache_hit_rate": (
+                    stats["cached_prompt_tokens"] / stats["prompt_tokens"] if stats["prompt_tokens"] else 0.0
+                ),
+            }
+            for model, stats in self._stats.items()
+        }
+
+    async def close(self) -> None:
+        """Close the underlying connection pool."""
+
+        await self.client.close()
+
+
+class JSONStringFieldStreamer:
+    """
+    Incrementally extract one top-level string field from streamed JSON.
+
+    Feed raw completion deltas; each call returns the newly decoded part of
+    the field's value so it can be forwarded before the JSON is complete.
+    """
+
+    _ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+    def __init__(self, field: str = "response"):
+        self._start_re = re.compile(r'"%s"\s*:\s*"' % re.escape(field))
+        self._buffer = ""
+        self._pos: Optional[int] = None
+        self.done = False
+
+    def feed(self, chunk: str) -> str:
+        if self.done:
+            return ""
+        self._buffer += chunk
+        if self._pos is None:
+            match = self._start_re.search(self._buffer)
+            if not match:
+                return ""
+            self._pos = match.end()
+
+        out: List[str] = []
+        buffer, pos = self._buffer, self._pos
+        while pos < len(buffer):
+            char = buffer[pos]
+            if char == '"':
+                self.done = True
+                break
+            if char != "\\":
+                out.append(char)
+                pos += 1
+                continue
+            # Escape sequence: wait until it is complete
+            if pos + 1 >= len(buffer):
+                break
+            code = buffer[pos + 1]
+            if code != "u":
+                out.append(self._ESCAPES.get(code, code))
+                pos += 2
+                continue
+            if pos + 6 > len(buffer):
+                break
+            codepoint = int(buffer[pos + 2:pos + 6], 16)
+            if 0xD800 <= codepoint < 0xDC00:
+                # Surrogate pair needs the following \uXXXX as well
+                if pos + 12 > len(buffer):
+                    break
+                low = int(buffer[pos + 8:pos + 12], 16)
+                codepoint = 0x10000 + ((codepoint - 0xD800) << 10) + (low - 0xDC00)
+                pos += 12
+            else:
+                pos += 6
+            out.append(chr(codepoint))
+        self._pos = pos
+        return "".join(out)
+
+
+# Global gateway instance (will be initialized in main.py)
+llm_gateway: Optional[LLMGateway] = None
+
+
+def get_llm_gateway() -> LLMGateway:
+    """Get the global LLM gateway instance"""
+    global llm_gateway
+    if llm_gateway is None:
+        raise RuntimeError("LLM gateway not initialized. Call initialize_llm_gateway() first.")
+    return llm_gateway
+
+
+def initialize_llm_gateway(
+    api_key: str,
+    config: Optional[LLMGatewayConfig] = None,
+    cache: Optional[LLMResponseCache] = None,
+) -> LLMGateway:
+    """Initialize the global LLM gateway instance"""
+    global llm_gateway
+    llm_gateway = LLMGateway(api_key, config, cache)
+    return llm_gateway
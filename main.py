@@ -6,16 +6,36 @@ import os
 import uvicorn
 from pathlib import Path
 from pydantic import BaseModel
-from typing import List, Optional, AsyncGenerator, Tuple, Dict, Any
+from typing import List, Optional, AsyncGenerator, Tuple, Dict, Any, Callable
 import json
 import asyncio
 import logging
+from collections import deque
 from dotenv import load_dotenv
-from openai import OpenAI
-from concurrent.futures import ThreadPoolExecutor, as_completed
-import httpx
 import base64 as b64
 from voice_agent import initialize_voice_agent, get_voice_agent, VoiceConfig
+from llm_gateway import initialize_llm_gateway, JSONStringFieldStreamer
+from llm_cache import initialize_llm_cache
+from file_index import initialize_file_index
+from search_backends import create_searcher
+from semantic_index import initialize_semantic_index
+from file_reader import RANGE_UNITS, STREAM_THRESHOLD_BYTES, file_range_bounds, iter_range, read_range
+from action_engine import initialize_action_engine
+from document_cache import initialize_document_cache, estimate_tokens
+from session_store import initialize_session_store
+from http_clients import get_with_cookies, initialize_http_clients
+from browser_pool import BrowserContextPool
+from browser_sessions import BrowserSession, BrowserSessionManager
+from page_elements import BROWSER_PERCEPTION, build_dom_prompt, decide_from_dom, resolve_step
+from page_capture import FrameDecisionCache, capture, hash_distance, wait_for_settle
+from action_plans import PLAN_PROMPT, plan_steps, run_plan
+from agent_scheduler import AgentScheduler
+from shared_state import LeaderElector, StateConfig, initialize_state_backend
+from worker_routing import BrowserSessionRouter, claim_browser_session, release_browser_session, serve_forwarded_requests
+from document_packing import pack_documents
+from map_reduce import REPORT_MODE, MAP_REDUCE_MAX_FILES, map_reduce_notes, use_map_reduce
+from intent_router import classify as classify_intents
+from chat_prompts import CHAT_SYSTEM_PROMPT, BACKGROUND_SYSTEM_PROMPT, build_chat_messages
 from slide_templates import HTML_TEMPLATE, SLIDE_TEMPLATES, create_slide_content
 from hyperspell_integration import (
     get_hyperspell_client,
@@ -53,7 +73,8 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 if not OPENAI_API_KEY:
     raise ValueError("OPENAI_API_KEY not found in .env file. Please create a .env file with your OpenAI API key.")
 
-openai_client = OpenAI(api_key=OPENAI_API_KEY)
+# Shared async LLM gateway - every chat completion goes through this pooled client
+llm_gateway = initialize_llm_gateway(OPENAI_API_KEY, cache=initialize_llm_cache())
 
 # Hyperspell integration toggle
 HYPERSPELL_API_KEY = os.getenv("HYPERSPELL_API_KEY", "").strip()
@@ -95,6 +116,14 @@ DATA_DIR.mkdir(exist_ok=True)
 DESKTOP_DIR = DATA_DIR / "Desktop"
 DESKTOP_DIR.mkdir(exist_ok=True)
 
+# Persistent inverted index used by find_file and the workflows (stored under DATA_DIR/.index)
+file_index = initialize_file_index(DATA_DIR)
+
+# find_file backend: the index, or a sharded thread/process content scan (FILE_SEARCH_BACKEND)
+file_searcher = create_searcher(DATA_DIR, file_index)
+# Optional embedding index for semantic find_file (SEMANTIC_INDEX=1, needs numpy)
+semantic_index = initialize_semantic_index(DATA_DIR)
+
 # Serve static files (CSS, JS, images)
 static_dir = BASE_DIR / "static"
 static_dir.mkdir(exist_ok=True)
@@ -105,90 +134,110 @@ templates_dir = BASE_DIR / "templates"
 templates_dir.mkdir(exist_ok=True)
 templates = Jinja2Templates(directory=str(templates_dir))
 
-# Conversation memory storage (in-memory, per session)
-# Format: {session_id: [{"role": "user", "content": "..."}, {"role": "assistant", "content": "..."}, ...]}
-conversation_history = {}
-
-# Email storage (in-memory)
-# Format: List of emails with latest first
-email_inbox = []
+# Conversation memory storage (bounded, TTL'd per session; see session_store.py)
+session_store = initialize_session_store()
+# One-off email command sessions are not revisited, so they expire quickly
+EMAIL_SESSION_TTL_SECONDS = float(os.getenv("EMAIL_SESSION_TTL_SECONDS", "3600"))
+
+# State shared by all uvicorn workers (see shared_state.py)
+state_config = StateConfig()
+state_backend = initialize_state_backend(state_config)
+# Browser requests are served by the worker holding the session's Playwright context
+app.add_middleware(BrowserSessionRouter, backend=state_backend)
+
+# Email storage (shared state namespaces)
+SENT_EMAILS_NS = "sent_emails"
+EMAIL_NOTIFICATIONS_NS = "email_notifications"
+ARCHIVED_PROCESSES_NS = "archived_processes"
+PROCESSED_EMAILS_NS = "processed_emails"
+EMAIL_STATE_NS = "email"
+
+def get_sent_emails() -> list:
+    """Emails sent from this app, latest first"""
+    return state_backend.values(SENT_EMAILS_NS)[::-1]
+
+def save_notification(notification: dict, create: bool = False):
+    """Publish a notification (or a status update to it) to every worker"""
+    # Updates to a notification the user already cleared are dropped
+    if create or state_backend.get(EMAIL_NOTIFICATIONS_NS, notification["id"]) is not None:
+        state_backend.put(EMAIL_NOTIFICATIONS_NS, notification["id"], notification)
 
 # Email API endpoints
 RAILWAY_EMAIL_API = "https://web-production-02ec.up.railway.app/compose-send"
 RAILWAY_EMAIL_INBOX_API = "https://web-production-02ec.up.railway.app/emails"
 
+# Pooled outbound HTTP clients, one per upstream (see http_clients.py)
+http_clients = initialize_http_clients()
+
 # Browser instance (Playwright)
 browser_instance: Optional[Browser] = None
-browser_contexts = {}  # Store browser contexts per session
+browser_pool: Optional[BrowserContextPool] = None  # Pre-warmed contexts handed to new sessions
 
 # Browser Agent Tasks - autonomous agents for each browser window
-browser_agents = {}  # Format: {session_id: {"tasks": deque([...]), "status": "active/idle/thinking", "current_goal": "", "logs": [], "agent_task": None}}
-agent_task_registry = {}  # Track running agent tasks
+browser_agents = {}  # Format: {session_id: {"tasks": deque([...]), "status": "active/idle/thinking", "current_goal": "", "logs": []}}
+# Agent steps run on agent_scheduler (defined after browser_agent_step)
+
+async def release_browser_context(session_id: str, session: BrowserSession):
+    """Stop a closed session's agent and return its context to the pool"""
+    browser_agents.pop(session_id, None)
+    await agent_scheduler.stop(session_id)
+    await asyncio.to_thread(release_browser_session, state_backend, session_id)
+    if browser_pool:
+        await browser_pool.release(session.context)
+
+# Live browser contexts per session, closed when idle or over the count/memory limits
+browser_sessions = BrowserSessionManager(release_browser_context)
+browser_sweep_task = None  # Periodic idle/memory sweep of browser_sessions
+# Vision decisions per (session, command), reused while the screenshot hash is unchanged
+vision_decisions = FrameDecisionCache()
 
 # Email monitoring for command emails
-processed_email_ids = set()  # Track which email IDs we've already processed
-email_monitor_task = None  # Background task reference
-email_notifications = []  # Store notifications for all new emails (both regular and command)
-archived_processes = []  # Store completed/archived processes for history
-
-# Inbox cache for faster loading
-inbox_cache = {
+email_monitor_task = None  # Background task reference (leader election loop)
+worker_routing_task = None  # Answers browser requests forwarded by other workers
+file_watcher_task = None  # Background task watching DATA_DIR for out-of-band edits
+# Only the worker holding this lease polls the inbox
+email_leader = LeaderElector(state_backend, "email_monitor", state_config.leader_lease_seconds)
+
+# Inbox cache for faster loading (one shared document, rebuilt by the email monitor)
+EMPTY_INBOX_CACHE = {
     "emails": [],
     "last_updated": None,
     "received_count": 0,
     "sent_count": 0
 }
-inbox_cache_lock = asyncio.Lock()  # Lock for thread-safe cache updates
 
-# File to persist processed email IDs across server restarts
+# Legacy file of processed email IDs, imported into the shared state on startup
 PROCESSED_EMAILS_FILE = Path("processed_email_ids.json")
 
-def save_processed_email_ids():
-    """Save processed email IDs to file for persistence across restarts"""
-    try:
-        with open(PROCESSED_EMAILS_FILE, 'w') as f:
-            json.dump(list(processed_email_ids), f)
-        logger.debug(f"💾 Saved {len(processed_email_ids)} processed email IDs to file")
-    except Exception as e:
-        logger.error(f"Error saving processed email IDs: {str(e)}", exc_info=True)
+def mark_email_processed(email_id: str) -> bool:
+    """Claim an email for processing; False if it was already claimed by any worker"""
+    return state_backend.add_member(PROCESSED_EMAILS_NS, email_id)
 
 def load_processed_email_ids():
-    """Load processed email IDs from file"""
-    global processed_email_ids
+    """Import processed email IDs from the legacy file"""
     try:
         if PROCESSED_EMAILS_FILE.exists():
             with open(PROCESSED_EMAILS_FILE, 'r') as f:
                 email_ids = json.load(f)
-                processed_email_ids = set(email_ids)
-            logger.info(f"📂 Loaded {len(processed_email_ids)} processed email IDs from file")
+            imported = sum(mark_email_processed(email_id) for email_id in email_ids)
+            logger.info(f"📂 Imported {imported} of {len(email_ids)} processed email IDs from file")
         else:
-            logger.info("📂 No processed email IDs file found, starting fresh")
+            logger.info("📂 No processed email IDs file found")
     except Exception as e:
         logger.error(f"Error loading processed email IDs: {str(e)}", exc_info=True)
-        processed_email_ids = set()
 
-def get_conversation_history(session_id: str, max_pairs: int = 4):
+async def get_conversation_history(session_id: str, max_pairs: int = 4):
     """Get conversation history for a session, limited to last max_pairs user-assistant pairs"""
-    if session_id not in conversation_history:
-        return []
-    
-    history = conversation_history[session_id]
-    # Return last max_pairs * 2 messages (each pair has user + assistant)
-    return history[-(max_pairs * 2):] if len(history) > max_pairs * 2 else history
-
-def add_to_conversation_history(session_id: str, user_message: str, assistant_response: str):
-    """Add a user-assistant pair to conversation history, maintaining max 4 pairs"""
-    if session_id not in conversation_history:
-        conversation_history[session_id] = []
-    
-    # Add new messages
-    conversation_history[session_id].append({"role": "user", "content": user_message})
-    conversation_history[session_id].append({"role": "assistant", "content": assistant_response})
-    
-    # Keep only last 4 pairs (8 messages total)
-    max_messages = 4 * 2  # 4 pairs * 2 messages per pair
-    if len(conversation_history[session_id]) > max_messages:
-        conversation_history[session_id] = conversation_history[session_id][-max_messages:]
+    # Each pair has user + assistant; only those rows are loaded from the store (off the event loop)
+    return await asyncio.to_thread(session_store.get_history, session_id, max_pairs * 2)
+
+async def add_to_conversation_history(session_id: str, user_message: str, assistant_response: str):
+    """Add a user-assistant pair to conversation history (the store caps messages per session)"""
+    ttl = EMAIL_SESSION_TTL_SECONDS if session_id.startswith("email_command_") else None
+    await asyncio.to_thread(session_store.append, session_id, [
+        {"role": "user", "content": user_message},
+        {"role": "assistant", "content": assistant_response},
+    ], ttl_seconds=ttl)
 
 
 # Hyperspell context helpers
@@ -384,17 +433,55 @@ async def voice_chat_page(request: Request):
     """Serve the voice chat interface"""
     return templates.TemplateResponse("voice_chat.html", {"request": request})
 
-def get_available_files():
-    """Get list of all files in the data directory"""
-    files = []
-    for root, dirs, filenames in os.walk(DATA_DIR):
-        for filename in filenames:
-            rel_path = os.path.relpath(os.path.join(root, filename), DATA_DIR)
-            files.append({
-                "name": filename,
-                "path": rel_path.replace(os.sep, "/")
-            })
-    return files
+async def get_available_files():
+    """Get list of all files in the data directory (maintained incrementally by the file index)"""
+    return await asyncio.to_thread(file_index.list_files)
+
+async def record_file_change(path, kind: str, source: str = "api"):
+    """Feed a write/delete under DATA_DIR into the file index change journal"""
+    try:
+        await asyncio.to_thread(file_index.record_change, str(path), kind, source)
+        if semantic_index is not None:
+            semantic_index.mark_stale()
+    except Exception as e:
+        logger.warning(f"Failed to record file change for {path}: {str(e)}")
+
+async def send_composed_email(instructions: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Send email instructions via the Railway API and store the sent email in the inbox"""
+    client = http_clients.client("email")
+    response = await client.post(
+        RAILWAY_EMAIL_API,
+        json={"instructions": instructions},
+        headers={"Content-Type": "application/json"}
+    )
+    response.raise_for_status()
+    result = response.json()
+    
+    # Log the response from Railway API
+    print("Railway API Response:", json.dumps(result, indent=2))
+    logger.info(f"Railway API Response: {json.dumps(result, indent=2)}")
+    
+    # Store email in inbox (latest first)
+    email_id = result.get("agentmail_message_id") or f"email_{len(await asyncio.to_thread(get_sent_emails))}"
+    email_entry = {
+        "id": email_id,
+        "message_id": result.get("agentmail_message_id"),
+        "to": result.get("email", {}).get("to", ""),
+        "subject": result.get("email", {}).get("subject", ""),
+        "body": result.get("email", {}).get("body", ""),
+        "status": result.get("status", "sent"),
+        "timestamp": datetime.now().isoformat(),
+        "sent": True
+    }
+    await asyncio.to_thread(state_backend.put, SENT_EMAILS_NS, email_entry["id"], email_entry)
+    return email_entry, result
+
+# Shared action registry used by chat, background email commands and workflows
+document_cache = initialize_document_cache()
+action_engine = initialize_action_engine(
+    DATA_DIR, file_index, send_composed_email,
+    searcher=file_searcher, document_cache=document_cache, semantic_index=semantic_index
+)
 
 async def process_chat_message(user_message: str, session_id: str = "default", skip_streaming: bool = False):
     """
@@ -418,10 +505,8 @@ async def process_chat_message(user_message: str, session_id: str = "default", s
             "data": None
         }
     
-    user_lower = user_message.lower().strip()
-    
     # Check conversation history for context
-    recent_history = get_conversation_history(session_id, max_pairs=2)
+    recent_history = await get_conversation_history(session_id, max_pairs=2)
     has_recent_find = any(
         msg.get("role") == "assistant" and 
         (msg.get("content", "").lower().find("found") >= 0 or 
@@ -430,24 +515,9 @@ async def process_chat_message(user_message: str, session_id: str = "default", s
         for msg in recent_history
     )
     
-    compilation_keywords = [
-        "compile", "create a report", "generate a report", "make a report", "make report",
-        "analyze and create", "summarize", "create a summary", "generate a summary",
-        "report of", "report from", "report on", "compile from", "compile all",
-        "gather and compile", "collect and summarize", "report of it", "compile it",
-        "make a report of", "create a report of", "summarize it", "compile them"
-    ]
-    
-    has_explicit_keyword = any(keyword in user_lower for keyword in compilation_keywords)
-    has_report_pattern = (
-        ("report" in user_lower and ("of" in user_lower or "from" in user_lower or "on" in user_lower)) or
-        ("make" in user_lower and "report" in user_lower) or
-        ("compile" in user_lower and ("it" in user_lower or "them" in user_lower or "all" in user_lower)) or
-        ("summarize" in user_lower and ("it" in user_lower or "them" in user_lower))
-    )
-    has_report_keyword = any(kw in user_lower for kw in ["report", "compile", "summarize", "summary"])
-    has_document_trigger = any(trig in user_lower for trig in ["documents", "files", "it", "them", "those", "all"])
-    is_compilation_request = has_explicit_keyword or has_report_pattern or (has_report_keyword and (has_document_trigger or has_recent_find))
+    # Classify the message once (compiled keyword automaton, see intent_router.py)
+    intents = classify_intents(user_message)
+    is_compilation_request = intents.is_compilation(has_recent_find)
     
     # For background tasks, we'll handle compilation/slideshow requests differently
     # Instead of streaming, we'll execute them directly
@@ -456,171 +526,21 @@ async def process_chat_message(user_message: str, session_id: str = "default", s
         # For email commands, we'll skip this and process normally
         pass
     
-    import re
-    slideshow_keywords = ["create.*slideshow", "make.*presentation", "generate.*slideshow", "create.*presentation", "build.*presentation"]
-    is_slideshow_request = any(re.search(keyword.replace("*", ".*"), user_lower) for keyword in slideshow_keywords)
+    is_slideshow_request = intents.slideshow
     
     # Skip streaming workflows for background email commands
     if not skip_streaming and is_slideshow_request:
         pass
     
     # Get current file list to help LLM understand available files
-    available_files = get_available_files()
-    files_context = "\n".join([f"- {f['path']}" for f in available_files[:20]])
+    available_files = await get_available_files()
     
-    # System prompt (same as chat endpoint)
-    system_prompt = """You are a helpful and friendly OS assistant that can engage in natural conversation AND help users control their operating system through natural language.
-
-You can have casual conversations with users - answer questions, provide explanations, chat about topics, etc. You're warm, intelligent, and engaging.
-
-When users want to perform actions on the system, you can execute the following:
-1. open_app - Open applications (file_manager, terminal, notepad, settings, mailbox, browser, slideshow)
-   - You can open multiple browser windows simultaneously by calling open_app with "browser" multiple times
-   - Each browser window operates independently and can navigate to different URLs
-2. close_all - Close all windows
-3. close_window - Close the topmost window
-4. minimize_window - Minimize the topmost window
-5. maximize_window - Maximize the topmost window
-6. create_file - Create a new file (path and content required)
-7. find_file - Find files by name pattern OR search within file contents (searches both in parallel)
-8. read_files - Read one or more files and return their contents (paths array required). Use this to retrieve document contents before compiling reports.
-9. delete_file - Delete a file by path
-10. list_files - List files in a directory
-11. compose_email - Compose and send an email using AI (instructions required)
-   - Supports sending to multiple recipients - include all email addresses in the instructions
-   - Format multiple recipients as: "Send an email to email1@example.com, email2@example.com, and email3@example.com about..."
-   - The instructions should clearly list all recipient email addresses, subject, and message content
-   - Can include file contents in emails - first use read_files to retrieve file content, then include it in the email instructions
-   - When user asks to send a file via email, first read the file using read_files, then include the content in the compose_email instructions
-   - Can search, summarize, and send: When user asks to search for files, summarize them, and email the summary - first use find_file to search, then read_files to get content, analyze and summarize the content, then include the summary in compose_email instructions
-12. navigate_browser - Navigate browser to a URL (url required) OR multiple URLs (urls as array required)
-   - For single URL: {"url": "example.com"} - Opens one browser window
-   - For multiple URLs: {"urls": ["google.com", "youtube.com"]} - Opens multiple browser windows simultaneously
-   - IMPORTANT: When user requests multiple sites at once (e.g., "open google.com and youtube.com"), use the multiple URLs format with "urls" array in the data field
-   - Each URL gets its own independent browser window
-13. control_browser - Control browser actions using natural language (command required, session_id optional)
-   - ONLY use this when user EXPLICITLY requests browser interaction or when a task REQUIRES it
-   - Examples of when to use: "click the login button", "fill out this form", "search for something", "click on X", "type Y in the search box", "scroll down"
-   - DO NOT use for simple navigation - use navigate_browser instead
-   - The system will analyze the current page screenshot using AI vision and execute the action
-   - Format: {"command": "natural language instruction", "session_id": "optional browser session"}
-   - If no session_id provided, uses the most recently active browser window
-   - IMPORTANT: Only use control_browser when the user explicitly asks for interaction OR when completing a task that requires page interaction
-
-For file operations, always work within the data directory. Paths should be relative (e.g., "Desktop/myfile.txt" or "myfile.txt").
-When creating files, if no path prefix is specified, create them in Desktop folder.
-
-The find_file operation searches both filenames and file contents in parallel for fast results.
-Use it like: "find recipes" (will search both filenames and contents), "find files containing chocolate", etc.
-
-DOCUMENT RETRIEVAL AND REPORT COMPILATION:
-When users ask to compile reports, analyze documents, or create summaries from multiple files:
-1. First use find_file to locate relevant documents (e.g., "find financial reports", "find Q4 documents")
-2. Then use read_files with the file paths found to retrieve their contents
-3. Analyze the retrieved content and use create_file to compile a comprehensive report
-4. The read_files action accepts an array of file paths and returns the full content of each file, which you can then synthesize into reports, summaries, or analyses.
-
-Example workflow for "Compile a Q4 financial report":
-- Step 1: find_file with pattern "Q4 financial" or "Q4 2024"
-- Step 2: The system will return found file paths in the response. In the next turn, use read_files with the paths from step 1
-- Step 3: After reading files, their contents will be in the conversation history. Use create_file to compile a comprehensive report synthesizing all the information
-
-ITERATIVE WORKFLOW SUPPORT:
-The system now supports automatic iterative workflows for document retrieval and report compilation. When users request:
-- "Compile a [topic] report"
-- "Create a summary of [documents]"
-- "Analyze [documents] and create a report"
-
-The system will automatically:
-1. Find relevant documents using find_file
-2. Read their contents using read_files
-3. Compile a comprehensive report using create_file
-
-You can also manually chain these actions across multiple turns using conversation history.
-
-EMAIL WITH FILE CONTENT:
-When users ask to send a file via email or include file content in an email:
-1. First use read_files to retrieve the file content (provide the file path)
-2. Then use compose_email with instructions that include the file content
-3. In the email instructions, explicitly include the file content and specify how it should be presented (e.g., "Include the following content:", "Attach the content from the file:", or "The email body should contain:")
-4. The file content will be included in the email body based on your instructions
-
-Example workflow for "Send the contents of report.txt to john@example.com":
-- Step 1: read_files with path "Desktop/report.txt" (or find the exact path first using find_file)
-- Step 2: After reading the file, use compose_email with instructions like: "Send an email to john@example.com with subject 'Report'. Include the following content from report.txt: [paste the file content here]"
-
-When the user asks to "send file X as email" or "email the contents of file Y", automatically:
-1. First find/read the file to get its content
-2. Then compose the email including that content in the instructions
-
-SEARCH, SUMMARIZE, AND SEND VIA EMAIL:
-When users ask to search for files, summarize them, and send the summary via email:
-1. First use find_file to locate relevant documents (e.g., "find financial reports", "find Q4 documents")
-2. Then use read_files to retrieve the file contents
-3. Analyze and summarize the content (you can summarize in your response or include a summary in the email instructions)
-4. Use compose_email with instructions that include a concise summary of the file content
-
-Example workflow for "Search for Q4 reports, summarize them, and email the summary to john@example.com":
-- Step 1: find_file with pattern "Q4" or "Q4 financial" to locate relevant documents
-- Step 2: read_files with the paths found in step 1
-- Step 3: After reading, analyze the content and create a summary, then use compose_email with instructions like: "Send an email to john@example.com with subject 'Q4 Reports Summary'. The email body should contain a concise summary of the Q4 financial reports. Summary: [your summary of the key points, metrics, and insights from the reports]"
-
-When the user asks to "search for X, summarize it, and send it via email" or "find documents about Y and email a summary":
-1. First search using find_file
-2. Read the files using read_files
-3. Summarize the content (focus on key points, main findings, important metrics, etc.)
-4. Compose an email with the summary included in the instructions
-
-BROWSER USAGE GUIDELINES:
-- Use navigate_browser for simple navigation (opening URLs, visiting sites)
-- Use control_browser ONLY when:
-  1. User EXPLICITLY requests interaction ("click X", "type Y", "scroll", "fill out form")
-  2. A task REQUIRES page interaction to complete (e.g., "search for X", "find out about Y", "login to site", "submit form")
-  3. User wants to find information ("find out about", "search for", "look up", "get information on") - this REQUIRES interaction
-- DO NOT use control_browser for simple navigation tasks (just opening a URL)
-- IMPORTANT: When user says "find out about X" or "search for Y":
-  * This is a TASK that REQUIRES interaction, so use control_browser
-  * OR use navigate_browser first, then control_browser to perform the search
-- If user explicitly says "find out about A, B, and C in separate browsers":
-  * Open multiple browsers (navigate_browser with multiple URLs)
-  * The system will automatically perform searches in each browser (you don't need to chain actions)
-
-Available files in the system:
-""" + files_context + """
-
-RESPONSE FORMAT - You must ALWAYS respond with ONLY a valid JSON object with this exact structure:
-
-{
-  "response": "string - Your conversational response to the user OR a helpful message explaining what action you took. Be natural and friendly.",
-  "action": "string or null - Action name to perform, or null if just conversational. Must be one of: open_app, close_all, close_window, minimize_window, maximize_window, create_file, find_file, read_files, delete_file, list_files, compose_email, navigate_browser, control_browser, or null",
-  "data": {
-    // Action-specific data. Use empty object {} for conversational messages or when action is null.
-    // For open_app: {"app": "string (required): file_manager, terminal, notepad, settings, mailbox, browser, or slideshow", "title": "string (optional): Window title"}
-    // For create_file: {"path": "string (required): File path", "content": "string (required): File content"}
-    // For delete_file: {"path": "string (required): File path to delete"}
-    // For list_files: {"path": "string (required): Directory path to list"}
-    // For find_file: {"pattern": "string (required): Search pattern", "search_content": "boolean (optional, defaults to true): Whether to search in file contents"}
-    // For read_files: {"paths": "array of strings (required): Array of file paths to read. Returns full content of each file."}
-    // For compose_email: {"instructions": "string (required): Natural language instructions describing the email to compose and send, including recipient email address(es) - can be single or multiple (comma-separated), subject matter, and any specific requirements. For multiple recipients, include all email addresses in the instructions like: 'Send an email to john@example.com, jane@example.com, and bob@example.com about...'. To include file content in the email, first use read_files to get the content, then include it in the instructions like: 'Send an email to recipient@example.com with subject X. Include the following content from the file: [paste file content here]'"}
-    // For navigate_browser: 
-    //   Single URL: {"url": "string (required): URL to navigate to (e.g., 'https://example.com' or 'example.com')"}
-    //   Multiple URLs: {"urls": ["array of strings (required): Multiple URLs to open simultaneously, each in its own browser window"]}
-    // For control_browser: {"command": "string (required): Natural language instruction for browser interaction (e.g., 'click the search button', 'type hello in the search box', 'scroll down')", "session_id": "string (optional): Browser session ID"}
-    // For other actions: {} (empty object)
-  }
-}
-
-IMPORTANT: 
-- Always return ONLY the JSON object, no other text before or after
-- For conversational messages (no action needed), set "action" to null and "data" to {}
-- Ensure all JSON is valid and properly formatted
-- The "response" field is always required and must be a string
-- The "action" field is always required and must be a string (one of the valid actions) or null
-- The "data" field is always required and must be an object (empty {} for conversational messages)"""
+    # Static system prompt (built once at import, shared prefix for prompt caching)
+    system_prompt = BACKGROUND_SYSTEM_PROMPT
 
     # Valid action names
     valid_actions = ["open_app", "close_all", "close_window", "minimize_window", "maximize_window", 
-                     "create_file", "find_file", "read_files", "delete_file", "list_files", "compose_email", "navigate_browser", "control_browser"]
+                     "create_file", "find_file", "read_files", "delete_file", "list_files", "compose_email", "navigate_browser", "control_browser", "plan"]
     
     def validate_response(response_dict):
         """Validate the LLM response structure and action"""
@@ -653,7 +573,7 @@ IMPORTANT:
         raw_response = None
 
         # Get conversation history (last 4 pairs = 8 messages)
-        history_messages = get_conversation_history(session_id, max_pairs=4)
+        history_messages = await get_conversation_history(session_id, max_pairs=4)
 
         # Hyperspell context enrichment
         print(f"🔍 Checking hyperspell for message: '{user_message[:50]}...'")
@@ -687,26 +607,21 @@ IMPORTANT:
                 hyperspell_context_memories
             )
 
-        # Build messages array with system prompt, optional Hyperspell context, history, and current user message
-        messages = [{"role": "system", "content": system_prompt}]
-        if formatted_hyperspell_context:
-            messages.append(
-                {
-                    "role": "system",
-                    "content": (
-                        "Context retrieved from Hyperspell "
-                        f"(sources: {', '.join(hyperspell_sources)}):\n"
-                        f"{formatted_hyperspell_context}"
-                    ),
-                }
-            )
-        messages.extend(history_messages)  # Add conversation history
-        messages.append({"role": "user", "content": user_message})  # Add current user message
+        # Build messages: static system prompt first (cacheable prefix), then the dynamic
+        # segments - available files, optional Hyperspell context, history, current user message
+        messages = build_chat_messages(
+            system_prompt,
+            available_files,
+            history_messages,
+            user_message,
+            hyperspell_sources=hyperspell_sources,
+            formatted_hyperspell_context=formatted_hyperspell_context,
+        )
         
         for attempt in range(1, max_retries + 1):
             try:
                 # Call OpenAI API
-                completion = openai_client.chat.completions.create(
+                completion = await llm_gateway.chat(
                     model="gpt-4.1-2025-04-14",
                     messages=messages,
                     temperature=0.7,
@@ -756,237 +671,12 @@ IMPORTANT:
         action = llm_response.get("action")
         action_data = llm_response.get("data", {})
         
-        # Execute actions - import the execute_action helper from chat endpoint logic
-        # We'll execute actions inline here (same logic as chat endpoint)
+        # Execute actions through the shared action engine (same registry as chat endpoint)
         # Note: For background tasks, we skip UI actions like open_app, close_window, etc.
         
-        if action == "create_file":
-            try:
-                file_path = action_data.get("path", "")
-                file_content = action_data.get("content", "")
-                
-                if not file_path:
-                    llm_response["response"] = "Error: No file path specified for file creation."
-                    llm_response["action"] = None
-                else:
-                    safe_path = Path(file_path)
-                    if ".." in str(safe_path) or safe_path.is_absolute():
-                        llm_response["response"] = "Error: Invalid file path."
-                        llm_response["action"] = None
-                    else:
-                        if not str(safe_path).startswith("Desktop/"):
-                            safe_path = Path("Desktop") / safe_path
-                        
-                        target_file = DATA_DIR / safe_path
-                        
-                        if target_file.exists():
-                            llm_response["response"] = f"Error: File '{safe_path}' already exists."
-                            llm_response["action"] = None
-                        else:
-                            target_file.parent.mkdir(parents=True, exist_ok=True)
-                            target_file.write_text(file_content, encoding='utf-8')
-                            llm_response["response"] = f"Successfully created file '{safe_path}'."
-            except Exception as e:
-                llm_response["response"] = f"Error creating file: {str(e)}"
-                llm_response["action"] = None
-        
-        elif action == "find_file":
-            try:
-                pattern = action_data.get("pattern", "")
-                search_in_content = action_data.get("search_content", True)
-                
-                if not pattern:
-                    llm_response["response"] = "Error: No search pattern specified."
-                    llm_response["action"] = None
-                else:
-                    all_files = []
-                    for root, dirs, filenames in os.walk(DATA_DIR):
-                        for filename in filenames:
-                            full_path = os.path.join(root, filename)
-                            rel_path = os.path.relpath(full_path, DATA_DIR)
-                            all_files.append({
-                                "path": rel_path.replace(os.sep, "/"),
-                                "full_path": full_path
-                            })
-                    
-                    found_files_by_name = []
-                    found_files_by_content = []
-                    
-                    pattern_lower = pattern.lower()
-                    pattern_words = pattern_lower.split()
-                    
-                    for file_info in all_files:
-                        path_lower = file_info["path"].lower()
-                        if pattern_lower in path_lower or (len(pattern_words) > 1 and all(word in path_lower for word in pattern_words)):
-                            found_files_by_name.append({
-                                "path": file_info["path"],
-                                "match_type": "filename"
-                            })
-                    
-                    if search_in_content:
-                        def search_file_content(file_info):
-                            try:
-                                with open(file_info["full_path"], 'r', encoding='utf-8', errors='ignore') as f:
-                                    content = f.read()
-                                    content_lower = content.lower()
-                                    matches_pattern = pattern_lower in content_lower
-                                    matches_words = len(pattern_words) > 1 and all(word in content_lower for word in pattern_words)
-                                    if matches_pattern or matches_words:
-                                        lines = content.split('\n')
-                                        matching_lines = []
-                                        for i, line in enumerate(lines, 1):
-                                            line_lower = line.lower()
-                                            if pattern_lower in line_lower or (len(pattern_words) > 1 and all(word in line_lower for word in pattern_words)):
-                                                matching_lines.append(i)
-                                        return {
-                                            "path": file_info["path"],
-                                            "match_type": "content",
-                                            "line_count": len(matching_lines),
-                                            "sample_lines": matching_lines[:3]
-                                        }
-                            except Exception:
-                                pass
-                            return None
-                        
-                        found_filename_paths = {f["path"] for f in found_files_by_name}
-                        with ThreadPoolExecutor(max_workers=10) as executor:
-                            futures = {executor.submit(search_file_content, file_info): file_info 
-                                      for file_info in all_files 
-                                      if file_info["path"] not in found_filename_paths}
-                            
-                            for future in as_completed(futures):
-                                result = future.result()
-                                if result:
-                                    found_files_by_content.append(result)
-                    
-                    found_files = found_files_by_name.copy()
-                    found_files_by_content_paths = {f["path"] for f in found_files_by_name}
-                    
-                    for content_match in found_files_by_content:
-                        if content_match["path"] not in found_files_by_content_paths:
-                            found_files.append(content_match)
-                    
-                    if found_files:
-                        results_text = []
-                        for f in found_files[:15]:
-                            if f["match_type"] == "filename":
-                                results_text.append(f"- {f['path']} (filename match)")
-                            else:
-                                line_info = f" (found in content at lines {', '.join(map(str, f.get('sample_lines', [])))}" + \
-                                          (f", and {f.get('line_count', 0) - len(f.get('sample_lines', []))} more" 
-                                           if f.get('line_count', 0) > len(f.get('sample_lines', [])) else "") + ")"
-                                results_text.append(f"- {f['path']}{line_info}")
-                        
-                        files_list = "\n".join(results_text)
-                        total_count = len(found_files)
-                        llm_response["response"] = f"Found {total_count} file(s) matching '{pattern}':\n{files_list}"
-                        llm_response["data"] = {
-                            "files": [f["path"] for f in found_files[:15]],
-                            "details": found_files[:15]
-                        }
-                    else:
-                        llm_response["response"] = f"No files found matching '{pattern}' in filename or content."
-                        llm_response["data"] = {"files": [], "details": []}
-            except Exception as e:
-                llm_response["response"] = f"Error finding files: {str(e)}"
-                llm_response["action"] = None
-        
-        elif action == "read_files":
-            try:
-                file_paths = action_data.get("paths", [])
-                if not file_paths or not isinstance(file_paths, list):
-                    llm_response["response"] = "Error: No file paths specified or paths must be an array."
-                    llm_response["action"] = None
-                else:
-                    file_contents = []
-                    errors = []
-                    
-                    for file_path in file_paths:
-                        try:
-                            safe_path = Path(file_path)
-                            if ".." in str(safe_path) or safe_path.is_absolute():
-                                errors.append(f"Invalid path: {file_path}")
-                                continue
-                            
-                            target_file = DATA_DIR / safe_path
-                            
-                            if not target_file.exists() or not target_file.is_file():
-                                errors.append(f"File not found: {file_path}")
-                                continue
-                            
-                            content = target_file.read_text(encoding='utf-8', errors='ignore')
-                            file_contents.append({
-                                "path": file_path,
-                                "content": content,
-                                "size": len(content),
-                                "lines": len(content.split('\n'))
-                            })
-                        except Exception as e:
-                            errors.append(f"Error reading {file_path}: {str(e)}")
-                    
-                    if file_contents:
-                        response_parts = [f"Successfully read {len(file_contents)} file(s):"]
-                        for fc in file_contents:
-                            response_parts.append(f"\n--- {fc['path']} ({fc['lines']} lines, {fc['size']} chars) ---")
-                            response_parts.append(fc['content'])
-                        
-                        if errors:
-                            response_parts.append(f"\n\nErrors: {', '.join(errors)}")
-                        
-                        llm_response["response"] = "\n".join(response_parts)
-                        llm_response["data"] = {
-                            "files": file_contents,
-                            "errors": errors
-                        }
-                    else:
-                        llm_response["response"] = f"No files could be read. Errors: {', '.join(errors) if errors else 'All files were invalid or not found.'}"
-                        llm_response["data"] = {"files": [], "errors": errors}
-            except Exception as e:
-                llm_response["response"] = f"Error reading files: {str(e)}"
-                llm_response["action"] = None
-        
-        elif action == "compose_email":
-            instructions = action_data.get("instructions", "")
-            if not instructions:
-                llm_response["response"] = "Error: No email instructions provided."
-                llm_response["action"] = None
-            else:
-                async with httpx.AsyncClient(timeout=30.0) as client:
-                    response = await client.post(
-                        RAILWAY_EMAIL_API,
-                        json={"instructions": instructions},
-                        headers={"Content-Type": "application/json"}
-                    )
-                    response.raise_for_status()
-                    result = response.json()
-                    
-                    email_entry = {
-                        "id": result.get("agentmail_message_id", f"email_{len(email_inbox)}"),
-                        "message_id": result.get("agentmail_message_id"),
-                        "to": result.get("email", {}).get("to", ""),
-                        "subject": result.get("email", {}).get("subject", ""),
-                        "body": result.get("email", {}).get("body", ""),
-                        "status": result.get("status", "sent"),
-                        "timestamp": datetime.now().isoformat(),
-                        "sent": True
-                    }
-                    email_inbox.insert(0, email_entry)
-                    
-                    recipient = email_entry.get("to", "recipient")
-                    subject = email_entry.get("subject", "email")
-                    
-                    # Format recipient(s) nicely for response
-                    recipients_str = recipient
-                    if isinstance(recipient, str) and ',' in recipient:
-                        # Multiple recipients - format as list
-                        recipients = [r.strip() for r in recipient.split(',')]
-                        if len(recipients) == 2:
-                            recipients_str = f"{recipients[0]} and {recipients[1]}"
-                        else:
-                            recipients_str = ", ".join(recipients[:-1]) + f", and {recipients[-1]}"
-                    
-                    llm_response["response"] = f"Email sent successfully to {recipients_str}!\nSubject: {subject}\nThe email has been added to your inbox."
-                    llm_response["data"] = {"email": email_entry}
+        if action in action_engine:
+            result = await action_engine.execute(action, action_data)
+            result.apply_to(llm_response)
         
         # Skip UI actions for background email commands (open_app, close_window, etc.)
         # These don't make sense in background context
@@ -998,66 +688,6 @@ IMPORTANT:
             llm_response["response"] = f"Browser actions are not available for background email commands. Browser automation is only available through the chat interface."
             llm_response["action"] = None
         
-        elif action == "delete_file":
-            try:
-                file_path = action_data.get("path", "")
-                if not file_path:
-                    llm_response["response"] = "Error: No file path specified for deletion."
-                    llm_response["action"] = None
-                else:
-                    safe_path = Path(file_path)
-                    if ".." in str(safe_path) or safe_path.is_absolute():
-                        llm_response["response"] = "Error: Invalid file path."
-                        llm_response["action"] = None
-                    else:
-                        target_file = DATA_DIR / safe_path
-                        
-                        if not target_file.exists():
-                            llm_response["response"] = f"Error: File '{safe_path}' not found."
-                            llm_response["action"] = None
-                        else:
-                            if target_file.is_file():
-                                target_file.unlink()
-                            else:
-                                import shutil
-                                shutil.rmtree(target_file)
-                            llm_response["response"] = f"Successfully deleted '{safe_path}'."
-            except Exception as e:
-                llm_response["response"] = f"Error deleting file: {str(e)}"
-                llm_response["action"] = None
-        
-        elif action == "list_files":
-            try:
-                list_path = action_data.get("path", "")
-                if list_path:
-                    safe_path = Path(list_path).name
-                    target_dir = DATA_DIR / safe_path
-                else:
-                    target_dir = DATA_DIR
-                
-                if not target_dir.exists() or not target_dir.is_dir():
-                    llm_response["response"] = f"Error: Directory '{list_path}' not found."
-                    llm_response["action"] = None
-                else:
-                    items = []
-                    for item in sorted(target_dir.iterdir()):
-                        items.append({
-                            "name": item.name,
-                            "path": str(item.relative_to(DATA_DIR)),
-                            "type": "folder" if item.is_dir() else "file"
-                        })
-                    
-                    if items:
-                        items_list = "\n".join([f"- {item['name']} ({item['type']})" for item in items[:20]])
-                        llm_response["response"] = f"Files in '{list_path or 'root'}':\n{items_list}"
-                        llm_response["data"] = {"items": items[:20]}
-                    else:
-                        llm_response["response"] = f"Directory '{list_path or 'root'}' is empty."
-                        llm_response["data"] = {"items": []}
-            except Exception as e:
-                llm_response["response"] = f"Error listing files: {str(e)}"
-                llm_response["action"] = None
-        
         # Record interaction with Hyperspell memory layer (non-blocking)
         if llm_response:
             metadata: Dict[str, Any] = {}
@@ -1075,15 +705,7 @@ IMPORTANT:
             )
 
         # Store conversation history
-        if session_id not in conversation_history:
-            conversation_history[session_id] = []
-
-        conversation_history[session_id].append({"role": "user", "content": user_message})
-        conversation_history[session_id].append({"role": "assistant", "content": llm_response.get("response", "")})
-
-        # Keep only last 20 messages per session
-        if len(conversation_history[session_id]) > 20:
-            conversation_history[session_id] = conversation_history[session_id][-20:]
+        await add_to_conversation_history(session_id, user_message, llm_response.get("response", ""))
 
         return llm_response
         
@@ -1099,6 +721,56 @@ IMPORTANT:
 async def chat_endpoint(request: Request):
     """Handle chat messages using OpenAI with JSON action output"""
     data = await request.json()
+    return await handle_chat_request(data)
+
+@app.post("/api/chat/sse")
+async def chat_sse_endpoint(request: Request):
+    """
+    Streaming variant of /api/chat (Server-Sent Events).
+    Emits the "response" text as "token" events while the LLM is still generating,
+    then one "final" event with response/action/data once actions have run.
+    Compilation and slideshow requests stream their workflow updates as usual.
+    """
+    data = await request.json()
+    events: asyncio.Queue = asyncio.Queue()
+    task = asyncio.create_task(handle_chat_request(data, emit=events.put_nowait))
+    task.add_done_callback(lambda _: events.put_nowait(None))
+    
+    async def generate():
+        try:
+            while (event := await events.get()) is not None:
+                yield f"data: {json.dumps(event)}\n\n"
+            
+            result = task.result()
+            if isinstance(result, StreamingResponse):
+                async for chunk in result.body_iterator:
+                    yield chunk
+            else:
+                final = json.loads(result.body)
+                yield f"data: {json.dumps({'type': 'final', **final})}\n\n"
+        except Exception as e:
+            logger.error(f"Error in streaming chat: {e}", exc_info=True)
+            yield f"data: {json.dumps({'type': 'error', 'message': str(e)})}\n\n"
+        finally:
+            if not task.done():
+                task.cancel()
+    
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+async def handle_chat_request(data: Dict[str, Any], emit: Optional[Callable[[Dict[str, Any]], None]] = None):
+    """
+    Process a chat request body and return the HTTP response.
+    When emit is given, the LLM reply is streamed and the "response" text is
+    forwarded to it as {"type": "token"} events while it is generated.
+    """
     user_message = data.get("message", "").strip()
     session_id = data.get("session_id", "default")  # Use session_id from request or default
     original_user_message = user_message  # Store for use in action handlers
@@ -1111,10 +783,8 @@ async def chat_endpoint(request: Request):
         })
     
     # Check if this is a compilation request - if so, use streaming endpoint
-    user_lower = user_message.lower().strip()
-    
     # Check conversation history for context (e.g., user might say "make a report of it" referring to previous search)
-    recent_history = get_conversation_history(session_id, max_pairs=2)
+    recent_history = await get_conversation_history(session_id, max_pairs=2)
     has_recent_find = any(
         msg.get("role") == "assistant" and 
         (msg.get("content", "").lower().find("found") >= 0 or 
@@ -1123,32 +793,11 @@ async def chat_endpoint(request: Request):
         for msg in recent_history
     )
     
-    compilation_keywords = [
-        "compile", "create a report", "generate a report", "make a report", "make report",
-        "analyze and create", "summarize", "create a summary", "generate a summary",
-        "report of", "report from", "report on", "compile from", "compile all",
-        "gather and compile", "collect and summarize", "report of it", "compile it",
-        "make a report of", "create a report of", "summarize it", "compile them"
-    ]
-    
-    # Check for explicit compilation keywords
-    has_explicit_keyword = any(keyword in user_lower for keyword in compilation_keywords)
-    
-    # Check for patterns like "report of it", "compile it", "make report", etc.
-    # These patterns should match even with prefixes like "no also"
-    has_report_pattern = (
-        ("report" in user_lower and ("of" in user_lower or "from" in user_lower or "on" in user_lower)) or
-        ("make" in user_lower and "report" in user_lower) or
-        ("compile" in user_lower and ("it" in user_lower or "them" in user_lower or "all" in user_lower)) or
-        ("summarize" in user_lower and ("it" in user_lower or "them" in user_lower))
-    )
-    
-    # Check for report/summary keywords combined with document references
-    has_report_keyword = any(kw in user_lower for kw in ["report", "compile", "summarize", "summary"])
-    has_document_trigger = any(trig in user_lower for trig in ["documents", "files", "it", "them", "those", "all"])
-    
-    # If user says something like "make a report of it" and there was recent file finding activity, trigger compilation
-    is_compilation_request = has_explicit_keyword or has_report_pattern or (has_report_keyword and (has_document_trigger or has_recent_find))
+    # Classify the message once (compiled keyword automaton, see intent_router.py).
+    # Explicit compilation keywords, "report of it"/"compile it" style patterns, or report keywords
+    # combined with document references (or recent file finding activity) trigger compilation
+    intents = classify_intents(user_message)
+    is_compilation_request = intents.is_compilation(has_recent_find)
     
     if is_compilation_request:
         # Use streaming endpoint for compilation requests
@@ -1175,9 +824,7 @@ async def chat_endpoint(request: Request):
         )
     
     # Check if this is a slideshow creation request
-    import re
-    slideshow_keywords = ["create.*slideshow", "make.*presentation", "generate.*slideshow", "create.*presentation", "build.*presentation"]
-    is_slideshow_request = any(re.search(keyword.replace("*", ".*"), user_lower) for keyword in slideshow_keywords)
+    is_slideshow_request = intents.slideshow
     
     if is_slideshow_request:
         # Use streaming endpoint for slideshow creation
@@ -1204,261 +851,14 @@ async def chat_endpoint(request: Request):
         )
     
     # Get current file list to help LLM understand available files
-    available_files = get_available_files()
-    files_context = "\n".join([f"- {f['path']}" for f in available_files[:20]])  # Limit to first 20 files
+    available_files = await get_available_files()
     
-    # System prompt that allows both conversational and task-oriented interactions
-    system_prompt = """You are a helpful and friendly OS assistant that can engage in natural conversation AND help users control their operating system through natural language.
-
-You can have casual conversations with users - answer questions, provide explanations, chat about topics, etc. You're warm, intelligent, and engaging.
-
-When users want to perform actions on the system, you can execute the following:
-1. open_app - Open applications (file_manager, terminal, notepad, settings, mailbox, browser, slideshow)
-   - You can open multiple browser windows simultaneously by calling open_app with "browser" multiple times
-   - Each browser window operates independently and can navigate to different URLs
-2. close_all - Close all windows
-3. close_window - Close the topmost window
-4. minimize_window - Minimize the topmost window
-5. maximize_window - Maximize the topmost window
-6. create_file - Create a new file (path and content required)
-7. find_file - Find files by name pattern OR search within file contents (searches both in parallel)
-8. read_files - Read one or more files and return their contents (paths array required). Use this to retrieve document contents before compiling reports.
-9. delete_file - Delete a file by path
-10. list_files - List files in a directory
-11. compose_email - Compose and send an email using AI (instructions required)
-   - Supports sending to multiple recipients - include all email addresses in the instructions
-   - Format multiple recipients as: "Send an email to email1@example.com, email2@example.com, and email3@example.com about..."
-   - The instructions should clearly list all recipient email addresses, subject, and message content
-   - Can include file contents in emails - first use read_files to retrieve file content, then include it in the email instructions
-   - When user asks to send a file via email, first read the file using read_files, then include the content in the compose_email instructions
-   - Can search, summarize, and send: When user asks to search for files, summarize them, and email the summary - first use find_file to search, then read_files to get content, analyze and summarize the content, then include the summary in compose_email instructions
-12. navigate_browser - Navigate browser to a URL (url required) OR multiple URLs (urls as array required)
-   - For single URL: {"url": "example.com"} - Opens one browser window
-   - For multiple URLs: {"urls": ["google.com", "youtube.com"]} - Opens multiple browser windows simultaneously
-   - IMPORTANT: When user requests multiple sites at once (e.g., "open google.com and youtube.com"), use the multiple URLs format with "urls" array in the data field
-   - Each URL gets its own independent browser window
-13. control_browser - Control browser actions using natural language (command required, session_id optional)
-   - ONLY use this when user EXPLICITLY requests browser interaction or when a task REQUIRES it
-   - Examples of when to use: "click the login button", "fill out this form", "search for something", "click on X", "type Y in the search box", "scroll down"
-   - DO NOT use for simple navigation - use navigate_browser instead
-   - The system will analyze the current page screenshot using AI vision and execute the action
-   - Format: {"command": "natural language instruction", "session_id": "optional browser session"}
-   - If no session_id provided, uses the most recently active browser window
-   - IMPORTANT: Only use control_browser when the user explicitly asks for interaction OR when completing a task that requires page interaction
-
-For file operations, always work within the data directory. Paths should be relative (e.g., "Desktop/myfile.txt" or "myfile.txt").
-When creating files, if no path prefix is specified, create them in Desktop folder.
-
-The find_file operation searches both filenames and file contents in parallel for fast results.
-Use it like: "find recipes" (will search both filenames and contents), "find files containing chocolate", etc.
-
-DOCUMENT RETRIEVAL AND REPORT COMPILATION:
-When users ask to compile reports, analyze documents, or create summaries from multiple files:
-1. First use find_file to locate relevant documents (e.g., "find financial reports", "find Q4 documents")
-2. Then use read_files with the file paths found to retrieve their contents
-3. Analyze the retrieved content and use create_file to compile a comprehensive report
-4. The read_files action accepts an array of file paths and returns the full content of each file, which you can then synthesize into reports, summaries, or analyses.
-
-Example workflow for "Compile a Q4 financial report":
-- Step 1: find_file with pattern "Q4 financial" or "Q4 2024"
-- Step 2: The system will return found file paths in the response. In the next turn, use read_files with the paths from step 1
-- Step 3: After reading files, their contents will be in the conversation history. Use create_file to compile a comprehensive report synthesizing all the information
-
-ITERATIVE WORKFLOW SUPPORT:
-The system now supports automatic iterative workflows for document retrieval and report compilation. When users request:
-- "Compile a [topic] report"
-- "Create a summary of [documents]"
-- "Analyze [documents] and create a report"
-
-The system will automatically:
-1. Find relevant documents using find_file
-2. Read their contents using read_files
-3. Compile a comprehensive report using create_file
-
-You can also manually chain these actions across multiple turns using conversation history.
-
-EMAIL WITH FILE CONTENT:
-When users ask to send a file via email or include file content in an email:
-1. First use read_files to retrieve the file content (provide the file path)
-2. Then use compose_email with instructions that include the file content
-3. In the email instructions, explicitly include the file content and specify how it should be presented (e.g., "Include the following content:", "Attach the content from the file:", or "The email body should contain:")
-4. The file content will be included in the email body based on your instructions
-
-Example workflow for "Send the contents of report.txt to john@example.com":
-- Step 1: read_files with path "Desktop/report.txt" (or find the exact path first using find_file)
-- Step 2: After reading the file, use compose_email with instructions like: "Send an email to john@example.com with subject 'Report'. Include the following content from report.txt: [paste the file content here]"
-
-When the user asks to "send file X as email" or "email the contents of file Y", automatically:
-1. First find/read the file to get its content
-2. Then compose the email including that content in the instructions
-
-SEARCH, SUMMARIZE, AND SEND VIA EMAIL:
-When users ask to search for files, summarize them, and send the summary via email:
-1. First use find_file to locate relevant documents (e.g., "find financial reports", "find Q4 documents")
-2. Then use read_files to retrieve the file contents
-3. Analyze and summarize the content (you can summarize in your response or include a summary in the email instructions)
-4. Use compose_email with instructions that include a concise summary of the file content
-
-Example workflow for "Search for Q4 reports, summarize them, and email the summary to john@example.com":
-- Step 1: find_file with pattern "Q4" or "Q4 financial" to locate relevant documents
-- Step 2: read_files with the paths found in step 1
-- Step 3: After reading, analyze the content and create a summary, then use compose_email with instructions like: "Send an email to john@example.com with subject 'Q4 Reports Summary'. The email body should contain a concise summary of the Q4 financial reports. Summary: [your summary of the key points, metrics, and insights from the reports]"
-
-When the user asks to "search for X, summarize it, and send it via email" or "find documents about Y and email a summary":
-1. First search using find_file
-2. Read the files using read_files
-3. Summarize the content (focus on key points, main findings, important metrics, etc.)
-4. Compose an email with the summary included in the instructions
-
-BROWSER USAGE GUIDELINES:
-- Use navigate_browser for simple navigation (opening URLs, visiting sites)
-- Use control_browser ONLY when:
-  1. User EXPLICITLY requests interaction ("click X", "type Y", "scroll", "fill out form")
-  2. A task REQUIRES page interaction to complete (e.g., "search for X", "find out about Y", "login to site", "submit form")
-  3. User wants to find information ("find out about", "search for", "look up", "get information on") - this REQUIRES interaction
-- DO NOT use control_browser for simple navigation tasks (just opening a URL)
-- IMPORTANT: When user says "find out about X" or "search for Y":
-  * This is a TASK that REQUIRES interaction, so use control_browser
-  * OR use navigate_browser first, then control_browser to perform the search
-- If user explicitly says "find out about A, B, and C in separate browsers":
-  * Open multiple browsers (navigate_browser with multiple URLs)
-  * The system will automatically perform searches in each browser (you don't need to chain actions)
-
-Available files in the system:
-""" + files_context + """
-
-RESPONSE FORMAT - You must ALWAYS respond with ONLY a valid JSON object with this exact structure:
-
-{
-  "response": "string - Your conversational response to the user OR a helpful message explaining what action you took. Be natural and friendly.",
-  "action": "string or null - Action name to perform, or null if just conversational. Must be one of: open_app, close_all, close_window, minimize_window, maximize_window, create_file, find_file, read_files, delete_file, list_files, compose_email, navigate_browser, control_browser, or null",
-  "data": {
-    // Action-specific data. Use empty object {} for conversational messages or when action is null.
-    // For open_app: {"app": "string (required): file_manager, terminal, notepad, settings, mailbox, browser, or slideshow", "title": "string (optional): Window title"}
-    // For create_file: {"path": "string (required): File path", "content": "string (required): File content"}
-    // For delete_file: {"path": "string (required): File path to delete"}
-    // For list_files: {"path": "string (required): Directory path to list"}
-    // For find_file: {"pattern": "string (required): Search pattern", "search_content": "boolean (optional, defaults to true): Whether to search in file contents"}
-    // For read_files: {"paths": "array of strings (required): Array of file paths to read. Returns full content of each file."}
-    // For compose_email: {"instructions": "string (required): Natural language instructions describing the email to compose and send, including recipient email address(es) - can be single or multiple (comma-separated), subject matter, and any specific requirements. For multiple recipients, include all email addresses in the instructions like: 'Send an email to john@example.com, jane@example.com, and bob@example.com about...'. To include file content in the email, first use read_files to get the content, then include it in the instructions like: 'Send an email to recipient@example.com with subject X. Include the following content from the file: [paste file content here]'"}
-    // For navigate_browser: 
-    //   Single URL: {"url": "string (required): URL to navigate to (e.g., 'https://example.com' or 'example.com')"}
-    //   Multiple URLs: {"urls": ["array of strings (required): Multiple URLs to open simultaneously, each in its own browser window"]}
-    // For control_browser: {"command": "string (required): Natural language instruction for browser interaction (e.g., 'click the search button', 'type hello in the search box', 'scroll down')", "session_id": "string (optional): Browser session ID"}
-    // For other actions: {} (empty object)
-  }
-}
-
-EXAMPLES:
-- User: "Hello!" 
-  Response: {"response": "Hello! How can I help you today?", "action": null, "data": {}}
-
-- User: "What's 2+2?" 
-  Response: {"response": "2+2 equals 4! Is there anything else I can help you with?", "action": null, "data": {}}
-
-- User: "Create a file called notes.txt" 
-  Response: {"response": "I'll create that file for you!", "action": "create_file", "data": {"path": "Desktop/notes.txt", "content": ""}}
-
-- User: "Open terminal" 
-  Response: {"response": "Opening the terminal for you!", "action": "open_app", "data": {"app": "terminal", "title": "Terminal"}}
-
-- User: "Find files with .txt extension" 
-  Response: {"response": "Searching for files...", "action": "find_file", "data": {"pattern": ".txt", "search_content": true}}
-
-- User: "Email Alex Johnson at zoebex01@gmail.com about the launch. Mention the roadmap deck and ask for feedback by Friday." 
-  Response: {"response": "I'll compose and send that email for you!", "action": "compose_email", "data": {"instructions": "Email Alex Johnson at zoebex01@gmail.com about the launch. Mention the roadmap deck and ask for feedback by Friday."}}
-
-- User: "Send an email to john@example.com saying hello" 
-  Response: {"response": "Sending an email to john@example.com with a friendly hello message!", "action": "compose_email", "data": {"instructions": "Send an email to john@example.com saying hello"}}
-
-- User: "Send an email to john@example.com, jane@example.com, and bob@example.com about the meeting" 
-  Response: {"response": "Sending an email to john@example.com, jane@example.com, and bob@example.com about the meeting!", "action": "compose_email", "data": {"instructions": "Send an email to john@example.com, jane@example.com, and bob@example.com about the meeting"}}
-
-- User: "Send the contents of report.txt to john@example.com"
-  Response (Step 1): {"response": "Reading the report.txt file to get its contents.", "action": "read_files", "data": {"paths": ["Desktop/report.txt"]}}
-  Response (Step 2, after reading): {"response": "Sending an email to john@example.com with the report contents!", "action": "compose_email", "data": {"instructions": "Send an email to john@example.com with subject 'Report'. Include the following content in the email body: [file content from report.txt]"}}
-
-- User: "Email the Q4 financial report to alice@example.com and bob@example.com"
-  Response (Step 1): {"response": "Finding the Q4 financial report file.", "action": "find_file", "data": {"pattern": "Q4 financial", "search_content": true}}
-  Response (Step 2, after finding): {"response": "Reading the Q4 financial report.", "action": "read_files", "data": {"paths": ["corporate_documents/Reports/Q4_2024_Financial_Report.md"]}}
-  Response (Step 3, after reading): {"response": "Sending the Q4 financial report to alice@example.com and bob@example.com!", "action": "compose_email", "data": {"instructions": "Send an email to alice@example.com and bob@example.com with subject 'Q4 Financial Report'. Include the following report content in the email body: [Q4 financial report content here]"}}
-
-- User: "Search for financial reports, summarize them, and email the summary to john@example.com"
-  Response (Step 1): {"response": "Searching for financial reports.", "action": "find_file", "data": {"pattern": "financial report", "search_content": true}}
-  Response (Step 2, after finding): {"response": "Reading the financial reports to create a summary.", "action": "read_files", "data": {"paths": ["corporate_documents/Reports/Q4_2024_Financial_Report.md", "corporate_documents/Financial/Income_Statement_Q4_2024.md"]}}
-  Response (Step 3, after reading): {"response": "Summarizing the reports and sending the summary to john@example.com!", "action": "compose_email", "data": {"instructions": "Send an email to john@example.com with subject 'Financial Reports Summary'. The email body should contain a concise executive summary of the key financial findings. Summary: Revenue increased 15% QoQ, operating expenses decreased 8%, net profit margin improved to 22%. Key highlights include strong performance in Q4 with total revenue of $X million and successful cost optimization initiatives."}}
-
-- User: "Find all client documents, summarize them, and send to the team at team@example.com"
-  Response (Step 1): {"response": "Searching for client documents.", "action": "find_file", "data": {"pattern": "client", "search_content": true}}
-  Response (Step 2, after finding): {"response": "Reading the client documents.", "action": "read_files", "data": {"paths": ["corporate_documents/Clients/Client_Status_Report_December_2024.md", "corporate_documents/Clients/Client_Acme_Corp_Profile.md"]}}
-  Response (Step 3, after reading): {"response": "Creating a summary and sending it to the team!", "action": "compose_email", "data": {"instructions": "Send an email to team@example.com with subject 'Client Documents Summary'. Include a concise summary of all client documents: [your summary of key client information, status updates, and important details]"}}
-
-- User: "Open google.com in the browser" 
-  Response: {"response": "Opening browser and navigating to google.com!", "action": "navigate_browser", "data": {"url": "google.com"}}
-
-- User: "Visit https://example.com" 
-  Response: {"response": "Opening browser and navigating to https://example.com!", "action": "navigate_browser", "data": {"url": "https://example.com"}}
-
-- User: "Open wikipedia.org and github.com" 
-  Response: {"response": "Opening two browser windows - one for wikipedia.org and one for github.com!", "action": "navigate_browser", "data": {"urls": ["wikipedia.org", "github.com"]}}
-
-- User: "Show me google.com and also open youtube.com" 
-  Response: {"response": "Opening google.com and youtube.com in separate browser windows!", "action": "navigate_browser", "data": {"urls": ["google.com", "youtube.com"]}}
-
-- User: "Open google.com, youtube.com, and github.com" 
-  Response: {"response": "Opening three browser windows for google.com, youtube.com, and github.com!", "action": "navigate_browser", "data": {"urls": ["google.com", "youtube.com", "github.com"]}}
-
-- User: "Open google.com and search for python" 
-  Response: {"response": "Opening google.com and searching for python!", "action": "navigate_browser", "data": {"url": "google.com"}}
-  IMPORTANT: After navigation completes, you should automatically follow up with control_browser to perform the search:
-  Follow-up: {"response": "Searching for python on Google!", "action": "control_browser", "data": {"command": "type python in the search box and click the search button or press enter"}}
-
-- User: "Find out about Tim Cook, Sundar Pichai, and Satya Nadella" 
-  Response: {"response": "Opening three browser windows to search for Tim Cook, Sundar Pichai, and Satya Nadella!", "action": "navigate_browser", "data": {"urls": ["google.com", "google.com", "google.com"]}}
-  IMPORTANT: This opens browsers but you MUST follow up with control_browser actions to actually search:
-  Follow-up 1: {"response": "Searching for Tim Cook in the first browser!", "action": "control_browser", "data": {"command": "type Tim Cook in the search box and click search", "session_id": "browser_session_1"}}
-  Follow-up 2: {"response": "Searching for Sundar Pichai in the second browser!", "action": "control_browser", "data": {"command": "type Sundar Pichai in the search box and click search", "session_id": "browser_session_2"}}
-  Follow-up 3: {"response": "Searching for Satya Nadella in the third browser!", "action": "control_browser", "data": {"command": "type Satya Nadella in the search box and click search", "session_id": "browser_session_3"}}
-  
-  CRITICAL: When user asks to "find out about" or "search for" something, you MUST complete the task by actually performing the search, not just opening the browser!
-
-- User: "Click the login button" (when browser is open and user explicitly requests interaction)
-  Response: {"response": "I'll click the login button for you!", "action": "control_browser", "data": {"command": "click the login button"}}
-
-- User: "Fill out the contact form with my email" (task requires interaction)
-  Response: {"response": "I'll fill out the contact form for you!", "action": "control_browser", "data": {"command": "fill out the contact form email field"}}
-
-- User: "Just open youtube.com" (simple navigation, no interaction needed)
-  Response: {"response": "Opening youtube.com!", "action": "navigate_browser", "data": {"url": "youtube.com"}}
-
-- User: "Tell me a joke" 
-  Response: {"response": "Why don't scientists trust atoms? Because they make up everything! 😄", "action": null, "data": {}}
-
-- User: "Compile a Q4 financial report from all the relevant documents"
-  Response (Step 1): {"response": "I'll help you compile a Q4 financial report. Let me first find all Q4 financial documents.", "action": "find_file", "data": {"pattern": "Q4 financial", "search_content": true}}
-  Response (Step 2, after files found): {"response": "Found relevant documents. Now reading them to compile the report.", "action": "read_files", "data": {"paths": ["corporate_documents/Reports/Q4_2024_Financial_Report.md", "corporate_documents/Financial/Income_Statement_Q4_2024.md", "corporate_documents/Financial/Balance_Sheet_Q4_2024.md"]}}
-  Response (Step 3, after reading): {"response": "I've analyzed the financial documents. Now compiling a comprehensive Q4 financial report.", "action": "create_file", "data": {"path": "Desktop/Q4_Financial_Report_Compiled.md", "content": "[Compiled report content based on retrieved documents]"}}
-
-- User: "Create a summary of all client status reports"
-  Response (Step 1): {"response": "Finding all client status reports.", "action": "find_file", "data": {"pattern": "client status", "search_content": true}}
-  Response (Step 2): {"response": "Reading the client status documents to create a summary.", "action": "read_files", "data": {"paths": ["corporate_documents/Clients/Client_Status_Report_December_2024.md"]}}
-  Response (Step 3): {"response": "Creating a comprehensive summary of client status.", "action": "create_file", "data": {"path": "Desktop/Client_Status_Summary.md", "content": "[Summary content]"}}
-
-- User: "Create a slideshow about Q4 financial results"
-  Response: {"response": "Opening the slideshow app for you!", "action": "open_app", "data": {"app": "slideshow", "title": "Slideshow"}}
-  NOTE: Once the slideshow app is open, the user can enter their prompt in the app to generate slides, OR you can automatically fill the prompt and trigger generation.
-
-IMPORTANT: 
-- Always return ONLY the JSON object, no other text before or after
-- For conversational messages (no action needed), set "action" to null and "data" to {}
-- Ensure all JSON is valid and properly formatted
-- The "response" field is always required and must be a string
-- The "action" field is always required and must be a string (one of the valid actions) or null
-- The "data" field is always required and must be an object (empty {} for conversational messages)"""
+    # Static system prompt (built once at import, shared prefix for prompt caching)
+    system_prompt = CHAT_SYSTEM_PROMPT
 
     # Valid action names
     valid_actions = ["open_app", "close_all", "close_window", "minimize_window", "maximize_window", 
-                     "create_file", "find_file", "read_files", "delete_file", "list_files", "compose_email", "navigate_browser", "control_browser"]
+                     "create_file", "find_file", "read_files", "delete_file", "list_files", "compose_email", "navigate_browser", "control_browser", "plan"]
     
     def validate_response(response_dict):
         """Validate the LLM response structure and action"""
@@ -1484,11 +884,9 @@ IMPORTANT:
         return True, "Valid"
     
     try:
-        # Log the full system prompt
-        logger.info("=" * 80)
-        logger.info("SYSTEM PROMPT:")
+        # The system prompt is static (see chat_prompts.py), log only its size
         logger.info("=" * 80)
-        logger.info(system_prompt)
+        logger.info(f"SYSTEM PROMPT: static prefix ({len(system_prompt)} chars)")
         logger.info("=" * 80)
         logger.info(f"USER MESSAGE: {user_message}")
         logger.info("=" * 80)
@@ -1499,7 +897,7 @@ IMPORTANT:
         raw_response = None
 
         # Get conversation history (last 4 pairs = 8 messages)
-        history_messages = get_conversation_history(session_id, max_pairs=4)
+        history_messages = await get_conversation_history(session_id, max_pairs=4)
 
         # Hyperspell context enrichment
         hyperspell_sources = detect_hyperspell_sources(user_message, history_messages)
@@ -1525,21 +923,16 @@ IMPORTANT:
                 hyperspell_context_memories
             )
 
-        # Build messages array with system prompt, optional Hyperspell context, history, and current user message
-        messages = [{"role": "system", "content": system_prompt}]
-        if formatted_hyperspell_context:
-            messages.append(
-                {
-                    "role": "system",
-                    "content": (
-                        "Context retrieved from Hyperspell "
-                        f"(sources: {', '.join(hyperspell_sources)}):\n"
-                        f"{formatted_hyperspell_context}"
-                    ),
-                }
-            )
-        messages.extend(history_messages)  # Add conversation history
-        messages.append({"role": "user", "content": user_message})  # Add current user message
+        # Build messages: static system prompt first (cacheable prefix), then the dynamic
+        # segments - available files, optional Hyperspell context, history, current user message
+        messages = build_chat_messages(
+            system_prompt,
+            available_files,
+            history_messages,
+            user_message,
+            hyperspell_sources=hyperspell_sources,
+            formatted_hyperspell_context=formatted_hyperspell_context,
+        )
         
         for attempt in range(1, max_retries + 1):
             try:
@@ -1547,15 +940,30 @@ IMPORTANT:
                 
                 # Call OpenAI API (expecting JSON response based on prompt instructions)
                 # Note: For vision tasks, we use gpt-5-2025-08-07 in the control_browser handler
-                completion = openai_client.chat.completions.create(
-                    model="gpt-4.1-2025-04-14",
-                    messages=messages,
-                    temperature=0.7,
-                    response_format={"type": "json_object"}
-                )
+                llm_params = {
+                    "model": "gpt-4.1-2025-04-14",
+                    "messages": messages,
+                    "temperature": 0.7,
+                    "response_format": {"type": "json_object"}
+                }
                 
-                # Get the raw response
-                raw_response = completion.choices[0].message.content
+                if emit is None:
+                    completion = await llm_gateway.chat(**llm_params)
+                    
+                    # Get the raw response
+                    raw_response = completion.choices[0].message.content
+                else:
+                    # Stream the reply, forwarding the "response" field as it is generated
+                    if attempt > 1:
+                        emit({"type": "reset"})
+                    streamer = JSONStringFieldStreamer("response")
+                    chunks = []
+                    async for delta in llm_gateway.chat_stream(**llm_params):
+                        chunks.append(delta)
+                        text = streamer.feed(delta)
+                        if text:
+                            emit({"type": "token", "text": text})
+                    raw_response = "".join(chunks)
                 
                 # Log the full LLM reply
                 logger.info("=" * 80)
@@ -1625,319 +1033,9 @@ IMPORTANT:
         if 'user_message' not in locals():
             user_message = data.get("message", "").strip()
         
-        if action == "create_file":
-            try:
-                file_path = action_data.get("path", "")
-                file_content = action_data.get("content", "")
-                
-                if not file_path:
-                    llm_response["response"] = "Error: No file path specified for file creation."
-                    llm_response["action"] = None
-                else:
-                    # Ensure path is safe
-                    safe_path = Path(file_path)
-                    if ".." in str(safe_path) or safe_path.is_absolute():
-                        llm_response["response"] = "Error: Invalid file path."
-                        llm_response["action"] = None
-                    else:
-                        # If path doesn't start with Desktop/, create in Desktop folder
-                        if not str(safe_path).startswith("Desktop/"):
-                            safe_path = Path("Desktop") / safe_path
-                        
-                        target_file = DATA_DIR / safe_path
-                        
-                        if target_file.exists():
-                            llm_response["response"] = f"Error: File '{safe_path}' already exists."
-                            llm_response["action"] = None
-                        else:
-                            target_file.parent.mkdir(parents=True, exist_ok=True)
-                            target_file.write_text(file_content, encoding='utf-8')
-                            llm_response["response"] = f"Successfully created file '{safe_path}'."
-            except Exception as e:
-                llm_response["response"] = f"Error creating file: {str(e)}"
-                llm_response["action"] = None
-        
-        elif action == "find_file":
-            try:
-                pattern = action_data.get("pattern", "")
-                search_in_content = action_data.get("search_content", True)  # Default to searching content too
-                
-                if not pattern:
-                    llm_response["response"] = "Error: No search pattern specified."
-                    llm_response["action"] = None
-                else:
-                    # First, collect all file paths
-                    all_files = []
-                    for root, dirs, filenames in os.walk(DATA_DIR):
-                        for filename in filenames:
-                            full_path = os.path.join(root, filename)
-                            rel_path = os.path.relpath(full_path, DATA_DIR)
-                            all_files.append({
-                                "path": rel_path.replace(os.sep, "/"),
-                                "full_path": full_path
-                            })
-                    
-                    found_files_by_name = []
-                    found_files_by_content = []
-                    
-                    # Parse pattern into words for flexible matching
-                    pattern_lower = pattern.lower()
-                    pattern_words = pattern_lower.split()
-                    
-                    # Search by filename (fast, no parallel needed)
-                    for file_info in all_files:
-                        path_lower = file_info["path"].lower()
-                        # Match if entire pattern is found OR all words are found
-                        if pattern_lower in path_lower or (len(pattern_words) > 1 and all(word in path_lower for word in pattern_words)):
-                            found_files_by_name.append({
-                                "path": file_info["path"],
-                                "match_type": "filename"
-                            })
-                    
-                    # Search within file contents in parallel
-                    if search_in_content:
-                        def search_file_content(file_info):
-                            """Search for pattern in file content"""
-                            try:
-                                with open(file_info["full_path"], 'r', encoding='utf-8', errors='ignore') as f:
-                                    content = f.read()
-                                    content_lower = content.lower()
-                                    
-                                    # Match if entire pattern is found OR all words are found
-                                    matches_pattern = pattern_lower in content_lower
-                                    matches_words = len(pattern_words) > 1 and all(word in content_lower for word in pattern_words)
-                                    
-                                    if matches_pattern or matches_words:
-                                        # Find line numbers where pattern or words appear
-                                        lines = content.split('\n')
-                                        matching_lines = []
-                                        for i, line in enumerate(lines, 1):
-                                            line_lower = line.lower()
-                                            if pattern_lower in line_lower or (len(pattern_words) > 1 and all(word in line_lower for word in pattern_words)):
-                                                matching_lines.append(i)
-                                        return {
-                                            "path": file_info["path"],
-                                            "match_type": "content",
-                                            "line_count": len(matching_lines),
-                                            "sample_lines": matching_lines[:3]  # Show first 3 matches
-                                        }
-                            except Exception:
-                                pass
-                            return None
-                        
-                        # Use ThreadPoolExecutor for parallel file reading
-                        found_filename_paths = {f["path"] for f in found_files_by_name}
-                        with ThreadPoolExecutor(max_workers=10) as executor:
-                            futures = {executor.submit(search_file_content, file_info): file_info 
-                                      for file_info in all_files 
-                                      if file_info["path"] not in found_filename_paths}
-                            
-                            for future in as_completed(futures):
-                                result = future.result()
-                                if result:
-                                    found_files_by_content.append(result)
-                    
-                    # Combine results (prioritize filename matches, avoid duplicates)
-                    found_files = found_files_by_name.copy()
-                    found_files_by_content_paths = {f["path"] for f in found_files_by_name}
-                    
-                    for content_match in found_files_by_content:
-                        if content_match["path"] not in found_files_by_content_paths:
-                            found_files.append(content_match)
-                    
-                    if found_files:
-                        # Format results
-                        results_text = []
-                        for f in found_files[:15]:  # Limit to 15 results
-                            if f["match_type"] == "filename":
-                                results_text.append(f"- {f['path']} (filename match)")
-                            else:
-                                line_info = f" (found in content at lines {', '.join(map(str, f.get('sample_lines', [])))}" + \
-                                          (f", and {f.get('line_count', 0) - len(f.get('sample_lines', []))} more" 
-                                           if f.get('line_count', 0) > len(f.get('sample_lines', [])) else "") + ")"
-                                results_text.append(f"- {f['path']}{line_info}")
-                        
-                        files_list = "\n".join(results_text)
-                        total_count = len(found_files)
-                        llm_response["response"] = f"Found {total_count} file(s) matching '{pattern}':\n{files_list}"
-                        llm_response["data"] = {
-                            "files": [f["path"] for f in found_files[:15]],
-                            "details": found_files[:15]
-                        }
-                    else:
-                        llm_response["response"] = f"No files found matching '{pattern}' in filename or content."
-                        llm_response["data"] = {"files": [], "details": []}
-            except Exception as e:
-                llm_response["response"] = f"Error finding files: {str(e)}"
-                llm_response["action"] = None
-        
-        elif action == "read_files":
-            try:
-                file_paths = action_data.get("paths", [])
-                if not file_paths or not isinstance(file_paths, list):
-                    llm_response["response"] = "Error: No file paths specified or paths must be an array."
-                    llm_response["action"] = None
-                else:
-                    file_contents = []
-                    errors = []
-                    
-                    for file_path in file_paths:
-                        try:
-                            # Ensure path is safe
-                            safe_path = Path(file_path)
-                            if ".." in str(safe_path) or safe_path.is_absolute():
-                                errors.append(f"Invalid path: {file_path}")
-                                continue
-                            
-                            target_file = DATA_DIR / safe_path
-                            
-                            if not target_file.exists() or not target_file.is_file():
-                                errors.append(f"File not found: {file_path}")
-                                continue
-                            
-                            # Read file content
-                            content = target_file.read_text(encoding='utf-8', errors='ignore')
-                            file_contents.append({
-                                "path": file_path,
-                                "content": content,
-                                "size": len(content),
-                                "lines": len(content.split('\n'))
-                            })
-                        except Exception as e:
-                            errors.append(f"Error reading {file_path}: {str(e)}")
-                    
-                    # Format response
-                    if file_contents:
-                        response_parts = [f"Successfully read {len(file_contents)} file(s):"]
-                        for fc in file_contents:
-                            response_parts.append(f"\n--- {fc['path']} ({fc['lines']} lines, {fc['size']} chars) ---")
-                            # Include full content in response for LLM to process
-                            response_parts.append(fc['content'])
-                        
-                        if errors:
-                            response_parts.append(f"\n\nErrors: {', '.join(errors)}")
-                        
-                        llm_response["response"] = "\n".join(response_parts)
-                        llm_response["data"] = {
-                            "files": file_contents,
-                            "errors": errors
-                        }
-                    else:
-                        llm_response["response"] = f"No files could be read. Errors: {', '.join(errors) if errors else 'All files were invalid or not found.'}"
-                        llm_response["data"] = {"files": [], "errors": errors}
-            except Exception as e:
-                llm_response["response"] = f"Error reading files: {str(e)}"
-                llm_response["action"] = None
-        
-        elif action == "delete_file":
-            try:
-                file_path = action_data.get("path", "")
-                if not file_path:
-                    llm_response["response"] = "Error: No file path specified for deletion."
-                    llm_response["action"] = None
-                else:
-                    # Ensure path is safe
-                    safe_path = Path(file_path)
-                    if ".." in str(safe_path) or safe_path.is_absolute():
-                        llm_response["response"] = "Error: Invalid file path."
-                        llm_response["action"] = None
-                    else:
-                        target_file = DATA_DIR / safe_path
-                        
-                        if not target_file.exists():
-                            llm_response["response"] = f"Error: File '{safe_path}' not found."
-                            llm_response["action"] = None
-                        else:
-                            if target_file.is_file():
-                                target_file.unlink()
-                            else:
-                                import shutil
-                                shutil.rmtree(target_file)
-                            llm_response["response"] = f"Successfully deleted '{safe_path}'."
-            except Exception as e:
-                llm_response["response"] = f"Error deleting file: {str(e)}"
-                llm_response["action"] = None
-        
-        elif action == "list_files":
-            try:
-                list_path = action_data.get("path", "")
-                if list_path:
-                    safe_path = Path(list_path).name
-                    target_dir = DATA_DIR / safe_path
-                else:
-                    target_dir = DATA_DIR
-                
-                if not target_dir.exists() or not target_dir.is_dir():
-                    llm_response["response"] = f"Error: Directory '{list_path}' not found."
-                    llm_response["action"] = None
-                else:
-                    items = []
-                    for item in sorted(target_dir.iterdir()):
-                        items.append({
-                            "name": item.name,
-                            "path": str(item.relative_to(DATA_DIR)),
-                            "type": "folder" if item.is_dir() else "file"
-                        })
-                    
-                    if items:
-                        items_list = "\n".join([f"- {item['name']} ({item['type']})" for item in items[:20]])
-                        llm_response["response"] = f"Files in '{list_path or 'root'}':\n{items_list}"
-                        llm_response["data"] = {"items": items[:20]}
-                    else:
-                        llm_response["response"] = f"Directory '{list_path or 'root'}' is empty."
-                        llm_response["data"] = {"items": []}
-            except Exception as e:
-                llm_response["response"] = f"Error listing files: {str(e)}"
-                llm_response["action"] = None
-        
-        elif action == "compose_email":
-            instructions = action_data.get("instructions", "")
-            if not instructions:
-                llm_response["response"] = "Error: No email instructions provided."
-                llm_response["action"] = None
-            else:
-                # Send email via Railway API (using async since this is an async endpoint)
-                async with httpx.AsyncClient(timeout=30.0) as client:
-                    response = await client.post(
-                        RAILWAY_EMAIL_API,
-                        json={"instructions": instructions},
-                        headers={"Content-Type": "application/json"}
-                    )
-                    response.raise_for_status()
-                    result = response.json()
-                    
-                    # Log the response from Railway API
-                    print("Railway API Response:", json.dumps(result, indent=2))
-                    logger.info(f"Railway API Response: {json.dumps(result, indent=2)}")
-                    
-                    # Store email in inbox (latest first)
-                    email_entry = {
-                        "id": result.get("agentmail_message_id", f"email_{len(email_inbox)}"),
-                        "message_id": result.get("agentmail_message_id"),
-                        "to": result.get("email", {}).get("to", ""),
-                        "subject": result.get("email", {}).get("subject", ""),
-                        "body": result.get("email", {}).get("body", ""),
-                        "status": result.get("status", "sent"),
-                        "timestamp": datetime.now().isoformat(),
-                        "sent": True
-                    }
-                    email_inbox.insert(0, email_entry)
-                    
-                    recipient = email_entry.get("to", "recipient")
-                    subject = email_entry.get("subject", "email")
-                    
-                    # Format recipient(s) nicely for response
-                    recipients_str = recipient
-                    if isinstance(recipient, str) and ',' in recipient:
-                        # Multiple recipients - format as list
-                        recipients = [r.strip() for r in recipient.split(',')]
-                        if len(recipients) == 2:
-                            recipients_str = f"{recipients[0]} and {recipients[1]}"
-                        else:
-                            recipients_str = ", ".join(recipients[:-1]) + f", and {recipients[-1]}"
-                    
-                    llm_response["response"] = f"Email sent successfully to {recipients_str}!\nSubject: {subject}\nThe email has been added to your inbox."
-                    llm_response["data"] = {"email": email_entry}
+        if action in action_engine:
+            result = await action_engine.execute(action, action_data)
+            result.apply_to(llm_response)
         
         elif action == "navigate_browser":
             try:
@@ -1963,8 +1061,7 @@ IMPORTANT:
                         search_terms = []
                         user_lower = original_user_message.lower()
                         # Common patterns: "find out about", "search for", "look up", "find information about"
-                        search_patterns = ["find out about", "search for", "look up", "find information about", "get information on", "learn about"]
-                        has_search_intent = any(pattern in user_lower for pattern in search_patterns)
+                        has_search_intent = intents.browser_search
                         
                         if has_search_intent:
                             # Extract search terms from user message
@@ -2019,17 +1116,7 @@ IMPORTANT:
                     user_lower = original_user_message.lower()
                     
                     # Detect complex tasks that require autonomous agent
-                    # Ensure re module is available (already imported at top level)
-                    task_patterns = [
-                        r'extract.*(?:info|information|data|text|content)',
-                        r'create.*(?:doc|document|file|word|txt)',
-                        r'save.*(?:info|information|data|text|content)',
-                        r'get.*(?:info|information|data).*(?:and|then).*(?:create|save|make|write)',
-                        r'summarize.*(?:and|then).*(?:save|create|write)',
-                        r'read.*(?:and|then).*(?:extract|save|create)'
-                    ]
-                    
-                    has_task_intent = any(re.search(pattern, user_lower) for pattern in task_patterns)
+                    has_task_intent = intents.browser_task
                     agent_goal = None
                     
                     if has_task_intent:
@@ -2094,12 +1181,8 @@ IMPORTANT:
                     # Find the active browser session if not specified
                     # We'll try to get the most recent browser session from browser contexts
                     if not session_id_param or session_id_param == "default":
-                        # Get the most recently used browser session (last key that's not a metadata key)
-                        active_sessions = [k for k in browser_contexts.keys() if not k.endswith("_base_url") and not k.endswith("_current_url")]
-                        if active_sessions:
-                            session_id_param = active_sessions[-1]  # Use most recent
-                        else:
-                            session_id_param = "default"
+                        # Get the most recently used browser session
+                        session_id_param = browser_sessions.most_recent() or "default"
                     
                     # Get browser page
                     page = await get_browser_page(session_id_param)
@@ -2107,15 +1190,30 @@ IMPORTANT:
                         llm_response["response"] = "Error: No browser window is currently open."
                         llm_response["action"] = None
                     else:
-                        # Take screenshot for vision analysis
-                        screenshot_bytes = await page.screenshot(full_page=False)
-                        screenshot_base64 = base64.b64encode(screenshot_bytes).decode('utf-8')
+                        try:
+                            vision_result = None
+                            if BROWSER_PERCEPTION == "dom":
+                                vision_result = await decide_from_dom(
+                                    page,
+                                    llm_gateway.chat,
+                                    build_dom_prompt(
+                                        "You are a browser automation assistant. Use the page's elements and the user command to determine what action to take.",
+                                        extra_actions=['wait: {"action": "wait"} if no action is needed'],
+                                    ),
+                                    f"User command: {command}",
+                                )
+                            if vision_result is None:
+                                # Take screenshot for vision analysis
+                                shot = await capture(page)
+                                # Same command on a visually unchanged page at the same URL: reuse the last decision
+                                vision_result = vision_decisions.get(session_id_param, page.url, command, shot)
+                            if vision_result is None:
                         
-                        # Use GPT-4 Vision to analyze the screenshot and understand the command
-                        vision_messages = [
-                            {
-                                "role": "system",
-                                "content": """You are a browser automation assistant. Analyze the screenshot and user command to determine what action to take.
+                                # Use GPT-4 Vision to analyze the screenshot and understand the command
+                                vision_messages = [
+                                    {
+                                        "role": "system",
+                                        "content": """You are a browser automation assistant. Analyze the screenshot and user command to determine what action to take.
 
 Available actions:
 1. click - Click on an element (provide x, y coordinates)
@@ -2135,35 +1233,36 @@ Return ONLY a JSON object with this exact format:
 For clicking, identify the element described in the command and provide its approximate center coordinates.
 For typing, identify the input field and provide coordinates to click it first, then the text to type.
 For scrolling, provide appropriate scroll amounts (typically y: -300 to scroll down, y: 300 to scroll up).
-Be precise with coordinates - they should match pixel positions in the 1280x720 viewport."""
-                            },
-                            {
-                                "role": "user",
-                                "content": [
-                                    {
-                                        "type": "text",
-                                        "text": f"User command: {command}\n\nAnalyze this browser screenshot and determine the appropriate action with coordinates."
+Be precise with coordinates - they should match pixel positions in the screenshot."""
                                     },
                                     {
-                                        "type": "image_url",
-                                        "image_url": {
-                                            "url": f"data:image/png;base64,{screenshot_base64}"
-                                        }
+                                        "role": "user",
+                                        "content": [
+                                            {
+                                                "type": "text",
+                                                "text": f"User command: {command}\n\nAnalyze this browser screenshot and determine the appropriate action with coordinates."
+                                            },
+                                            {
+                                                "type": "image_url",
+                                                "image_url": {
+                                                    "url": shot.data_url
+                                                }
+                                            }
+                                        ]
                                     }
                                 ]
-                            }
-                        ]
+                                
+                                vision_response = await llm_gateway.chat(
+                                    model="gpt-5-2025-08-07",  # GPT-5 with vision support
+                                    messages=vision_messages,
+                                    reasoning_effort="medium",  # GPT-5 parameter: minimal, low, medium, high
+                                    verbosity="medium",  # GPT-5 parameter: low, medium, high
+                                    response_format={"type": "json_object"},
+                                    timeout=90
+                                )
                         
-                        try:
-                            vision_response = openai_client.chat.completions.create(
-                                model="gpt-5-2025-08-07",  # GPT-5 with vision support
-                                messages=vision_messages,
-                                reasoning_effort="medium",  # GPT-5 parameter: minimal, low, medium, high
-                                verbosity="medium",  # GPT-5 parameter: low, medium, high
-                                response_format={"type": "json_object"}
-                            )
-                            
-                            vision_result = json.loads(vision_response.choices[0].message.content)
+                                vision_result = shot.map_decision(json.loads(vision_response.choices[0].message.content))
+                                vision_decisions.put(session_id_param, page.url, command, shot, vision_result)
                             action_type = vision_result.get("action", "wait")
                             
                             # Execute the action
@@ -2171,7 +1270,7 @@ Be precise with coordinates - they should match pixel positions in the 1280x720
                                 x = vision_result.get("x", 0)
                                 y = vision_result.get("y", 0)
                                 await page.mouse.click(x, y)
-                                await page.wait_for_timeout(500)
+                                await wait_for_settle(page)
                                 description = vision_result.get("description", "Clicked on the page")
                                 llm_response["response"] = f"{description}. Action completed!"
                             elif action_type == "type":
@@ -2187,14 +1286,14 @@ Be precise with coordinates - they should match pixel positions in the 1280x720
                                 # Type the text
                                 if text:
                                     await page.keyboard.type(text)
-                                    await page.wait_for_timeout(500)
+                                    await wait_for_settle(page)
                                 description = vision_result.get("description", "Typed text")
                                 llm_response["response"] = f"{description}. Action completed!"
                             elif action_type == "scroll":
                                 scroll_x = vision_result.get("x", 0)
                                 scroll_y = vision_result.get("y", 0)
                                 await page.mouse.wheel(scroll_x, scroll_y)
-                                await page.wait_for_timeout(500)
+                                await wait_for_settle(page)
                                 description = vision_result.get("description", "Scrolled the page")
                                 llm_response["response"] = f"{description}. Action completed!"
                             else:
@@ -2238,7 +1337,7 @@ Be precise with coordinates - they should match pixel positions in the 1280x720
         # Store conversation history (only if we got a successful response)
         if llm_response and raw_response:
             # Store the raw JSON response as assistant message for conversation context
-            add_to_conversation_history(session_id, user_message, raw_response)
+            await add_to_conversation_history(session_id, user_message, raw_response)
             logger.info(f"Stored conversation exchange for session: {session_id}")
 
         return JSONResponse(content=llm_response)
@@ -2301,8 +1400,11 @@ async def list_files(path: str = ""):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/files/read")
-async def read_file(path: str):
-    """Read a text file"""
+async def read_file(path: str, offset: int = 0, limit: Optional[int] = None, unit: str = "lines", stream: bool = False):
+    """
+    Read a text file, optionally a line or byte range of it (offset/limit in `unit`).
+    Large files (or stream=true) are sent as a chunked text/plain stream instead of JSON.
+    """
     try:
         root_dir = DATA_DIR
         
@@ -2318,9 +1420,32 @@ async def read_file(path: str):
         
         if not target_file.exists() or not target_file.is_file():
             raise HTTPException(status_code=404, detail="File not found")
+        if unit not in RANGE_UNITS:
+            raise HTTPException(status_code=400, detail=f"Invalid unit: expected one of {', '.join(RANGE_UNITS)}")
+        
+        ranged = offset > 0 or limit is not None
+        if stream or (not ranged and target_file.stat().st_size > STREAM_THRESHOLD_BYTES):
+            start, end, total = await asyncio.to_thread(file_range_bounds, target_file, offset, limit, unit)
+            return StreamingResponse(
+                iter_range(target_file, start, end),
+                media_type="text/plain",
+                headers={
+                    "X-Total-Bytes": str(total),
+                    "X-Range-Start": str(start),
+                    "X-Range-End": str(end),
+                }
+            )
         
-        content = target_file.read_text(encoding='utf-8')
-        return JSONResponse(content={"content": content, "path": path})
+        result = await asyncio.to_thread(read_range, target_file, offset, limit, unit)
+        return JSONResponse(content={
+            "content": result["content"],
+            "path": path,
+            "lines": result["lines"],
+            "total_bytes": result["total_bytes"],
+            "start_byte": result["start_byte"],
+            "end_byte": result["end_byte"],
+            "has_more": result["has_more"],
+        })
     except HTTPException:
         raise
     except Exception as e:
@@ -2340,6 +1465,7 @@ async def write_file(file_data: FileContent):
         target_file.parent.mkdir(parents=True, exist_ok=True)
         
         target_file.write_text(file_data.content, encoding='utf-8')
+        await record_file_change(safe_path, "modified")
         return JSONResponse(content={"success": True, "path": file_data.path})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -2363,6 +1489,7 @@ async def create_file(create_data: CreateFile):
         
         target_file.parent.mkdir(parents=True, exist_ok=True)
         target_file.write_text(create_data.content, encoding='utf-8')
+        await record_file_change(safe_path, "created")
         return JSONResponse(content={"success": True, "path": str(safe_path)})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -2385,6 +1512,7 @@ async def create_folder(folder_data: CreateFolder):
             raise HTTPException(status_code=400, detail="Folder already exists")
         
         target_folder.mkdir(parents=True, exist_ok=True)
+        await record_file_change(safe_path, "created")
         return JSONResponse(content={"success": True, "path": str(safe_path)})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -2407,94 +1535,110 @@ async def delete_item(path: str):
         else:
             import shutil
             shutil.rmtree(target_item)
+        await record_file_change(safe_path, "deleted")
         
         return JSONResponse(content={"success": True, "path": path})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/files/changes")
+async def list_file_changes(limit: int = 50):
+    """Get the most recent entries from the file change journal"""
+    changes = await asyncio.to_thread(file_index.recent_changes, limit)
+    return JSONResponse(content={"changes": changes})
+
+@app.get("/api/files/semantic-search")
+async def semantic_file_search(query: str, k: int = 10):
+    """Find files whose content is semantically closest to the query"""
+    if semantic_index is None:
+        raise HTTPException(status_code=503, detail="Semantic index is not enabled (set SEMANTIC_INDEX=1)")
+    results = await asyncio.to_thread(semantic_index.search, query, max(1, min(k, 100)))
+    return JSONResponse(content={"results": results, "stats": semantic_index.get_stats()})
+
+@app.get("/api/files/search/stream")
+async def stream_file_search(pattern: str, k: int = 15, content: bool = True):
+    """Stream the top-k ranked file search results as server-sent events"""
+    if not pattern.strip():
+        raise HTTPException(status_code=400, detail="No search pattern provided")
+    k = max(1, min(k, 100))
+
+    async def generate():
+        count = 0
+        try:
+            async for result in action_engine.stream_find_file(pattern, content, k):
+                count += 1
+                yield f"data: {json.dumps({'type': 'result', **result})}\n\n"
+            yield f"data: {json.dumps({'type': 'done', 'count': count})}\n\n"
+        except Exception as e:
+            logger.error(f"Error in streaming file search: {e}", exc_info=True)
+            yield f"data: {json.dumps({'type': 'error', 'message': str(e)})}\n\n"
+
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # Email endpoints
 @app.post("/api/email/compose-send")
 async def compose_and_send_email(email_data: ComposeEmail):
     """Compose and send email via Railway API"""
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        response = await client.post(
-            RAILWAY_EMAIL_API,
-            json={"instructions": email_data.instructions},
-            headers={"Content-Type": "application/json"}
-        )
-        response.raise_for_status()
-        result = response.json()
-        
-        # Log the response from Railway API
-        print("Railway API Response:", json.dumps(result, indent=2))
-        logger.info(f"Railway API Response: {json.dumps(result, indent=2)}")
-        
-        # Store email in inbox (latest first)
-        email_entry = {
-            "id": result.get("agentmail_message_id", f"email_{len(email_inbox)}"),
-            "message_id": result.get("agentmail_message_id"),
-            "to": result.get("email", {}).get("to", ""),
-            "subject": result.get("email", {}).get("subject", ""),
-            "body": result.get("email", {}).get("body", ""),
-            "status": result.get("status", "sent"),
-            "timestamp": datetime.now().isoformat(),
-            "sent": True
-        }
-        email_inbox.insert(0, email_entry)
+    email_entry, result = await send_composed_email(email_data.instructions)
 
-        # Trigger background cache update to include the sent email
-        asyncio.create_task(refresh_cache_from_api())
+    # Trigger background cache update to include the sent email
+    asyncio.create_task(refresh_cache_from_api())
 
-        return JSONResponse(content={
-            "success": True,
-            "email": email_entry,
-            "response": result
-        })
+    return JSONResponse(content={
+        "success": True,
+        "email": email_entry,
+        "response": result
+    })
 
 @app.get("/api/email/inbox")
 async def get_inbox(page: int = 1, per_page: int = 20, summaries: bool = True):
     """Get inbox emails from cache (updated by background worker) with pagination"""
     try:
-        async with inbox_cache_lock:
-            # Serve from cache for instant loading
-            all_emails = inbox_cache.get("emails", [])
-            received_count = inbox_cache.get("received_count", 0)
-            sent_count = inbox_cache.get("sent_count", 0)
-            last_updated = inbox_cache.get("last_updated")
-
-            # Calculate pagination
-            total_count = len(all_emails)
-            total_pages = (total_count + per_page - 1) // per_page if per_page > 0 else 1
-            page = max(1, min(page, total_pages))  # Ensure page is in valid range
+        # Serve from cache for instant loading
+        inbox_cache = await asyncio.to_thread(state_backend.get, EMAIL_STATE_NS, "inbox_cache", EMPTY_INBOX_CACHE)
+        all_emails = inbox_cache.get("emails", [])
+        received_count = inbox_cache.get("received_count", 0)
+        sent_count = inbox_cache.get("sent_count", 0)
+        last_updated = inbox_cache.get("last_updated")
+
+        # Calculate pagination
+        total_count = len(all_emails)
+        total_pages = (total_count + per_page - 1) // per_page if per_page > 0 else 1
+        page = max(1, min(page, total_pages))  # Ensure page is in valid range
 
-            # Calculate slice indices
-            start_idx = (page - 1) * per_page
-            end_idx = start_idx + per_page
+        # Calculate slice indices
+        start_idx = (page - 1) * per_page
+        end_idx = start_idx + per_page
 
-            # Get paginated emails
-            paginated_emails = all_emails[start_idx:end_idx]
+        # Get paginated emails
+        paginated_emails = all_emails[start_idx:end_idx]
 
-            logger.info(f"📬 Serving inbox from cache: {len(paginated_emails)} emails (page {page}/{total_pages}), last updated: {last_updated}")
+        logger.info(f"📬 Serving inbox from cache: {len(paginated_emails)} emails (page {page}/{total_pages}), last updated: {last_updated}")
 
-            return JSONResponse(content={
-                "success": True,
-                "emails": paginated_emails,
-                "pagination": {
-                    "page": page,
-                    "per_page": per_page,
-                    "total": total_count,
-                    "total_pages": total_pages,
-                    "has_next": page < total_pages,
-                    "has_prev": page > 1
-                },
-                "received_count": received_count,
-                "sent_count": sent_count,
-                "cached": True,
-                "last_updated": last_updated
-            })
+        return JSONResponse(content={
+            "success": True,
+            "emails": paginated_emails,
+            "pagination": {
+                "page": page,
+                "per_page": per_page,
+                "total": total_count,
+                "total_pages": total_pages,
+                "has_next": page < total_pages,
+                "has_prev": page > 1
+            },
+            "received_count": received_count,
+            "sent_count": sent_count,
+            "cached": True,
+            "last_updated": last_updated
+        })
     except Exception as e:
         logger.error(f"Error fetching inbox from cache: {str(e)}")
         # Fallback to local emails if cache fails
+        email_inbox = await asyncio.to_thread(get_sent_emails)
         total_count = len(email_inbox)
         per_page = max(1, per_page)
         total_pages = (total_count + per_page - 1) // per_page if per_page > 0 else 1
@@ -2523,6 +1667,7 @@ async def get_inbox(page: int = 1, per_page: int = 20, summaries: bool = True):
 async def get_last_email():
     """Get the most recent email from the inbox"""
     try:
+        email_inbox = await asyncio.to_thread(get_sent_emails)
         if not email_inbox or len(email_inbox) == 0:
             return JSONResponse(content={
                 "success": True,
@@ -2544,9 +1689,7 @@ async def get_last_email():
 async def get_email_notifications():
     """Get notifications for command emails that were processed in the background"""
     try:
-        global email_notifications
-        # Ensure we always return a list, even if empty
-        notifications = email_notifications if email_notifications else []
+        notifications = await asyncio.to_thread(state_backend.values, EMAIL_NOTIFICATIONS_NS)
         
         logger.debug(f"Returning {len(notifications)} email notifications")
         
@@ -2563,9 +1706,7 @@ async def get_email_notifications():
 async def get_archived_processes():
     """Get archived/completed processes for history"""
     try:
-        global archived_processes
-        # Ensure we always return a list, even if empty
-        archived = archived_processes if archived_processes else []
+        archived = await asyncio.to_thread(state_backend.values, ARCHIVED_PROCESSES_NS)
         
         # Sort by archived_at (most recent first)
         archived.sort(key=lambda x: x.get("archived_at", x.get("timestamp", "")), reverse=True)
@@ -2585,10 +1726,8 @@ async def get_archived_processes():
 async def clear_email_notification(notification_id: str):
     """Clear a specific email notification and archive it if it's a completed process"""
     try:
-        global email_notifications, archived_processes
-        
         # Find the notification before removing it
-        notification = next((n for n in email_notifications if n.get("id") == notification_id), None)
+        notification = await asyncio.to_thread(state_backend.get, EMAIL_NOTIFICATIONS_NS, notification_id)
         
         # If it's a command notification and is completed/failed, archive it
         if notification and notification.get("type") == "command":
@@ -2598,11 +1737,11 @@ async def clear_email_notification(notification_id: str):
                     **notification,
                     "archived_at": datetime.now().isoformat()
                 }
-                archived_processes.append(archived_notification)
+                await asyncio.to_thread(state_backend.put, ARCHIVED_PROCESSES_NS, notification_id, archived_notification)
                 logger.info(f"📦 Archived process {notification_id}")
         
         # Remove from active notifications
-        email_notifications = [n for n in email_notifications if n.get("id") != notification_id]
+        await asyncio.to_thread(state_backend.delete, EMAIL_NOTIFICATIONS_NS, notification_id)
         
         return JSONResponse(content={
             "success": True,
@@ -2617,6 +1756,32 @@ async def health_check():
     """Health check endpoint"""
     return {"status": "ok"}
 
+@app.get("/api/llm/stats")
+async def get_llm_stats():
+    """Get per-model LLM gateway call counters and response cache hit/miss counters"""
+    return JSONResponse(content={
+        "models": llm_gateway.get_stats(),
+        "cache": llm_gateway.cache.get_stats() if llm_gateway.cache else None
+    })
+
+@app.get("/api/http/stats")
+async def get_http_stats():
+    """Get per-upstream request counts and connection reuse for the pooled HTTP clients"""
+    return JSONResponse(content=http_clients.get_stats())
+
+@app.get("/api/sessions/stats")
+async def get_session_stats():
+    """Get conversation session store counters and size"""
+    return JSONResponse(content=await asyncio.to_thread(session_store.get_stats))
+
+@app.get("/api/actions/stats")
+async def get_action_stats():
+    """Get per-action execution counts and timings plus document cache metrics"""
+    return JSONResponse(content={
+        "actions": action_engine.get_stats(),
+        "document_cache": document_cache.get_stats()
+    })
+
 # ============================================
 # Hyperspell Integration Endpoints
 # ============================================
@@ -2715,10 +1880,12 @@ async def get_integration_link(request: dict):
 # Browser initialization
 async def init_browser():
     """Initialize Playwright browser"""
-    global browser_instance
+    global browser_instance, browser_pool
     try:
         playwright = await async_playwright().start()
         browser_instance = await playwright.chromium.launch(headless=True)
+        browser_pool = BrowserContextPool(browser_instance)
+        asyncio.create_task(browser_pool.warm())
         logger.info("Playwright browser initialized")
     except Exception as e:
         logger.error(f"Failed to initialize browser: {str(e)}")
@@ -2733,68 +1900,139 @@ async def get_browser_page(session_id: str = "default") -> Optional[Page]:
     if not browser_instance:
         return None
     
-    # Get or create context for session
-    if session_id not in browser_contexts:
-        browser_contexts[session_id] = await browser_instance.new_context(
-            viewport={'width': 1280, 'height': 720},
-            user_agent='Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-        )
+    # Get a context for the session (pre-warmed from the pool when available)
+    session = browser_sessions.get(session_id)
+    if session is None:
+        context = await browser_pool.acquire()
+        session = browser_sessions.get(session_id)
+        if session is not None:
+            # A concurrent request for the same session got there first
+            await browser_pool.release(context)
+        else:
+            session = await browser_sessions.add(session_id, context)
+            # Route this session's later requests (from any worker) here
+            await asyncio.to_thread(claim_browser_session, state_backend, session_id)
     
-    context = browser_contexts[session_id]
+    context = session.context
     pages = context.pages
     if len(pages) > 0:
         return pages[0]
     else:
         return await context.new_page()
 
-async def browser_agent_worker(session_id: str):
-    """Autonomous browser agent that processes tasks independently and generates new ones"""
-    logger.info(f"🤖 Browser agent [{session_id}] STARTED - Running autonomously")
+async def run_agent_action(session_id: str, agent: Dict[str, Any], page: Page, step: Dict[str, Any], following: Optional[Dict[str, Any]] = None):
+    """Execute one click/type/scroll/press step of an agent's plan"""
+    action_type = step.get("action", "wait")
+    following_action = following.get("action") if following else None
     
-    try:
-        while True:
-            # Check if agent exists and has tasks/goals
-            if session_id not in browser_agents:
-                await asyncio.sleep(1)
-                continue
-            
-            agent = browser_agents[session_id]
-            
-            # If agent has no goal/tasks, wait
-            if not agent.get("current_goal") and len(agent.get("tasks", deque())) == 0:
-                agent["status"] = "idle"
-                await asyncio.sleep(1)
-                continue
+    if action_type == "click":
+        x = step.get("x", 0)
+        y = step.get("y", 0)
+        logger.info(f"🖱️  Agent [{session_id}]: Clicking at ({x}, {y})")
+        await page.mouse.click(x, y)
+    elif action_type == "type":
+        text = step.get("text", "")
+        x = step.get("x")
+        y = step.get("y")
+        
+        logger.info(f"⌨️  Agent [{session_id}]: Typing '{text}'")
+        if x is not None and y is not None:
+            await page.mouse.click(x, y)
+            await page.wait_for_timeout(300)
+        
+        if text:
+            await page.keyboard.type(text, delay=50)
             
-            # If agent has a goal, work on it
-            if agent.get("current_goal"):
-                agent["status"] = "thinking"
-                
-                page = await get_browser_page(session_id)
-                if not page:
-                    logger.warning(f"⚠️  Agent [{session_id}]: No browser page available")
-                    await asyncio.sleep(2)
-                    continue
-                
-                # Log current state
-                current_url = page.url
-                logger.info(f"🤖 Agent [{session_id}] at {current_url} - Goal: {agent['current_goal']}")
-                
-                # Take screenshot for analysis
-                agent["status"] = "analyzing"
-                agent_log = {"timestamp": datetime.now().isoformat(), "action": "analyzing", "message": f"Analyzing page at {current_url}"}
-                agent["logs"].append(agent_log)
+            # Auto-press Enter if it's a search (unless the plan presses a key next)
+            looks_like_search = "search" in agent.get('current_goal', '').lower() or page.url == "https://www.google.com/" or "google.com" in page.url
+            if looks_like_search and following_action != "press":
+                logger.info(f"🔍 Agent [{session_id}]: Pressing Enter to search")
+                await page.keyboard.press('Enter')
+    elif action_type == "scroll":
+        scroll_x = step.get("x", 0)
+        scroll_y = step.get("y", 0)
+        logger.info(f"📜 Agent [{session_id}]: Scrolling ({scroll_x}, {scroll_y})")
+        await page.mouse.wheel(scroll_x, scroll_y)
+    elif action_type == "press":
+        key = step.get("key", "Enter")
+        logger.info(f"⌨️  Agent [{session_id}]: Pressing {key}")
+        await page.keyboard.press(key)
+
+async def browser_agent_step(session_id: str) -> bool:
+    """Run one step of a session's autonomous browser agent; True while it has more work"""
+    agent = browser_agents.get(session_id)
+    if agent is None:
+        return False
+    
+    try:
+        # Without a goal, take the next queued task (if any)
+        if not agent.get("current_goal"):
+            if len(agent.get("tasks", deque())) > 0:
+                task = agent["tasks"].popleft()
+                agent["current_goal"] = task.get("goal", task.get("command", ""))
+                logger.info(f"📋 Agent [{session_id}]: New task queued - {agent['current_goal']}")
+                return True
+            agent["status"] = "idle"
+            return False
+        
+        agent["status"] = "thinking"
+        
+        page = await get_browser_page(session_id)
+        if not page:
+            logger.warning(f"⚠️  Agent [{session_id}]: No browser page available")
+            await asyncio.sleep(2)
+            return True
+        
+        # Log current state
+        current_url = page.url
+        logger.info(f"🤖 Agent [{session_id}] at {current_url} - Goal: {agent['current_goal']}")
+        
+        # Read the page (element list, or a screenshot as fallback)
+        agent["status"] = "analyzing"
+        agent_log = {"timestamp": datetime.now().isoformat(), "action": "analyzing", "message": f"Analyzing page at {current_url}"}
+        agent["logs"].append(agent_log)
+        
+        await wait_for_settle(page)
+        
+        # Use LLM to decide next action based on goal
+        agent["status"] = "planning"
+        agent_log = {"timestamp": datetime.now().isoformat(), "action": "planning", "message": "Planning next action to achieve goal"}
+        agent["logs"].append(agent_log)
+        
+        try:
+            vision_result = None
+            if BROWSER_PERCEPTION == "dom":
+                vision_result = await decide_from_dom(
+                    page,
+                    llm_gateway.chat,
+                    build_dom_prompt(
+                        f"""You are an autonomous browser agent working on a specific task.
+
+YOUR CURRENT GOAL: {agent.get('current_goal', 'Unknown')}
+
+Decide the next action that works toward the goal. Read the page content carefully; if the goal involves extracting information, only mark it done once the page shows everything requested.""",
+                        extra_actions=['done: {"action": "done"} if the goal is achieved'],
+                        extra_fields={
+                            "goal_progress": "what progress have you made toward the goal? Include specific details of what information you've found.",
+                            "next_steps": "what will you do next?",
+                        },
+                        notes=PLAN_PROMPT,
+                    ),
+                    f"Determine the next action to work toward: {agent.get('current_goal', 'Unknown')}",
+                )
+                # Frames are only compared between consecutive screenshot steps
+                agent["last_phash"] = None
+            if vision_result is None:
                 logger.info(f"📸 Agent [{session_id}]: Taking screenshot for analysis")
-                
-                await asyncio.sleep(1)  # Wait for page to stabilize
-                screenshot_bytes = await page.screenshot(full_page=False)
-                screenshot_base64 = base64.b64encode(screenshot_bytes).decode('utf-8')
-                
-                # Use LLM to decide next action based on goal
-                agent["status"] = "planning"
-                agent_log = {"timestamp": datetime.now().isoformat(), "action": "planning", "message": "Planning next action to achieve goal"}
-                agent["logs"].append(agent_log)
-                
+                shot = await capture(page)
+                unchanged = (
+                    not shot.uniform
+                    and agent.get("last_phash") is not None
+                    and hash_distance(agent["last_phash"], shot.phash) <= vision_decisions.max_distance
+                )
+                agent["last_phash"] = shot.phash
+                page_note = "\n\nNote: the page has not visibly changed since your last action; try a different action." if unchanged else ""
+        
                 system_prompt = f"""You are an autonomous browser agent working on a specific task.
 
 YOUR CURRENT GOAL: {agent.get('current_goal', 'Unknown')}
@@ -2830,8 +2068,10 @@ Return ONLY a JSON object:
   "next_steps": "what will you do next?"
 }}
 
-Be precise with coordinates for the 1280x720 viewport."""
-                
+{PLAN_PROMPT}
+
+Be precise with coordinates - they should match pixel positions in the screenshot."""
+        
                 vision_messages = [
                     {"role": "system", "content": system_prompt},
                     {
@@ -2839,182 +2079,159 @@ Be precise with coordinates for the 1280x720 viewport."""
                         "content": [
                             {
                                 "type": "text",
-                                "text": f"Current URL: {current_url}\n\nAnalyze this page screenshot and determine the next action to work toward: {agent.get('current_goal', 'Unknown')}"
+                                "text": f"Current URL: {current_url}\n\nAnalyze this page screenshot and determine the next action to work toward: {agent.get('current_goal', 'Unknown')}{page_note}"
                             },
                             {
                                 "type": "image_url",
-                                "image_url": {"url": f"data:image/png;base64,{screenshot_base64}"}
+                                "image_url": {"url": shot.data_url}
                             }
                         ]
                     }
                 ]
+        
+                vision_response = await llm_gateway.chat(
+                    model="gpt-5-2025-08-07",
+                    messages=vision_messages,
+                    reasoning_effort="medium",  # GPT-5 parameter: minimal, low, medium, high
+                    verbosity="medium",  # GPT-5 parameter: low, medium, high
+                    response_format={"type": "json_object"},
+                    timeout=90
+                )
+        
+                vision_result = shot.map_decision(json.loads(vision_response.choices[0].message.content))
+            agent["model_calls"] = agent.get("model_calls", 0) + 1
+            steps = plan_steps(vision_result)
+            action_type = " → ".join(step.get("action", "wait") for step in steps)
+            description = vision_result.get("description", "")
+            goal_progress = vision_result.get("goal_progress", "")
+            next_steps = vision_result.get("next_steps", "")
+            
+            # Log the decision
+            agent_log = {
+                "timestamp": datetime.now().isoformat(),
+                "action": action_type,
+                "message": description,
+                "progress": goal_progress,
+                "next": next_steps
+            }
+            agent["logs"].append(agent_log)
+            logger.info(f"🎯 Agent [{session_id}]: {description}")
+            if goal_progress:
+                logger.info(f"   📊 Progress: {goal_progress}")
+            if next_steps:
+                logger.info(f"   ➡️  Next: {next_steps}")
+            
+            # Execute the plan until it ends or a checkpoint needs the model again
+            agent["status"] = "executing"
+            plan = await run_plan(
+                page,
+                steps,
+                lambda step, following: run_agent_action(session_id, agent, page, step, following),
+                resolve=lambda step: resolve_step(page, step),
+                settle=lambda: wait_for_settle(page),
+            )
+            agent["actions_run"] = agent.get("actions_run", 0) + plan.executed
+            if plan.stopped:
+                agent["logs"].append({
+                    "timestamp": datetime.now().isoformat(),
+                    "action": "checkpoint",
+                    "message": f"Re-planning after {plan.executed} of {len(steps)} steps: {plan.stopped}"
+                })
+            
+            if plan.done:
+                logger.info(f"✅ Agent [{session_id}]: Task complete! Goal achieved.")
                 
-                try:
-                    vision_response = openai_client.chat.completions.create(
-                        model="gpt-5-2025-08-07",
-                        messages=vision_messages,
-                        reasoning_effort="medium",  # GPT-5 parameter: minimal, low, medium, high
-                        verbosity="medium",  # GPT-5 parameter: low, medium, high
-                        response_format={"type": "json_object"}
-                    )
-                    
-                    vision_result = json.loads(vision_response.choices[0].message.content)
-                    action_type = vision_result.get("action", "wait")
-                    description = vision_result.get("description", "")
-                    goal_progress = vision_result.get("goal_progress", "")
-                    next_steps = vision_result.get("next_steps", "")
-                    
-                    # Log the decision
-                    agent_log = {
-                        "timestamp": datetime.now().isoformat(),
-                        "action": action_type,
-                        "message": description,
-                        "progress": goal_progress,
-                        "next": next_steps
-                    }
-                    agent["logs"].append(agent_log)
-                    logger.info(f"🎯 Agent [{session_id}]: {description}")
-                    if goal_progress:
-                        logger.info(f"   📊 Progress: {goal_progress}")
-                    if next_steps:
-                        logger.info(f"   ➡️  Next: {next_steps}")
-                    
-                    # Execute the action
-                    agent["status"] = "executing"
-                    
-                    if action_type == "done":
-                        logger.info(f"✅ Agent [{session_id}]: Task complete! Goal achieved.")
+                # If goal involves extraction/document creation, extract content and create file
+                goal_lower = agent.get('current_goal', '').lower()
+                if 'extract' in goal_lower or 'create' in goal_lower or 'save' in goal_lower or 'doc' in goal_lower:
+                    try:
+                        # Extract text content from page
+                        page_text = await page.evaluate("""() => {
+                            // Get main content, excluding scripts, styles, nav, footer
+                            const content = document.querySelector('main') || 
+                                           document.querySelector('article') || 
+                                           document.querySelector('#content') ||
+                                           document.querySelector('.mw-parser-output') ||
+                                           document.body;
+                            return content.innerText || content.textContent || '';
+                        }""")
                         
-                        # If goal involves extraction/document creation, extract content and create file
-                        goal_lower = agent.get('current_goal', '').lower()
-                        if 'extract' in goal_lower or 'create' in goal_lower or 'save' in goal_lower or 'doc' in goal_lower:
-                            try:
-                                # Extract text content from page
-                                page_text = await page.evaluate("""() => {
-                                    // Get main content, excluding scripts, styles, nav, footer
-                                    const content = document.querySelector('main') || 
-                                                   document.querySelector('article') || 
-                                                   document.querySelector('#content') ||
-                                                   document.querySelector('.mw-parser-output') ||
-                                                   document.body;
-                                    return content.innerText || content.textContent || '';
-                                }""")
-                                
-                                if page_text:
-                                    # Use LLM to format and extract relevant info
-                                    extraction_prompt = f"""Extract and format the information from this webpage content according to the goal: {agent.get('current_goal', '')}
+                        if page_text:
+                            # Use LLM to format and extract relevant info
+                            extraction_prompt = f"""Extract and format the information from this webpage content according to the goal: {agent.get('current_goal', '')}
 
 Content:
 {page_text[:15000]}  # Limit to avoid token limits
 
 Format the extracted information clearly and comprehensively. If creating a document, structure it appropriately."""
-                                    
-                                    extraction_response = openai_client.chat.completions.create(
-                                        model="gpt-4.1-2025-04-14",
-                                        messages=[
-                                            {"role": "system", "content": "You are a document extraction assistant. Extract and format information clearly."},
-                                            {"role": "user", "content": extraction_prompt}
-                                        ],
-                                        temperature=0.7
-                                    )
-                                    
-                                    extracted_content = extraction_response.choices[0].message.content
-                                    
-                                    # Get page title for filename
-                                    page_title = await page.title()
-                                    # Use re module (imported at top level)
-                                    safe_title = re.sub(r'[^\w\s-]', '', page_title)[:30].replace(' ', '_')
-                                    
-                                    # Determine filename from goal or page title
-                                    filename = "extracted_info.txt"
-                                    if 'word' in goal_lower or 'doc' in goal_lower:
-                                        filename = f"{safe_title}_info.txt"
-                                    else:
-                                        filename = f"{safe_title}_extracted.txt"
-
-                                    # Create file
-                                    safe_path = Path("Desktop") / filename
-                                    target_file = DATA_DIR / safe_path
-                                    target_file.parent.mkdir(parents=True, exist_ok=True)
-                                    target_file.write_text(extracted_content, encoding='utf-8')
-                                    
-                                    logger.info(f"📄 Agent [{session_id}]: Created file {filename} with extracted content")
-                                    agent_log = {
-                                        "timestamp": datetime.now().isoformat(), 
-                                        "action": "done", 
-                                        "message": f"Task completed successfully. Created file: {filename}"
-                                    }
-                                    agent["logs"].append(agent_log)
-                                else:
-                                    agent_log = {"timestamp": datetime.now().isoformat(), "action": "done", "message": "Task completed successfully"}
-                                    agent["logs"].append(agent_log)
-                            except Exception as e:
-                                logger.error(f"❌ Agent [{session_id}] error creating file: {str(e)}")
-                                agent_log = {"timestamp": datetime.now().isoformat(), "action": "error", "message": f"Error creating file: {str(e)}"}
-                                agent["logs"].append(agent_log)
+                            
+                            extraction_response = await llm_gateway.chat(
+                                model="gpt-4.1-2025-04-14",
+                                messages=[
+                                    {"role": "system", "content": "You are a document extraction assistant. Extract and format information clearly."},
+                                    {"role": "user", "content": extraction_prompt}
+                                ],
+                                temperature=0.7
+                            )
+                            
+                            extracted_content = extraction_response.choices[0].message.content
+                            
+                            # Get page title for filename
+                            page_title = await page.title()
+                            # Use re module (imported at top level)
+                            safe_title = re.sub(r'[^\w\s-]', '', page_title)[:30].replace(' ', '_')
+                            
+                            # Determine filename from goal or page title
+                            filename = "extracted_info.txt"
+                            if 'word' in goal_lower or 'doc' in goal_lower:
+                                filename = f"{safe_title}_info.txt"
+                            else:
+                                filename = f"{safe_title}_extracted.txt"
+
+                            # Create file
+                            safe_path = Path("Desktop") / filename
+                            target_file = DATA_DIR / safe_path
+                            target_file.parent.mkdir(parents=True, exist_ok=True)
+                            target_file.write_text(extracted_content, encoding='utf-8')
+                            await record_file_change(safe_path, "created", source="agent")
+                            
+                            logger.info(f"📄 Agent [{session_id}]: Created file {filename} with extracted content")
+                            agent_log = {
+                                "timestamp": datetime.now().isoformat(), 
+                                "action": "done", 
+                                "message": f"Task completed successfully. Created file: {filename}"
+                            }
+                            agent["logs"].append(agent_log)
                         else:
                             agent_log = {"timestamp": datetime.now().isoformat(), "action": "done", "message": "Task completed successfully"}
                             agent["logs"].append(agent_log)
-                        
-                        agent["current_goal"] = None
-                        agent["status"] = "completed"
-                        await asyncio.sleep(5)  # Wait before checking for new tasks
-                    elif action_type == "click":
-                        x = vision_result.get("x", 0)
-                        y = vision_result.get("y", 0)
-                        logger.info(f"🖱️  Agent [{session_id}]: Clicking at ({x}, {y})")
-                        await page.mouse.click(x, y)
-                        await page.wait_for_timeout(1500)
-                    elif action_type == "type":
-                        text = vision_result.get("text", "")
-                        x = vision_result.get("x")
-                        y = vision_result.get("y")
-                        
-                        logger.info(f"⌨️  Agent [{session_id}]: Typing '{text}'")
-                        if x is not None and y is not None:
-                            await page.mouse.click(x, y)
-                            await page.wait_for_timeout(300)
-                        
-                        if text:
-                            await page.keyboard.type(text, delay=50)
-                            await page.wait_for_timeout(800)
-                            
-                            # Auto-press Enter if it's a search
-                            if "search" in agent.get('current_goal', '').lower() or page.url == "https://www.google.com/" or "google.com" in page.url:
-                                logger.info(f"🔍 Agent [{session_id}]: Pressing Enter to search")
-                                await page.keyboard.press('Enter')
-                                await page.wait_for_timeout(3000)
-                    elif action_type == "scroll":
-                        scroll_x = vision_result.get("x", 0)
-                        scroll_y = vision_result.get("y", 0)
-                        logger.info(f"📜 Agent [{session_id}]: Scrolling ({scroll_x}, {scroll_y})")
-                        await page.mouse.wheel(scroll_x, scroll_y)
-                        await page.wait_for_timeout(1000)
-                    
-                    # Update page info after action
-                    await page.wait_for_timeout(1000)
-                    agent["status"] = "idle"
-                    await asyncio.sleep(1)  # Brief pause between actions
-                    
-                except Exception as e:
-                    logger.error(f"❌ Agent [{session_id}] error during action: {str(e)}")
-                    agent_log = {"timestamp": datetime.now().isoformat(), "action": "error", "message": f"Error: {str(e)}"}
-                    agent["logs"].append(agent_log)
-                    agent["status"] = "error"
-                    await asyncio.sleep(2)
-                    
-            else:
-                # Process queued tasks
-                if len(agent.get("tasks", deque())) > 0:
-                    task = agent["tasks"].popleft()
-                    agent["current_goal"] = task.get("goal", task.get("command", ""))
-                    logger.info(f"📋 Agent [{session_id}]: New task queued - {agent['current_goal']}")
+                    except Exception as e:
+                        logger.error(f"❌ Agent [{session_id}] error creating file: {str(e)}")
+                        agent_log = {"timestamp": datetime.now().isoformat(), "action": "error", "message": f"Error creating file: {str(e)}"}
+                        agent["logs"].append(agent_log)
                 else:
-                    agent["status"] = "idle"
-                    await asyncio.sleep(1)
+                    agent_log = {"timestamp": datetime.now().isoformat(), "action": "done", "message": "Task completed successfully"}
+                    agent["logs"].append(agent_log)
                 
-    except asyncio.CancelledError:
-        logger.info(f"🛑 Browser agent [{session_id}] STOPPED")
+                agent["current_goal"] = None
+                agent["last_phash"] = None
+                agent["status"] = "completed"
+                # Keep going only if more tasks are queued
+                return bool(agent.get("tasks"))
+            
+            # Let the page react (navigation, XHR, re-render) before the next step
+            await wait_for_settle(page)
+            agent["status"] = "idle"
+            return True
+            
+        except Exception as e:
+            logger.error(f"❌ Agent [{session_id}] error during action: {str(e)}")
+            agent_log = {"timestamp": datetime.now().isoformat(), "action": "error", "message": f"Error: {str(e)}"}
+            agent["logs"].append(agent_log)
+            agent["status"] = "error"
+            await asyncio.sleep(2)  # Back off before retrying the goal
+            return True
+
     except Exception as e:
         logger.error(f"💥 Agent [{session_id}] FATAL ERROR: {str(e)}")
         if session_id in browser_agents:
@@ -3024,12 +2241,16 @@ Format the extracted information clearly and comprehensively. If creating a docu
                 "action": "fatal_error",
                 "message": f"Fatal error: {str(e)}"
             })
+        return False
+
+# Runs agent steps for every session with a goal (bounded, round-robin, no idle polling)
+agent_scheduler = AgentScheduler(browser_agent_step)
 
 def start_browser_agent(session_id: str, initial_goal: str = None):
     """Start an autonomous browser agent for a session with an optional goal"""
-    if session_id in agent_task_registry:
-        # Agent already running, add goal if provided
-        if initial_goal and session_id in browser_agents:
+    if session_id in browser_agents:
+        # Agent already exists, set the new goal if provided
+        if initial_goal:
             browser_agents[session_id]["current_goal"] = initial_goal
             if "logs" not in browser_agents[session_id]:
                 browser_agents[session_id]["logs"] = []
@@ -3039,209 +2260,176 @@ def start_browser_agent(session_id: str, initial_goal: str = None):
                 "message": f"New goal set: {initial_goal}"
             })
             logger.info(f"📝 Agent [{session_id}]: Goal updated to '{initial_goal}'")
+            agent_scheduler.wake(session_id)
         return
     
-    async def run_agent():
-        await browser_agent_worker(session_id)
-    
-    # Create task but don't await it - let it run in background
-    task = asyncio.create_task(run_agent())
-    agent_task_registry[session_id] = task
     browser_agents[session_id] = {
         "tasks": deque(),
-        "status": "starting",
+        "status": "starting" if initial_goal else "idle",
         "current_goal": initial_goal or "",
         "logs": [{"timestamp": datetime.now().isoformat(), "action": "started", "message": f"Agent started with goal: {initial_goal or 'No initial goal'}"}]
     }
+    # Steps are scheduled only while there is a goal; idle agents cost nothing
+    if initial_goal:
+        agent_scheduler.wake(session_id)
     logger.info(f"🚀 Started browser agent [{session_id}] with goal: {initial_goal or 'No initial goal'}")
 
 async def update_inbox_cache(received_emails: list):
     """Update the inbox cache with latest emails"""
-    global inbox_cache, email_inbox
-
-    async with inbox_cache_lock:
-        try:
-            # Process received emails
-            processed_received = []
-            for email in received_emails:
-                email_entry = {
-                    "id": email.get("message_id", f"email_{len(processed_received)}"),
-                    "message_id": email.get("message_id"),
-                    "from": email.get("from", ""),
-                    "subject": email.get("subject", "(No subject)"),
-                    "body": email.get("text", email.get("html", "")),
-                    "html": email.get("html", ""),
-                    "text": email.get("text", ""),
-                    "thread_id": email.get("thread_id"),
-                    "timestamp": email.get("received_at", datetime.now().isoformat()),
-                    "received_at": email.get("received_at"),
-                    "sent": False,
-                    "status": "received"
-                }
-                processed_received.append(email_entry)
-
-            # Combine with locally stored sent emails
-            all_emails = processed_received + email_inbox
-
-            # Sort by timestamp (most recent first)
-            def get_sort_key(email):
-                ts = email.get("received_at") or email.get("timestamp", "")
-                return ts if ts else "1970-01-01T00:00:00"
-            all_emails.sort(key=get_sort_key, reverse=True)
-
-            # Update cache
-            inbox_cache["emails"] = all_emails
-            inbox_cache["last_updated"] = datetime.now().isoformat()
-            inbox_cache["received_count"] = len(processed_received)
-            inbox_cache["sent_count"] = len(email_inbox)
+    try:
+        # Process received emails
+        processed_received = []
+        for email in received_emails:
+            email_entry = {
+                "id": email.get("message_id", f"email_{len(processed_received)}"),
+                "message_id": email.get("message_id"),
+                "from": email.get("from", ""),
+                "subject": email.get("subject", "(No subject)"),
+                "body": email.get("text", email.get("html", "")),
+                "html": email.get("html", ""),
+                "text": email.get("text", ""),
+                "thread_id": email.get("thread_id"),
+                "timestamp": email.get("received_at", datetime.now().isoformat()),
+                "received_at": email.get("received_at"),
+                "sent": False,
+                "status": "received"
+            }
+            processed_received.append(email_entry)
+
+        # Combine with locally stored sent emails
+        email_inbox = await asyncio.to_thread(get_sent_emails)
+        all_emails = processed_received + email_inbox
+
+        # Sort by timestamp (most recent first)
+        def get_sort_key(email):
+            ts = email.get("received_at") or email.get("timestamp", "")
+            return ts if ts else "1970-01-01T00:00:00"
+        all_emails.sort(key=get_sort_key, reverse=True)
+
+        # Update cache
+        await asyncio.to_thread(state_backend.put, EMAIL_STATE_NS, "inbox_cache", {
+            "emails": all_emails,
+            "last_updated": datetime.now().isoformat(),
+            "received_count": len(processed_received),
+            "sent_count": len(email_inbox)
+        })
 
-            logger.info(f"📦 Cache updated: {len(all_emails)} total emails ({len(processed_received)} received, {len(email_inbox)} sent)")
-        except Exception as e:
-            logger.error(f"Error updating inbox cache: {str(e)}")
+        logger.info(f"📦 Cache updated: {len(all_emails)} total emails ({len(processed_received)} received, {len(email_inbox)} sent)")
+    except Exception as e:
+        logger.error(f"Error updating inbox cache: {str(e)}")
 
 async def refresh_cache_from_api():
     """Fetch latest emails from API and update cache"""
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(
-                RAILWAY_EMAIL_INBOX_API,
-                params={"limit": 100, "summaries": True}
-            )
-            if response.status_code == 200:
-                result = response.json()
-                if result.get("status") == "ok" and result.get("emails"):
-                    await update_inbox_cache(result.get("emails", []))
-                    logger.info("📦 Cache refreshed from API")
+        client = http_clients.client("email")
+        response = await client.get(
+            RAILWAY_EMAIL_INBOX_API,
+            params={"limit": 100, "summaries": True}
+        )
+        if response.status_code == 200:
+            result = response.json()
+            if result.get("status") == "ok" and result.get("emails"):
+                await update_inbox_cache(result.get("emails", []))
+                logger.info("📦 Cache refreshed from API")
     except Exception as e:
         logger.error(f"Error refreshing cache from API: {str(e)}")
 
 async def email_monitor_worker():
     """Background task that monitors inbox for all new emails"""
-    global processed_email_ids, email_notifications, archived_processes
     logger.info("📧 Email monitor worker started")
 
-    # Load processed email IDs from file first (most reliable source)
-    load_processed_email_ids()
-
-    # Also populate from existing notifications and archived processes (in case file is missing)
-    for notif in email_notifications:
-        if notif.get("id"):
-            processed_email_ids.add(notif.get("id"))
-
-    for archived in archived_processes:
-        if archived.get("id"):
-            processed_email_ids.add(archived.get("id"))
-
-    # Save the merged set back to file
-    if processed_email_ids:
-        logger.info(f"📋 Initialized processed_email_ids with {len(processed_email_ids)} existing email IDs")
-        save_processed_email_ids()
+    # Carry over IDs processed before the shared state existed
+    await asyncio.to_thread(load_processed_email_ids)
 
     while True:
         try:
             # Fetch emails from the inbox API
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(
-                    RAILWAY_EMAIL_INBOX_API,
-                    params={"limit": 20, "summaries": False}
-                )
+            client = http_clients.client("email")
+            response = await client.get(
+                RAILWAY_EMAIL_INBOX_API,
+                params={"limit": 20, "summaries": False}
+            )
 
-                if response.status_code != 200:
-                    logger.warning(f"Failed to fetch emails: {response.status_code}")
-                    await asyncio.sleep(30)
-                    continue
+            if response.status_code != 200:
+                logger.warning(f"Failed to fetch emails: {response.status_code}")
+                await asyncio.sleep(30)
+                continue
 
-                result = response.json()
+            result = response.json()
 
-                if result.get("status") != "ok" or not result.get("emails"):
-                    logger.debug(f"No new emails found. Status: {result.get('status')}, Emails: {len(result.get('emails', []))}")
-                    await asyncio.sleep(30)
-                    continue
+            if result.get("status") != "ok" or not result.get("emails"):
+                logger.debug(f"No new emails found. Status: {result.get('status')}, Emails: {len(result.get('emails', []))}")
+                await asyncio.sleep(30)
+                continue
 
-                emails = result.get("emails", [])
-                logger.info(f"📬 Fetched {len(emails)} emails from API. Currently tracking {len(processed_email_ids)} processed emails")
+            emails = result.get("emails", [])
+            processed_count = await asyncio.to_thread(state_backend.count_members, PROCESSED_EMAILS_NS)
+            logger.info(f"📬 Fetched {len(emails)} emails from API. Currently tracking {processed_count} processed emails")
 
-                # Update inbox cache with fetched emails
-                await update_inbox_cache(emails)
+            # Update inbox cache with fetched emails
+            await update_inbox_cache(emails)
 
-                # Process each email
-                for email in emails:
-                    email_id = email.get("message_id")
+            # Process each email
+            for email in emails:
+                email_id = email.get("message_id")
                     
-                    if not email_id:
-                        logger.warning(f"Email missing message_id, skipping: {email.get('subject', 'Unknown')}")
-                        continue
+                if not email_id:
+                    logger.warning(f"Email missing message_id, skipping: {email.get('subject', 'Unknown')}")
+                    continue
 
-                    # Skip if we've already processed this email
-                    if email_id in processed_email_ids:
-                        logger.info(f"✅ Skipping already processed email: {email_id}")
-                        continue
+                # Claim atomically so no two workers (or leaders) process the same email
+                if not await asyncio.to_thread(mark_email_processed, email_id):
+                    logger.info(f"✅ Skipping already processed email: {email_id}")
+                    continue
 
-                    # Also check if this email is in active notifications (already being processed)
-                    if any(notif.get("id") == email_id for notif in email_notifications):
-                        logger.info(f"✅ Skipping email already in notifications (active): {email_id}")
-                        processed_email_ids.add(email_id)  # Mark as processed to prevent duplicate
-                        save_processed_email_ids()
-                        continue
+                logger.info(f"📧 Processing new email: {email_id} from {email.get('from', 'unknown')}")
 
-                    # Also check if this email is in archived processes (extra safety check)
-                    if any(archived.get("id") == email_id for archived in archived_processes):
-                        logger.info(f"✅ Skipping email already in archive: {email_id}")
-                        processed_email_ids.add(email_id)  # Mark as processed
-                        save_processed_email_ids()
-                        continue
+                # Get email body (prefer text, fallback to html)
+                email_body = email.get("text", email.get("html", ""))
 
-                    # Mark as processed immediately to prevent duplicate processing
-                    processed_email_ids.add(email_id)
-                    save_processed_email_ids()
-                    logger.info(f"📧 Processing new email: {email_id} from {email.get('from', 'unknown')}")
-
-                    # Get email body (prefer text, fallback to html)
-                    email_body = email.get("text", email.get("html", ""))
-
-                    # Check if email body starts with "COMMAND: JARVIS"
-                    is_command_email = email_body.strip().upper().startswith("COMMAND: JARVIS")
-
-                    if is_command_email:
-                        logger.info(f"📬 Found command email from {email.get('from', 'unknown')}: {email_id}")
-
-                        # Extract the actual command (remove "COMMAND: JARVIS" prefix)
-                        command = email_body.strip()[len("COMMAND: JARVIS"):].strip()
-
-                        # Create notification for command email
-                        notification = {
-                            "id": email_id,
-                            "type": "command",
-                            "from": email.get("from", "Unknown"),
-                            "subject": email.get("subject", "(No subject)"),
-                            "command": command,
-                            "body": email_body[:200],  # First 200 chars for preview
-                            "timestamp": datetime.now().isoformat(),
-                            "received_at": email.get("received_at", datetime.now().isoformat()),
-                            "status": "scheduled"
-                        }
-                        email_notifications.append(notification)
+                # Check if email body starts with "COMMAND: JARVIS"
+                is_command_email = email_body.strip().upper().startswith("COMMAND: JARVIS")
 
-                        logger.info(f"🤖 Scheduling background task for command: {command[:50]}...")
+                if is_command_email:
+                    logger.info(f"📬 Found command email from {email.get('from', 'unknown')}: {email_id}")
 
-                        # Process the command like a chat message (in background)
-                        # We'll use session_id "email_command" for email-triggered commands
-                        asyncio.create_task(process_email_command(email_id, command, notification))
-                    else:
-                        # Regular new email - just create a notification
-                        logger.info(f"📬 New email from {email.get('from', 'unknown')}: {email_id}")
-
-                        notification = {
-                            "id": email_id,
-                            "type": "email",
-                            "from": email.get("from", "Unknown"),
-                            "subject": email.get("subject", "(No subject)"),
-                            "body": email_body[:200],  # First 200 chars for preview
-                            "timestamp": datetime.now().isoformat(),
-                            "received_at": email.get("received_at", datetime.now().isoformat()),
-                            "status": "received"
-                        }
-                        email_notifications.append(notification)
+                    # Extract the actual command (remove "COMMAND: JARVIS" prefix)
+                    command = email_body.strip()[len("COMMAND: JARVIS"):].strip()
+
+                    # Create notification for command email
+                    notification = {
+                        "id": email_id,
+                        "type": "command",
+                        "from": email.get("from", "Unknown"),
+                        "subject": email.get("subject", "(No subject)"),
+                        "command": command,
+                        "body": email_body[:200],  # First 200 chars for preview
+                        "timestamp": datetime.now().isoformat(),
+                        "received_at": email.get("received_at", datetime.now().isoformat()),
+                        "status": "scheduled"
+                    }
+                    await asyncio.to_thread(save_notification, notification, create=True)
+
+                    logger.info(f"🤖 Scheduling background task for command: {command[:50]}...")
+
+                    # Process the command like a chat message (in background)
+                    # We'll use session_id "email_command" for email-triggered commands
+                    asyncio.create_task(process_email_command(email_id, command, notification))
+                else:
+                    # Regular new email - just create a notification
+                    logger.info(f"📬 New email from {email.get('from', 'unknown')}: {email_id}")
+
+                    notification = {
+                        "id": email_id,
+                        "type": "email",
+                        "from": email.get("from", "Unknown"),
+                        "subject": email.get("subject", "(No subject)"),
+                        "body": email_body[:200],  # First 200 chars for preview
+                        "timestamp": datetime.now().isoformat(),
+                        "received_at": email.get("received_at", datetime.now().isoformat()),
+                        "status": "received"
+                    }
+                    await asyncio.to_thread(save_notification, notification, create=True)
 
         except Exception as e:
             logger.error(f"Error in email monitor worker: {str(e)}", exc_info=True)
@@ -3255,25 +2443,15 @@ async def process_email_command(email_id: str, command: str, notification: dict)
     try:
         logger.info(f"⚙️ Processing email command {email_id}: {command[:50]}...")
         notification["status"] = "processing"
+        await asyncio.to_thread(save_notification, notification)
 
         # Use dedicated session for email commands
         session_id = f"email_command_{email_id}"
         
         # Check if this is a compilation/slideshow request that needs iterative workflow
-        command_lower = command.lower().strip()
-        import re
-        
-        compilation_keywords = [
-            "compile", "create a report", "generate a report", "make a report", "make report",
-            "analyze and create", "summarize", "create a summary", "generate a summary",
-            "report of", "report from", "report on", "compile from", "compile all",
-            "gather and compile", "collect and summarize", "report of it", "compile it",
-            "make a report of", "create a report of", "summarize it", "compile them"
-        ]
-        slideshow_keywords = ["create.*slideshow", "make.*presentation", "generate.*slideshow", "create.*presentation", "build.*presentation", "prepare.*presentation"]
-        
-        is_compilation = any(keyword in command_lower for keyword in compilation_keywords)
-        is_slideshow = any(re.search(keyword.replace("*", ".*"), command_lower) for keyword in slideshow_keywords)
+        intents = classify_intents(command)
+        is_compilation = intents.compilation_keyword
+        is_slideshow = intents.email_slideshow
         
         if is_compilation:
             # For compilation workflows (reports), execute the iterative workflow directly
@@ -3285,6 +2463,7 @@ async def process_email_command(email_id: str, command: str, notification: dict)
                 async for update in execute_iterative_workflow(command, session_id):
                     if update.get("type") == "status":
                         notification["progress"] = update.get("message", "")
+                        await asyncio.to_thread(save_notification, notification)
                         logger.info(f"📊 Progress: {update.get('message', '')}")
                     elif update.get("type") == "result":
                         full_output.append(update.get("content", ""))
@@ -3310,6 +2489,7 @@ async def process_email_command(email_id: str, command: str, notification: dict)
                 async for update in execute_slideshow_workflow(command, session_id):
                     if update.get("type") == "status":
                         notification["progress"] = update.get("message", "")
+                        await asyncio.to_thread(save_notification, notification)
                         logger.info(f"📊 Progress: {update.get('message', '')}")
                     elif update.get("type") == "result":
                         full_output.append(update.get("content", ""))
@@ -3346,22 +2526,34 @@ async def process_email_command(email_id: str, command: str, notification: dict)
         notification["failed_at"] = datetime.now().isoformat()
         notification["error"] = str(e)
     
-    # Ensure email_id stays in processed_email_ids even if process fails
+    await asyncio.to_thread(save_notification, notification)
+
+    # Ensure email_id stays claimed even if the process fails
     # This prevents reprocessing the same email command
-    if email_id not in processed_email_ids:
-        processed_email_ids.add(email_id)
-        save_processed_email_ids()
-        logger.debug(f"✅ Added {email_id} to processed_email_ids to prevent reprocessing")
+    if await asyncio.to_thread(mark_email_processed, email_id):
+        logger.debug(f"✅ Marked {email_id} as processed to prevent reprocessing")
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize browser on startup"""
-    global email_monitor_task
+    global email_monitor_task, worker_routing_task, file_watcher_task, browser_sweep_task
     await init_browser()
+    browser_sweep_task = asyncio.create_task(browser_sessions.run())
+
+    # Build/refresh the file search index in the background, then watch for out-of-band edits
+    asyncio.create_task(asyncio.to_thread(file_index.sync))
+    if semantic_index is not None:
+        asyncio.create_task(asyncio.to_thread(semantic_index.sync))
+    file_watcher_task = asyncio.create_task(file_index.watch())
 
-    # Start the email monitoring background task
+    # Every worker answers browser requests forwarded to it by the others
+    worker_routing_task = asyncio.create_task(
+        serve_forwarded_requests(app, state_backend, state_config.worker_lease_seconds)
+    )
+
+    # Start the email monitoring background task (runs only on the elected worker)
     try:
-        email_monitor_task = asyncio.create_task(email_monitor_worker())
+        email_monitor_task = asyncio.create_task(email_leader.run(email_monitor_worker))
         logger.info("✅ Email monitor task started")
     except Exception as e:
         logger.error(f"Failed to start email monitor task: {str(e)}", exc_info=True)
@@ -3383,35 +2575,68 @@ async def get_browser_agent_status(session_id: str):
 
 @app.get("/api/browser/agents")
 async def get_all_browser_agents():
-    """Get status of all browser agents"""
+    """Get status of all browser agents (merged across workers by BrowserSessionRouter)"""
     agents_status = {}
     for session_id, agent in browser_agents.items():
         agents_status[session_id] = {
             "status": agent.get("status", "unknown"),
             "current_goal": agent.get("current_goal", ""),
             "log_count": len(agent.get("logs", [])),
+            "model_calls": agent.get("model_calls", 0),
+            "actions_run": agent.get("actions_run", 0),
             "latest_log": agent.get("logs", [])[-1] if agent.get("logs") else None
         }
-    return JSONResponse(content={"agents": agents_status})
+    return JSONResponse(content={
+        "agents": agents_status,
+        "scheduler": agent_scheduler.get_stats(),
+        "vision_cache": vision_decisions.get_stats(),
+    })
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Clean up browser on shutdown"""
-    global browser_instance, email_monitor_task
-    # Cancel all agent tasks
-    for session_id, task in agent_task_registry.items():
-        task.cancel()
-    agent_task_registry.clear()
+    global browser_instance, email_monitor_task, worker_routing_task, file_watcher_task, browser_sweep_task
+    # Cancel running agent steps
+    await agent_scheduler.close()
 
-    # Cancel email monitor task
+    # Cancel email monitor task (releases the leader lease for another worker)
     if email_monitor_task:
         email_monitor_task.cancel()
         logger.info("Email monitor task cancelled")
+    if worker_routing_task:
+        worker_routing_task.cancel()
+    if browser_sweep_task:
+        browser_sweep_task.cancel()
+    await asyncio.gather(
+        *[task for task in (email_monitor_task, worker_routing_task) if task], return_exceptions=True
+    )
+    for session_id in browser_sessions.session_ids():
+        release_browser_session(state_backend, session_id)
 
+    if browser_pool:
+        await browser_pool.close()
     if browser_instance:
         await browser_instance.close()
         logger.info("Browser closed")
 
+    if file_watcher_task:
+        file_watcher_task.cancel()
+    file_index.close()
+    if file_searcher is not file_index:
+        file_searcher.close()
+    if semantic_index is not None:
+        semantic_index.close()
+    session_store.close()
+    state_backend.close()
+    action_engine.shutdown()
+    await http_clients.close()
+
+    # Close the pooled LLM connections
+    await llm_gateway.close()
+    if llm_gateway.cache:
+        llm_gateway.cache.close()
+    logger.info("LLM gateway closed")
+
 # Browser endpoints
 @app.post("/api/browser/navigate-multiple")
 async def browser_navigate_multiple(nav_data: BrowserNavigateMultiple):
@@ -3423,9 +2648,7 @@ async def browser_navigate_multiple(nav_data: BrowserNavigateMultiple):
         if not urls:
             raise HTTPException(status_code=400, detail="No URLs provided")
         
-        results = []
-        
-        for idx, target_url in enumerate(urls):
+        async def open_browser(idx: int, target_url: str) -> dict:
             # Normalize URL
             if not target_url.startswith(('http://', 'https://')):
                 target_url = f"https://{target_url}"
@@ -3451,13 +2674,16 @@ async def browser_navigate_multiple(nav_data: BrowserNavigateMultiple):
                 start_browser_agent(session_id, initial_goal=agent_goal)
                 logger.info(f"🤖 Started agent [{session_id}] with goal: {agent_goal}")
             
-            results.append({
+            return {
                 "session_id": session_id,
                 "url": current_url,
                 "title": title,
                 "proxy_url": proxy_url,
                 "agent_goal": agent_goal
-            })
+            }
+        
+        # Open every window at once: total time is that of the slowest site
+        results = await asyncio.gather(*[open_browser(idx, url) for idx, url in enumerate(urls)])
         
         return JSONResponse(content={
             "success": True,
@@ -3468,6 +2694,23 @@ async def browser_navigate_multiple(nav_data: BrowserNavigateMultiple):
         logger.error(f"Error navigating multiple browsers: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
+@app.delete("/api/browser/session/{session_id}")
+async def close_browser_session(session_id: str):
+    """Close a browser session: stop its agent and return its context to the pool"""
+    if not await browser_sessions.close(session_id):
+        raise HTTPException(status_code=404, detail="Browser session not found")
+    return JSONResponse(content={"success": True, "session_id": session_id})
+
+@app.get("/api/browser/pool")
+async def get_browser_pool_stats():
+    """Get pre-warmed browser context pool counters for this worker (all workers under "workers")"""
+    return JSONResponse(content=browser_pool.get_stats() if browser_pool else {})
+
+@app.get("/api/browser/sessions")
+async def get_browser_session_stats():
+    """Get open browser sessions on this worker with idle time, JS heap and eviction counters (all workers under "workers")"""
+    return JSONResponse(content=browser_sessions.get_stats())
+
 @app.post("/api/browser/navigate")
 async def browser_navigate(nav_data: BrowserNavigate):
     """Navigate to a URL and return page info"""
@@ -3484,8 +2727,8 @@ async def browser_navigate(nav_data: BrowserNavigate):
         # Navigate to URL
         await page.goto(url, wait_until='networkidle', timeout=30000)
         
-        # Wait a bit for page to fully render
-        await page.wait_for_timeout(1000)
+        # Wait for late rendering to finish
+        await wait_for_settle(page)
         
         # Get current URL (in case of redirects)
         current_url = page.url
@@ -3496,8 +2739,11 @@ async def browser_navigate(nav_data: BrowserNavigate):
         # Store the base URL for this session for proxying
         parsed_url = urlparse(current_url)
         base_url = f"{parsed_url.scheme}://{parsed_url.netloc}"
-        browser_contexts[nav_data.session_id + "_base_url"] = base_url
-        browser_contexts[nav_data.session_id + "_current_url"] = current_url
+        # The session may have been swept since get_browser_page returned
+        session = browser_sessions.get(nav_data.session_id, touch=False)
+        if session is not None:
+            session.base_url = base_url
+            session.current_url = current_url
         
         # Check if agent goal was provided (for single URL navigation with tasks)
         agent_goal = nav_data.agent_goal
@@ -3527,7 +2773,8 @@ async def browser_proxy_page(session_id: str, request: Request):
         # Get the HTML content
         html_content = await page.content()
         current_url = page.url
-        base_url = browser_contexts.get(session_id + "_base_url", current_url)
+        session = browser_sessions.get(session_id, touch=False)
+        base_url = (session.base_url if session else None) or current_url
         
         # Rewrite URLs in HTML to use our proxy
         # Import re inside function to ensure it's accessible in closure
@@ -3578,27 +2825,25 @@ async def browser_proxy_resource(session_id: str, url: str, request: Request):
         if not page:
             raise HTTPException(status_code=500, detail="Browser not available")
         
-        # Fetch the resource using Playwright's context
-        async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
-            # Use the same cookies/headers as the browser page
-            headers = {}
-            cookies = await page.context.cookies()
-            for cookie in cookies:
-                client.cookies.set(cookie['name'], cookie['value'], domain=cookie.get('domain', ''))
-            
-            response = await client.get(url, headers=headers)
-            response.raise_for_status()
-            
-            # Determine content type
-            content_type = response.headers.get('content-type', 'application/octet-stream')
-            
-            return Response(
-                content=response.content,
-                media_type=content_type,
-                headers={
-                    "Cache-Control": "public, max-age=3600",
-                }
-            )
+        # Send the browser page's cookies (the pooled client keeps none of its own), looked up again for every redirect hop
+        async def cookie_header(hop_url: str) -> Optional[str]:
+            cookies = await page.context.cookies(hop_url)
+            return "; ".join(f"{cookie['name']}={cookie['value']}" for cookie in cookies) or None
+
+        # Fetch the resource on the shared proxy pool
+        response = await get_with_cookies(http_clients.client("proxy"), url, cookie_header)
+        response.raise_for_status()
+        
+        # Determine content type
+        content_type = response.headers.get('content-type', 'application/octet-stream')
+        
+        return Response(
+            content=response.content,
+            media_type=content_type,
+            headers={
+                "Cache-Control": "public, max-age=3600",
+            }
+        )
     except Exception as e:
         logger.error(f"Error proxying resource {url}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
@@ -3614,15 +2859,28 @@ async def browser_control(control_data: BrowserControl):
         if not page:
             raise HTTPException(status_code=500, detail="Browser not available")
         
-        # Take screenshot for vision analysis
-        screenshot_bytes = await page.screenshot(full_page=False)
-        screenshot_base64 = base64.b64encode(screenshot_bytes).decode('utf-8')
-        
-        # Use GPT-4 Vision to analyze the screenshot and understand the command
-        vision_messages = [
-            {
-                "role": "system",
-                "content": """You are a browser automation assistant. Analyze the screenshot and user command to determine what action to take.
+        vision_result = None
+        if BROWSER_PERCEPTION == "dom":
+            vision_result = await decide_from_dom(
+                page,
+                llm_gateway.chat,
+                build_dom_prompt(
+                    "You are a browser automation assistant. Use the page's elements and the user command to determine what action to take."
+                ),
+                f"User command: {command}",
+            )
+        if vision_result is None:
+            # Take screenshot for vision analysis
+            shot = await capture(page)
+            # Same command on a visually unchanged page at the same URL: reuse the last decision
+            vision_result = vision_decisions.get(session_id_param, page.url, command, shot)
+        if vision_result is None:
+        
+            # Use GPT-4 Vision to analyze the screenshot and understand the command
+            vision_messages = [
+                {
+                    "role": "system",
+                    "content": """You are a browser automation assistant. Analyze the screenshot and user command to determine what action to take.
 
 Available actions:
 1. click - Click on an element (provide x, y coordinates)
@@ -3641,34 +2899,36 @@ Return ONLY a JSON object with this exact format:
 For clicking, identify the element described in the command and provide its approximate center coordinates.
 For typing, identify the input field and provide coordinates to click it first, then the text to type.
 For scrolling, provide appropriate scroll amounts (typically y: -300 to scroll down, y: 300 to scroll up).
-Be precise with coordinates - they should match pixel positions in the 1280x720 viewport."""
-            },
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": f"User command: {command}\n\nAnalyze this browser screenshot and determine the appropriate action with coordinates."
-                    },
-                    {
-                        "type": "image_url",
-                        "image_url": {
-                            "url": f"data:image/png;base64,{screenshot_base64}"
+Be precise with coordinates - they should match pixel positions in the screenshot."""
+                },
+                {
+                    "role": "user",
+                    "content": [
+                        {
+                            "type": "text",
+                            "text": f"User command: {command}\n\nAnalyze this browser screenshot and determine the appropriate action with coordinates."
+                        },
+                        {
+                            "type": "image_url",
+                            "image_url": {
+                                "url": shot.data_url
+                            }
                         }
-                    }
-                ]
-            }
-        ]
+                    ]
+                }
+            ]
         
-        vision_response = openai_client.chat.completions.create(
-            model="gpt-5-2025-08-07",
-            messages=vision_messages,
-            reasoning_effort="medium",  # GPT-5 parameter: minimal, low, medium, high
-            verbosity="medium",  # GPT-5 parameter: low, medium, high
-            response_format={"type": "json_object"}
-        )
+            vision_response = await llm_gateway.chat(
+                model="gpt-5-2025-08-07",
+                messages=vision_messages,
+                reasoning_effort="medium",  # GPT-5 parameter: minimal, low, medium, high
+                verbosity="medium",  # GPT-5 parameter: low, medium, high
+                response_format={"type": "json_object"},
+                timeout=90
+            )
         
-        vision_result = json.loads(vision_response.choices[0].message.content)
+            vision_result = shot.map_decision(json.loads(vision_response.choices[0].message.content))
+            vision_decisions.put(session_id_param, page.url, command, shot, vision_result)
         action_type = vision_result.get("action", "wait")
         
         # Execute the action
@@ -3676,7 +2936,6 @@ Be precise with coordinates - they should match pixel positions in the 1280x720
             x = vision_result.get("x", 0)
             y = vision_result.get("y", 0)
             await page.mouse.click(x, y)
-            await page.wait_for_timeout(500)
         elif action_type == "type":
             text = vision_result.get("text", "")
             x = vision_result.get("x")
@@ -3688,15 +2947,13 @@ Be precise with coordinates - they should match pixel positions in the 1280x720
             
             if text:
                 await page.keyboard.type(text)
-                await page.wait_for_timeout(500)
         elif action_type == "scroll":
             scroll_x = vision_result.get("x", 0)
             scroll_y = vision_result.get("y", 0)
             await page.mouse.wheel(scroll_x, scroll_y)
-            await page.wait_for_timeout(500)
         
         # Wait for page to update
-        await page.wait_for_timeout(1000)
+        await wait_for_settle(page)
         
         # Get updated page info
         current_url = page.url
@@ -3744,13 +3001,15 @@ async def browser_action(action_data: BrowserAction):
             current_url = page.url
             parsed_url = urlparse(current_url)
             base_url = f"{parsed_url.scheme}://{parsed_url.netloc}"
-            browser_contexts[action_data.session_id + "_base_url"] = base_url
-            browser_contexts[action_data.session_id + "_current_url"] = current_url
+            session = browser_sessions.get(action_data.session_id, touch=False)
+            if session is not None:
+                session.base_url = base_url
+                session.current_url = current_url
         else:
             raise HTTPException(status_code=400, detail=f"Unknown action: {action_data.action}")
         
         # Wait for page to update
-        await page.wait_for_timeout(500)
+        await wait_for_settle(page)
         
         # Return updated page info
         current_url = page.url
@@ -4040,9 +3299,8 @@ async def execute_iterative_workflow(user_message: str, session_id: str):
     Yields progress updates at each step.
     This is an async generator that yields dict updates.
     """
-    compilation_keywords = ["compile", "create a report", "generate a report", "analyze and create", "summarize", "create a summary"]
     user_lower = user_message.lower()
-    is_compilation_request = any(keyword in user_lower for keyword in compilation_keywords)
+    is_compilation_request = classify_intents(user_message).workflow_compilation
     
     if not is_compilation_request:
         yield {"type": "error", "message": "Not a compilation request"}
@@ -4061,13 +3319,14 @@ Search terms:"""
         
         try:
             yield {"type": "progress", "message": "🔍 Analyzing request to determine search terms...", "step": 1}
-            completion = openai_client.chat.completions.create(
+            # Deterministic sub-call: repeated requests are served from the response cache
+            search_terms = (await llm_gateway.chat_text(
                 model="gpt-4.1-2025-04-14",
                 messages=[{"role": "user", "content": search_prompt}],
                 temperature=0.3,
-                max_tokens=50
-            )
-            search_terms = completion.choices[0].message.content.strip()
+                max_tokens=50,
+                use_cache=True
+            )).strip()
             pattern = search_terms.split(',')[0].strip() if ',' in search_terms else search_terms
         except Exception as e:
             logger.error(f"Error extracting search pattern: {e}")
@@ -4077,48 +3336,14 @@ Search terms:"""
         yield {"type": "progress", "message": f"🔍 Searching for documents matching: '{pattern}'...", "step": 1}
         await asyncio.sleep(0.1)
     
-        # Execute find_file - run in thread pool to avoid blocking
-        loop = asyncio.get_event_loop()
-        def search_files():
-            all_files = []
-            for root, dirs, filenames in os.walk(DATA_DIR):
-                for filename in filenames:
-                    full_path = os.path.join(root, filename)
-                    rel_path = os.path.relpath(full_path, DATA_DIR)
-                    all_files.append({
-                        "path": rel_path.replace(os.sep, "/"),
-                        "full_path": full_path
-                    })
-            
-            pattern_lower = pattern.lower()
-            pattern_words = pattern_lower.split()
-            found_files = []
-            
-            for file_info in all_files:
-                path_lower = file_info["path"].lower()
-                if pattern_lower in path_lower or (len(pattern_words) > 1 and all(word in path_lower for word in pattern_words)):
-                    found_files.append(file_info["path"])
-            
-            def search_content(file_info):
-                try:
-                    with open(file_info["full_path"], 'r', encoding='utf-8', errors='ignore') as f:
-                        content_lower = f.read().lower()
-                        if pattern_lower in content_lower or (len(pattern_words) > 1 and all(word in content_lower for word in pattern_words)):
-                            return file_info["path"]
-                except:
-                    pass
-                return None
-            
-            with ThreadPoolExecutor(max_workers=10) as executor:
-                futures = {executor.submit(search_content, file_info): file_info for file_info in all_files if file_info["path"] not in found_files}
-                for future in as_completed(futures):
-                    result = future.result()
-                    if result and result not in found_files:
-                        found_files.append(result)
-            
-            return found_files
-        
-        found_files = await loop.run_in_executor(None, search_files)
+        # Stream the top-ranked matches so each hit is reported as soon as it is found
+        # (map-reduce mode can compile from many more documents than one prompt holds)
+        file_limit = 10 if REPORT_MODE == "single" else MAP_REDUCE_MAX_FILES
+        found_files = []
+        async for hit in action_engine.stream_find_file(pattern, limit=file_limit):
+            found_files.append(hit["path"])
+            if len(found_files) <= 10:
+                yield {"type": "progress", "message": f"📄 Found {hit['path'].split('/')[-1]}", "step": 1, "file": hit["path"]}
         
         if not found_files:
             yield {"type": "error", "message": f"No documents found matching '{pattern}'"}
@@ -4128,24 +3353,11 @@ Search terms:"""
         await asyncio.sleep(0.1)
     
         # Step 2: Read files
-        yield {"type": "progress", "message": f"📖 Step 2: Reading {min(len(found_files), 10)} document(s)...", "step": 2}
+        yield {"type": "progress", "message": f"📖 Step 2: Reading {len(found_files)} document(s)...", "step": 2}
         await asyncio.sleep(0.1)
         
-        def read_files_sync():
-            file_contents = []
-            for file_path in found_files[:10]:
-                try:
-                    safe_path = Path(file_path)
-                    if ".." not in str(safe_path) and not safe_path.is_absolute():
-                        target_file = DATA_DIR / safe_path
-                        if target_file.exists() and target_file.is_file():
-                            content = target_file.read_text(encoding='utf-8', errors='ignore')
-                            file_contents.append({"path": file_path, "content": content})
-                except Exception as e:
-                    logger.error(f"Error reading {file_path}: {e}")
-            return file_contents
-        
-        file_contents = await loop.run_in_executor(None, read_files_sync)
+        read_result = await action_engine.execute("read_files", {"paths": found_files})
+        file_contents = (read_result.data or {}).get("files", [])
         
         if not file_contents:
             yield {"type": "error", "message": "Could not read any documents"}
@@ -4158,11 +3370,41 @@ Search terms:"""
         yield {"type": "progress", "message": "🤖 Step 3: Analyzing documents and compiling comprehensive report...", "step": 3}
         await asyncio.sleep(0.1)
         
-        documents_text = "\n\n".join([f"=== {fc['path']} ===\n{fc['content']}" for fc in file_contents])
+        total_tokens = sum(fc.get("tokens") or estimate_tokens(fc["content"]) for fc in file_contents)
+        if use_map_reduce(REPORT_MODE, len(file_contents), total_tokens, single_max_files=10):
+            # Map-reduce: summarise documents/chunks concurrently, then compile from the merged notes
+            yield {"type": "progress", "message": f"🧩 Summarising {len(file_contents)} document(s) in parallel...", "step": 3}
+            
+            async def complete(prompt: str, max_tokens: int) -> str:
+                return await llm_gateway.chat_text(
+                    model="gpt-4.1-2025-04-14",
+                    messages=[{"role": "user", "content": prompt}],
+                    temperature=0.3,
+                    max_tokens=max_tokens,
+                    timeout=120
+                )
+            
+            documents_text = ""
+            async for event in map_reduce_notes(file_contents, user_message, complete):
+                if event["type"] == "notes":
+                    documents_text = event["text"]
+                else:
+                    yield {**event, "step": 3}
+            if not documents_text:
+                yield {"type": "error", "message": "No relevant information could be extracted from the documents"}
+                return
+            documents_heading = "Here are notes extracted from the relevant documents"
+        else:
+            # Fit the documents into the prompt's token budget (whole where possible, else best excerpts)
+            packed = pack_documents(file_contents, user_message)
+            documents_text = packed.text
+            documents_heading = "Here are the relevant documents"
+            if packed.trimmed:
+                yield {"type": "progress", "message": f"✂️ Fitted documents to the prompt budget: {packed.summary()}", "step": 3}
         
         compile_prompt = f"""Based on the user request: "{user_message}"
 
-Here are the relevant documents:
+{documents_heading}:
 
 {documents_text}
 
@@ -4173,12 +3415,12 @@ Return the compiled report content:"""
         yield {"type": "progress", "message": "🤖 Generating report with AI (this may take a moment)...", "step": 3}
         
         try:
-            completion = await asyncio.to_thread(
-                openai_client.chat.completions.create,
+            completion = await llm_gateway.chat(
                 model="gpt-4.1-2025-04-14",
                 messages=[{"role": "user", "content": compile_prompt}],
                 temperature=0.7,
-                max_tokens=4000
+                max_tokens=4000,
+                timeout=180
             )
             compiled_content = completion.choices[0].message.content
             
@@ -4192,6 +3434,7 @@ Return the compiled report content:"""
             target_file = DATA_DIR / output_path
             target_file.parent.mkdir(parents=True, exist_ok=True)
             target_file.write_text(compiled_content, encoding='utf-8')
+            await record_file_change(output_path, "created", source="workflow")
             
             yield {
                 "type": "complete",
@@ -4233,13 +3476,14 @@ Response:"""
         
         try:
             yield {"type": "progress", "message": "🔍 Analyzing request to determine information sources...", "step": 1}
-            completion = openai_client.chat.completions.create(
+            # Deterministic sub-call: repeated requests are served from the response cache
+            search_decision = (await llm_gateway.chat_text(
                 model="gpt-4.1-2025-04-14",
                 messages=[{"role": "user", "content": search_decision_prompt}],
                 temperature=0.3,
-                max_tokens=50
-            )
-            search_decision = completion.choices[0].message.content.strip()
+                max_tokens=50,
+                use_cache=True
+            )).strip()
             should_search = search_decision.upper().startswith("YES")
             if should_search:
                 pattern = search_decision.split(":")[-1].strip() if ":" in search_decision else " ".join([word for word in user_message.lower().split() if len(word) > 3][:3])
@@ -4258,75 +3502,24 @@ Response:"""
             yield {"type": "progress", "message": f"🔍 Searching for documents matching: '{pattern}'...", "step": 1}
             await asyncio.sleep(0.1)
             
-            # Execute file search
-            loop = asyncio.get_event_loop()
-            def search_files():
-                all_files = []
-                for root, dirs, filenames in os.walk(DATA_DIR):
-                    for filename in filenames:
-                        full_path = os.path.join(root, filename)
-                        rel_path = os.path.relpath(full_path, DATA_DIR)
-                        all_files.append({
-                            "path": rel_path.replace(os.sep, "/"),
-                            "full_path": full_path
-                        })
-                
-                pattern_lower = pattern.lower()
-                pattern_words = pattern_lower.split()
-                found_files = []
-                
-                for file_info in all_files:
-                    path_lower = file_info["path"].lower()
-                    if pattern_lower in path_lower or (len(pattern_words) > 1 and all(word in path_lower for word in pattern_words)):
-                        found_files.append(file_info["path"])
-                
-                def search_content(file_info):
-                    try:
-                        with open(file_info["full_path"], 'r', encoding='utf-8', errors='ignore') as f:
-                            content_lower = f.read().lower()
-                            if pattern_lower in content_lower or (len(pattern_words) > 1 and all(word in content_lower for word in pattern_words)):
-                                return file_info["path"]
-                    except:
-                        pass
-                    return None
-                
-                with ThreadPoolExecutor(max_workers=10) as executor:
-                    futures = {executor.submit(search_content, file_info): file_info for file_info in all_files if file_info["path"] not in found_files}
-                    for future in as_completed(futures):
-                        result = future.result()
-                        if result and result not in found_files:
-                            found_files.append(result)
-                
-                return found_files
-            
-            found_files = await loop.run_in_executor(None, search_files)
+            # Execute file search through the shared action engine
+            search_result = await action_engine.execute("find_file", {"pattern": pattern})
+            found_files = (search_result.data or {}).get("files", [])
+            total_found = (search_result.data or {}).get("total", len(found_files))
             
             if found_files:
-                yield {"type": "progress", "message": f"✅ Found {len(found_files)} relevant document(s)", "step": 1, "files": found_files[:10]}
+                yield {"type": "progress", "message": f"✅ Found {total_found} relevant document(s)", "step": 1, "files": found_files[:10]}
                 await asyncio.sleep(0.1)
                 
                 # Step 2: Read files
                 yield {"type": "progress", "message": f"📖 Step 2: Reading {min(len(found_files), 10)} document(s)...", "step": 2}
                 await asyncio.sleep(0.1)
                 
-                def read_files_sync():
-                    contents = []
-                    for file_path in found_files[:10]:
-                        try:
-                            safe_path = Path(file_path)
-                            if ".." not in str(safe_path) and not safe_path.is_absolute():
-                                target_file = DATA_DIR / safe_path
-                                if target_file.exists() and target_file.is_file():
-                                    content = target_file.read_text(encoding='utf-8', errors='ignore')
-                                    contents.append({"path": file_path, "content": content})
-                        except Exception as e:
-                            logger.error(f"Error reading {file_path}: {e}")
-                    return contents
-                
-                file_contents = await loop.run_in_executor(None, read_files_sync)
+                read_result = await action_engine.execute("read_files", {"paths": found_files[:10]})
+                file_contents = (read_result.data or {}).get("files", [])
                 
                 if file_contents:
-                    documents_text = "\n\n".join([f"=== {fc['path']} ===\n{fc['content']}" for fc in file_contents])
+                    documents_text = pack_documents(file_contents, user_message).text
                     yield {"type": "progress", "message": f"✅ Successfully gathered information from {len(file_contents)} document(s)", "step": 2}
                     await asyncio.sleep(0.1)
         else:
@@ -4371,6 +3564,7 @@ Create a professional presentation that incorporates this information."""
         target_file = DATA_DIR / output_path
         target_file.parent.mkdir(parents=True, exist_ok=True)
         target_file.write_text(slideshow_response.get("html"), encoding='utf-8')
+        await record_file_change(output_path, "created", source="workflow")
         
         yield {
             "type": "complete",
@@ -4453,7 +3647,7 @@ Guidelines:
 - Use clear, concise language"""
         
         try:
-            completion = openai_client.chat.completions.create(
+            completion = await llm_gateway.chat(
                 model="gpt-4.1-2025-04-14",
                 messages=[
                     {"role": "system", "content": system_prompt},
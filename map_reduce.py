@@ -0,0 +1,184 @@
+"""Map-reduce summarisation for report compilation over many documents.
+
+A single completion over every matched document is limited by the prompt
+budget and takes time proportional to the total input. In map-reduce mode
+the compilation workflow instead:
+
+- **map**: splits documents into chunks and extracts request-relevant notes
+  from each chunk concurrently (at most ``MAP_REDUCE_CONCURRENCY`` calls in
+  flight)
+- **reduce**: merges the notes in budget-sized batches, again concurrently,
+  until they fit one prompt. The workflow's existing compile step then
+  writes the report from them.
+
+A failed map or merge call is counted and reported rather than aborting
+the report: a failed chunk contributes no notes, and a failed merge keeps
+its batch's notes unmerged.
+
+:func:`map_reduce_notes` is an async generator. It yields ``progress``
+events as chunks finish, then one ``notes`` event with the reduced text.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Tuple
+
+from document_cache import estimate_tokens
+from document_packing import PACK_TOKEN_BUDGET, chunk_text
+
+
+logger = logging.getLogger(__name__)
+
+
+REPORT_MODE = os.getenv("REPORT_MODE", "auto")  # auto | single | map_reduce
+MAP_REDUCE_CONCURRENCY = int(os.getenv("MAP_REDUCE_CONCURRENCY", "4"))
+MAP_REDUCE_MAX_FILES = int(os.getenv("MAP_REDUCE_MAX_FILES", "200"))
+MAP_CHUNK_TOKENS = int(os.getenv("MAP_CHUNK_TOKENS", "3000"))
+MAP_NOTES_MAX_TOKENS = int(os.getenv("MAP_NOTES_MAX_TOKENS", "600"))
+REDUCE_MAX_ROUNDS = 4
+
+# (prompt, max_tokens) -> completion text
+Complete = Callable[[str, int], Awaitable[str]]
+
+MAP_PROMPT = """The user request is: "{request}"
+
+Below is {label}. Extract every fact, figure, name, date and finding relevant to the request as concise bullet notes. If nothing is relevant, reply with "NONE".
+
+{content}
+
+Notes:"""
+
+REDUCE_PROMPT = """The user request is: "{request}"
+
+Below are notes extracted from several documents. Merge them into one set of concise bullet notes, keeping every distinct fact and figure and which document it came from. Remove duplicates.
+
+{content}
+
+Merged notes:"""
+
+
+def use_map_reduce(mode: str, file_count: int, total_tokens: int, single_max_files: int) -> bool:
+    """Decide whether a compilation should run in map-reduce mode."""
+
+    if mode == "map_reduce":
+        return True
+    if mode == "single":
+        return False
+    return file_count > single_max_files or total_tokens > PACK_TOKEN_BUDGET
+
+
+def split_for_map(documents: List[Dict[str, Any]], chunk_tokens: int = MAP_CHUNK_TOKENS) -> List[Tuple[str, str]]:
+    """Return ``(label, text)`` map inputs: small documents whole, large ones in chunks."""
+
+    inputs = []
+    for doc in documents:
+        tokens = doc.get("tokens") or estimate_tokens(doc["content"])
+        if tokens <= chunk_tokens:
+            inputs.append((doc["path"], doc["content"]))
+            continue
+        chunks = chunk_text(doc["content"], chunk_tokens)
+        inputs.extend(
+            (f"{doc['path']} (part {i}/{len(chunks)})", chunk) for i, chunk in enumerate(chunks, 1)
+        )
+    return inputs
+
+
+def _batches(notes: List[str], budget_tokens: int) -> List[List[str]]:
+    batches: List[List[str]] = [[]]
+    used = 0
+    for note in notes:
+        cost = estimate_tokens(note)
+        if batches[-1] and used + cost > budget_tokens:
+            batches.append([])
+            used = 0
+        batches[-1].append(note)
+        used += cost
+    return batches
+
+
+async def map_reduce_notes(
+    documents: List[Dict[str, Any]],
+    request: str,
+    complete: Complete,
+    budget_tokens: int = PACK_TOKEN_BUDGET,
+    concurrency: int = MAP_REDUCE_CONCURRENCY,
+    chunk_tokens: int = MAP_CHUNK_TOKENS,
+) -> AsyncIterator[Dict[str, Any]]:
+    """Summarise ``documents`` (``read_files`` entries) into notes that fit ``budget_tokens``."""
+
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+    async def run(label: str, prompt: str) -> Tuple[str, str]:
+        async with semaphore:
+            return label, (await complete(prompt, MAP_NOTES_MAX_TOKENS)).strip()
+
+    inputs = split_for_map(documents, chunk_tokens)
+    total = len(inputs)
+    tasks = [
+        asyncio.create_task(run(label, MAP_PROMPT.format(
+            request=request, label=f"an excerpt of {label}", content=content
+        )))
+        for label, content in inputs
+    ]
+
+    notes: List[str] = []
+    failed = 0
+    merge_failed = 0
+    try:
+        for done, next_result in enumerate(asyncio.as_completed(tasks), 1):
+            try:
+                label, text = await next_result
+            except Exception as e:
+                failed += 1
+                logger.warning(f"Map step failed: {e}")
+                yield {"type": "progress", "stage": "map", "done": done, "total": total,
+                       "message": f"⚠️ Could not summarise a chunk ({done}/{total}): {e}"}
+                continue
+            if text and text.upper() != "NONE":
+                notes.append(f"=== {label} ===\n{text}")
+            yield {"type": "progress", "stage": "map", "done": done, "total": total,
+                   "message": f"🧩 Summarised {done}/{total}: {label}"}
+
+        rounds = 0
+        while sum(estimate_tokens(note) for note in notes) > budget_tokens and rounds < REDUCE_MAX_ROUNDS:
+            rounds += 1
+            batches = _batches(notes, budget_tokens // 2)
+            if len(batches) < 2:
+                break
+            yield {"type": "progress", "stage": "reduce", "done": 0, "total": len(batches),
+                   "message": f"🔗 Merging notes (round {rounds}, {len(batches)} batches)..."}
+            tasks = [
+                asyncio.create_task(run(f"merged notes {i}", REDUCE_PROMPT.format(
+                    request=request, content="\n\n".join(batch)
+                )))
+                for i, batch in enumerate(batches, 1)
+            ]
+            merged = await asyncio.gather(*tasks, return_exceptions=True)
+            notes = []
+            round_failed = 0
+            for batch, result in zip(batches, merged):
+                if isinstance(result, BaseException):
+                    round_failed += 1
+                    logger.warning(f"Reduce step failed: {result}")
+                    notes.extend(batch)
+                else:
+                    label, text = result
+                    notes.append(f"=== {label} ===\n{text}")
+            merge_failed += round_failed
+            if round_failed:
+                yield {"type": "progress", "stage": "reduce", "done": len(batches), "total": len(batches),
+                       "message": f"⚠️ Could not merge {round_failed} of {len(batches)} note batches; keeping them unmerged"}
+            if round_failed == len(batches):
+                break
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    logger.info(
+        f"🧩 Map-reduce produced {len(notes)} note block(s) from {total} chunk(s), "
+        f"{failed} failed, {merge_failed} merge(s) failed"
+    )
+    yield {"type": "notes", "text": "\n\n".join(notes), "chunks": total, "failed": failed, "merge_failed": merge_failed}
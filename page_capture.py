@@ -0,0 +1,227 @@
+"""Screenshot pipeline for vision-based browser actions.
+
+Vision decisions used to send a full 1280x720 PNG each time, padded by
+fixed ``sleep``/``wait_for_timeout`` calls before and after each action.
+This module replaces both:
+
+- :func:`capture` takes the screenshot and, off the event loop, scales it
+  down to ``SCREENSHOT_WIDTH`` and re-encodes it as JPEG or WebP at
+  ``SCREENSHOT_QUALITY`` (``SCREENSHOT_FORMAT=png`` keeps it lossless).
+  Coordinates the model gives in screenshot pixels are mapped back to
+  the viewport with :meth:`Screenshot.map_decision`.
+- each capture carries a 64-bit difference hash (dHash), a perceptual
+  hash that ignores small rendering noise. :class:`FrameDecisionCache`
+  reuses a decision for the same instruction on the same URL when the
+  page has not visibly changed (Hamming distance
+  ``<= SCREENSHOT_HASH_DISTANCE``), so the page is not re-analysed.
+  Nearly uniform frames (blank or loading pages, contrast below
+  ``SCREENSHOT_MIN_CONTRAST``) all hash alike and are never cached.
+- :func:`wait_for_settle` returns once the network is idle and the DOM
+  has stopped mutating for ``SETTLE_QUIET_MS``, capped at
+  ``SETTLE_TIMEOUT_MS``, instead of sleeping a fixed time.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Any, Dict, Optional, Tuple
+
+from PIL import Image, ImageStat
+
+
+logger = logging.getLogger(__name__)
+
+
+SCREENSHOT_WIDTH = int(os.getenv("SCREENSHOT_WIDTH", "1024"))  # 0 keeps the viewport size
+SCREENSHOT_FORMAT = os.getenv("SCREENSHOT_FORMAT", "jpeg").lower()  # jpeg | webp | png
+SCREENSHOT_QUALITY = int(os.getenv("SCREENSHOT_QUALITY", "70"))
+SCREENSHOT_HASH_DISTANCE = int(os.getenv("SCREENSHOT_HASH_DISTANCE", "4"))
+# Grayscale standard deviation below which a frame counts as uniform
+SCREENSHOT_MIN_CONTRAST = float(os.getenv("SCREENSHOT_MIN_CONTRAST", "2"))
+SETTLE_TIMEOUT_MS = float(os.getenv("SETTLE_TIMEOUT_MS", "3000"))
+SETTLE_QUIET_MS = float(os.getenv("SETTLE_QUIET_MS", "300"))
+
+MIME_TYPES = {"jpeg": "image/jpeg", "webp": "image/webp", "png": "image/png"}
+
+# Resolves after `quiet` ms without DOM mutations, or after `timeout` ms
+DOM_QUIET_JS = """([quiet, timeout]) => new Promise(resolve => {
+    let timer;
+    const observer = new MutationObserver(() => {
+        clearTimeout(timer);
+        timer = setTimeout(done, quiet);
+    });
+    const cap = setTimeout(done, timeout);
+    function done() {
+        observer.disconnect();
+        clearTimeout(timer);
+        clearTimeout(cap);
+        resolve();
+    }
+    observer.observe(document, {subtree: true, childList: true, attributes: true, characterData: true});
+    timer = setTimeout(done, quiet);
+})"""
+
+
+@dataclass
+class Screenshot:
+    """An encoded screenshot and how it maps back to the viewport."""
+
+    data: bytes
+    mime_type: str
+    width: int
+    height: int
+    scale: float  # viewport pixels per screenshot pixel
+    phash: int
+    contrast: float = 0.0  # grayscale standard deviation of a thumbnail
+
+    @property
+    def uniform(self) -> bool:
+        """True for blank or loading frames, whose hash says nothing about the layout."""
+
+        return self.contrast < SCREENSHOT_MIN_CONTRAST
+
+    @property
+    def data_url(self) -> str:
+        return f"data:{self.mime_type};base64,{base64.b64encode(self.data).decode('utf-8')}"
+
+    def map_decision(self, decision: Dict[str, Any]) -> Dict[str, Any]:
+        """Scale click/type ``x``/``y`` (also in plan steps) from screenshot to viewport pixels."""
+
+        plan = decision.get("plan")
+        for step in [decision, *(plan if isinstance(plan, list) else [])]:
+            if not isinstance(step, dict) or step.get("action") not in ("click", "type"):
+                continue
+            if step.get("x") is not None and step.get("y") is not None:
+                step["x"] = float(step["x"]) * self.scale
+                step["y"] = float(step["y"]) * self.scale
+        return decision
+
+
+def dhash(image: Image.Image, size: int = 8) -> int:
+    """Difference hash: one bit per horizontally adjacent pixel pair of a tiny grayscale copy."""
+
+    small = image.convert("L").resize((size + 1, size), Image.BILINEAR)
+    pixels = list(small.getdata())
+    bits = 0
+    for row in range(size):
+        for col in range(size):
+            left = pixels[row * (size + 1) + col]
+            right = pixels[row * (size + 1) + col + 1]
+            bits = (bits << 1) | (left > right)
+    return bits
+
+
+def hash_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def contrast(image: Image.Image, size: int = 64) -> float:
+    """Grayscale standard deviation of a small copy of the image."""
+
+    small = image.convert("L").resize((size, max(round(size * image.height / image.width), 1)), Image.BILINEAR)
+    return ImageStat.Stat(small).stddev[0]
+
+
+def encode_screenshot(
+    png: bytes,
+    width: int = SCREENSHOT_WIDTH,
+    fmt: str = SCREENSHOT_FORMAT,
+    quality: int = SCREENSHOT_QUALITY,
+) -> Screenshot:
+    """Downscale and re-encode a PNG screenshot (CPU-bound; run it in a thread)."""
+
+    image = Image.open(BytesIO(png))
+    image.load()
+    phash = dhash(image)
+    frame_contrast = contrast(image)
+    scale = 1.0
+    if width and image.width > width:
+        scale = image.width / width
+        image = image.resize((width, round(image.height / scale)), Image.LANCZOS)
+    fmt = fmt if fmt in MIME_TYPES else "jpeg"
+    out = BytesIO()
+    if fmt == "png":
+        image.save(out, format="PNG", optimize=True)
+    else:
+        image.convert("RGB").save(out, format=fmt.upper(), quality=quality)
+    return Screenshot(
+        data=out.getvalue(),
+        mime_type=MIME_TYPES[fmt],
+        width=image.width,
+        height=image.height,
+        scale=scale,
+        phash=phash,
+        contrast=frame_contrast,
+    )
+
+
+async def capture(page: Any, **options: Any) -> Screenshot:
+    """Screenshot the viewport and encode it per the ``SCREENSHOT_*`` settings."""
+
+    png = await page.screenshot(full_page=False, type="png")
+    shot = await asyncio.to_thread(encode_screenshot, png, **options)
+    logger.debug(f"📸 Screenshot {shot.width}x{shot.height} {shot.mime_type}: {len(png)} -> {len(shot.data)} bytes")
+    return shot
+
+
+async def wait_for_settle(page: Any, timeout_ms: float = SETTLE_TIMEOUT_MS, quiet_ms: float = SETTLE_QUIET_MS) -> float:
+    """Wait for network idle and a quiet DOM (at most ``timeout_ms``); returns seconds waited."""
+
+    started = time.perf_counter()
+    # A click may start a navigation that destroys the page's JS context mid-wait; retry once
+    for _ in range(2):
+        remaining = timeout_ms - (time.perf_counter() - started) * 1000
+        if remaining < 1:
+            break
+        try:
+            await page.wait_for_load_state("networkidle", timeout=remaining)
+            remaining = timeout_ms - (time.perf_counter() - started) * 1000
+            if remaining >= 1:
+                await page.evaluate(DOM_QUIET_JS, [quiet_ms, remaining])
+            break
+        except Exception as e:
+            logger.debug(f"Settle wait interrupted: {e}")
+    return time.perf_counter() - started
+
+
+class FrameDecisionCache:
+    """Recent vision decisions keyed by session, page URL, instruction and screenshot hash."""
+
+    def __init__(self, max_entries: int = 256, max_distance: int = SCREENSHOT_HASH_DISTANCE):
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        # (scope, url, instruction) -> (phash, decision)
+        self._entries: "OrderedDict[Tuple[str, str, str], Tuple[int, Dict[str, Any]]]" = OrderedDict()
+        self._stats = {"hits": 0, "misses": 0, "uniform": 0}
+
+    def get(self, scope: str, url: str, instruction: str, shot: Screenshot) -> Optional[Dict[str, Any]]:
+        if shot.uniform:
+            self._stats["uniform"] += 1
+            return None
+        key = (scope, url, instruction)
+        entry = self._entries.get(key)
+        if entry is not None and hash_distance(entry[0], shot.phash) <= self.max_distance:
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return dict(entry[1])
+        self._stats["misses"] += 1
+        return None
+
+    def put(self, scope: str, url: str, instruction: str, shot: Screenshot, decision: Dict[str, Any]) -> None:
+        if shot.uniform:
+            return
+        key = (scope, url, instruction)
+        self._entries[key] = (shot.phash, dict(decision))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self._stats, "entries": len(self._entries)}
@@ -0,0 +1,238 @@
+"""DOM-based perception for browser actions.
+
+The browser agent, ``/api/browser/control`` and the chat ``browser_control``
+action used to screenshot the page for every step. They then asked a
+vision model, with medium reasoning effort, for pixel coordinates.
+In ``dom`` perception mode (``BROWSER_PERCEPTION``, the default) they
+instead:
+
+1. run :data:`EXTRACT_ELEMENTS_JS` in the page, which tags every visible
+   interactive element with a ``data-agentic-id`` and returns a compact
+   indexed list (tag, role, label, placeholder, href) plus a short
+   excerpt of the page text
+2. send that list as plain text to a fast text model, which answers with
+   an element id
+3. resolve the id back to the element's on-screen centre
+
+The result uses the same ``{"action", "x", "y", "text", ...}`` shape as
+the vision path, so the existing click/type/scroll code runs unchanged.
+:func:`decide_from_dom` returns None when the page has no usable
+elements, the model asks for a screenshot, or the id cannot be resolved.
+Callers then fall back to the screenshot + vision path.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+BROWSER_PERCEPTION = os.getenv("BROWSER_PERCEPTION", "dom")  # dom | vision
+BROWSER_DOM_MODEL = os.getenv("BROWSER_DOM_MODEL", "gpt-4.1-2025-04-14")
+DOM_ELEMENT_LIMIT = int(os.getenv("DOM_ELEMENT_LIMIT", "150"))
+DOM_TEXT_CHARS = int(os.getenv("DOM_TEXT_CHARS", "1500"))
+ELEMENT_ATTRIBUTE = "data-agentic-id"
+
+EXTRACT_ELEMENTS_JS = """([limit, textChars, attr]) => {
+    const selector = [
+        'a[href]', 'button', 'input:not([type=hidden])', 'textarea', 'select', 'summary',
+        '[role=button]', '[role=link]', '[role=tab]', '[role=menuitem]', '[role=checkbox]',
+        '[role=radio]', '[role=option]', '[role=switch]', '[role=combobox]', '[role=searchbox]',
+        '[role=textbox]', '[contenteditable=""]', '[contenteditable=true]', '[onclick]'
+    ].join(',');
+    document.querySelectorAll('[' + attr + ']').forEach(el => el.removeAttribute(attr));
+    const vw = window.innerWidth, vh = window.innerHeight;
+    const clean = s => (s || '').replace(/\\s+/g, ' ').trim();
+    const elements = [];
+    for (const el of document.querySelectorAll(selector)) {
+        if (elements.length >= limit) break;
+        const rect = el.getBoundingClientRect();
+        if (rect.width < 2 || rect.height < 2) continue;
+        // Keep what is on screen or within one screen below it
+        if (rect.bottom < 0 || rect.top > vh * 2 || rect.right < 0 || rect.left > vw) continue;
+        const style = window.getComputedStyle(el);
+        if (style.visibility === 'hidden' || style.display === 'none' || el.disabled) continue;
+        const labelled = el.labels && el.labels.length ? el.labels[0].innerText : '';
+        const label = clean(
+            el.getAttribute('aria-label') || labelled || el.innerText || el.value ||
+            el.getAttribute('title') || el.getAttribute('alt') || ''
+        ).slice(0, 80);
+        const id = elements.length + 1;
+        el.setAttribute(attr, String(id));
+        elements.push({
+            id,
+            tag: el.tagName.toLowerCase(),
+            role: el.getAttribute('role') || '',
+            type: el.tagName === 'INPUT' ? (el.getAttribute('type') || 'text') : '',
+            label,
+            placeholder: clean(el.getAttribute('placeholder')).slice(0, 60),
+            href: el.tagName === 'A' ? (el.getAttribute('href') || '').slice(0, 80) : '',
+            in_view: rect.top >= 0 && rect.bottom <= vh,
+        });
+    }
+    return {
+        url: location.href,
+        title: document.title,
+        elements,
+        text: clean(document.body ? document.body.innerText : '').slice(0, textChars),
+        scroll_y: Math.round(window.scrollY),
+        page_height: document.documentElement.scrollHeight,
+        viewport_height: vh,
+    };
+}"""
+
+DOM_ACTIONS_PROMPT = """{intro}
+
+You do not see the page. You get its interactive elements, each with a numeric id, and an excerpt of its text.
+
+Available actions:
+- click: {{"action": "click", "element": <id>}}
+- type: {{"action": "type", "element": <id of the input>, "text": "text to type"}}
+- scroll: {{"action": "scroll", "x": 0, "y": <pixels, positive scrolls down>}}
+{extra_actions}- screenshot: {{"action": "screenshot"}} only if the elements and text are not enough to decide (e.g. canvas or image-only content)
+
+Return ONLY a JSON object with the chosen action's fields plus:
+  "description": "brief description of what you're doing"{extra_fields}"""
+
+
+def format_snapshot(snapshot: Dict[str, Any]) -> str:
+    """Render a page snapshot as compact prompt text."""
+
+    lines = [
+        f"URL: {snapshot.get('url', '')}",
+        f"Title: {snapshot.get('title', '')}",
+        f"Scroll: {snapshot.get('scroll_y', 0)}/{snapshot.get('page_height', 0)}px "
+        f"(viewport {snapshot.get('viewport_height', 0)}px)",
+        "Interactive elements:",
+    ]
+    for element in snapshot.get("elements", []):
+        kind = element["tag"]
+        if element.get("type"):
+            kind += f" type={element['type']}"
+        if element.get("role"):
+            kind += f" role={element['role']}"
+        line = f"[{element['id']}] {kind}"
+        if element.get("label"):
+            line += f' "{element["label"]}"'
+        if element.get("placeholder"):
+            line += f' placeholder="{element["placeholder"]}"'
+        if element.get("href"):
+            line += f" href={element['href']}"
+        if not element.get("in_view"):
+            line += " (below)"
+        lines.append(line)
+    if snapshot.get("text"):
+        lines.append(f"Page text (excerpt): {snapshot['text']}")
+    return "\n".join(lines)
+
+
+def build_dom_prompt(
+    intro: str,
+    extra_actions: Optional[List[str]] = None,
+    extra_fields: Optional[Dict[str, str]] = None,
+    notes: str = "",
+) -> str:
+    """System prompt for element-id actions; ``extra_*`` add caller-specific actions and fields."""
+
+    prompt = DOM_ACTIONS_PROMPT.format(
+        intro=intro,
+        extra_actions="".join(f"- {action}\n" for action in extra_actions or []),
+        extra_fields="".join(f',\n  "{name}": "{description}"' for name, description in (extra_fields or {}).items()),
+    )
+    return f"{prompt}\n\n{notes}" if notes else prompt
+
+
+async def snapshot_page(page: Any, limit: int = DOM_ELEMENT_LIMIT, text_chars: int = DOM_TEXT_CHARS) -> Dict[str, Any]:
+    """Tag and list the page's interactive elements."""
+
+    return await page.evaluate(EXTRACT_ELEMENTS_JS, [limit, text_chars, ELEMENT_ATTRIBUTE])
+
+
+async def element_center(page: Any, element_id: Any) -> Optional[Dict[str, float]]:
+    """Scroll a tagged element into view and return its centre in viewport pixels."""
+
+    locator = page.locator(f'[{ELEMENT_ATTRIBUTE}="{int(element_id)}"]').first
+    if await locator.count() == 0:
+        return None
+    await locator.scroll_into_view_if_needed(timeout=2000)
+    box = await locator.bounding_box()
+    if not box:
+        return None
+    return {"x": box["x"] + box["width"] / 2, "y": box["y"] + box["height"] / 2}
+
+
+async def resolve_step(page: Any, step: Dict[str, Any]) -> bool:
+    """Set a click/type step's ``x``/``y`` from its element id; False if the element is gone."""
+
+    if step.get("action") not in ("click", "type") or step.get("element") is None:
+        return True
+    try:
+        center = await element_center(page, step["element"])
+    except Exception as e:
+        logger.warning(f"Could not locate element {step.get('element')}: {e}")
+        return False
+    if center is None:
+        return False
+    step.update(center)
+    return True
+
+
+async def decide_from_dom(
+    page: Any,
+    chat: Callable[..., Awaitable[Any]],
+    system_prompt: str,
+    instruction: str,
+    model: str = BROWSER_DOM_MODEL,
+) -> Optional[Dict[str, Any]]:
+    """
+    Choose the next action from the page's element list.
+
+    Returns a decision in the vision path's shape (element ids resolved
+    to ``x``/``y``), or None when the caller should fall back to a
+    screenshot. For a multi-step ``plan`` only the first step is resolved
+    here; later steps are resolved when they run (:func:`resolve_step`).
+    """
+
+    started = time.perf_counter()
+    try:
+        snapshot = await snapshot_page(page)
+    except Exception as e:
+        logger.warning(f"DOM snapshot failed, falling back to screenshot: {e}")
+        return None
+    if not snapshot.get("elements"):
+        return None
+
+    page_text = format_snapshot(snapshot)
+    response = await chat(
+        model=model,
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": f"{instruction}\n\n{page_text}"},
+        ],
+        response_format={"type": "json_object"},
+        temperature=0,
+        timeout=30,
+    )
+    decision = json.loads(response.choices[0].message.content)
+    plan = decision.get("plan")
+    first = plan[0] if isinstance(plan, list) and plan and isinstance(plan[0], dict) else decision
+    action = first.get("action")
+    if action == "screenshot":
+        logger.info("DOM mode: model asked for a screenshot")
+        return None
+    if action == "click" and first.get("element") is None:
+        return None
+    if not await resolve_step(page, first):
+        return None
+
+    logger.info(
+        f"🧾 DOM step: {len(snapshot['elements'])} elements, {len(page_text)} chars, "
+        f"{(time.perf_counter() - started) * 1000:.0f} ms -> {action} {first.get('element', '')}"
+    )
+    return decision
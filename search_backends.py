@@ -0,0 +1,306 @@
+"""Scan-based search backends for find_file.
+
+The persistent inverted index (``file_index.py``) is the default search
+path. For corpora where scanning is preferable (e.g. data that changes
+faster than it is worth indexing) this module provides a brute-force
+content scan that shards the data directory across a worker pool:
+
+- ``thread``: ``ThreadPoolExecutor`` (I/O overlaps, but the GIL
+  serialises the lowercasing and substring checks)
+- ``process``: ``ProcessPoolExecutor`` sized to the core count, so the
+  CPU-bound matching runs in parallel
+
+Results stream back as each shard finishes, ranked within the shard
+(filename boost, then BM25 with shard-local length statistics). Select
+the backend with ``FILE_SEARCH_BACKEND=index|thread|process``.
+
+:func:`search_stream` turns any backend's ``iter_search`` into an async
+generator that stops the producer once the consumer has enough results.
+
+Run ``python search_backends.py [num_files ...]`` to benchmark the
+thread, process and indexed modes on synthetic corpora.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from file_index import (
+    INDEX_MAX_FILE_BYTES,
+    FileIndex,
+    bm25_term_score,
+    filename_score,
+    iter_data_files,
+    matches_filename,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+SEARCH_BACKEND = os.getenv("FILE_SEARCH_BACKEND", "index")
+SEARCH_WORKERS = int(os.getenv("FILE_SEARCH_WORKERS", "0")) or os.cpu_count() or 4
+SHARDS_PER_WORKER = 4
+SCAN_MODES = ("thread", "process")
+
+
+def _text_matches(text_lower: str, pattern_lower: str, pattern_words: List[str]) -> bool:
+    return pattern_lower in text_lower or (
+        len(pattern_words) > 1 and all(word in text_lower for word in pattern_words)
+    )
+
+
+def scan_shard(
+    data_dir: str,
+    rel_paths: List[str],
+    pattern_lower: str,
+    pattern_words: List[str],
+    max_bytes: int = INDEX_MAX_FILE_BYTES,
+) -> List[Dict[str, Any]]:
+    """Scan one shard of files for content matches, best first (runs inside a worker)."""
+
+    results = []
+    lengths = []
+    for rel_path in rel_paths:
+        full_path = os.path.join(data_dir, rel_path)
+        try:
+            if os.path.getsize(full_path) > max_bytes:
+                continue
+            with open(full_path, "r", encoding="utf-8", errors="ignore") as f:
+                content_lower = f.read().lower()
+        except OSError:
+            continue
+        if not _text_matches(content_lower, pattern_lower, pattern_words):
+            continue
+        matching_lines = [
+            line_no
+            for line_no, line in enumerate(content_lower.split("\n"), 1)
+            if _text_matches(line, pattern_lower, pattern_words)
+        ]
+        results.append({
+            "path": rel_path,
+            "match_type": "content",
+            "line_count": len(matching_lines),
+            "sample_lines": matching_lines[:3],
+        })
+        lengths.append(len(content_lower.split()))
+
+    avg_length = sum(lengths) / len(lengths) if lengths else 1.0
+    for result, length in zip(results, lengths):
+        # No corpus-wide document frequencies here: tf saturation and length only
+        result["score"] = round(bm25_term_score(max(result["line_count"], 1), length, avg_length), 4)
+    results.sort(key=lambda r: (-r["score"], r["path"]))
+    return results
+
+
+class ScanSearcher:
+    """
+    Sharded content scan over the data directory.
+
+    Exposes the same ``search()`` signature and result shape as
+    :class:`file_index.FileIndex`, plus :meth:`iter_search` which yields
+    results as soon as each shard completes.
+    """
+
+    def __init__(self, data_dir: Path, mode: str = "process", max_workers: int = SEARCH_WORKERS):
+        if mode not in SCAN_MODES:
+            raise ValueError(f"Unknown scan mode '{mode}', expected one of {SCAN_MODES}")
+        self.data_dir = Path(data_dir)
+        self.mode = mode
+        self.max_workers = max_workers
+        self._executor: Optional[Executor] = None
+
+    def _pool(self) -> Executor:
+        if self._executor is None:
+            if self.mode == "process":
+                # spawn: workers must not inherit the server's threads/event loop
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="search"
+                )
+        return self._executor
+
+    def iter_search(
+        self,
+        pattern: str,
+        search_content: bool = True,
+        limit: Optional[int] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """Yield ranked filename matches, then content matches as shards complete."""
+
+        pattern_lower = pattern.lower()
+        pattern_words = pattern_lower.split()
+        paths = sorted(path for path, _ in iter_data_files(self.data_dir))
+
+        filename_hits = []
+        remaining = []
+        for path in paths:
+            if matches_filename(path, pattern_lower, pattern_words):
+                filename_hits.append({
+                    "path": path, "match_type": "filename", "score": filename_score(path, pattern_lower)
+                })
+            else:
+                remaining.append(path)
+
+        emitted = 0
+        for result in sorted(filename_hits, key=lambda r: -r["score"]):
+            yield result
+            emitted += 1
+            if limit and emitted >= limit:
+                return
+
+        if not search_content or not remaining:
+            return
+
+        shard_count = max(1, min(len(remaining), self.max_workers * SHARDS_PER_WORKER))
+        shards = [remaining[i::shard_count] for i in range(shard_count)]
+        futures = [
+            self._pool().submit(scan_shard, str(self.data_dir), shard, pattern_lower, pattern_words)
+            for shard in shards
+        ]
+        try:
+            for future in as_completed(futures):
+                for result in future.result():
+                    yield result
+                    emitted += 1
+                    if limit and emitted >= limit:
+                        return
+        finally:
+            # Early termination: drop shards that have not started yet
+            for future in futures:
+                future.cancel()
+
+    def search(
+        self,
+        pattern: str,
+        search_content: bool = True,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Collect all matches: filename matches first, then content matches by score."""
+
+        results = sorted(
+            self.iter_search(pattern, search_content),
+            key=lambda r: (r["match_type"] != "filename", -r["score"], r["path"]),
+        )
+        results = [{k: v for k, v in r.items() if k != "score"} for r in results]
+        return results[:limit] if limit else results
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+async def search_stream(
+    searcher: Any,
+    pattern: str,
+    search_content: bool = True,
+    limit: Optional[int] = None,
+    executor: Optional[Executor] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Async generator over ``searcher.iter_search`` (file index or scan backend).
+
+    The blocking search runs on a worker thread and hands results to the
+    event loop as they are produced. When the consumer stops early (limit
+    reached, client disconnected) the producer is told to stop and its
+    generator is closed, which cancels any pending scan shards.
+    """
+
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    stop = threading.Event()
+    done = object()
+
+    def produce() -> None:
+        results = searcher.iter_search(pattern, search_content, limit)
+        try:
+            for result in results:
+                if stop.is_set():
+                    break
+                loop.call_soon_threadsafe(queue.put_nowait, result)
+        except Exception as e:
+            loop.call_soon_threadsafe(queue.put_nowait, e)
+        finally:
+            results.close()
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(queue.put_nowait, done)
+
+    loop.run_in_executor(executor, produce)
+    try:
+        while True:
+            item = await queue.get()
+            if item is done:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+
+def create_searcher(data_dir: Path, file_index: FileIndex, backend: str = SEARCH_BACKEND):
+    """Return the find_file search backend: the file index, or a thread/process scan."""
+
+    if backend in SCAN_MODES:
+        logger.info(f"🔎 find_file uses the {backend} scan backend ({SEARCH_WORKERS} workers)")
+        return ScanSearcher(data_dir, backend)
+    if backend != "index":
+        logger.warning(f"Unknown FILE_SEARCH_BACKEND '{backend}', using the index")
+    return file_index
+
+
+def _make_corpus(root: Path, num_files: int) -> None:
+    import random
+
+    rng = random.Random(42)
+    vocabulary = [f"word{i}" for i in range(5000)] + ["revenue", "client", "quarterly", "roadmap"]
+    for i in range(num_files):
+        folder = root / f"dir{i % 100:03d}"
+        folder.mkdir(parents=True, exist_ok=True)
+        lines = [" ".join(rng.choices(vocabulary, k=12)) for _ in range(25)]
+        (folder / f"doc{i:06d}.txt").write_text("\n".join(lines), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    import sys
+    import tempfile
+    import time
+
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10000]
+    queries = ["quarterly revenue", "client roadmap", "word4999"]
+
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            started = time.perf_counter()
+            _make_corpus(root, size)
+            print(f"\n{size} files (corpus built in {time.perf_counter() - started:.1f}s)")
+
+            index = FileIndex(root)
+            started = time.perf_counter()
+            index.sync()
+            print(f"  index build: {time.perf_counter() - started:.2f}s")
+
+            backends = [("index", index)] + [(mode, ScanSearcher(root, mode)) for mode in SCAN_MODES]
+            for name, backend in backends:
+                backend.search("warmup", search_content=False)
+                timings = []
+                for query in queries:
+                    started = time.perf_counter()
+                    hits = len(backend.search(query))
+                    timings.append(time.perf_counter() - started)
+                print(f"  {name:>7}: {sum(timings) / len(timings) * 1000:8.1f} ms/query (last query {hits} hits)")
+                if hasattr(backend, "close"):
+                    backend.close()
@@ -0,0 +1,314 @@
+"""Optional semantic (embedding) index for find_file.
+
+``find_file`` matches the literal pattern the LLM picked, so a request
+phrased differently from the documents often costs several extra
+search -> read turns. When enabled (``SEMANTIC_INDEX=1``, requires
+``numpy``) this index chunks every document under the data directory,
+embeds the chunks and answers queries with a cosine top-K over all
+chunks. find_file then adds the closest files to its literal matches.
+
+Storage lives next to the file index (``.index/semantic``): a float16
+matrix memory-mapped from ``vectors.f16`` plus a JSON manifest of chunk
+locations and the file states they were built from. Unchanged files keep
+their rows across re-syncs; only new or edited files are re-embedded.
+
+Embedders are pluggable:
+
+- ``hashing`` (default): deterministic feature hashing of words and
+  character trigrams. It needs no model download and is stable across
+  runs, which makes it suitable for tests.
+- ``sentence-transformers:<model>``: a local sentence-transformers model.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from document_packing import chunk_text
+from file_index import INDEX_DIR_NAME, INDEX_MAX_FILE_BYTES, iter_data_files, tokenize
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+
+logger = logging.getLogger(__name__)
+
+
+SEMANTIC_INDEX_ENABLED = os.getenv("SEMANTIC_INDEX", "0").lower() in ("1", "true", "yes")
+SEMANTIC_EMBEDDER = os.getenv("SEMANTIC_EMBEDDER", "hashing")
+SEMANTIC_DIM = int(os.getenv("SEMANTIC_DIM", "384"))
+SEMANTIC_CHUNK_TOKENS = int(os.getenv("SEMANTIC_CHUNK_TOKENS", "200"))
+SEMANTIC_RESCAN_SECONDS = float(os.getenv("SEMANTIC_RESCAN_SECONDS", "300"))
+# Rows scored per matrix product (bounds the float32 working copy)
+SEARCH_BLOCK_ROWS = 65536
+EMBED_BATCH = 256
+SEMANTIC_DIR_NAME = "semantic"
+
+
+@lru_cache(maxsize=200000)
+def _feature(token: str, dim: int) -> Tuple[int, float]:
+    digest = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+    return digest % dim, (1.0 if digest >> 63 else -1.0)
+
+
+class HashingEmbedder:
+    """Signed feature hashing of words (weight 1) and character trigrams (weight 0.5)."""
+
+    name = "hashing"
+
+    def __init__(self, dim: int = SEMANTIC_DIM):
+        self.dim = dim
+
+    def _features(self, text: str) -> Counter:
+        features: Counter = Counter()
+        for word in tokenize(text):
+            features[word] += 1
+            padded = f"#{word}#"
+            for i in range(len(padded) - 2):
+                features["~" + padded[i:i + 3]] += 1
+        return features
+
+    def embed(self, texts: List[str]) -> "np.ndarray":
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, count in self._features(text).items():
+                column, sign = _feature(feature, self.dim)
+                weight = 0.5 if feature.startswith("~") else 1.0
+                # Sublinear term frequency so repeated words do not dominate
+                vectors[row, column] += sign * weight * (1.0 + math.log(count))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+
+class SentenceTransformerEmbedder:
+    """Local sentence-transformers model (optional dependency)."""
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+
+        self.name = f"sentence-transformers:{model_name}"
+        self.model = SentenceTransformer(model_name)
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    def embed(self, texts: List[str]) -> "np.ndarray":
+        return self.model.encode(texts, normalize_embeddings=True, convert_to_numpy=True).astype(np.float32)
+
+
+def create_embedder(spec: str = SEMANTIC_EMBEDDER):
+    """Build the embedder named by ``spec`` (``hashing`` or ``sentence-transformers:<model>``)."""
+
+    if spec.startswith("sentence-transformers:"):
+        return SentenceTransformerEmbedder(spec.split(":", 1)[1])
+    if spec != "hashing":
+        logger.warning(f"Unknown SEMANTIC_EMBEDDER '{spec}', using the hashing embedder")
+    return HashingEmbedder()
+
+
+class SemanticIndex:
+    """
+    Chunk embeddings for the data directory with cosine top-K search.
+
+    Rows of the float16 matrix correspond one-to-one to ``self._chunks``
+    entries ``[path, start_line, end_line]``.
+    """
+
+    def __init__(self, data_dir: Path, embedder: Any = None):
+        if np is None:
+            raise RuntimeError("numpy is required for the semantic index")
+        self.data_dir = Path(data_dir)
+        self.embedder = embedder or create_embedder()
+        self.index_dir = self.data_dir / INDEX_DIR_NAME / SEMANTIC_DIR_NAME
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self.vectors_path = self.index_dir / "vectors.f16"
+        self.manifest_path = self.index_dir / "chunks.json"
+
+        self._lock = threading.RLock()
+        self._files: Dict[str, List[int]] = {}
+        self._chunks: List[List[Any]] = []
+        self._matrix: Optional["np.ndarray"] = None
+        self._last_sync = 0.0
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            manifest = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        if manifest.get("embedder") != self.embedder.name or manifest.get("dim") != self.embedder.dim:
+            logger.info("Semantic index was built with a different embedder; rebuilding")
+            return
+        self._files = manifest["files"]
+        self._chunks = manifest["chunks"]
+        self._matrix = self._open_matrix(len(self._chunks))
+
+    def _open_matrix(self, rows: int) -> Optional["np.ndarray"]:
+        if rows == 0 or not self.vectors_path.exists():
+            return None
+        return np.memmap(self.vectors_path, dtype=np.float16, mode="r", shape=(rows, self.embedder.dim))
+
+    # ------------------------------------------------------------------
+    # Building
+    # ------------------------------------------------------------------
+    def _chunk_file(self, rel_path: str) -> List[Tuple[int, int, str]]:
+        try:
+            text = (self.data_dir / rel_path).read_text(encoding="utf-8", errors="ignore")
+        except OSError as exc:
+            logger.warning(f"Could not embed {rel_path}: {exc}")
+            return []
+        chunks = []
+        line = 1
+        for chunk in chunk_text(text, SEMANTIC_CHUNK_TOKENS):
+            lines = chunk.count("\n")
+            if chunk.strip():
+                chunks.append((line, line + max(lines - (1 if chunk.endswith("\n") else 0), 0), chunk))
+            line += lines
+        return chunks
+
+    def sync(self) -> Dict[str, int]:
+        """Re-embed new and changed files, drop deleted ones and rewrite the matrix."""
+
+        started = time.perf_counter()
+        with self._lock:
+            current = {
+                path: [stat.st_mtime_ns, stat.st_size]
+                for path, stat in iter_data_files(self.data_dir)
+                if stat.st_size <= INDEX_MAX_FILE_BYTES
+            }
+            changed = [path for path, state in current.items() if self._files.get(path) != state]
+            removed = [path for path in self._files if path not in current]
+            if not changed and not removed:
+                self._last_sync = time.time()
+                return {"embedded": 0, "removed": 0, "chunks": len(self._chunks)}
+
+            changed_set = set(changed)
+            keep_rows = [
+                row for row, (path, _, _) in enumerate(self._chunks)
+                if path in current and path not in changed_set
+            ]
+            chunks = [self._chunks[row] for row in keep_rows]
+            new_texts: List[str] = []
+            for path in sorted(changed):
+                for start_line, end_line, text in self._chunk_file(path):
+                    chunks.append([path, start_line, end_line])
+                    new_texts.append(f"{path}\n{text}")
+
+            tmp_path = self.vectors_path.with_suffix(".tmp")
+            if chunks:
+                matrix = np.memmap(tmp_path, dtype=np.float16, mode="w+", shape=(len(chunks), self.embedder.dim))
+                if keep_rows:
+                    matrix[:len(keep_rows)] = self._matrix[keep_rows]
+                for start in range(0, len(new_texts), EMBED_BATCH):
+                    row = len(keep_rows) + start
+                    batch = new_texts[start:start + EMBED_BATCH]
+                    matrix[row:row + len(batch)] = self.embedder.embed(batch).astype(np.float16)
+                matrix.flush()
+                del matrix
+                self._matrix = None
+                os.replace(tmp_path, self.vectors_path)
+            else:
+                self._matrix = None
+                self.vectors_path.unlink(missing_ok=True)
+
+            self._files = current
+            self._chunks = chunks
+            self._matrix = self._open_matrix(len(chunks))
+            manifest = {"embedder": self.embedder.name, "dim": self.embedder.dim, "files": current, "chunks": chunks}
+            self.manifest_path.write_text(json.dumps(manifest), encoding="utf-8")
+            self._last_sync = time.time()
+
+        logger.info(
+            f"🧭 Semantic index synced in {(time.perf_counter() - started) * 1000:.1f} ms "
+            f"({len(changed)} embedded, {len(removed)} removed, {len(chunks)} chunks)"
+        )
+        return {"embedded": len(changed), "removed": len(removed), "chunks": len(chunks)}
+
+    def mark_stale(self) -> None:
+        """Re-sync (incrementally) before the next search, e.g. after a write."""
+
+        self._last_sync = 0.0
+
+    def ensure_fresh(self) -> None:
+        if time.time() - self._last_sync > SEMANTIC_RESCAN_SECONDS:
+            self.sync()
+
+    # ------------------------------------------------------------------
+    # Querying
+    # ------------------------------------------------------------------
+    def search(self, query: str, k: int = 10) -> List[Dict[str, Any]]:
+        """Return up to ``k`` files ranked by their best chunk's cosine similarity."""
+
+        self.ensure_fresh()
+        with self._lock:
+            if self._matrix is None or not query.strip():
+                return []
+            q = self.embedder.embed([query])[0].astype(np.float32)
+            rows = self._matrix.shape[0]
+            scores = np.empty(rows, dtype=np.float32)
+            for start in range(0, rows, SEARCH_BLOCK_ROWS):
+                block = np.asarray(self._matrix[start:start + SEARCH_BLOCK_ROWS], dtype=np.float32)
+                scores[start:start + len(block)] = block @ q
+
+            # Over-fetch chunks: several of the best may belong to the same file
+            candidates = min(rows, k * 8)
+            top = np.argpartition(-scores, candidates - 1)[:candidates]
+            best: Dict[str, Dict[str, Any]] = {}
+            for row in top[np.argsort(-scores[top])]:
+                path, start_line, end_line = self._chunks[row]
+                if path not in best:
+                    best[path] = {
+                        "path": path,
+                        "match_type": "semantic",
+                        "score": round(float(scores[row]), 4),
+                        "lines": [start_line, end_line],
+                    }
+                if len(best) >= k:
+                    break
+            return list(best.values())
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "embedder": self.embedder.name,
+                "dim": self.embedder.dim,
+                "files": len(self._files),
+                "chunks": len(self._chunks),
+                "matrix_bytes": len(self._chunks) * self.embedder.dim * 2,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._matrix = None
+
+
+# Global semantic index instance (will be initialized in main.py)
+semantic_index: Optional[SemanticIndex] = None
+
+
+def get_semantic_index() -> Optional[SemanticIndex]:
+    """Get the global semantic index instance (None when disabled)"""
+    return semantic_index
+
+
+def initialize_semantic_index(data_dir: Path, enabled: bool = SEMANTIC_INDEX_ENABLED) -> Optional[SemanticIndex]:
+    """Initialize the global semantic index if enabled and numpy is available"""
+    global semantic_index
+    if not enabled:
+        return None
+    if np is None:
+        logger.warning("SEMANTIC_INDEX is enabled but numpy is not installed; semantic search disabled")
+        return None
+    semantic_index = SemanticIndex(data_dir)
+    logger.info(f"🧭 Semantic index initialized ({semantic_index.embedder.name}, {len(semantic_index._chunks)} chunks)")
+    return semantic_index
@@ -0,0 +1,331 @@
+"""Bounded conversation session store for Agentic OS.
+
+Chat history used to live in a module-level dict that gained an entry
+for every session (including one per ``email_command_<id>`` session)
+and never shrank. Sessions now go through a store with:
+
+- a per-session TTL, refreshed on every write
+- a global LRU cap on the number of sessions
+- a per-session cap on stored messages
+- lazy reads that load only the last N messages a request needs
+
+Two backends are available: ``memory`` (bounded, lost on restart) and
+``sqlite`` (survives restarts). Select one with ``SESSION_STORE_BACKEND``.
+"""
+
+from __future__ import annotations
+
+import abc
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+
+logger = logging.getLogger(__name__)
+
+# Roles are stored as one character
+ROLE_CODES = {"user": "u", "assistant": "a", "system": "s"}
+ROLE_NAMES = {code: role for role, code in ROLE_CODES.items()}
+
+
+class SessionStoreConfig(BaseModel):
+    """Configuration for the conversation session store"""
+    backend: str = os.getenv("SESSION_STORE_BACKEND", "sqlite")
+    sqlite_path: str = os.getenv("SESSION_STORE_PATH", "sessions.sqlite3")
+    ttl_seconds: float = float(os.getenv("SESSION_TTL_SECONDS", str(7 * 24 * 3600)))
+    max_sessions: int = int(os.getenv("SESSION_MAX_SESSIONS", "10000"))
+    max_messages: int = int(os.getenv("SESSION_MAX_MESSAGES", "20"))
+    # Expired sessions are swept at most this often
+    prune_interval_seconds: float = 60.0
+
+
+class SessionStore(abc.ABC):
+    """Common interface: ``get_history``, ``append``, ``clear``, ``prune``, ``get_stats``."""
+
+    def __init__(self, config: SessionStoreConfig):
+        self.config = config
+        self._lock = threading.Lock()
+        self._last_prune = time.time()
+        self._stats = {"reads": 0, "writes": 0, "expired": 0, "evictions": 0}
+
+    def _maybe_prune(self) -> None:
+        if time.time() - self._last_prune >= self.config.prune_interval_seconds:
+            self._last_prune = time.time()
+            self._prune_locked()
+
+    def prune(self) -> int:
+        """Drop expired sessions now; returns how many were removed."""
+
+        with self._lock:
+            self._last_prune = time.time()
+            return self._prune_locked()
+
+    @abc.abstractmethod
+    def _prune_locked(self) -> int:
+        ...
+
+    @abc.abstractmethod
+    def get_history(self, session_id: str, max_messages: int) -> List[Dict[str, str]]:
+        ...
+
+    @abc.abstractmethod
+    def append(self, session_id: str, messages: List[Dict[str, str]], ttl_seconds: Optional[float] = None) -> None:
+        ...
+
+    @abc.abstractmethod
+    def clear(self, session_id: str) -> None:
+        ...
+
+    @abc.abstractmethod
+    def get_stats(self) -> Dict[str, Any]:
+        ...
+
+    def close(self) -> None:
+        pass
+
+
+class MemorySessionStore(SessionStore):
+    """In-process LRU of sessions, each a bounded deque of ``(role_code, content)`` tuples."""
+
+    def __init__(self, config: SessionStoreConfig):
+        super().__init__(config)
+        # session_id -> (expires_at, ttl_seconds, messages)
+        self._sessions: "OrderedDict[str, Tuple[float, float, Deque[Tuple[str, str]]]]" = OrderedDict()
+
+    def get_history(self, session_id: str, max_messages: int) -> List[Dict[str, str]]:
+        with self._lock:
+            self._stats["reads"] += 1
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return []
+            if entry[0] < time.time():
+                del self._sessions[session_id]
+                self._stats["expired"] += 1
+                return []
+            self._sessions.move_to_end(session_id)
+            messages = list(entry[2])[-max_messages:] if max_messages > 0 else []
+            return [{"role": ROLE_NAMES[role], "content": content} for role, content in messages]
+
+    def append(self, session_id: str, messages: List[Dict[str, str]], ttl_seconds: Optional[float] = None) -> None:
+        with self._lock:
+            self._stats["writes"] += 1
+            entry = self._sessions.pop(session_id, None)
+            history = entry[2] if entry else deque(maxlen=self.config.max_messages)
+            ttl = ttl_seconds if ttl_seconds is not None else (entry[1] if entry else self.config.ttl_seconds)
+            history.extend((ROLE_CODES[m["role"]], m["content"]) for m in messages)
+            self._sessions[session_id] = (time.time() + ttl, ttl, history)
+            while len(self._sessions) > self.config.max_sessions:
+                self._sessions.popitem(last=False)
+                self._stats["evictions"] += 1
+            self._maybe_prune()
+
+    def clear(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def _prune_locked(self) -> int:
+        now = time.time()
+        expired = [session_id for session_id, entry in self._sessions.items() if entry[0] < now]
+        for session_id in expired:
+            del self._sessions[session_id]
+        self._stats["expired"] += len(expired)
+        return len(expired)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                "backend": "memory",
+                "sessions": len(self._sessions),
+                "messages": sum(len(entry[2]) for entry in self._sessions.values()),
+            }
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    SQLite-backed sessions that survive restarts.
+
+    ``sessions`` holds expiry and last access per session (the LRU order);
+    ``messages`` holds one row per message, trimmed to ``max_messages`` on
+    every append, and reads select only the last N rows. Reads never write:
+    they note the access time in memory, and the next append flushes it to
+    ``last_access``. Expired sessions are deleted by the periodic prune.
+    """
+
+    def __init__(self, config: SessionStoreConfig):
+        super().__init__(config)
+        # session_id -> last read time not yet written to sessions.last_access
+        self._pending_access: Dict[str, float] = {}
+        Path(config.sqlite_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(config.sqlite_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                expires_at REAL NOT NULL,
+                ttl_seconds REAL NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS sessions_last_access ON sessions (last_access);
+            CREATE INDEX IF NOT EXISTS sessions_expires_at ON sessions (expires_at);
+            CREATE TABLE IF NOT EXISTS messages (
+                session_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                role TEXT NOT NULL,
+                content TEXT NOT NULL,
+                PRIMARY KEY (session_id, seq)
+            ) WITHOUT ROWID;
+            """
+        )
+        with self._lock:
+            removed = self._prune_locked()
+        if removed:
+            logger.info(f"🗂️ Dropped {removed} expired session(s) on startup")
+
+    def get_history(self, session_id: str, max_messages: int) -> List[Dict[str, str]]:
+        now = time.time()
+        with self._lock:
+            self._stats["reads"] += 1
+            row = self._conn.execute(
+                "SELECT expires_at FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            if row is None or row[0] < now or max_messages <= 0:
+                return []
+            self._pending_access[session_id] = now
+            rows = self._conn.execute(
+                "SELECT role, content FROM messages WHERE session_id = ? ORDER BY seq DESC LIMIT ?",
+                (session_id, max_messages),
+            ).fetchall()
+        return [{"role": ROLE_NAMES[role], "content": content} for role, content in reversed(rows)]
+
+    def append(self, session_id: str, messages: List[Dict[str, str]], ttl_seconds: Optional[float] = None) -> None:
+        now = time.time()
+        with self._lock:
+            self._stats["writes"] += 1
+            row = self._conn.execute(
+                "SELECT ttl_seconds FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            ttl = ttl_seconds if ttl_seconds is not None else (row[0] if row else self.config.ttl_seconds)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, expires_at, ttl_seconds, last_access) VALUES (?, ?, ?, ?)",
+                (session_id, now + ttl, ttl, now),
+            )
+            last_seq = self._conn.execute(
+                "SELECT COALESCE(MAX(seq), 0) FROM messages WHERE session_id = ?", (session_id,)
+            ).fetchone()[0]
+            self._conn.executemany(
+                "INSERT INTO messages (session_id, seq, role, content) VALUES (?, ?, ?, ?)",
+                [
+                    (session_id, last_seq + i, ROLE_CODES[m["role"]], m["content"])
+                    for i, m in enumerate(messages, 1)
+                ],
+            )
+            self._conn.execute(
+                "DELETE FROM messages WHERE session_id = ? AND seq <= ?",
+                (session_id, last_seq + len(messages) - self.config.max_messages),
+            )
+            self._pending_access.pop(session_id, None)
+            self._flush_access()
+            if row is None:
+                self._evict_over_cap()
+            self._maybe_prune()
+            self._conn.commit()
+
+    def _flush_access(self) -> None:
+        if self._pending_access:
+            self._conn.executemany(
+                "UPDATE sessions SET last_access = ? WHERE session_id = ?",
+                [(accessed, session_id) for session_id, accessed in self._pending_access.items()],
+            )
+            self._pending_access.clear()
+
+    def _evict_over_cap(self) -> None:
+        count = self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        excess = count - self.config.max_sessions
+        if excess <= 0:
+            return
+        victims = [
+            row[0] for row in self._conn.execute(
+                "SELECT session_id FROM sessions ORDER BY last_access LIMIT ?", (excess,)
+            )
+        ]
+        for session_id in victims:
+            self._delete(session_id)
+        self._stats["evictions"] += len(victims)
+
+    def _delete(self, session_id: str) -> None:
+        self._pending_access.pop(session_id, None)
+        self._conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+        self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def clear(self, session_id: str) -> None:
+        with self._lock:
+            self._delete(session_id)
+            self._conn.commit()
+
+    def _prune_locked(self) -> int:
+        expired = [
+            row[0] for row in self._conn.execute(
+                "SELECT session_id FROM sessions WHERE expires_at < ?", (time.time(),)
+            )
+        ]
+        for session_id in expired:
+            self._delete(session_id)
+        self._conn.commit()
+        self._stats["expired"] += len(expired)
+        return len(expired)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                "backend": "sqlite",
+                "sessions": self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0],
+                "messages": self._conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0],
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_access()
+            self._conn.commit()
+            self._conn.close()
+
+
+def create_session_store(config: Optional[SessionStoreConfig] = None) -> SessionStore:
+    """Build the configured session store backend."""
+
+    config = config or SessionStoreConfig()
+    if config.backend == "memory":
+        return MemorySessionStore(config)
+    if config.backend != "sqlite":
+        logger.warning(f"Unknown SESSION_STORE_BACKEND '{config.backend}', using sqlite")
+    return SQLiteSessionStore(config)
+
+
+# Global session store instance (will be initialized in main.py)
+session_store: Optional[SessionStore] = None
+
+
+def get_session_store() -> SessionStore:
+    """Get the global session store instance"""
+    global session_store
+    if session_store is None:
+        raise RuntimeError("Session store not initialized. Call initialize_session_store() first.")
+    return session_store
+
+
+def initialize_session_store(config: Optional[SessionStoreConfig] = None) -> SessionStore:
+    """Initialize the global session store instance"""
+    global session_store
+    session_store = create_session_store(config)
+    logger.info(f"🗂️ Session store initialized ({session_store.config.backend})")
+    return session_store
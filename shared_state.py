@@ -0,0 +1,471 @@
+"""Shared state for running Agentic OS under ``uvicorn --workers N``.
+
+Process globals cannot be seen by sibling workers. State that must be
+shared (email notifications, the processed-email set, the inbox cache,
+browser session ownership) goes through a :class:`StateBackend`:
+
+- documents: JSON values by ``(namespace, key)``, listed in creation order
+- sets: atomic ``add_member`` returns whether the caller added it first,
+  so two workers can never both claim the same email
+- leases: expiring named locks used for leader election and worker
+  liveness
+- mailbox: per-worker request/reply messages, used to forward browser
+  requests to the worker that owns the session
+
+``SQLiteStateBackend`` works across processes on one host (WAL mode,
+SQLite's file locking). ``MemoryStateBackend`` is for single-process use
+and tests. Select one with ``STATE_BACKEND=sqlite|memory``.
+
+:class:`LeaderElector` keeps a lease renewed and runs a coroutine only
+while this worker holds it. The email monitor runs this way, so exactly
+one worker polls the inbox and a new leader takes over if it dies.
+"""
+
+from __future__ import annotations
+
+import abc
+import asyncio
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from pydantic import BaseModel
+
+
+logger = logging.getLogger(__name__)
+
+# Unique per worker process
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+# Mailbox messages (and unclaimed replies) older than this are dropped
+MAILBOX_MAX_AGE_SECONDS = float(os.getenv("MAILBOX_MAX_AGE_SECONDS", "600"))
+
+
+class StateConfig(BaseModel):
+    """Configuration for the shared state backend"""
+    backend: str = os.getenv("STATE_BACKEND", "sqlite")
+    sqlite_path: str = os.getenv("STATE_DB_PATH", "agentic_state.sqlite3")
+    leader_lease_seconds: float = float(os.getenv("LEADER_LEASE_SECONDS", "15"))
+    worker_lease_seconds: float = float(os.getenv("WORKER_LEASE_SECONDS", "15"))
+
+
+class StateBackend(abc.ABC):
+    """Interface shared by the memory and SQLite backends."""
+
+    # Documents
+    @abc.abstractmethod
+    def get(self, namespace: str, key: str, default: Any = None) -> Any:
+        ...
+
+    @abc.abstractmethod
+    def put(self, namespace: str, key: str, value: Any) -> None:
+        ...
+
+    @abc.abstractmethod
+    def delete(self, namespace: str, key: str) -> None:
+        ...
+
+    @abc.abstractmethod
+    def values(self, namespace: str) -> List[Any]:
+        ...
+
+    # Sets
+    @abc.abstractmethod
+    def add_member(self, namespace: str, member: str) -> bool:
+        ...
+
+    @abc.abstractmethod
+    def has_member(self, namespace: str, member: str) -> bool:
+        ...
+
+    @abc.abstractmethod
+    def count_members(self, namespace: str) -> int:
+        ...
+
+    # Leases
+    @abc.abstractmethod
+    def acquire_lease(self, name: str, owner: str, ttl_seconds: float) -> bool:
+        ...
+
+    @abc.abstractmethod
+    def release_lease(self, name: str, owner: str) -> None:
+        ...
+
+    @abc.abstractmethod
+    def lease_owner(self, name: str) -> Optional[str]:
+        ...
+
+    # Mailbox
+    @abc.abstractmethod
+    def send(self, recipient: str, payload: Dict[str, Any]) -> int:
+        ...
+
+    @abc.abstractmethod
+    def receive(self, recipient: str, limit: int = 10) -> List[Tuple[int, Dict[str, Any]]]:
+        ...
+
+    @abc.abstractmethod
+    def reply(self, message_id: int, payload: Dict[str, Any]) -> None:
+        ...
+
+    @abc.abstractmethod
+    def take_reply(self, message_id: int) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abc.abstractmethod
+    def purge_mailbox(self, max_age_seconds: float = MAILBOX_MAX_AGE_SECONDS) -> int:
+        """Drop messages older than ``max_age_seconds`` whose sender gave up; returns how many."""
+
+    def close(self) -> None:
+        pass
+
+
+class MemoryStateBackend(StateBackend):
+    """Process-local backend (single worker, tests)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._docs: Dict[str, "OrderedDict[str, str]"] = {}
+        self._sets: Dict[str, Set[str]] = {}
+        self._leases: Dict[str, Tuple[str, float]] = {}
+        self._mailbox: Dict[int, Dict[str, Any]] = {}
+        self._next_message = 1
+
+    def get(self, namespace: str, key: str, default: Any = None) -> Any:
+        with self._lock:
+            raw = self._docs.get(namespace, {}).get(key)
+        return default if raw is None else json.loads(raw)
+
+    def put(self, namespace: str, key: str, value: Any) -> None:
+        raw = json.dumps(value)
+        with self._lock:
+            self._docs.setdefault(namespace, OrderedDict())[key] = raw
+
+    def delete(self, namespace: str, key: str) -> None:
+        with self._lock:
+            self._docs.get(namespace, {}).pop(key, None)
+
+    def values(self, namespace: str) -> List[Any]:
+        with self._lock:
+            raws = list(self._docs.get(namespace, {}).values())
+        return [json.loads(raw) for raw in raws]
+
+    def add_member(self, namespace: str, member: str) -> bool:
+        with self._lock:
+            members = self._sets.setdefault(namespace, set())
+            if member in members:
+                return False
+            members.add(member)
+            return True
+
+    def has_member(self, namespace: str, member: str) -> bool:
+        with self._lock:
+            return member in self._sets.get(namespace, set())
+
+    def count_members(self, namespace: str) -> int:
+        with self._lock:
+            return len(self._sets.get(namespace, set()))
+
+    def acquire_lease(self, name: str, owner: str, ttl_seconds: float) -> bool:
+        now = time.time()
+        with self._lock:
+            current = self._leases.get(name)
+            if current and current[0] != owner and current[1] > now:
+                return False
+            self._leases[name] = (owner, now + ttl_seconds)
+            return True
+
+    def release_lease(self, name: str, owner: str) -> None:
+        with self._lock:
+            if self._leases.get(name, (None,))[0] == owner:
+                del self._leases[name]
+
+    def lease_owner(self, name: str) -> Optional[str]:
+        with self._lock:
+            current = self._leases.get(name)
+        return current[0] if current and current[1] > time.time() else None
+
+    def send(self, recipient: str, payload: Dict[str, Any]) -> int:
+        with self._lock:
+            message_id = self._next_message
+            self._next_message += 1
+            self._mailbox[message_id] = {
+                "recipient": recipient,
+                "payload": payload,
+                "claimed": False,
+                "reply": None,
+                "created_at": time.time(),
+            }
+            return message_id
+
+    def receive(self, recipient: str, limit: int = 10) -> List[Tuple[int, Dict[str, Any]]]:
+        with self._lock:
+            messages = []
+            for message_id, message in self._mailbox.items():
+                if message["recipient"] == recipient and not message["claimed"]:
+                    message["claimed"] = True
+                    messages.append((message_id, message["payload"]))
+                    if len(messages) >= limit:
+                        break
+            return messages
+
+    def reply(self, message_id: int, payload: Dict[str, Any]) -> None:
+        with self._lock:
+            if message_id in self._mailbox:
+                self._mailbox[message_id]["reply"] = payload
+
+    def take_reply(self, message_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            message = self._mailbox.get(message_id)
+            if message is None or message["reply"] is None:
+                return None
+            del self._mailbox[message_id]
+            return message["reply"]
+
+    def purge_mailbox(self, max_age_seconds: float = MAILBOX_MAX_AGE_SECONDS) -> int:
+        cutoff = time.time() - max_age_seconds
+        with self._lock:
+            stale = [message_id for message_id, message in self._mailbox.items() if message["created_at"] < cutoff]
+            for message_id in stale:
+                del self._mailbox[message_id]
+        return len(stale)
+
+
+class SQLiteStateBackend(StateBackend):
+    """Backend shared by all worker processes through one SQLite file."""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS docs (
+        namespace TEXT NOT NULL,
+        key TEXT NOT NULL,
+        value TEXT NOT NULL,
+        PRIMARY KEY (namespace, key)
+    );
+    CREATE TABLE IF NOT EXISTS members (
+        namespace TEXT NOT NULL,
+        member TEXT NOT NULL,
+        PRIMARY KEY (namespace, member)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS leases (
+        name TEXT PRIMARY KEY,
+        owner TEXT NOT NULL,
+        expires_at REAL NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS mailbox (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        recipient TEXT NOT NULL,
+        payload TEXT NOT NULL,
+        claimed INTEGER NOT NULL DEFAULT 0,
+        reply TEXT,
+        created_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS mailbox_recipient ON mailbox (recipient, claimed);
+    """
+
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # isolation_level=None: explicit BEGIN IMMEDIATE for read-modify-write operations
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+        self.purge_mailbox()
+
+    def _write(self, sql: str, params: Tuple = ()) -> sqlite3.Cursor:
+        with self._lock:
+            return self._conn.execute(sql, params)
+
+    def get(self, namespace: str, key: str, default: Any = None) -> Any:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM docs WHERE namespace = ? AND key = ?", (namespace, key)
+            ).fetchone()
+        return default if row is None else json.loads(row[0])
+
+    def put(self, namespace: str, key: str, value: Any) -> None:
+        # Upsert keeps the rowid, so values() stays in creation order
+        self._write(
+            "INSERT INTO docs (namespace, key, value) VALUES (?, ?, ?) "
+            "ON CONFLICT (namespace, key) DO UPDATE SET value = excluded.value",
+            (namespace, key, json.dumps(value)),
+        )
+
+    def delete(self, namespace: str, key: str) -> None:
+        self._write("DELETE FROM docs WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def values(self, namespace: str) -> List[Any]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT value FROM docs WHERE namespace = ? ORDER BY rowid", (namespace,)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def add_member(self, namespace: str, member: str) -> bool:
+        cursor = self._write(
+            "INSERT OR IGNORE INTO members (namespace, member) VALUES (?, ?)", (namespace, member)
+        )
+        return cursor.rowcount == 1
+
+    def has_member(self, namespace: str, member: str) -> bool:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM members WHERE namespace = ? AND member = ?", (namespace, member)
+            ).fetchone() is not None
+
+    def count_members(self, namespace: str) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM members WHERE namespace = ?", (namespace,)
+            ).fetchone()[0]
+
+    def acquire_lease(self, name: str, owner: str, ttl_seconds: float) -> bool:
+        now = time.time()
+        # Take the lease if it is free, expired or already ours (renewal)
+        cursor = self._write(
+            "INSERT INTO leases (name, owner, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+            "WHERE leases.owner = excluded.owner OR leases.expires_at < ?",
+            (name, owner, now + ttl_seconds, now),
+        )
+        return cursor.rowcount == 1
+
+    def release_lease(self, name: str, owner: str) -> None:
+        self._write("DELETE FROM leases WHERE name = ? AND owner = ?", (name, owner))
+
+    def lease_owner(self, name: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT owner FROM leases WHERE name = ? AND expires_at >= ?", (name, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def send(self, recipient: str, payload: Dict[str, Any]) -> int:
+        cursor = self._write(
+            "INSERT INTO mailbox (recipient, payload, created_at) VALUES (?, ?, ?)",
+            (recipient, json.dumps(payload), time.time()),
+        )
+        return cursor.lastrowid
+
+    def receive(self, recipient: str, limit: int = 10) -> List[Tuple[int, Dict[str, Any]]]:
+        with self._lock:
+            # Idle workers poll often: look for mail with a plain read before taking the write lock
+            if self._conn.execute(
+                "SELECT 1 FROM mailbox WHERE recipient = ? AND claimed = 0 LIMIT 1", (recipient,)
+            ).fetchone() is None:
+                return []
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT id, payload FROM mailbox WHERE recipient = ? AND claimed = 0 ORDER BY id LIMIT ?",
+                    (recipient, limit),
+                ).fetchall()
+                self._conn.executemany("UPDATE mailbox SET claimed = 1 WHERE id = ?", [(row[0],) for row in rows])
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [(message_id, json.loads(payload)) for message_id, payload in rows]
+
+    def reply(self, message_id: int, payload: Dict[str, Any]) -> None:
+        self._write("UPDATE mailbox SET reply = ? WHERE id = ?", (json.dumps(payload), message_id))
+
+    def take_reply(self, message_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT reply FROM mailbox WHERE id = ? AND reply IS NOT NULL", (message_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("DELETE FROM mailbox WHERE id = ?", (message_id,))
+        return json.loads(row[0])
+
+    def purge_mailbox(self, max_age_seconds: float = MAILBOX_MAX_AGE_SECONDS) -> int:
+        return self._write("DELETE FROM mailbox WHERE created_at < ?", (time.time() - max_age_seconds,)).rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class LeaderElector:
+    """
+    Run ``start()`` only while this worker holds the ``name`` lease.
+
+    The lease is renewed every third of its TTL. If renewal fails (another
+    worker took over after a stall) the running task is cancelled.
+    """
+
+    def __init__(self, backend: StateBackend, name: str, ttl_seconds: float, owner: str = WORKER_ID):
+        self.backend = backend
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.owner = owner
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def run(self, start: Callable[[], Awaitable[Any]]) -> None:
+        try:
+            while True:
+                try:
+                    leader = await asyncio.to_thread(
+                        self.backend.acquire_lease, self.name, self.owner, self.ttl_seconds
+                    )
+                except Exception as e:
+                    logger.warning(f"Lease renewal for {self.name} failed: {e}")
+                    leader = False
+                if leader and not self.is_leader:
+                    logger.info(f"👑 Worker {self.owner} is leader for {self.name}")
+                    self._task = asyncio.create_task(start())
+                elif not leader and self._task is not None:
+                    logger.info(f"Worker {self.owner} lost the {self.name} lease")
+                    self._task.cancel()
+                    self._task = None
+                await asyncio.sleep(self.ttl_seconds / 3)
+        finally:
+            if self._task is not None:
+                self._task.cancel()
+            self.backend.release_lease(self.name, self.owner)
+
+
+def create_state_backend(config: Optional[StateConfig] = None) -> StateBackend:
+    """Build the configured state backend."""
+
+    config = config or StateConfig()
+    if config.backend == "memory":
+        return MemoryStateBackend()
+    if config.backend != "sqlite":
+        logger.warning(f"Unknown STATE_BACKEND '{config.backend}', using sqlite")
+    return SQLiteStateBackend(config.sqlite_path)
+
+
+# Global state backend instance (will be initialized in main.py)
+state_backend: Optional[StateBackend] = None
+state_config: StateConfig = StateConfig()
+
+
+def get_state_backend() -> StateBackend:
+    """Get the global state backend instance"""
+    global state_backend
+    if state_backend is None:
+        raise RuntimeError("State backend not initialized. Call initialize_state_backend() first.")
+    return state_backend
+
+
+def initialize_state_backend(config: Optional[StateConfig] = None) -> StateBackend:
+    """Initialize the global state backend instance"""
+    global state_backend, state_config
+    state_config = config or StateConfig()
+    state_backend = create_state_backend(state_config)
+    logger.info(f"🗄️ State backend initialized ({state_config.backend}, worker {WORKER_ID})")
+    return state_backend
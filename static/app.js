@@ -505,7 +505,12 @@ function closeWindow(windowId) {
     
     // Clean up browser session if it's a browser window
     if (win.app === 'browser') {
+        const sessionId = browserWindowSessions.get(windowId);
         browserWindowSessions.delete(windowId);
+        if (sessionId) {
+            // Return the server-side browser context to the pool
+            fetch(`/api/browser/session/${sessionId}`, { method: 'DELETE' }).catch(() => {});
+        }
     }
     
     win.element.remove();
@@ -698,34 +703,51 @@ chatForm.addEventListener('submit', async (e) => {
     
     // Send to backend
     try {
-        const response = await fetch('/api/chat', {
+        const response = await fetch('/api/chat/sse', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({ message })
         });
         
+        let data = null;
+        let assistantMessageId = null;
+        
         // Check if response is streaming (text/event-stream)
         const contentType = response.headers.get('content-type');
         if (contentType && contentType.includes('text/event-stream')) {
-            // Handle streaming response for compilation requests
+            // Handle streamed tokens, the final chat result, and compilation/slideshow updates
             const reader = response.body.getReader();
             const decoder = new TextDecoder();
-            let assistantMessageId = null;
+            let streamedText = '';
+            let pending = '';
             
             while (true) {
                 const { done, value } = await reader.read();
                 if (done) break;
                 
-                const chunk = decoder.decode(value, { stream: true });
-                const lines = chunk.split('\n');
+                // Events can be split across reads - keep the trailing partial line
+                pending += decoder.decode(value, { stream: true });
+                const lines = pending.split('\n');
+                pending = lines.pop();
                 
                 for (const line of lines) {
                     if (line.startsWith('data: ')) {
                         try {
                             const update = JSON.parse(line.slice(6));
-                            console.log('Received update:', update); // Debug log
                             
-                            if (update.type === 'progress') {
+                            if (update.type === 'token') {
+                                streamedText += update.text;
+                                if (!assistantMessageId) {
+                                    assistantMessageId = addChatMessage(streamedText, 'assistant', true);
+                                } else {
+                                    updateChatMessage(assistantMessageId, streamedText);
+                                }
+                            } else if (update.type === 'reset') {
+                                // The server is retrying the LLM call - start the text over
+                                streamedText = '';
+                            } else if (update.type === 'final') {
+                                data = update;
+                            } else if (update.type === 'progress') {
                                 if (!assistantMessageId) {
                                     // Create assistant message for progress updates
                                     assistantMessageId = addChatMessage(update.message, 'assistant', true);
@@ -761,14 +783,18 @@ chatForm.addEventListener('submit', async (e) => {
                     }
                 }
             }
-            return;
+            if (!data) return;
+        } else {
+            // Regular JSON response
+            data = await response.json();
         }
         
-        // Regular JSON response
-        const data = await response.json();
-        
-        // Add assistant message
-        addChatMessage(data.response, 'assistant');
+        // Add assistant message (or replace the streamed text with the final response)
+        if (assistantMessageId) {
+            updateChatMessage(assistantMessageId, data.response);
+        } else {
+            addChatMessage(data.response, 'assistant');
+        }
         
         // Handle actions
         if (data.action === 'open_app') {
@@ -1412,8 +1438,7 @@ async function openHtmlFile(path) {
             const urlInput = windowElement.querySelector('#browser-url');
             
             // Load the HTML file content
-            fetch(`/api/files/read?path=${encodeURIComponent(path)}`)
-                .then(response => response.json())
+            fetchFileContent(path)
                 .then(data => {
                     if (iframe && data.content) {
                         iframe.srcdoc = data.content;
@@ -1433,10 +1458,18 @@ async function openHtmlFile(path) {
     }
 }
 
+// Large files are streamed back as text/plain instead of JSON
+async function fetchFileContent(path) {
+    const response = await fetch(`/api/files/read?path=${encodeURIComponent(path)}`);
+    if ((response.headers.get('content-type') || '').startsWith('text/plain')) {
+        return { content: await response.text(), path };
+    }
+    return response.json();
+}
+
 async function notepadOpenFile(path) {
     try {
-        const response = await fetch(`/api/files/read?path=${encodeURIComponent(path)}`);
-        const data = await response.json();
+        const data = await fetchFileContent(path);
         
         document.getElementById('notepad-editor').value = data.content;
         document.getElementById('notepad-filename').value = path;
@@ -2643,8 +2676,7 @@ async function slideshowLoad() {
     if (!filename) return;
     
     try {
-        const response = await fetch(`/api/files/read?path=${encodeURIComponent(filename)}`);
-        const data = await response.json();
+        const data = await fetchFileContent(filename);
         
         if (data.content) {
             currentSlideshowHtml = data.content;
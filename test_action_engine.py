@@ -0,0 +1,142 @@
+"""
+Tests for the unified action execution engine
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from action_engine import ActionEngine
+from file_index import FileIndex
+
+
+def _make_engine(tmp_path, send_email=None):
+    return ActionEngine(tmp_path, FileIndex(tmp_path), send_email)
+
+
+def test_create_find_read_delete(tmp_path):
+    """File actions share one registry and keep the chat response shapes"""
+    engine = _make_engine(tmp_path)
+
+    async def run():
+        created = await engine.execute("create_file", {"path": "plan.md", "content": "roadmap\nQ4 goals"})
+        assert created.success and created.response == "Successfully created file 'Desktop/plan.md'."
+        assert created.data is None
+
+        found, read = await engine.execute_many([
+            ("find_file", {"pattern": "roadmap"}),
+            ("read_files", {"paths": ["Desktop/plan.md", "missing.md"]}),
+        ])
+        assert found.data["files"] == ["Desktop/plan.md"]
+        assert found.data["total"] == 1
+        assert read.data["files"][0]["lines"] == 2
+        assert read.data["errors"] == ["File not found: missing.md"]
+
+        deleted = await engine.execute("delete_file", {"path": "Desktop/plan.md"})
+        assert deleted.success
+        assert (await engine.execute("find_file", {"pattern": "roadmap"})).data["files"] == []
+
+    asyncio.run(run())
+    assert engine.get_stats()["find_file"]["count"] == 2
+
+
+def test_errors_clear_action(tmp_path):
+    """Failed actions set action to None like the inline handlers did"""
+    engine = _make_engine(tmp_path)
+    llm_response = {"response": "", "action": "create_file", "data": {"path": "../x"}}
+
+    result = asyncio.run(engine.execute("create_file", llm_response["data"]))
+    result.apply_to(llm_response)
+
+    assert llm_response == {"response": "Error: Invalid file path.", "action": None, "data": {"path": "../x"}}
+
+
+def test_compose_email_formats_recipients(tmp_path):
+    """compose_email delegates sending and formats multiple recipients"""
+    async def send_email(instructions):
+        return {"to": "a@x.com, b@x.com", "subject": instructions}, {}
+
+    engine = _make_engine(tmp_path, send_email)
+    result = asyncio.run(engine.execute("compose_email", {"instructions": "Hello"}))
+
+    assert result.response.startswith("Email sent successfully to a@x.com and b@x.com!\nSubject: Hello")
+    assert result.data["email"]["subject"] == "Hello"
+
+
+def test_plan_runs_independent_steps_concurrently(tmp_path):
+    """Independent plan steps overlap and outputs feed later steps"""
+    engine = _make_engine(tmp_path)
+    (tmp_path / "a.md").write_text("alpha report", encoding="utf-8")
+    (tmp_path / "b.md").write_text("beta report", encoding="utf-8")
+    engine.file_index.sync()
+
+    active = {"now": 0, "peak": 0}
+    original_read = engine._read_files
+
+    def slow_read(params):
+        active["now"] += 1
+        active["peak"] = max(active["peak"], active["now"])
+        time.sleep(0.05)
+        active["now"] -= 1
+        return original_read(params)
+
+    engine.actions["read_files"].handler = slow_read
+    plan = {"steps": [
+        {"id": "find", "action": "find_file", "data": {"pattern": "report"}},
+        {"id": "read_a", "action": "read_files", "data": {"paths": ["a.md"]}},
+        {"id": "read_b", "action": "read_files", "data": {"paths": ["b.md"]}},
+        {"id": "save", "action": "create_file", "depends_on": ["find", "read_a"],
+         "data": {"path": "summary.md", "content": "{{find.files}}"}},
+    ]}
+
+    result = asyncio.run(engine.execute("plan", plan))
+
+    assert result.success
+    assert active["peak"] == 2
+    assert [step["success"] for step in result.data["steps"]] == [True, True, True, True]
+    assert (tmp_path / "Desktop/summary.md").read_text(encoding="utf-8") == "a.md\nb.md"
+
+
+def test_plan_rejects_cycles(tmp_path):
+    """Plans must form a DAG of registered actions"""
+    engine = _make_engine(tmp_path)
+    plan = {"steps": [
+        {"id": "a", "action": "list_files", "depends_on": ["b"]},
+        {"id": "b", "action": "list_files", "depends_on": ["a"]},
+    ]}
+
+    result = asyncio.run(engine.execute("plan", plan))
+
+    assert not result.success
+    assert "cycle" in result.response
+
+
+def test_plan_references_imply_dependencies(tmp_path):
+    """A step reading another step's output waits for it even without depends_on"""
+    engine = _make_engine(tmp_path)
+    (tmp_path / "a.md").write_text("alpha", encoding="utf-8")
+    engine.file_index.sync()
+
+    original_find = engine._find_file
+
+    def slow_find(params):
+        time.sleep(0.05)
+        return original_find(params)
+
+    engine.actions["find_file"].handler = slow_find
+    plan = {"steps": [
+        {"id": "find", "action": "find_file", "data": {"pattern": "a.md"}},
+        {"id": "save", "action": "create_file",
+         "data": {"path": "found.md", "content": "Files: {{find.files}}"}},
+    ]}
+
+    result = asyncio.run(engine.execute("plan", plan))
+
+    assert result.success
+    assert (tmp_path / "Desktop/found.md").read_text(encoding="utf-8") == "Files: a.md"
+
+    self_ref = {"steps": [{"id": "a", "action": "read_files", "data": {"paths": "$a.files"}}]}
+    assert "cycle" in asyncio.run(engine.execute("plan", self_ref)).response
@@ -0,0 +1,81 @@
+"""
+Tests for multi-step browser agent action plans
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from action_plans import plan_steps, run_plan
+
+
+class FakePage:
+    def __init__(self, url="https://example.com/"):
+        self.url = url
+
+
+def _executor(page, executed, navigate_on=None, fail_on=None):
+    async def execute(step, following):
+        if step.get("action") == fail_on:
+            raise RuntimeError("boom")
+        executed.append((step["action"], following["action"] if following else None))
+        if step.get("action") == navigate_on:
+            page.url = "https://example.com/results"
+
+    return execute
+
+
+def test_plan_steps_normalizes_decisions():
+    """Single actions become one-step plans; plans are capped and cut after done"""
+    assert plan_steps({"action": "click", "x": 1, "y": 2}) == [{"action": "click", "x": 1, "y": 2}]
+    plan = [{"action": "scroll"}, {"action": "done"}, {"action": "click"}]
+    assert plan_steps({"plan": plan}) == plan[:2]
+    many = [{"action": "scroll"}] * 10
+    assert len(plan_steps({"plan": many}, max_steps=3)) == 3
+
+
+def test_run_plan_executes_back_to_back():
+    """Every step runs and sees the next one; the plan ends without a checkpoint"""
+    page, executed = FakePage(), []
+    steps = [{"action": "click"}, {"action": "type"}, {"action": "press"}]
+    result = asyncio.run(run_plan(page, steps, _executor(page, executed)))
+    assert executed == [("click", "type"), ("type", "press"), ("press", None)]
+    assert result.executed == 3 and result.stopped is None and not result.done
+
+
+def test_run_plan_checkpoints_after_navigation():
+    """Steps after a navigation are dropped so the model can look again"""
+    page, executed = FakePage(), []
+    steps = [{"action": "type"}, {"action": "press"}, {"action": "click"}]
+    result = asyncio.run(run_plan(page, steps, _executor(page, executed, navigate_on="press")))
+    assert [action for action, _ in executed] == ["type", "press"]
+    assert result.stopped == "page navigated" and result.skipped == 1
+
+
+def test_run_plan_stops_when_element_is_gone():
+    """An unresolvable step ends the plan before it runs"""
+    page, executed = FakePage(), []
+
+    async def resolve(step):
+        return step.get("element") != 9
+
+    steps = [{"action": "click", "element": 1}, {"action": "click", "element": 9}]
+    result = asyncio.run(run_plan(page, steps, _executor(page, executed), resolve=resolve))
+    assert result.executed == 1 and result.stopped == "element not found"
+
+
+def test_run_plan_done_and_failures():
+    """done completes the plan; a later failure is a checkpoint, a first-step failure raises"""
+    page, executed = FakePage(), []
+    result = asyncio.run(run_plan(page, [{"action": "scroll"}, {"action": "done"}], _executor(page, executed)))
+    assert result.done and result.executed == 1
+
+    result = asyncio.run(run_plan(page, [{"action": "scroll"}, {"action": "click"}], _executor(page, [], fail_on="click")))
+    assert result.executed == 1 and result.stopped.startswith("step failed")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(run_plan(page, [{"action": "click"}], _executor(page, [], fail_on="click")))
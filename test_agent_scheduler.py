@@ -0,0 +1,87 @@
+"""
+Tests for the browser agent scheduler
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from agent_scheduler import AgentScheduler
+
+
+def test_sessions_take_turns_within_the_concurrency_limit():
+    """Steps alternate between sessions and never exceed max_concurrent"""
+    remaining = {"a": 3, "b": 3, "c": 1}
+    order = []
+    running = 0
+    peak = 0
+
+    async def step(session_id):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        order.append(session_id)
+        await asyncio.sleep(0.01)
+        running -= 1
+        remaining[session_id] -= 1
+        return remaining[session_id] > 0
+
+    async def run():
+        scheduler = AgentScheduler(step, max_concurrent=1, idle_seconds=0.05)
+        for session_id in ("a", "b", "c"):
+            scheduler.wake(session_id)
+        await asyncio.sleep(0.3)
+        return scheduler.get_stats()
+
+    stats = asyncio.run(run())
+    assert order == ["a", "b", "c", "a", "b", "a", "b"]
+    assert peak == 1
+    assert stats["steps"] == 7
+
+
+def test_workers_retire_when_idle():
+    """No worker task is left once every agent is out of work"""
+
+    async def step(session_id):
+        return False
+
+    async def run():
+        scheduler = AgentScheduler(step, max_concurrent=4, idle_seconds=0.05)
+        scheduler.wake("a")
+        scheduler.wake("b")
+        await asyncio.sleep(0.01)
+        busy = scheduler.get_stats()["workers"]
+        await asyncio.sleep(0.2)
+        return busy, scheduler.get_stats()
+
+    busy, stats = asyncio.run(run())
+    assert busy >= 1
+    assert stats["workers"] == 0
+    assert stats["workers_retired"] == stats["workers_started"]
+
+
+def test_stop_cancels_a_running_step_and_pending_work():
+    """A stopped session's step is cancelled and not rescheduled"""
+    calls = []
+
+    async def step(session_id):
+        calls.append(session_id)
+        await asyncio.sleep(10)
+        return True
+
+    async def run():
+        scheduler = AgentScheduler(step, max_concurrent=2, idle_seconds=0.05)
+        scheduler.wake("a")
+        await asyncio.sleep(0.01)
+        scheduler.wake("a")  # woken while running
+        await scheduler.stop("a")
+        await asyncio.sleep(0.1)
+        stats = scheduler.get_stats()
+        await scheduler.close()
+        return stats
+
+    stats = asyncio.run(run())
+    assert calls == ["a"]
+    assert stats["running"] == [] and stats["queued"] == []
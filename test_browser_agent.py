@@ -0,0 +1,133 @@
+"""
+Tests for the scheduled browser agent in main.py
+"""
+
+import asyncio
+import json
+import os
+import sys
+from io import BytesIO
+from types import SimpleNamespace
+
+import pytest
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="module")
+def main(tmp_path_factory):
+    # main opens chat.log and its SQLite stores relative to the working directory
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("main"))
+    os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+    try:
+        import main as module
+    finally:
+        os.chdir(cwd)
+    return module
+
+
+class FakeMouse:
+    def __init__(self, page):
+        self.page = page
+
+    async def click(self, x, y):
+        self.page.clicks.append((x, y))
+
+
+class FakePage:
+    url = "https://example.com/"
+
+    def __init__(self):
+        self.clicks = []
+        self.mouse = FakeMouse(self)
+
+    async def screenshot(self, **kwargs):
+        out = BytesIO()
+        Image.new("RGB", (1280, 720), "white").save(out, format="PNG")
+        return out.getvalue()
+
+    async def wait_for_load_state(self, state, timeout=None):
+        pass
+
+    async def reload(self):
+        pass
+
+    async def title(self):
+        return "Example"
+
+    async def evaluate(self, script, arg=None):
+        if "querySelectorAll" in script:
+            return {
+                "url": self.url,
+                "title": "Example",
+                "elements": [{"id": 1, "tag": "a", "label": "More info", "href": "/about", "in_view": True}],
+                "text": "Example Domain",
+            }
+        return None
+
+    def locator(self, selector):
+        box = {"x": 10, "y": 20, "width": 100, "height": 10}
+
+        async def count():
+            return 1
+
+        async def scroll_into_view_if_needed(timeout=None):
+            pass
+
+        async def bounding_box():
+            return box
+
+        locator = SimpleNamespace(count=count, scroll_into_view_if_needed=scroll_into_view_if_needed, bounding_box=bounding_box)
+        locator.first = locator
+        return locator
+
+
+def test_agent_goal_runs_through_the_scheduler(main, monkeypatch):
+    """start_browser_agent wakes the scheduler, which runs steps until the goal is done"""
+    page = FakePage()
+    decision = {"plan": [{"action": "click", "element": 1}, {"action": "done"}], "description": "open the link"}
+
+    async def get_browser_page(session_id="default"):
+        return page
+
+    async def chat(**kwargs):
+        message = SimpleNamespace(content=json.dumps(decision))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    monkeypatch.setattr(main, "get_browser_page", get_browser_page)
+    monkeypatch.setattr(main, "BROWSER_PERCEPTION", "dom")
+    monkeypatch.setattr(main.llm_gateway, "chat", chat)
+
+    async def run():
+        main.start_browser_agent("agent-test", initial_goal="open the more info link")
+        for _ in range(500):
+            if main.browser_agents["agent-test"]["status"] in ("completed", "error"):
+                break
+            await asyncio.sleep(0.01)
+        main.agent_scheduler.cancel("agent-test")
+        return main.browser_agents.pop("agent-test")
+
+    agent = asyncio.run(run())
+    assert agent["status"] == "completed"
+    assert page.clicks == [(60.0, 25.0)]
+    assert agent["model_calls"] == 1 and agent["actions_run"] == 1
+    assert agent["logs"][-1]["action"] == "done"
+
+
+def test_reload_survives_a_swept_session(main, monkeypatch):
+    """Reloading a page whose session was swept meanwhile still answers instead of failing"""
+    page = FakePage()
+
+    async def get_browser_page(session_id="default"):
+        return page
+
+    monkeypatch.setattr(main, "get_browser_page", get_browser_page)
+    response = asyncio.run(main.browser_action(main.BrowserAction(action="reload", session_id="swept")))
+    assert json.loads(response.body) == {
+        "success": True,
+        "url": "https://example.com/",
+        "title": "Example",
+        "proxy_url": "/api/browser/proxy/swept/",
+    }
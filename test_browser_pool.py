@@ -0,0 +1,144 @@
+"""
+Tests for the pre-warmed browser context pool
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from browser_pool import BrowserContextPool
+
+
+class FakePage:
+    def __init__(self, context):
+        self.context = context
+        self.url = "about:blank"
+
+    async def goto(self, url):
+        self.url = url
+
+    async def close(self):
+        self.context.pages.remove(self)
+
+
+class FakeCDPSession:
+    def __init__(self, context):
+        self.context = context
+
+    async def send(self, method, params):
+        self.context.cleared.append(params["origin"])
+
+    async def detach(self):
+        pass
+
+
+class FakeContext:
+    def __init__(self, fail_reset=False):
+        self.pages = []
+        self.cookies = ["session=1"]
+        self.cleared = []
+        self.closed = False
+        self.fail_reset = fail_reset
+        self.handlers = {}
+
+    def on(self, event, handler):
+        self.handlers[event] = handler
+
+    def request(self, url):
+        self.handlers["request"](type("Request", (), {"url": url})())
+
+    async def new_page(self):
+        page = FakePage(self)
+        self.pages.append(page)
+        return page
+
+    async def clear_cookies(self):
+        if self.fail_reset:
+            raise RuntimeError("target closed")
+        self.cookies = []
+
+    async def clear_permissions(self):
+        pass
+
+    async def new_cdp_session(self, page):
+        return FakeCDPSession(self)
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.contexts = []
+
+    async def new_context(self, **options):
+        context = FakeContext()
+        self.contexts.append(context)
+        return context
+
+
+def test_acquire_uses_prewarmed_contexts_and_refills():
+    """Sessions get warm contexts with a page open; the pool refills in the background"""
+    browser = FakeBrowser()
+    pool = BrowserContextPool(browser, min_size=2, max_size=4)
+
+    async def run():
+        await pool.warm()
+        first = await pool.acquire()
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        return first
+
+    first = asyncio.run(run())
+    assert len(first.pages) == 1
+    stats = pool.get_stats()
+    assert stats["pooled_hits"] == 1
+    assert stats["cold_starts"] == 0
+    assert stats["in_use"] == 1
+    assert stats["idle"] == 2
+
+
+def test_release_resets_context_before_reuse():
+    """Released contexts lose extra pages, cookies and per-origin storage"""
+    browser = FakeBrowser()
+    pool = BrowserContextPool(browser, min_size=0, max_size=2)
+
+    async def run():
+        context = await pool.acquire()
+        context.request("https://example.com/login")
+        context.request("data:text/plain,x")
+        await context.new_page()
+        await context.pages[0].goto("https://example.com/account")
+        await pool.release(context)
+        return context, await pool.acquire()
+
+    released, reused = asyncio.run(run())
+    assert reused is released
+    assert len(reused.pages) == 1
+    assert reused.pages[0].url == "about:blank"
+    assert reused.cookies == []
+    assert reused.cleared == ["https://example.com"]
+    assert pool.get_stats()["recycled"] == 1
+
+
+def test_release_discards_when_full_or_reset_fails():
+    """Contexts beyond max_size, or that fail to reset, are closed instead of pooled"""
+    browser = FakeBrowser()
+    pool = BrowserContextPool(browser, min_size=0, max_size=1)
+
+    async def run():
+        a, b = await pool.acquire(), await pool.acquire()
+        b.fail_reset = True
+        await pool.release(b)
+        await pool.release(a)
+        c = await pool.acquire()
+        await pool.release(c)
+        return a, b, c
+
+    a, b, c = asyncio.run(run())
+    assert b.closed and not a.closed
+    assert c is a
+    assert pool.get_stats()["discarded"] == 1
+    assert pool.get_stats()["idle"] == 1
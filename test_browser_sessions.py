@@ -0,0 +1,79 @@
+"""
+Tests for browser session lifecycle limits
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from browser_sessions import BrowserSessionManager
+
+
+def _manager(closed, **kwargs):
+    async def close_session(session_id, session):
+        closed.append(session_id)
+
+    return BrowserSessionManager(close_session, **kwargs)
+
+
+def test_opening_past_the_cap_closes_least_recently_used():
+    """The session not touched for longest is closed first"""
+    closed = []
+    manager = _manager(closed, max_contexts=2)
+
+    async def run():
+        await manager.add("a", object())
+        await manager.add("b", object())
+        manager.get("a")
+        await manager.add("c", object())
+
+    asyncio.run(run())
+    assert closed == ["b"]
+    assert manager.session_ids() == ["a", "c"]
+    assert manager.most_recent() == "c"
+    assert manager.get_stats()["evicted_lru"] == 1
+
+
+def test_sweep_closes_idle_sessions():
+    """Sessions idle past the timeout are closed by the sweep"""
+    closed = []
+
+    async def measure(context):
+        return 0
+
+    manager = _manager(closed, idle_timeout=60, measure=measure)
+
+    async def run():
+        await manager.add("old", object())
+        await manager.add("fresh", object())
+        manager.get("old", touch=False).last_access = time.time() - 120
+        return await manager.sweep()
+
+    assert asyncio.run(run()) == {"idle": 1, "memory": 0}
+    assert closed == ["old"]
+    assert "fresh" in manager and "old" not in manager
+
+
+def test_sweep_enforces_heap_cap():
+    """Least recently used sessions are closed until the summed heap fits"""
+    closed = []
+    heaps = {"a": 60, "b": 30, "c": 30}
+
+    async def measure(context):
+        return heaps[context]
+
+    manager = _manager(closed, max_heap_bytes=80, measure=measure)
+
+    async def run():
+        for session_id in ("a", "b", "c"):
+            await manager.add(session_id, session_id)
+        return await manager.sweep()
+
+    assert asyncio.run(run()) == {"idle": 0, "memory": 1}
+    assert closed == ["a"]
+    stats = manager.get_stats()
+    assert stats["heap_bytes"] == 60
+    assert stats["sessions"]["b"]["heap_bytes"] == 30
@@ -0,0 +1,35 @@
+"""
+Tests for the static chat system prompts
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from chat_prompts import BACKGROUND_SYSTEM_PROMPT, CHAT_SYSTEM_PROMPT, build_chat_messages
+
+
+def test_prefix_is_stable_and_dynamic_context_follows():
+    """File lists and history never change the leading system prompt"""
+    first = build_chat_messages(CHAT_SYSTEM_PROMPT, [{"path": "a.md"}], [], "hi")
+    second = build_chat_messages(
+        CHAT_SYSTEM_PROMPT,
+        [{"path": "b.md"}],
+        [{"role": "user", "content": "earlier"}],
+        "hello",
+        hyperspell_sources=["notion"],
+        formatted_hyperspell_context="memory",
+    )
+
+    assert first[0] == second[0] == {"role": "system", "content": CHAT_SYSTEM_PROMPT}
+    assert first[1]["content"] == "Available files in the system:\n- a.md"
+    assert [m["role"] for m in second] == ["system", "system", "system", "user", "user"]
+    assert "Available files" not in CHAT_SYSTEM_PROMPT
+
+
+def test_background_prompt_omits_examples():
+    """Background email commands share the contract without the worked examples"""
+    assert "EXAMPLES:" in CHAT_SYSTEM_PROMPT
+    assert "EXAMPLES:" not in BACKGROUND_SYSTEM_PROMPT
+    assert BACKGROUND_SYSTEM_PROMPT.endswith(CHAT_SYSTEM_PROMPT[-200:])
@@ -0,0 +1,54 @@
+"""
+Tests for the document cache
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from document_cache import DocumentCache, DocumentCacheConfig
+
+
+def test_hits_and_invalidation_on_change(tmp_path):
+    """Unchanged files are served from the cache, edited files are re-read"""
+    target = tmp_path / "Q4_report.md"
+    target.write_text("Revenue\nGrew 12%\n", encoding="utf-8")
+    cache = DocumentCache()
+
+    document = cache.get(target)
+    assert cache.get(target) is document
+    assert document.lower == "revenue\ngrew 12%\n"
+    assert document.line_count == 3
+    assert document.line_of(document.text.index("Grew")) == 2
+    assert document.word_count == 3
+
+    target.write_text("Revenue\nGrew 15% this quarter\n", encoding="utf-8")
+    assert cache.get(target).text == "Revenue\nGrew 15% this quarter\n"
+
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["misses"], stats["invalidations"]) == (1, 2, 1)
+
+
+def test_byte_budget_evicts_least_recently_used(tmp_path):
+    """Entries are evicted oldest-first once the byte budget is exceeded"""
+    paths = []
+    for i in range(3):
+        path = tmp_path / f"doc{i}.txt"
+        path.write_text("x" * 1000, encoding="utf-8")
+        paths.append(path)
+
+    probe = DocumentCache().get(paths[0])
+    cache = DocumentCache(DocumentCacheConfig(max_bytes=probe.nbytes * 2, max_document_bytes=10_000))
+    cache.get(paths[0])
+    cache.get(paths[1])
+    cache.get(paths[0])
+    cache.get(paths[2])
+
+    stats = cache.get_stats()
+    assert stats["entries"] == 2
+    assert stats["evictions"] == 1
+    assert stats["bytes"] <= stats["max_bytes"]
+    # doc1 was least recently used and is gone, doc0 is still cached
+    cache.get(paths[0])
+    assert cache.get_stats()["hits"] == 2
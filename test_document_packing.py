@@ -0,0 +1,49 @@
+"""
+Tests for token-budgeted document packing
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from document_packing import TRIM_MARKER, chunk_text, pack_documents
+
+
+def test_everything_fits_whole():
+    """Documents under the budget are included whole in their original order"""
+    documents = [
+        {"path": "b.md", "content": "Q4 revenue grew"},
+        {"path": "a.md", "content": "Client list"},
+    ]
+    packed = pack_documents(documents, "Q4 revenue", budget_tokens=1000)
+
+    assert packed.text == "=== b.md ===\nQ4 revenue grew\n\n=== a.md ===\nClient list"
+    assert [doc["mode"] for doc in packed.documents] == ["whole", "whole"]
+    assert packed.trimmed == 0
+
+
+def test_large_document_is_trimmed_to_relevant_chunks():
+    """Over budget, small documents stay whole and large ones keep their best chunks"""
+    filler = "".join(f"meeting notes line {i} about office logistics\n" for i in range(200))
+    large = filler + "Q4 revenue grew 12% driven by enterprise renewals\n" + filler
+    documents = [
+        {"path": "big.log", "content": large},
+        {"path": "summary.md", "content": "Q4 summary: revenue up"},
+    ]
+    packed = pack_documents(documents, "Q4 revenue", budget_tokens=300, chunk_tokens=100)
+
+    assert packed.tokens <= 300
+    modes = {doc["path"]: doc["mode"] for doc in packed.documents}
+    assert modes == {"big.log": "excerpts", "summary.md": "whole"}
+    assert "Q4 revenue grew 12%" in packed.text
+    assert TRIM_MARKER in packed.text
+    assert packed.text.index("big.log") < packed.text.index("summary.md")
+
+
+def test_chunk_text_preserves_content():
+    """Chunks cover the text exactly and respect the size limit"""
+    text = "short line\n" * 50 + "x" * 1000
+    chunks = chunk_text(text, chunk_tokens=50)
+    assert "".join(chunks) == text
+    assert all(len(chunk) <= 200 for chunk in chunks)
@@ -0,0 +1,128 @@
+"""
+Tests for the persistent inverted file index
+"""
+
+import os
+import shutil
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from file_index import FileIndex, INDEX_DIR_NAME
+
+
+def _write(root, rel_path, content):
+    target = root / rel_path
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target.write_text(content, encoding="utf-8")
+
+
+def test_filename_and_content_matches(tmp_path):
+    """Filename matches come first, content matches carry line numbers"""
+    _write(tmp_path, "Reports/Q4_Financial.md", "Summary\nRevenue grew")
+    _write(tmp_path, "Desktop/notes.txt", "todo\nQ4 financial review\nmore Q4 financial notes\n")
+    _write(tmp_path, "Desktop/other.txt", "nothing relevant")
+
+    index = FileIndex(tmp_path)
+    index.sync()
+    results = index.search("Q4 financial")
+
+    assert results[0] == {"path": "Reports/Q4_Financial.md", "match_type": "filename"}
+    assert results[1] == {
+        "path": "Desktop/notes.txt",
+        "match_type": "content",
+        "line_count": 2,
+        "sample_lines": [2, 3],
+    }
+    assert len(results) == 2
+
+
+def test_words_on_different_lines_match_file(tmp_path):
+    """All words must appear in the file, lines only count when all words share a line"""
+    _write(tmp_path, "a.txt", "client list\nstatus update\n")
+    index = FileIndex(tmp_path)
+    index.sync()
+
+    results = index.search("client status")
+    assert results == [{"path": "a.txt", "match_type": "content", "line_count": 0, "sample_lines": []}]
+
+
+def test_sync_picks_up_changes_and_skips_index_dir(tmp_path):
+    """Re-syncing indexes new/changed files and drops deleted ones"""
+    _write(tmp_path, "keep.txt", "alpha")
+    index = FileIndex(tmp_path)
+    index.sync()
+    assert [r["path"] for r in index.search("alpha")] == ["keep.txt"]
+
+    _write(tmp_path, "new.txt", "beta alphabet")
+    (tmp_path / "keep.txt").unlink()
+    assert index.sync() == {"added": 1, "updated": 0, "removed": 1}
+
+    assert [r["path"] for r in index.search("alpha")] == ["new.txt"]
+    assert not any(path.startswith(INDEX_DIR_NAME) for path in index.all_paths())
+
+
+def test_record_change_updates_listing_and_journal(tmp_path):
+    """Write paths feed the journal and keep the file listing current"""
+    index = FileIndex(tmp_path)
+    assert index.list_files() == []
+
+    _write(tmp_path, "Desktop/Projects/plan.md", "roadmap")
+    assert index.record_change("Desktop/Projects", "created")
+    assert index.list_files() == [{"name": "plan.md", "path": "Desktop/Projects/plan.md"}]
+    assert [r["path"] for r in index.search("roadmap")] == ["Desktop/Projects/plan.md"]
+
+    # Re-reporting an unchanged file is a no-op for the index
+    assert not index.record_change("Desktop/Projects/plan.md", "modified")
+
+    shutil.rmtree(tmp_path / "Desktop")
+    assert index.record_change("Desktop", "deleted")
+    assert index.list_files() == []
+
+    kinds = [change["kind"] for change in index.recent_changes()]
+    assert kinds == ["deleted", "modified", "created"]
+
+
+def test_iter_search_ranks_by_relevance(tmp_path):
+    """Filename hits outrank content hits, content hits are ordered by BM25 score"""
+    _write(tmp_path, "a_sparse.txt", "budget\n" + "filler words here\n" * 50)
+    _write(tmp_path, "b_dense.txt", "budget\nbudget review\nbudget totals\n")
+    _write(tmp_path, "budget.md", "nothing")
+
+    index = FileIndex(tmp_path)
+    index.sync()
+    results = list(index.iter_search("budget"))
+
+    assert [r["path"] for r in results] == ["budget.md", "b_dense.txt", "a_sparse.txt"]
+    assert results[1]["score"] > results[2]["score"]
+    assert [r["path"] for r in index.iter_search("budget", limit=2)] == ["budget.md", "b_dense.txt"]
+
+
+def test_list_files_does_not_sync_inline(tmp_path):
+    """Listing serves the maintained index instead of walking the directory"""
+    _write(tmp_path, "a.txt", "alpha")
+    index = FileIndex(tmp_path)
+    index.sync()
+    assert [f["path"] for f in index.list_files()] == ["a.txt"]
+
+    # An out-of-band file only shows up once the watcher or a sync reports it
+    _write(tmp_path, "b.txt", "beta")
+    assert [f["path"] for f in index.list_files()] == ["a.txt"]
+    index.sync()
+    assert [f["path"] for f in index.list_files()] == ["a.txt", "b.txt"]
+
+
+def test_filename_hits_are_yielded_before_content_is_scored(tmp_path):
+    """The first result arrives without scoring content, and queries never sync"""
+    _write(tmp_path, "budget.md", "nothing")
+    _write(tmp_path, "notes.txt", "budget review")
+    index = FileIndex(tmp_path)
+    index.sync()
+
+    def fail(*args):
+        raise AssertionError("content scored before the filename hit was consumed")
+
+    index._search_content = fail
+    index.sync = fail
+    results = index.iter_search("budget")
+    assert next(results)["path"] == "budget.md"
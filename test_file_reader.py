@@ -0,0 +1,103 @@
+"""
+Tests for memory-mapped file reads
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import file_reader
+from file_reader import iter_range, read_range
+
+
+def test_full_read_matches_read_text(tmp_path):
+    """A full read returns the file content and the split-based line count"""
+    target = tmp_path / "notes.txt"
+    target.write_text("alpha\nbeta\ngamma\n", encoding="utf-8")
+
+    result = read_range(target)
+    assert result["content"] == "alpha\nbeta\ngamma\n"
+    assert result["lines"] == len(result["content"].split("\n"))
+    assert result["has_more"] is False
+
+    empty = tmp_path / "empty.txt"
+    empty.write_text("", encoding="utf-8")
+    assert read_range(empty)["content"] == ""
+    assert read_range(empty)["lines"] == 1
+
+
+def test_line_and_byte_ranges(tmp_path, monkeypatch):
+    """Ranges return only the requested slice and report whether more remains"""
+    monkeypatch.setattr(file_reader, "READ_CHUNK_BYTES", 4)
+    target = tmp_path / "log.txt"
+    target.write_text("".join(f"line {i}\n" for i in range(10)), encoding="utf-8")
+
+    lines = read_range(target, offset=2, limit=3)
+    assert lines["content"] == "line 2\nline 3\nline 4\n"
+    assert lines["lines"] == 11
+    assert lines["has_more"] is True
+
+    assert read_range(target, offset=8)["content"] == "line 8\nline 9\n"
+    assert read_range(target, offset=5, limit=4, unit="bytes")["content"] == "0\nli"
+
+    chunks = list(iter_range(target, 7, 21))
+    assert all(len(chunk) <= 4 for chunk in chunks)
+    assert b"".join(chunks) == b"line 1\nline 2\n"
+
+
+def test_byte_ranges_keep_whole_characters(tmp_path):
+    """Byte ranges never split a multi-byte character, so pages decode and join cleanly"""
+    target = tmp_path / "utf8.txt"
+    target.write_text("aé€😀b" * 3, encoding="utf-8")
+
+    assert read_range(target, offset=2, limit=1, unit="bytes")["content"] == "€"
+    pages, offset = [], 0
+    while True:
+        page = read_range(target, offset=offset, limit=2, unit="bytes")
+        pages.append(page["content"])
+        offset = page["end_byte"]
+        if not page["has_more"]:
+            break
+    assert "".join(pages) == "aé€😀b" * 3
+
+
+def test_crlf_newlines_are_normalized(tmp_path):
+    """CRLF files read like read_text: line ranges come back without carriage returns"""
+    target = tmp_path / "dos.txt"
+    target.write_bytes(b"one\r\ntwo\r\nthree\r\n")
+
+    assert read_range(target)["content"] == target.read_text(encoding="utf-8")
+    lines = read_range(target, offset=1, limit=1)
+    assert lines["content"] == "two\n"
+    assert lines["lines"] == 4
+
+
+def test_streaming_survives_truncation(tmp_path, monkeypatch):
+    """A file truncated mid-stream ends the stream early instead of faulting"""
+    monkeypatch.setattr(file_reader, "READ_CHUNK_BYTES", 64 * 1024)
+    target = tmp_path / "log.txt"
+    target.write_bytes(b"x" * 1024 * 1024)
+
+    chunks = iter_range(target, 0, 1024 * 1024)
+    assert len(next(chunks)) == 64 * 1024
+    target.write_bytes(b"short")
+    assert list(chunks) == []
+
+
+def test_ranged_reads_reuse_the_line_count(tmp_path, monkeypatch):
+    """Paging does not rescan the whole file; a changed file is counted again"""
+    target = tmp_path / "log.txt"
+    target.write_text("".join(f"line {i}\n" for i in range(10)), encoding="utf-8")
+    scans = []
+    original = file_reader.count_newlines
+    monkeypatch.setattr(file_reader, "count_newlines", lambda *args: scans.append(args) or original(*args))
+
+    assert read_range(target, offset=0, limit=2)["lines"] == 11
+    assert read_range(target, offset=2, limit=2)["lines"] == 11
+    assert len(scans) == 1
+
+    target.write_text("one\ntwo\n", encoding="utf-8")
+    os.utime(target, ns=(0, 0))
+    assert read_range(target, offset=1, limit=1)["lines"] == 3
+    assert len(scans) == 2
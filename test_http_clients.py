@@ -0,0 +1,122 @@
+"""
+Tests for the pooled outbound HTTP client registry
+"""
+
+import asyncio
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from http_clients import HTTPClientConfig, HTTPClientRegistry, get_with_cookies
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b"ok"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Set-Cookie", "tracking=1; Path=/")
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.cookies.append(self.headers.get("Cookie"))
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    httpd.cookies = []
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_requests_reuse_pooled_connections(server):
+    """Sequential requests to one upstream share a keep-alive connection"""
+    registry = HTTPClientRegistry(HTTPClientConfig(http2=False))
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+
+    async def run():
+        for _ in range(5):
+            response = await registry.client("upstream").get(url)
+            assert response.text == "ok"
+        same = registry.client("upstream") is registry.client("upstream")
+        await registry.close()
+        return same
+
+    assert asyncio.run(run())
+    stats = registry.get_stats()["upstream"]
+    assert stats["requests"] == 5
+    assert stats["new_connections"] == 1
+    assert stats["reused_connections"] == 4
+    assert stats["reuse_rate"] == pytest.approx(0.8)
+    assert stats["http_versions"] == {"HTTP/1.1": 5}
+
+
+def test_pooled_clients_do_not_keep_cookies(server):
+    """Cookies set by one response are never sent on later requests"""
+    registry = HTTPClientRegistry(HTTPClientConfig(http2=False))
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+
+    async def run():
+        client = registry.client("proxy")
+        await client.get(url)
+        await client.get(url)
+        await registry.close()
+
+    asyncio.run(run())
+    assert server.cookies == [None, None]
+
+
+def test_redirect_hops_carry_their_own_cookies():
+    """Each redirect hop is sent the cookies for its own host, not dropped or reused"""
+    sent = []
+
+    def handler(request):
+        sent.append((request.url.host, request.headers.get("Cookie")))
+        if request.url.host == "a.test":
+            return httpx.Response(302, headers={"Location": "http://b.test/style.css"})
+        return httpx.Response(200, text="body {}")
+
+    async def cookie_header(url):
+        return {"a.test": "sid=a", "b.test": "sid=b"}.get(httpx.URL(url).host)
+
+    async def run():
+        registry = HTTPClientRegistry(HTTPClientConfig(http2=False))
+        client = registry.client("proxy", transport=httpx.MockTransport(handler), follow_redirects=True)
+        response = await get_with_cookies(client, "http://a.test/style.css", cookie_header)
+        await registry.close()
+        return response
+
+    response = asyncio.run(run())
+    assert response.text == "body {}"
+    assert sent == [("a.test", "sid=a"), ("b.test", "sid=b")]
+
+
+def test_redirect_loops_are_cut_off():
+    """A redirect loop raises TooManyRedirects instead of spinning"""
+
+    def handler(request):
+        return httpx.Response(302, headers={"Location": str(request.url)})
+
+    async def no_cookies(url):
+        return None
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            await get_with_cookies(client, "http://a.test/", no_cookies, max_redirects=3)
+
+    with pytest.raises(httpx.TooManyRedirects):
+        asyncio.run(run())
@@ -0,0 +1,137 @@
+"""
+Tests for the precompiled intent router
+"""
+
+import os
+import random
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from intent_router import classify, find_literals
+
+
+def test_overlapping_literals_found_in_one_pass():
+    """Literals sharing a start position or nested in words are all reported"""
+    literals = find_literals("make a report of it with them")
+    assert {"make a report of", "make a report", "make", "report of", "report", "of", "it", "them"} <= literals
+    assert "on" not in literals
+
+
+# The inline checks the router replaced, copied verbatim from the chat,
+# email command, browser and workflow handlers in main.py
+
+def _baseline_chat(user_message, has_recent_find=False):
+    user_lower = user_message.lower().strip()
+    compilation_keywords = [
+        "compile", "create a report", "generate a report", "make a report", "make report",
+        "analyze and create", "summarize", "create a summary", "generate a summary",
+        "report of", "report from", "report on", "compile from", "compile all",
+        "gather and compile", "collect and summarize", "report of it", "compile it",
+        "make a report of", "create a report of", "summarize it", "compile them"
+    ]
+    has_explicit_keyword = any(keyword in user_lower for keyword in compilation_keywords)
+    has_report_pattern = (
+        ("report" in user_lower and ("of" in user_lower or "from" in user_lower or "on" in user_lower)) or
+        ("make" in user_lower and "report" in user_lower) or
+        ("compile" in user_lower and ("it" in user_lower or "them" in user_lower or "all" in user_lower)) or
+        ("summarize" in user_lower and ("it" in user_lower or "them" in user_lower))
+    )
+    has_report_keyword = any(kw in user_lower for kw in ["report", "compile", "summarize", "summary"])
+    has_document_trigger = any(trig in user_lower for trig in ["documents", "files", "it", "them", "those", "all"])
+    is_compilation_request = has_explicit_keyword or has_report_pattern or (has_report_keyword and (has_document_trigger or has_recent_find))
+    slideshow_keywords = ["create.*slideshow", "make.*presentation", "generate.*slideshow", "create.*presentation", "build.*presentation"]
+    is_slideshow_request = any(re.search(keyword.replace("*", ".*"), user_lower) for keyword in slideshow_keywords)
+    return is_compilation_request, is_slideshow_request
+
+
+def _baseline_email_command(command):
+    command_lower = command.lower().strip()
+    compilation_keywords = [
+        "compile", "create a report", "generate a report", "make a report", "make report",
+        "analyze and create", "summarize", "create a summary", "generate a summary",
+        "report of", "report from", "report on", "compile from", "compile all",
+        "gather and compile", "collect and summarize", "report of it", "compile it",
+        "make a report of", "create a report of", "summarize it", "compile them"
+    ]
+    slideshow_keywords = ["create.*slideshow", "make.*presentation", "generate.*slideshow", "create.*presentation", "build.*presentation", "prepare.*presentation"]
+    is_compilation = any(keyword in command_lower for keyword in compilation_keywords)
+    is_slideshow = any(re.search(keyword.replace("*", ".*"), command_lower) for keyword in slideshow_keywords)
+    return is_compilation, is_slideshow
+
+
+def _baseline_browser(original_user_message):
+    user_lower = original_user_message.lower()
+    search_patterns = ["find out about", "search for", "look up", "find information about", "get information on", "learn about"]
+    has_search_intent = any(pattern in user_lower for pattern in search_patterns)
+    task_patterns = [
+        r'extract.*(?:info|information|data|text|content)',
+        r'create.*(?:doc|document|file|word|txt)',
+        r'save.*(?:info|information|data|text|content)',
+        r'get.*(?:info|information|data).*(?:and|then).*(?:create|save|make|write)',
+        r'summarize.*(?:and|then).*(?:save|create|write)',
+        r'read.*(?:and|then).*(?:extract|save|create)'
+    ]
+    has_task_intent = any(re.search(pattern, user_lower) for pattern in task_patterns)
+    return has_search_intent, has_task_intent
+
+
+def _baseline_workflow(user_message):
+    compilation_keywords = ["compile", "create a report", "generate a report", "analyze and create", "summarize", "create a summary"]
+    user_lower = user_message.lower()
+    return any(keyword in user_lower for keyword in compilation_keywords)
+
+
+def _assert_matches_baseline(message):
+    intents = classify(message)
+    for has_recent_find in (False, True):
+        compilation, slideshow = _baseline_chat(message, has_recent_find)
+        assert intents.is_compilation(has_recent_find) == compilation, message
+        assert intents.slideshow == slideshow, message
+    assert (intents.compilation_keyword, intents.email_slideshow) == _baseline_email_command(message), message
+    assert (intents.browser_search, intents.browser_task) == _baseline_browser(message), message
+    assert intents.workflow_compilation == _baseline_workflow(message), message
+
+
+def test_matches_inline_keyword_checks():
+    """Routing decisions are identical to the original inline checks"""
+    messages = [
+        "Hello there",
+        "make a report of it",
+        "Please compile them",
+        "what's the summary",
+        "summary of the documents",
+        "Create a fun slideshow about cats",
+        "createslideshow",
+        "create slideshow",
+        "prepare the quarterly presentation",
+        "open google.com and find out about Tim Cook and Satya Nadella",
+        "go to example.com and extract the contact information",
+        "Generate a summary of Q4",
+        "  Build\na presentation  ",
+    ]
+    for message in messages:
+        _assert_matches_baseline(message)
+
+
+def test_fuzzed_messages_match_inline_keyword_checks():
+    """Random mixes of keyword fragments route exactly like the original checks"""
+    rng = random.Random(1234)
+    words = [
+        "create", "make", "generate", "build", "prepare", "slideshow", "presentation", "report", "compile",
+        "summarize", "summary", "of", "from", "on", "it", "them", "all", "those", "files", "documents",
+        "extract", "info", "data", "save", "get", "and", "then", "write", "read", "doc", "find out about",
+        "search for", "look up", "learn about", "analyze and create", "a", "the", "x", "REPORT", "Create",
+    ]
+    separators = ["", "", " ", " ", "  ", "\n", ".", "-"]
+    for _ in range(5000):
+        parts = [rng.choice(words) + rng.choice(separators) for _ in range(rng.randint(1, 6))]
+        _assert_matches_baseline(rng.choice(["", " ", "\n"]) + "".join(parts))
+
+
+def test_recent_find_enables_follow_up_compilation():
+    """A bare "summary" only compiles when files were just found"""
+    intents = classify("give me a summary")
+    assert not intents.is_compilation()
+    assert intents.is_compilation(has_recent_find=True)
@@ -0,0 +1,51 @@
+"""
+Tests for the LLM response cache
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from llm_cache import LLMCacheConfig, LLMResponseCache
+
+
+def test_key_ignores_timeout_and_param_order():
+    """Keys depend on model, messages and reply-affecting params only"""
+    messages = [{"role": "user", "content": "hi"}]
+    key = LLMResponseCache.make_key("m", messages, {"temperature": 0.3, "max_tokens": 50})
+    assert key == LLMResponseCache.make_key("m", messages, {"max_tokens": 50, "temperature": 0.3, "timeout": 9})
+    assert key != LLMResponseCache.make_key("m", messages, {"temperature": 0.7, "max_tokens": 50})
+
+
+def test_lru_eviction_and_ttl():
+    """Least recently used entries are evicted and expired entries miss"""
+    cache = LLMResponseCache(LLMCacheConfig(max_entries=2, ttl_seconds=60, sqlite_path=None))
+    cache.set("a", "A")
+    cache.set("b", "B")
+    assert cache.get("a") == "A"
+    cache.set("c", "C")  # evicts "b"
+    assert cache.get("b") is None
+
+    cache.set("short", "S", ttl_seconds=0.01)
+    time.sleep(0.02)
+    assert cache.get("short") is None
+
+    stats = cache.get_stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+    assert stats["evictions"] == 2
+
+
+def test_sqlite_backing_survives_restart(tmp_path):
+    """Entries written through to SQLite are served by a new cache instance"""
+    config = LLMCacheConfig(sqlite_path=str(tmp_path / "llm_cache.sqlite3"))
+    cache = LLMResponseCache(config)
+    cache.set("key", "YES:Q4,financial")
+    cache.close()
+
+    reopened = LLMResponseCache(config)
+    assert reopened.get("key") == "YES:Q4,financial"
+    assert reopened.get_stats()["disk_hits"] == 1
+    reopened.close()
@@ -0,0 +1,139 @@
+"""
+Tests for the shared async LLM gateway
+"""
+
+import asyncio
+import json
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from llm_cache import LLMCacheConfig, LLMResponseCache
+from llm_gateway import JSONStringFieldStreamer, LLMGateway, LLMGatewayConfig
+
+
+class _FakeCompletions:
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+
+    async def create(self, **kwargs):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.01)
+        self.active -= 1
+        message = SimpleNamespace(content=kwargs["model"])
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def _make_gateway(config):
+    gateway = LLMGateway("sk-test", config)
+    completions = _FakeCompletions()
+    gateway.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return gateway, completions
+
+
+def test_model_concurrency_limit():
+    """Calls for one model never exceed its configured limit"""
+    config = LLMGatewayConfig(default_concurrency=8, model_concurrency={"slow-model": 2})
+    gateway, completions = _make_gateway(config)
+
+    async def run():
+        await asyncio.gather(*[
+            gateway.chat(model="slow-model", messages=[]) for _ in range(6)
+        ])
+
+    asyncio.run(run())
+    assert completions.peak == 2
+    stats = gateway.get_stats()["slow-model"]
+    assert stats["calls"] == 6
+    assert stats["in_flight"] == 0
+
+
+def test_chat_text_returns_content():
+    """chat_text unwraps the first choice"""
+    gateway, _ = _make_gateway(LLMGatewayConfig())
+    assert asyncio.run(gateway.chat_text(model="gpt-test", messages=[])) == "gpt-test"
+
+
+def test_json_field_streamer_handles_split_escapes():
+    """The response field is decoded incrementally even when escapes are split across chunks"""
+    raw = json.dumps({"response": "Line 1\n\"quoted\" café \U0001F600", "action": None, "data": {}})
+    for size in (1, 3, 8):
+        streamer = JSONStringFieldStreamer("response")
+        text = "".join(streamer.feed(raw[i:i + size]) for i in range(0, len(raw), size))
+        assert text == json.loads(raw)["response"]
+        assert streamer.done
+
+
+def test_cached_chat_text_skips_repeat_calls():
+    """Identical cached calls hit the network once, even when concurrent"""
+    gateway, completions = _make_gateway(LLMGatewayConfig())
+    gateway.cache = LLMResponseCache(LLMCacheConfig(sqlite_path=None))
+    calls = []
+    original_create = completions.create
+
+    async def counting_create(**kwargs):
+        calls.append(kwargs)
+        return await original_create(**kwargs)
+
+    completions.create = counting_create
+    messages = [{"role": "user", "content": "terms?"}]
+
+    async def run():
+        first = await asyncio.gather(*[
+            gateway.chat_text(model="gpt-test", messages=messages, use_cache=True) for _ in range(3)
+        ])
+        again = await gateway.chat_text(model="gpt-test", messages=messages, use_cache=True)
+        return first, again
+
+    first, again = asyncio.run(run())
+    assert first == ["gpt-test"] * 3 and again == "gpt-test"
+    assert len(calls) == 1
+    assert gateway.cache.get_stats()["hits"] == 1
+
+
+def test_cancelled_owner_does_not_strand_waiters():
+    """A waiter on a cancelled in-flight call makes its own request instead of hanging"""
+    gateway, completions = _make_gateway(LLMGatewayConfig())
+    gateway.cache = LLMResponseCache(LLMCacheConfig(sqlite_path=None))
+    messages = [{"role": "user", "content": "terms?"}]
+
+    async def run():
+        owner = asyncio.create_task(gateway.chat_text(model="gpt-test", messages=messages, use_cache=True))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(gateway.chat_text(model="gpt-test", messages=messages, use_cache=True))
+        await asyncio.sleep(0)
+        owner.cancel()
+        result = await asyncio.wait_for(waiter, 1)
+        return owner.cancelled(), result
+
+    owner_cancelled, result = asyncio.run(run())
+    assert owner_cancelled
+    assert result == "gpt-test"
+    assert gateway._inflight == {}
+
+
+def test_usage_records_cached_prompt_tokens():
+    """Prompt-cache hits are reported as cached vs uncached input tokens"""
+    gateway, completions = _make_gateway(LLMGatewayConfig())
+    original_create = completions.create
+
+    async def create_with_usage(**kwargs):
+        completion = await original_create(**kwargs)
+        completion.usage = SimpleNamespace(
+            prompt_tokens=6000,
+            completion_tokens=50,
+            prompt_tokens_details=SimpleNamespace(cached_tokens=5120),
+        )
+        return completion
+
+    completions.create = create_with_usage
+    asyncio.run(gateway.chat(model="gpt-test", messages=[]))
+
+    stats = gateway.get_stats()["gpt-test"]
+    assert stats["cached_prompt_tokens"] == 5120
+    assert stats["uncached_prompt_tokens"] == 880
+    assert round(stats["prompt_cache_hit_rate"], 3) == 0.853
@@ -0,0 +1,89 @@
+"""
+Tests for map-reduce summarisation
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from map_reduce import map_reduce_notes, split_for_map, use_map_reduce
+
+
+def _run(documents, complete, **kwargs):
+    async def collect():
+        return [event async for event in map_reduce_notes(documents, "Q4 revenue", complete, **kwargs)]
+    return asyncio.run(collect())
+
+
+def test_map_runs_concurrently_and_reports_progress():
+    """Every chunk is summarised with bounded parallelism and one progress event each"""
+    in_flight = {"now": 0, "max": 0}
+
+    async def complete(prompt, max_tokens):
+        in_flight["now"] += 1
+        in_flight["max"] = max(in_flight["max"], in_flight["now"])
+        await asyncio.sleep(0.01)
+        in_flight["now"] -= 1
+        return "NONE" if "other.txt" in prompt else "- revenue grew 12%"
+
+    documents = [{"path": f"doc{i}.md", "content": "Q4 revenue grew"} for i in range(6)]
+    documents.append({"path": "other.txt", "content": "unrelated"})
+    events = _run(documents, complete, concurrency=3)
+
+    progress = [e for e in events if e["type"] == "progress"]
+    assert len(progress) == 7
+    assert progress[-1]["done"] == progress[-1]["total"] == 7
+    assert in_flight["max"] == 3
+    assert events[-1]["type"] == "notes"
+    assert events[-1]["text"].count("revenue grew 12%") == 6
+    assert "other.txt" not in events[-1]["text"]
+
+
+def test_reduce_merges_notes_until_they_fit():
+    """Notes over the budget are merged in batches"""
+    async def complete(prompt, max_tokens):
+        if prompt.startswith('The user request is: "Q4 revenue"\n\nBelow are notes'):
+            return "- merged"
+        return "- " + "fact " * 40
+
+    documents = [{"path": f"doc{i}.md", "content": "Q4"} for i in range(8)]
+    events = _run(documents, complete, budget_tokens=120)
+
+    assert any(e.get("stage") == "reduce" for e in events)
+    assert "- merged" in events[-1]["text"]
+    assert "fact" not in events[-1]["text"]
+
+
+def test_failed_merge_keeps_its_notes():
+    """A merge call that fails keeps that batch's notes and is counted, the rest still merge"""
+    merges = {"calls": 0}
+
+    async def complete(prompt, max_tokens):
+        if prompt.startswith('The user request is: "Q4 revenue"\n\nBelow are notes'):
+            merges["calls"] += 1
+            if merges["calls"] == 1:
+                raise TimeoutError("merge timed out")
+            return "- merged"
+        return "- " + "fact " * 40
+
+    documents = [{"path": f"doc{i}.md", "content": "Q4"} for i in range(8)]
+    events = _run(documents, complete, budget_tokens=120, concurrency=1)
+
+    assert any("Could not merge 1" in e.get("message", "") for e in events)
+    assert events[-1]["type"] == "notes"
+    assert events[-1]["merge_failed"] >= 1
+    assert "fact" in events[-1]["text"] and "- merged" in events[-1]["text"]
+
+
+def test_split_and_mode_selection():
+    """Large documents are chunked, auto mode switches on size or count"""
+    inputs = split_for_map([{"path": "big.log", "content": "line of text\n" * 400}], chunk_tokens=200)
+    assert len(inputs) > 1
+    assert inputs[0][0].startswith("big.log (part 1/")
+
+    assert not use_map_reduce("auto", 5, 1000, single_max_files=10)
+    assert use_map_reduce("auto", 50, 1000, single_max_files=10)
+    assert use_map_reduce("map_reduce", 1, 10, single_max_files=10)
+    assert not use_map_reduce("single", 50, 10 ** 6, single_max_files=10)
@@ -0,0 +1,123 @@
+"""
+Tests for the screenshot pipeline and settle detection
+"""
+
+import asyncio
+import os
+import sys
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from PIL import Image, ImageDraw
+
+from page_capture import FrameDecisionCache, Screenshot, dhash, encode_screenshot, hash_distance, wait_for_settle
+
+
+def _png(draw_box=None, size=(1280, 720)):
+    image = Image.new("RGB", size, "white")
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((0, 0, size[0] // 2, 60), fill="navy")
+    if draw_box:
+        draw.rectangle(draw_box, fill="red")
+    out = BytesIO()
+    image.save(out, format="PNG")
+    return out.getvalue()
+
+
+def test_encode_downscales_and_compresses():
+    """A 1280x720 PNG becomes a smaller JPEG with a viewport scale factor"""
+    out = BytesIO()
+    Image.effect_noise((1280, 720), 48).convert("RGB").save(out, format="PNG")
+    png = out.getvalue()
+    shot = encode_screenshot(png, width=640, fmt="jpeg", quality=70)
+    assert (shot.width, shot.height) == (640, 360)
+    assert shot.scale == 2.0
+    assert shot.mime_type == "image/jpeg"
+    assert len(shot.data) < len(png)
+    assert shot.data_url.startswith("data:image/jpeg;base64,")
+
+    webp = encode_screenshot(png, width=0, fmt="webp")
+    assert (webp.width, webp.height) == (1280, 720)
+    assert webp.mime_type == "image/webp"
+
+
+def test_map_decision_scales_click_coordinates_only():
+    """Clicks map to viewport pixels; scroll amounts are left alone"""
+    shot = encode_screenshot(_png(), width=640)
+    assert shot.map_decision({"action": "click", "x": 100, "y": 50}) == {"action": "click", "x": 200.0, "y": 100.0}
+    assert shot.map_decision({"action": "scroll", "x": 0, "y": 300}) == {"action": "scroll", "x": 0, "y": 300}
+
+
+def test_dhash_ignores_noise_but_sees_layout_changes():
+    """Re-encoding keeps the hash close; a new block on the page moves it"""
+    base = Image.open(BytesIO(_png()))
+    jpeg = BytesIO()
+    base.save(jpeg, format="JPEG", quality=40)
+    assert hash_distance(dhash(base), dhash(Image.open(jpeg))) <= 4
+
+    changed = Image.open(BytesIO(_png(draw_box=(700, 200, 1200, 700))))
+    assert hash_distance(dhash(base), dhash(changed)) > 4
+
+
+def _shot(phash, contrast=50.0):
+    return Screenshot(data=b"", mime_type="image/jpeg", width=1, height=1, scale=1.0, phash=phash, contrast=contrast)
+
+
+def test_frame_cache_reuses_decisions_for_unchanged_frames():
+    """Same instruction on the same URL with a near-identical hash hits; other frames miss"""
+    cache = FrameDecisionCache(max_distance=2)
+    url = "https://example.com/"
+    cache.put("s1", url, "click search", _shot(0b1010), {"action": "click", "x": 1, "y": 2})
+    assert cache.get("s1", url, "click search", _shot(0b1011)) == {"action": "click", "x": 1, "y": 2}
+    assert cache.get("s1", url, "click search", _shot(0b0101)) is None
+    assert cache.get("s2", url, "click search", _shot(0b1010)) is None
+    assert cache.get("s1", "https://example.com/other", "click search", _shot(0b1010)) is None
+    assert cache.get_stats()["hits"] == 1
+
+
+def test_uniform_frames_are_never_cached():
+    """Blank frames all hash alike, so their decisions are neither stored nor reused"""
+    out = BytesIO()
+    Image.new("RGB", (1280, 720), "white").save(out, format="PNG")
+    blank = encode_screenshot(out.getvalue(), width=640)
+    assert blank.uniform
+    assert not encode_screenshot(_png(), width=640).uniform
+
+    cache = FrameDecisionCache()
+    cache.put("s1", "about:blank", "click search", blank, {"action": "click", "x": 1, "y": 2})
+    assert cache.get("s1", "about:blank", "click search", blank) is None
+    assert cache.get_stats()["entries"] == 0 and cache.get_stats()["uniform"] == 1
+
+
+class FakePage:
+    def __init__(self, fail_first=False):
+        self.calls = []
+        self.fail_first = fail_first
+
+    async def wait_for_load_state(self, state, timeout=None):
+        self.calls.append(("load_state", state))
+
+    async def evaluate(self, script, arg=None):
+        self.calls.append(("quiet", arg[0]))
+        if self.fail_first:
+            self.fail_first = False
+            raise RuntimeError("Execution context was destroyed")
+
+
+def test_wait_for_settle_waits_for_network_and_dom():
+    """Settling waits for network idle, then a DOM quiet period; retries after a navigation"""
+    page = FakePage()
+    asyncio.run(wait_for_settle(page, timeout_ms=1000, quiet_ms=50))
+    assert page.calls == [("load_state", "networkidle"), ("quiet", 50)]
+
+    page = FakePage(fail_first=True)
+    asyncio.run(wait_for_settle(page, timeout_ms=1000, quiet_ms=50))
+    assert len(page.calls) == 4
+
+
+def test_map_decision_scales_plan_steps():
+    """Coordinates inside a multi-step plan are mapped too"""
+    shot = encode_screenshot(_png(), width=640)
+    decision = shot.map_decision({"plan": [{"action": "click", "x": 10, "y": 10}, {"action": "press", "key": "Enter"}]})
+    assert decision["plan"][0] == {"action": "click", "x": 20.0, "y": 20.0}
@@ -0,0 +1,124 @@
+"""
+Tests for DOM-based browser action decisions
+"""
+
+import asyncio
+import json
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from page_elements import build_dom_prompt, decide_from_dom, format_snapshot
+
+
+SNAPSHOT = {
+    "url": "https://example.com/",
+    "title": "Example",
+    "elements": [
+        {"id": 1, "tag": "input", "role": "", "type": "search", "label": "", "placeholder": "Search", "href": "", "in_view": True},
+        {"id": 2, "tag": "a", "role": "", "type": "", "label": "More info", "placeholder": "", "href": "/about", "in_view": False},
+    ],
+    "text": "Example Domain",
+    "scroll_y": 0,
+    "page_height": 1400,
+    "viewport_height": 720,
+}
+
+
+class FakeLocator:
+    def __init__(self, box):
+        self.box = box
+        self.first = self
+
+    async def count(self):
+        return 1 if self.box else 0
+
+    async def scroll_into_view_if_needed(self, timeout=None):
+        pass
+
+    async def bounding_box(self):
+        return self.box
+
+
+class FakePage:
+    def __init__(self, snapshot, boxes):
+        self.snapshot = snapshot
+        self.boxes = boxes
+        self.selectors = []
+
+    async def evaluate(self, script, arg=None):
+        return self.snapshot
+
+    def locator(self, selector):
+        self.selectors.append(selector)
+        element_id = int(selector.split('"')[1])
+        return FakeLocator(self.boxes.get(element_id))
+
+
+def _chat(decision, calls=None):
+    async def chat(**kwargs):
+        if calls is not None:
+            calls.append(kwargs)
+        message = SimpleNamespace(content=json.dumps(decision))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    return chat
+
+
+def test_format_snapshot_lists_elements_compactly():
+    """Each element is one indexed line; off-screen ones are marked"""
+    text = format_snapshot(SNAPSHOT)
+    assert '[1] input type=search placeholder="Search"' in text
+    assert '[2] a "More info" href=/about (below)' in text
+    assert "Page text (excerpt): Example Domain" in text
+
+
+def test_build_dom_prompt_adds_caller_actions_and_fields():
+    """Caller-specific actions and JSON fields are included in the prompt"""
+    prompt = build_dom_prompt("Intro", extra_actions=['done: {"action": "done"}'], extra_fields={"next_steps": "what next"})
+    assert prompt.startswith("Intro")
+    assert '- done: {"action": "done"}' in prompt
+    assert '"next_steps": "what next"' in prompt
+
+
+def test_decision_resolves_element_to_its_center():
+    """An element id becomes viewport coordinates in the vision result shape"""
+    page = FakePage(SNAPSHOT, {1: {"x": 100, "y": 50, "width": 200, "height": 20}})
+    calls = []
+    decision = asyncio.run(decide_from_dom(
+        page, _chat({"action": "type", "element": 1, "text": "cats"}, calls), "system", "User command: search cats"
+    ))
+    assert decision["x"] == 200 and decision["y"] == 60
+    assert decision["text"] == "cats"
+    assert page.selectors == ['[data-agentic-id="1"]']
+    # Text only: no image in the request
+    assert all(isinstance(m["content"], str) for m in calls[0]["messages"])
+
+
+def test_falls_back_without_elements_or_on_request():
+    """No elements, an unknown id, or an explicit screenshot request return None"""
+    empty = FakePage({**SNAPSHOT, "elements": []}, {})
+    assert asyncio.run(decide_from_dom(empty, _chat({"action": "click", "element": 1}), "s", "c")) is None
+
+    page = FakePage(SNAPSHOT, {})
+    assert asyncio.run(decide_from_dom(page, _chat({"action": "click", "element": 7}), "s", "c")) is None
+    assert asyncio.run(decide_from_dom(page, _chat({"action": "screenshot"}), "s", "c")) is None
+
+
+def test_scroll_passes_through():
+    """Actions without an element keep the model's fields"""
+    page = FakePage(SNAPSHOT, {})
+    decision = asyncio.run(decide_from_dom(page, _chat({"action": "scroll", "x": 0, "y": 600}), "s", "c"))
+    assert decision == {"action": "scroll", "x": 0, "y": 600}
+
+
+def test_plan_resolves_only_its_first_step():
+    """The first plan step is located up front; later ones are left for execution"""
+    page = FakePage(SNAPSHOT, {1: {"x": 0, "y": 0, "width": 10, "height": 10}})
+    plan = [{"action": "type", "element": 1, "text": "cats"}, {"action": "press", "key": "Enter"}, {"action": "click", "element": 2}]
+    decision = asyncio.run(decide_from_dom(page, _chat({"plan": plan}), "s", "c"))
+    assert decision["plan"][0]["x"] == 5
+    assert "x" not in decision["plan"][2]
+    assert page.selectors == ['[data-agentic-id="1"]']
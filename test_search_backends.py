@@ -0,0 +1,81 @@
+"""
+Tests for the thread/process scan search backends
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from search_backends import ScanSearcher, create_searcher, search_stream
+from file_index import FileIndex
+
+
+def _write(root, rel_path, content):
+    target = root / rel_path
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target.write_text(content, encoding="utf-8")
+
+
+def _corpus(root):
+    _write(root, "Reports/Q4_Financial.md", "Summary")
+    _write(root, "Desktop/notes.txt", "todo\nQ4 financial review\nmore q4 financial notes\n")
+    _write(root, "Desktop/other.txt", "nothing relevant")
+
+
+def test_scan_modes_match_result_shape(tmp_path):
+    """Thread and process scans return filename hits first, then content hits with lines"""
+    _corpus(tmp_path)
+    expected = [
+        {"path": "Reports/Q4_Financial.md", "match_type": "filename"},
+        {"path": "Desktop/notes.txt", "match_type": "content", "line_count": 2, "sample_lines": [2, 3]},
+    ]
+    for mode in ("thread", "process"):
+        searcher = ScanSearcher(tmp_path, mode, max_workers=2)
+        try:
+            assert searcher.search("Q4 financial") == expected
+        finally:
+            searcher.close()
+
+
+def test_iter_search_stops_at_limit(tmp_path):
+    """Streaming search stops once the limit is reached"""
+    for i in range(20):
+        _write(tmp_path, f"docs/file{i}.txt", "shared keyword")
+    searcher = ScanSearcher(tmp_path, "thread", max_workers=2)
+    try:
+        assert len(list(searcher.iter_search("keyword", limit=5))) == 5
+    finally:
+        searcher.close()
+
+
+def test_create_searcher_defaults_to_index(tmp_path):
+    """Unknown or index backends fall back to the file index"""
+    index = FileIndex(tmp_path)
+    assert create_searcher(tmp_path, index, "index") is index
+    assert create_searcher(tmp_path, index, "bogus") is index
+    assert isinstance(create_searcher(tmp_path, index, "thread"), ScanSearcher)
+
+
+def test_search_stream_yields_ranked_results_up_to_limit(tmp_path):
+    """The async stream yields ranked hits and stops after the limit"""
+    _corpus(tmp_path)
+    for i in range(10):
+        _write(tmp_path, f"misc/file{i}.txt", "q4 financial")
+
+    async def collect(searcher, limit):
+        return [result async for result in search_stream(searcher, "Q4 financial", limit=limit)]
+
+    index = FileIndex(tmp_path)
+    index.sync()
+    results = asyncio.run(collect(index, 3))
+    assert len(results) == 3
+    assert results[0]["path"] == "Reports/Q4_Financial.md"
+    assert all("score" in result for result in results)
+
+    searcher = ScanSearcher(tmp_path, "thread", max_workers=2)
+    try:
+        assert len(asyncio.run(collect(searcher, 4))) == 4
+    finally:
+        searcher.close()
@@ -0,0 +1,53 @@
+"""
+Tests for the optional semantic index
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+np = pytest.importorskip("numpy")
+
+from semantic_index import HashingEmbedder, SemanticIndex
+
+
+def _write(root, rel_path, content):
+    target = root / rel_path
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target.write_text(content, encoding="utf-8")
+
+
+def test_hashing_embedder_is_deterministic_and_normalized():
+    """The same text always maps to the same unit vector"""
+    embedder = HashingEmbedder(dim=64)
+    first, second = embedder.embed(["quarterly revenue growth", "quarterly revenue growth"])
+    assert np.allclose(first, second)
+    assert abs(float(np.linalg.norm(first)) - 1.0) < 1e-5
+
+
+def test_search_ranks_related_files_and_tracks_changes(tmp_path):
+    """Queries find related wording, edits are re-embedded and deletions dropped"""
+    _write(tmp_path, "Finance/q4.md", "Quarterly revenue grew and finances improved\n")
+    _write(tmp_path, "Clients/acme.txt", "Acme client onboarding status\n")
+    _write(tmp_path, "notes.txt", "Lunch menu for the team offsite\n")
+
+    index = SemanticIndex(tmp_path, HashingEmbedder(dim=256))
+    assert index.sync()["embedded"] == 3
+
+    results = index.search("financial revenue for the quarter", k=2)
+    assert results[0]["path"] == "Finance/q4.md"
+    assert results[0]["match_type"] == "semantic"
+    assert results[0]["lines"] == [1, 1]
+
+    (tmp_path / "notes.txt").unlink()
+    _write(tmp_path, "Clients/acme.txt", "Acme client revenue forecast\n")
+    assert index.sync() == {"embedded": 1, "removed": 1, "chunks": 2}
+
+    # The manifest and float16 matrix reload from disk
+    reloaded = SemanticIndex(tmp_path, HashingEmbedder(dim=256))
+    assert reloaded.get_stats()["chunks"] == 2
+    assert reloaded._matrix.dtype == np.float16
+    assert {r["path"] for r in reloaded.search("client forecast", k=5)} == {"Clients/acme.txt", "Finance/q4.md"}
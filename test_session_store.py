@@ -0,0 +1,103 @@
+"""
+Tests for the conversation session store
+"""
+
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from session_store import SessionStore, SessionStoreConfig, create_session_store
+
+
+def _pair(i):
+    return [{"role": "user", "content": f"q{i}"}, {"role": "assistant", "content": f"a{i}"}]
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_store(request, tmp_path):
+    stores = []
+
+    def make(**overrides):
+        config = SessionStoreConfig(backend=request.param, sqlite_path=str(tmp_path / "sessions.sqlite3"), **overrides)
+        store = create_session_store(config)
+        stores.append(store)
+        return store
+
+    yield make
+    for store in stores:
+        store.close()
+
+
+def test_history_is_capped_and_read_lazily(make_store):
+    """Only the newest messages are kept, reads return just the last N in order"""
+    store = make_store(max_messages=6)
+    for i in range(5):
+        store.append("s1", _pair(i))
+
+    assert store.get_history("s1", 4) == _pair(3) + _pair(4)
+    assert len(store.get_history("s1", 100)) == 6
+    assert store.get_history("missing", 4) == []
+    assert store.get_stats()["messages"] == 6
+
+
+def test_ttl_and_lru_cap(make_store):
+    """Expired sessions disappear and the least recently used session is evicted"""
+    store = make_store(max_sessions=2)
+    store.append("short", _pair(0), ttl_seconds=0.01)
+    time.sleep(0.02)
+    assert store.get_history("short", 4) == []
+
+    store.append("a", _pair(1))
+    store.append("b", _pair(2))
+    store.get_history("a", 2)
+    store.append("c", _pair(3))
+
+    assert store.get_history("b", 2) == []
+    assert store.get_history("a", 2) == _pair(1)
+    assert store.get_stats()["sessions"] == 2
+
+
+def test_sqlite_sessions_survive_restart(tmp_path):
+    """The SQLite backend reloads history after reopening"""
+    config = SessionStoreConfig(backend="sqlite", sqlite_path=str(tmp_path / "s.sqlite3"))
+    store = create_session_store(config)
+    store.append("s1", _pair(1))
+    store.close()
+
+    reopened = create_session_store(config)
+    assert reopened.get_history("s1", 4) == _pair(1)
+    reopened.close()
+
+
+def test_sqlite_reads_do_not_write(tmp_path):
+    """Reads only select; the LRU access time is written with the next append"""
+    config = SessionStoreConfig(backend="sqlite", sqlite_path=str(tmp_path / "s.sqlite3"), max_sessions=2)
+    store = create_session_store(config)
+    store.append("a", _pair(1))
+    store.append("b", _pair(2))
+
+    changes = store._conn.total_changes
+    assert store.get_history("a", 2) == _pair(1)
+    assert store.get_history("expired-or-missing", 2) == []
+    assert store._conn.total_changes == changes
+    assert not store._conn.in_transaction
+
+    store.append("c", _pair(3))
+    assert store.get_history("b", 2) == []
+    assert store.get_history("a", 2) == _pair(1)
+    store.close()
+
+
+def test_incomplete_store_cannot_be_created():
+    """A backend missing part of the interface fails at construction, not on first use."""
+
+    class PartialStore(SessionStore):
+        def get_history(self, session_id, max_messages):
+            return []
+
+    with pytest.raises(TypeError):
+        PartialStore(SessionStoreConfig())
@@ -0,0 +1,213 @@
+"""
+Tests for the shared state backend and browser session routing
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import worker_routing
+from shared_state import LeaderElector, MemoryStateBackend, SQLiteStateBackend, StateBackend
+from worker_routing import BrowserSessionRouter, claim_browser_session, live_workers, serve_forwarded_requests
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        state = MemoryStateBackend()
+    else:
+        state = SQLiteStateBackend(str(tmp_path / "state.sqlite3"))
+    yield state
+    state.close()
+
+
+def test_set_claims_are_exclusive(backend):
+    """Only the first add_member of an email ID succeeds"""
+    assert backend.add_member("processed", "m1")
+    assert not backend.add_member("processed", "m1")
+    assert backend.has_member("processed", "m1")
+    assert not backend.has_member("processed", "m2")
+    assert backend.count_members("processed") == 1
+
+
+def test_documents_keep_creation_order(backend):
+    """Updating a document does not move it in values()"""
+    backend.put("notes", "a", {"status": "scheduled"})
+    backend.put("notes", "b", {"status": "received"})
+    backend.put("notes", "a", {"status": "completed"})
+    assert backend.values("notes") == [{"status": "completed"}, {"status": "received"}]
+    backend.delete("notes", "a")
+    assert backend.get("notes", "a") is None
+    assert backend.get("notes", "a", {}) == {}
+
+
+def test_lease_is_exclusive_until_it_expires(backend):
+    """Another owner can take a lease only after it expires"""
+    assert backend.acquire_lease("leader", "w1", 0.2)
+    assert backend.acquire_lease("leader", "w1", 0.2)  # renewal
+    assert not backend.acquire_lease("leader", "w2", 0.2)
+    assert backend.lease_owner("leader") == "w1"
+    time.sleep(0.3)
+    assert backend.lease_owner("leader") is None
+    assert backend.acquire_lease("leader", "w2", 10)
+    backend.release_lease("leader", "w1")  # not the owner: no effect
+    assert backend.lease_owner("leader") == "w2"
+
+
+def test_mailbox_delivers_each_message_once(backend):
+    """Messages are received once by their recipient and replies taken once"""
+    message_id = backend.send("w2", {"path": "/x"})
+    assert backend.receive("w1") == []
+    assert backend.receive("w2") == [(message_id, {"path": "/x"})]
+    assert backend.receive("w2") == []
+    assert backend.take_reply(message_id) is None
+    backend.reply(message_id, {"status": 200})
+    assert backend.take_reply(message_id) == {"status": 200}
+    assert backend.take_reply(message_id) is None
+
+
+def test_purge_drops_only_old_mailbox_messages(backend):
+    """Messages nobody took a reply for are dropped once they pass the age limit"""
+    backend.send("w2", {"path": "/x"})
+    assert backend.purge_mailbox(60) == 0
+    time.sleep(0.01)
+    assert backend.purge_mailbox(0) == 1
+    assert backend.receive("w2") == []
+
+
+def test_incomplete_backend_cannot_be_created():
+    """A backend missing part of the interface fails at construction, not on first use"""
+
+    class PartialBackend(StateBackend):
+        def get(self, namespace, key, default=None):
+            return default
+
+    with pytest.raises(TypeError):
+        PartialBackend()
+
+
+def test_leader_elector_runs_on_one_worker():
+    """Only one of two electors starts the task"""
+    backend = MemoryStateBackend()
+    started = []
+
+    async def run():
+        async def work(name):
+            started.append(name)
+            await asyncio.sleep(10)
+
+        electors = [LeaderElector(backend, "email_monitor", 0.3, owner=name) for name in ("w1", "w2")]
+        tasks = [asyncio.create_task(e.run(lambda name=e.owner: work(name))) for e in electors]
+        await asyncio.sleep(0.25)
+        leaders = [e.owner for e in electors if e.is_leader]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return leaders
+
+    assert asyncio.run(run()) == ["w1"]
+    assert started == ["w1"]
+    assert backend.lease_owner("email_monitor") is None
+
+
+def _worker_app(backend, worker_id):
+    async def navigate(request: Request):
+        body = await request.json()
+        return JSONResponse({"worker": worker_id, "session_id": body.get("session_id")})
+
+    async def agent(request: Request):
+        return JSONResponse({"worker": worker_id, "session_id": request.path_params["session_id"]})
+
+    async def agents(request: Request):
+        return JSONResponse({"agents": {f"{worker_id}-s": {"status": "running"}}, "scheduler": {"worker": worker_id}})
+
+    app = Starlette(routes=[
+        Route("/api/browser/navigate", navigate, methods=["POST"]),
+        Route("/api/browser/agent/{session_id}", agent),
+        Route("/api/browser/agents", agents),
+    ])
+    app.add_middleware(BrowserSessionRouter, backend=backend, worker_id=worker_id)
+    return app
+
+
+def test_browser_requests_are_routed_to_the_owning_worker():
+    """Requests for a session owned by another live worker are answered by that worker"""
+    backend = MemoryStateBackend()
+    app_a = _worker_app(backend, "a")
+    app_b = _worker_app(backend, "b")
+    claim_browser_session(backend, "s1", worker_id="b")
+
+    async def run():
+        serve_b = asyncio.create_task(serve_forwarded_requests(app_b, backend, 5, worker_id="b"))
+        await asyncio.sleep(0.1)
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app_a), base_url="http://a") as client:
+            owned = (await client.post("/api/browser/navigate", json={"session_id": "s1"})).json()
+            by_path = (await client.get("/api/browser/agent/s1")).json()
+            local = (await client.post("/api/browser/navigate", json={"session_id": "s2"})).json()
+        serve_b.cancel()
+        await asyncio.gather(serve_b, return_exceptions=True)
+        # Once b stops renewing its lease, a serves the session itself
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app_a), base_url="http://a") as client:
+            orphaned = (await client.get("/api/browser/agent/s1")).json()
+        return owned, by_path, local, orphaned
+
+    owned, by_path, local, orphaned = asyncio.run(run())
+    assert owned == {"worker": "b", "session_id": "s1"}
+    assert by_path == {"worker": "b", "session_id": "s1"}
+    assert local == {"worker": "a", "session_id": "s2"}
+    assert orphaned == {"worker": "a", "session_id": "s1"}
+
+
+def test_status_endpoints_cover_every_live_worker():
+    """/api/browser/agents lists agents from all workers, with each worker's answer kept"""
+    backend = MemoryStateBackend()
+    app_a = _worker_app(backend, "a")
+    app_b = _worker_app(backend, "b")
+
+    async def run():
+        serving = [
+            asyncio.create_task(serve_forwarded_requests(app, backend, 5, worker_id=name))
+            for app, name in ((app_a, "a"), (app_b, "b"))
+        ]
+        await asyncio.sleep(0.1)
+        workers = sorted(live_workers(backend))
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app_a), base_url="http://a") as client:
+            merged = (await client.get("/api/browser/agents")).json()
+        for task in serving:
+            task.cancel()
+        await asyncio.gather(*serving, return_exceptions=True)
+        return workers, merged
+
+    workers, merged = asyncio.run(run())
+    assert workers == ["a", "b"]
+    assert set(merged["agents"]) == {"a-s", "b-s"}
+    assert merged["scheduler"] == {"worker": "a"}
+    assert merged["workers"]["b"]["scheduler"] == {"worker": "b"}
+    assert live_workers(backend) == []
+
+
+def test_serving_worker_purges_stale_mailbox_rows(monkeypatch):
+    """The mailbox loop drops abandoned messages without waiting for a restart"""
+    backend = MemoryStateBackend()
+    backend.send("gone", {"path": "/x"})
+    backend._mailbox[1]["created_at"] -= 3600
+    monkeypatch.setattr(worker_routing, "MAILBOX_PURGE_SECONDS", 0)
+
+    async def run():
+        serving = asyncio.create_task(serve_forwarded_requests(_worker_app(backend, "a"), backend, 5, worker_id="a"))
+        await asyncio.sleep(0.1)
+        serving.cancel()
+        await asyncio.gather(serving, return_exceptions=True)
+
+    asyncio.run(run())
+    assert backend._mailbox == {}
@@ -0,0 +1,313 @@
+"""Route browser requests to the worker process that owns the session.
+
+Playwright contexts, pages and browser agents are live objects inside one
+worker process and cannot be shared. When a worker creates a browser
+context it records itself as the session's owner in the shared state
+backend. :class:`BrowserSessionRouter` is an ASGI middleware that looks
+up the owner of each ``/api/browser/...`` request. If another live worker
+owns the session, the request goes into that worker's mailbox and this
+worker waits for the reply. :func:`serve_forwarded_requests` runs on
+every worker: it replays mailbox requests against the local app and
+keeps the worker's liveness lease fresh. Mailbox and reply polls back
+off from ``MAILBOX_POLL_SECONDS`` to ``MAILBOX_POLL_MAX_SECONDS`` while
+nothing arrives. Every ``MAILBOX_PURGE_SECONDS`` it also drops mailbox
+rows whose sender timed out or died, so long-running deployments do not
+accumulate them until the next restart.
+
+Worker-wide status endpoints (``CLUSTER_PATHS``) are sent to every live
+worker. Each answer appears under ``workers``, keyed by worker id. The
+top level keeps the local answer, and ``agents`` maps are merged.
+
+Sessions whose owner has stopped renewing its lease are served locally,
+and the local worker takes them over on first use.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import json
+import logging
+import os
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from shared_state import WORKER_ID, StateBackend
+
+
+logger = logging.getLogger(__name__)
+
+
+BROWSER_OWNER_NS = "browser_owner"
+WORKERS_NS = "workers"
+FORWARD_HEADER = "x-agentic-forwarded"
+FORWARD_TIMEOUT_SECONDS = float(os.getenv("WORKER_FORWARD_TIMEOUT_SECONDS", "120"))
+CLUSTER_TIMEOUT_SECONDS = float(os.getenv("WORKER_CLUSTER_TIMEOUT_SECONDS", "5"))
+MAILBOX_POLL_SECONDS = 0.05
+MAILBOX_POLL_MAX_SECONDS = float(os.getenv("WORKER_MAILBOX_POLL_MAX_SECONDS", "0.5"))
+MAILBOX_PURGE_SECONDS = float(os.getenv("WORKER_MAILBOX_PURGE_SECONDS", "60"))
+
+SESSION_PATH_RE = re.compile(r"^/api/browser/(?:agent|proxy|resource|session)/([^/]+)")
+# Endpoints that carry the session in the JSON body ("default" when omitted)
+SESSION_BODY_PATHS = {"/api/browser/navigate", "/api/browser/control", "/api/browser/action"}
+# Per-worker status endpoints answered by every live worker
+CLUSTER_PATHS = {"/api/browser/agents", "/api/browser/pool", "/api/browser/sessions"}
+HOP_BY_HOP_HEADERS = {"host", "content-length", "transfer-encoding", "connection"}
+
+
+def worker_lease_name(worker_id: str) -> str:
+    return f"worker:{worker_id}"
+
+
+def claim_browser_session(backend: StateBackend, session_id: str, worker_id: str = WORKER_ID) -> None:
+    """Record this worker as the owner of a browser session."""
+
+    backend.put(BROWSER_OWNER_NS, session_id, worker_id)
+
+
+def release_browser_session(backend: StateBackend, session_id: str, worker_id: str = WORKER_ID) -> None:
+    if backend.get(BROWSER_OWNER_NS, session_id) == worker_id:
+        backend.delete(BROWSER_OWNER_NS, session_id)
+
+
+def live_owner(backend: StateBackend, session_id: str) -> Optional[str]:
+    """Owner worker of ``session_id`` if it is still alive."""
+
+    owner = backend.get(BROWSER_OWNER_NS, session_id)
+    if owner and backend.lease_owner(worker_lease_name(owner)) == owner:
+        return owner
+    return None
+
+
+def live_workers(backend: StateBackend) -> List[str]:
+    """Workers currently renewing their liveness lease (stale registrations are dropped)."""
+
+    workers = []
+    for worker_id in backend.values(WORKERS_NS):
+        if backend.lease_owner(worker_lease_name(worker_id)) == worker_id:
+            workers.append(worker_id)
+        else:
+            backend.delete(WORKERS_NS, worker_id)
+    return workers
+
+
+def merge_cluster_responses(local_worker: str, responses: Dict[str, Any]) -> Dict[str, Any]:
+    """Combine per-worker JSON answers: local fields on top, merged ``agents``, all under ``workers``."""
+
+    local = responses.get(local_worker)
+    merged = dict(local) if isinstance(local, dict) else {}
+    if isinstance(merged.get("agents"), dict):
+        merged["agents"] = {}
+        for answer in responses.values():
+            if isinstance(answer, dict) and isinstance(answer.get("agents"), dict):
+                merged["agents"].update(answer["agents"])
+    merged["workers"] = responses
+    return merged
+
+
+class BrowserSessionRouter:
+    """ASGI middleware forwarding browser requests to the owning worker."""
+
+    def __init__(self, app, backend: StateBackend, worker_id: str = WORKER_ID):
+        self.app = app
+        self.backend = backend
+        self.worker_id = worker_id
+
+    async def __call__(self, scope, receive, send):
+        path = scope.get("path", "")
+        if scope["type"] != "http" or not path.startswith("/api/browser/"):
+            return await self.app(scope, receive, send)
+        headers = dict(scope.get("headers") or [])
+        if FORWARD_HEADER.encode() in headers:
+            return await self.app(scope, receive, send)
+        if path in CLUSTER_PATHS and scope.get("method") == "GET":
+            return await self._gather(scope, send)
+
+        body = b""
+        session_id = None
+        match = SESSION_PATH_RE.match(path)
+        if match:
+            session_id = match.group(1)
+        elif path in SESSION_BODY_PATHS and scope.get("method") == "POST":
+            more_body = True
+            while more_body:
+                message = await receive()
+                body += message.get("body", b"")
+                more_body = message.get("more_body", False)
+            try:
+                session_id = json.loads(body or b"{}").get("session_id") or "default"
+            except (ValueError, AttributeError):
+                session_id = None
+
+        owner = await asyncio.to_thread(live_owner, self.backend, session_id) if session_id else None
+        if owner and owner != self.worker_id:
+            return await self._forward(owner, scope, body, send)
+
+        if path in SESSION_BODY_PATHS:
+            # The body was consumed above; replay it for the app
+            replayed = False
+
+            async def replay():
+                nonlocal replayed
+                if not replayed:
+                    replayed = True
+                    return {"type": "http.request", "body": body, "more_body": False}
+                return await receive()
+
+            return await self.app(scope, replay, send)
+        return await self.app(scope, receive, send)
+
+    async def _exchange(self, owner: str, scope, body: bytes, timeout: float) -> Optional[Dict[str, Any]]:
+        """Send a request to ``owner``'s mailbox and wait for its reply (None on timeout)."""
+
+        payload = {
+            "method": scope["method"],
+            "path": scope["path"],
+            "query_string": scope.get("query_string", b"").decode("latin-1"),
+            "headers": [
+                [k.decode("latin-1"), v.decode("latin-1")]
+                for k, v in scope.get("headers") or []
+                if k.decode("latin-1").lower() not in HOP_BY_HOP_HEADERS
+            ],
+            "body": base64.b64encode(body).decode("ascii"),
+        }
+        message_id = await asyncio.to_thread(self.backend.send, owner, payload)
+        deadline = time.monotonic() + timeout
+        delay = MAILBOX_POLL_SECONDS
+        while time.monotonic() < deadline:
+            reply = await asyncio.to_thread(self.backend.take_reply, message_id)
+            if reply is not None:
+                return reply
+            await asyncio.sleep(min(delay, max(deadline - time.monotonic(), 0)))
+            delay = min(delay * 2, MAILBOX_POLL_MAX_SECONDS)
+        return None
+
+    async def _forward(self, owner: str, scope, body: bytes, send) -> None:
+        reply = await self._exchange(owner, scope, body, FORWARD_TIMEOUT_SECONDS)
+        if reply is None:
+            status = 504
+            headers = [(b"content-type", b"application/json")]
+            content = json.dumps({"detail": f"Worker {owner} did not answer"}).encode()
+        else:
+            status = reply["status"]
+            headers = [(k.encode("latin-1"), v.encode("latin-1")) for k, v in reply["headers"]]
+            content = base64.b64decode(reply["body"])
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": content})
+
+    async def _call_local(self, scope) -> Dict[str, Any]:
+        """Run a bodiless request against the local app and decode its JSON answer."""
+
+        status, chunks = 500, []
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def capture(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        await self.app(scope, receive, capture)
+        if status != 200:
+            return {"error": f"HTTP {status}"}
+        return json.loads(b"".join(chunks) or b"{}")
+
+    async def _call_remote(self, worker_id: str, scope) -> Dict[str, Any]:
+        reply = await self._exchange(worker_id, scope, b"", CLUSTER_TIMEOUT_SECONDS)
+        if reply is None:
+            return {"error": "did not answer"}
+        if reply["status"] != 200:
+            return {"error": f"HTTP {reply['status']}"}
+        return json.loads(base64.b64decode(reply["body"]) or b"{}")
+
+    async def _gather(self, scope, send) -> None:
+        workers = await asyncio.to_thread(live_workers, self.backend)
+        others = [worker_id for worker_id in workers if worker_id != self.worker_id]
+        answers = await asyncio.gather(
+            self._call_local(scope),
+            *[self._call_remote(worker_id, scope) for worker_id in others],
+            return_exceptions=True,
+        )
+        responses = {
+            worker_id: {"error": str(answer)} if isinstance(answer, Exception) else answer
+            for worker_id, answer in zip([self.worker_id, *others], answers)
+        }
+        content = json.dumps(merge_cluster_responses(self.worker_id, responses)).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(content)).encode())],
+        })
+        await send({"type": "http.response.body", "body": content})
+
+
+async def _handle_forwarded(client: httpx.AsyncClient, backend: StateBackend, message_id: int, payload: Dict[str, Any]) -> None:
+    url = payload["path"] + (f"?{payload['query_string']}" if payload["query_string"] else "")
+    try:
+        response = await client.request(
+            payload["method"],
+            url,
+            headers=[(k, v) for k, v in payload["headers"]] + [(FORWARD_HEADER, "1")],
+            content=base64.b64decode(payload["body"]),
+        )
+        reply = {
+            "status": response.status_code,
+            "headers": [
+                [k, v] for k, v in response.headers.multi_items() if k.lower() not in HOP_BY_HOP_HEADERS
+            ],
+            "body": base64.b64encode(response.content).decode("ascii"),
+        }
+    except Exception as e:
+        logger.error(f"Forwarded request {payload['path']} failed: {e}", exc_info=True)
+        reply = {
+            "status": 502,
+            "headers": [["content-type", "application/json"]],
+            "body": base64.b64encode(json.dumps({"detail": str(e)}).encode()).decode("ascii"),
+        }
+    await asyncio.to_thread(backend.reply, message_id, reply)
+
+
+async def serve_forwarded_requests(
+    app,
+    backend: StateBackend,
+    lease_seconds: float,
+    worker_id: str = WORKER_ID,
+) -> None:
+    """Keep this worker's liveness lease fresh and answer requests forwarded to it."""
+
+    lease_name = worker_lease_name(worker_id)
+    last_beat = 0.0
+    last_purge = time.monotonic()
+    delay = MAILBOX_POLL_SECONDS
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://worker", timeout=FORWARD_TIMEOUT_SECONDS
+    ) as client:
+        try:
+            while True:
+                try:
+                    if time.monotonic() - last_beat >= lease_seconds / 3:
+                        await asyncio.to_thread(backend.acquire_lease, lease_name, worker_id, lease_seconds)
+                        await asyncio.to_thread(backend.put, WORKERS_NS, worker_id, worker_id)
+                        last_beat = time.monotonic()
+                    if time.monotonic() - last_purge >= MAILBOX_PURGE_SECONDS:
+                        purged = await asyncio.to_thread(backend.purge_mailbox)
+                        if purged:
+                            logger.info(f"Dropped {purged} stale mailbox messages")
+                        last_purge = time.monotonic()
+                    messages = await asyncio.to_thread(backend.receive, worker_id)
+                    for message_id, payload in messages:
+                        asyncio.create_task(_handle_forwarded(client, backend, message_id, payload))
+                    # Poll quickly while requests arrive, back off while idle
+                    delay = MAILBOX_POLL_SECONDS if messages else min(delay * 2, MAILBOX_POLL_MAX_SECONDS)
+                except Exception as e:
+                    logger.warning(f"Worker mailbox poll failed: {e}")
+                await asyncio.sleep(delay)
+        finally:
+            backend.delete(WORKERS_NS, worker_id)
+            backend.release_lease(lease_name, worker_id)